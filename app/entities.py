@@ -1,9 +1,24 @@
+from __future__ import annotations
+
+import dataclasses
+
 from .utils import LastName, Event
 
 
+@dataclasses.dataclass(frozen=True)
 class Person:
-    def __init__(self, lastname: LastName, firstnames, birthday: Event, death: Event):
-        self.__lastname = lastname
-        self.__firstnames = firstnames
-        self.__birthday = birthday
-        self.__death = death
+    """A person of a family tree. Persons are immutable, edits are made by replacing them in their tree."""
+    lastname: LastName
+    firstnames: tuple[str, ...]
+    birthday: Event = None
+    death: Event = None
+    notes: str = ''
+    parent_ids: tuple[int, ...] = ()
+
+    @property
+    def full_name(self) -> str:
+        """The first names of this person followed by their last name."""
+        names = list(self.firstnames)
+        if self.lastname:
+            names.append(self.lastname.label)
+        return ' '.join(names)
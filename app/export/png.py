@@ -0,0 +1,82 @@
+"""Streaming PNG encoder, for images too large to be held in memory."""
+from __future__ import annotations
+
+import struct
+import typing as typ
+import zlib
+
+SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Size of the compressed data buffered before writing an IDAT chunk
+_CHUNK_SIZE = 1 << 16
+
+
+class PngWriter:
+    """Writes an 8-bit RGB PNG image row by row, so that the whole image never has to be in memory.
+
+    Rows are compressed as they are written. The writer must be closed once all rows have been written.
+    """
+
+    def __init__(self, file: typ.BinaryIO, width: int, height: int, compression_level: int = 6):
+        """Writes the header of an image.
+
+        :param file: A binary file to write to.
+        :param width: Width of the image in pixels.
+        :param height: Height of the image in pixels.
+        :param compression_level: The zlib compression level, from 0 to 9.
+        :raise ValueError: If a dimension is not in [1, 2^31 - 1].
+        """
+        for dimension in (width, height):
+            if not 0 < dimension < 2 ** 31:
+                raise ValueError(f'invalid image dimension {dimension}')
+        self._file = file
+        self._width = width
+        self._height = height
+        self._rows = 0
+        self._compressor = zlib.compressobj(compression_level)
+        self._buffer = bytearray()
+        file.write(SIGNATURE)
+        # Bit depth 8, color type 2 (RGB), default compression, filter and interlace methods
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    @property
+    def rows_written(self) -> int:
+        return self._rows
+
+    def write_row(self, row: bytes):
+        """Writes the next row of the image.
+
+        :param row: The RGB values of the row’s pixels, 3 bytes per pixel.
+        :raise ValueError: If the row’s length does not match the image’s width or all rows were already written.
+        """
+        if len(row) != 3 * self._width:
+            raise ValueError(f'expected {3 * self._width} bytes, got {len(row)}')
+        if self._rows == self._height:
+            raise ValueError('all rows have already been written')
+        # Filter type 0 (none) before each row
+        self._buffer += self._compressor.compress(b'\x00')
+        self._buffer += self._compressor.compress(row)
+        self._rows += 1
+        if len(self._buffer) >= _CHUNK_SIZE:
+            self._flush()
+
+    def close(self):
+        """Writes the remaining compressed data and the end of the image. Does not close the underlying file.
+
+        :raise ValueError: If not all rows have been written.
+        """
+        if self._rows != self._height:
+            raise ValueError(f'{self._height - self._rows} rows are missing')
+        self._buffer += self._compressor.flush()
+        self._flush()
+        self._write_chunk(b'IEND', b'')
+
+    def _flush(self):
+        if self._buffer:
+            self._write_chunk(b'IDAT', bytes(self._buffer))
+            self._buffer.clear()
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(chunk_type + data)))
@@ -0,0 +1,58 @@
+"""Streaming SVG writer, for drawings too large to be held in memory."""
+from __future__ import annotations
+
+import typing as typ
+from xml.sax import saxutils
+
+
+def _number(value: float) -> str:
+    return f'{value:.2f}'.rstrip('0').rstrip('.')
+
+
+class SvgWriter:
+    """Writes SVG elements to a file as soon as they are drawn.
+
+    The writer must be closed once all elements have been written.
+    """
+
+    def __init__(self, file: typ.TextIO, width: float, height: float, view_box: tuple[float, float, float, float],
+                 stylesheet: str = ''):
+        """Writes the header of a document.
+
+        :param file: A text file to write to.
+        :param width: Width of the document in pixels.
+        :param height: Height of the document in pixels.
+        :param view_box: The drawing’s area in user coordinates, as (x, y, width, height).
+        :param stylesheet: CSS rules for the document’s elements.
+        """
+        self._file = file
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{_number(width)}" height="{_number(height)}" '
+                   f'viewBox="{" ".join(map(_number, view_box))}">\n')
+        if stylesheet:
+            file.write(f'<style>{saxutils.escape(stylesheet)}</style>\n')
+
+    def rect(self, x: float, y: float, width: float, height: float, radius: float = 0, css_class: str = None):
+        attributes = self._attributes(x=x, y=y, width=width, height=height, rx=radius or None, css_class=css_class)
+        self._file.write(f'<rect {attributes}/>\n')
+
+    def polyline(self, points: typ.Iterable[tuple[float, float]], css_class: str = None):
+        points = ' '.join(f'{_number(x)},{_number(y)}' for x, y in points)
+        self._file.write(f'<polyline {self._attributes(points=points, css_class=css_class)}/>\n')
+
+    def text(self, x: float, y: float, text: str, css_class: str = None):
+        """Writes a text whose baseline starts at the given point, or is centered on it depending on the style."""
+        self._file.write(f'<text {self._attributes(x=x, y=y, css_class=css_class)}>{saxutils.escape(text)}</text>\n')
+
+    def close(self):
+        """Writes the end of the document. Does not close the underlying file."""
+        self._file.write('</svg>\n')
+
+    @staticmethod
+    def _attributes(css_class: str = None, **attributes) -> str:
+        if css_class:
+            attributes['class'] = css_class
+        return ' '.join(
+            f'{name}={saxutils.quoteattr(_number(value) if isinstance(value, (int, float)) else value)}'
+            for name, value in attributes.items() if value is not None
+        )
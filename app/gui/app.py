@@ -2,20 +2,49 @@ import argparse
 import ctypes
 import datetime
 import os
+import pathlib
 import sys
 import traceback
 
+from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
 
-from . import config, constants, dialogs, logger, canvas
+from . import (autosave, config, consistency_check, constants, dialogs, logger, canvas, map_view, person_list, poster,
+               search, timeline)
 from .i18n import translate as _t
 from .util import gui
+from ..layout import lod
+from ..model import (consistency, cycles, dedupe, family, gazetteer, history, serialization, text_index,
+                     tree as tree_, trigram_index)
 
 
 class Application(QMainWindow):
+    # Maximum number of likely duplicates listed in the popup
+    MAX_SHOWN_DUPLICATES = 20
+
     def __init__(self):
         super().__init__(parent=None)
+        self._tree = tree_.FamilyTree()
+        self._tree_file: pathlib.Path | None = None
+        self._text_index = text_index.TextIndex.for_tree(self._tree)
+        self._trigram_index = trigram_index.TrigramIndex.for_tree(self._tree)
+        self._family = family.FamilyIndex(self._tree)
+        self._cycles = cycles.CycleDetector.for_tree(self._tree, self._family)
+        # Kept up to date with the tree, only the rules affected by each edit are evaluated again
+        self._consistency = consistency.ConsistencyChecker.for_tree(self._tree, self._family)
+        self._history = history.History.for_tree(self._tree)
+        # Shared by all trees so that places resolved once are resolved the same way in other trees
+        self._gazetteer = gazetteer.Gazetteer.load(constants.GAZETTEER_FILE) or gazetteer.Gazetteer()
+        self._autosaver = autosave.Autosaver(lambda: self._tree, parent=self)
+        # noinspection PyUnresolvedReferences
+        qApp.aboutToQuit.connect(self._on_quit)
         self._init_ui()
+        self._canvas.set_tree(self._tree, self._family, None)
+        self._person_list.set_tree(self._tree)
+        self._timeline.set_tree(self._tree)
+        self._map.set_tree(self._tree)
+        self._history.add_listener(self._update_history_actions)
+        self._update_history_actions()
         gui.center(self)
 
     def _init_ui(self):
@@ -27,13 +56,47 @@ class Application(QMainWindow):
 
         main_widget = QWidget(parent=self)
         main_layout = QHBoxLayout()
-        self._canvas = canvas.Canvas(parent=self)
+        self._canvas = canvas.Canvas(debug=config.CONFIG.debug, generations=config.CONFIG.generations, parent=self)
         # noinspection PyArgumentList
         main_layout.addWidget(self._canvas)
         main_widget.setLayout(main_layout)
         self.setCentralWidget(main_widget)
 
+        self._person_list = person_list.PersonListPanel(parent=self)
+        # noinspection PyUnresolvedReferences
+        self._person_list.person_selected.connect(self._canvas.set_root)
+        self._person_list_dock = QDockWidget(_t('main_window.person_list.title'), parent=self)
+        self._person_list_dock.setObjectName('person_list')
+        self._person_list_dock.setWidget(self._person_list)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self._person_list_dock)
+
+        self._timeline = timeline.Timeline(parent=self)
+        # noinspection PyUnresolvedReferences
+        self._timeline.person_selected.connect(self._canvas.set_root)
+        self._timeline_dock = QDockWidget(_t('main_window.timeline.title'), parent=self)
+        self._timeline_dock.setObjectName('timeline')
+        self._timeline_dock.setWidget(self._timeline)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self._timeline_dock)
+
+        self._map = map_view.MapView(parent=self)
+        self._map_dock = QDockWidget(_t('main_window.map.title'), parent=self)
+        self._map_dock.setObjectName('map')
+        self._map_dock.setWidget(self._map)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self._map_dock)
+        self.tabifyDockWidget(self._timeline_dock, self._map_dock)
+
         self._init_menu()
+        self._init_toolbar()
+
+    def _init_toolbar(self):
+        toolbar = self.addToolBar(_t('main_window.toolbar.label'))
+        toolbar.setMovable(False)
+        self._search_field = search.PersonSearchField(lambda: self._tree, lambda: self._trigram_index, parent=self)
+        self._search_field.setPlaceholderText(_t('main_window.toolbar.search.placeholder'))
+        self._search_field.setMaximumWidth(300)
+        # noinspection PyUnresolvedReferences
+        self._search_field.person_selected.connect(self._canvas.set_root)
+        toolbar.addWidget(self._search_field)
 
     def _init_menu(self):
         menubar = self.menuBar()
@@ -57,6 +120,12 @@ class Application(QMainWindow):
             self._save_tree_as,
             'Ctrl+Shift+S'
         )
+        file_menu.addAction(
+            gui.icon('export'),
+            _t('main_window.menu.file.item.export_poster'),
+            self._export_poster,
+            'Ctrl+Shift+E'
+        )
         file_menu.addSeparator()
         file_menu.addAction(
             gui.icon('exit'),
@@ -66,6 +135,19 @@ class Application(QMainWindow):
         )
 
         edit_menu = menubar.addMenu(_t('main_window.menu.edit.label'))
+        self._undo_action = edit_menu.addAction(
+            gui.icon('undo'),
+            _t('main_window.menu.edit.item.undo'),
+            self._undo,
+            'Ctrl+Z'
+        )
+        self._redo_action = edit_menu.addAction(
+            gui.icon('redo'),
+            _t('main_window.menu.edit.item.redo'),
+            self._redo,
+            'Ctrl+Shift+Z'
+        )
+        edit_menu.addSeparator()
         edit_menu.addAction(
             gui.icon('person-add'),
             _t('main_window.menu.edit.item.add_person'),
@@ -85,6 +167,24 @@ class Application(QMainWindow):
             'Del'
         )
 
+        view_menu = menubar.addMenu(_t('main_window.menu.view.label'))
+        modes_group = QActionGroup(self)
+        for mode, name, shortcut in ((canvas.ANCESTORS, 'ancestors', 'Ctrl+1'),
+                                     (canvas.DESCENDANTS, 'descendants', 'Ctrl+2'),
+                                     (canvas.HOURGLASS, 'hourglass', 'Ctrl+3'),
+                                     (canvas.FAN, 'fan_chart', 'Ctrl+4')):
+            action = view_menu.addAction(_t(f'main_window.menu.view.item.{name}'))
+            action.setShortcut(shortcut)
+            action.setCheckable(True)
+            action.setChecked(mode == self._canvas.mode)
+            # noinspection PyUnresolvedReferences
+            action.triggered.connect(lambda _, m=mode: self._canvas.set_mode(m))
+            modes_group.addAction(action)
+        view_menu.addSeparator()
+        view_menu.addAction(self._person_list_dock.toggleViewAction())
+        view_menu.addAction(self._timeline_dock.toggleViewAction())
+        view_menu.addAction(self._map_dock.toggleViewAction())
+
         tools_menu = menubar.addMenu(_t('main_window.menu.tools.label'))
         tools_menu.addAction(
             gui.icon('check-inconsistencies'),
@@ -92,12 +192,35 @@ class Application(QMainWindow):
             self._check_inconsistencies,
             'Ctrl+I'
         )
+        tools_menu.addAction(
+            _t('main_window.menu.tools.item.check_whole_tree'),
+            self._check_whole_tree
+        )
+        tools_menu.addAction(
+            _t('main_window.menu.tools.item.find_ancestry_loops'),
+            lambda: self._show_ancestry_loops(always=True),
+            'Ctrl+Shift+I'
+        )
+        tools_menu.addAction(
+            _t('main_window.menu.tools.item.find_duplicates'),
+            self._show_duplicates
+        )
+        tools_menu.addAction(
+            _t('main_window.menu.tools.item.normalize_places'),
+            self._normalize_places
+        )
         tools_menu.addAction(
             gui.icon('terminal'),
             _t('main_window.menu.tools.item.sparql_terminal'),
             self._open_sparql_terminal,
             'Ctrl+T'
         )
+        if config.CONFIG.debug:
+            tools_menu.addSeparator()
+            tools_menu.addAction(
+                _t('main_window.menu.tools.item.export_frame_stats'),
+                self._export_frame_stats
+            )
 
         help_menu = menubar.addMenu(_t('main_window.menu.help.label'))
         help_menu.addAction(
@@ -113,13 +236,79 @@ class Application(QMainWindow):
         )
 
     def _open_tree_file(self):
-        pass  # TODO
+        path, _ = QFileDialog.getOpenFileName(
+            parent=self,
+            caption=_t('dialog.open_tree.title'),
+            directory=str(config.CONFIG.last_directory or ''),
+            filter=_t('dialog.common.tree_file_filter', ext=constants.TREE_FILE_EXTENSION),
+        )
+        if not path:
+            return
+        path = pathlib.Path(path)
+        config.CONFIG.last_directory = path.parent
+        try:
+            tree = serialization.load_tree(path)
+        except (OSError, serialization.TreeFileError) as e:
+            logger.logger.exception(e)
+            gui.show_error(_t('popup.open_tree.error.text'), parent=self)
+            return
+        # Reuse the index saved alongside the tree file if it is in sync with it
+        index = text_index.TextIndex.load(text_index.index_path(path), serialization.read_save_id(path))
+        if index is not None:
+            index.attach(tree)
+        self._set_tree(tree, index)
+        self._tree_file = path
 
     def _save_tree(self):
-        pass  # TODO
+        if self._tree_file is None:
+            self._save_tree_as()
+        else:
+            self._write_tree(self._tree_file)
 
     def _save_tree_as(self):
-        pass  # TODO
+        path, _ = QFileDialog.getSaveFileName(
+            parent=self,
+            caption=_t('dialog.save_tree.title'),
+            directory=str(config.CONFIG.last_directory or ''),
+            filter=_t('dialog.common.tree_file_filter', ext=constants.TREE_FILE_EXTENSION),
+        )
+        if not path:
+            return
+        path = pathlib.Path(path)
+        if not path.suffix:
+            path = path.with_suffix(constants.TREE_FILE_EXTENSION)
+        config.CONFIG.last_directory = path.parent
+        if self._write_tree(path):
+            self._tree_file = path
+
+    def _write_tree(self, path: pathlib.Path) -> bool:
+        try:
+            save_id = serialization.dump_tree(self._tree.snapshot(), path)
+            self._text_index.save(text_index.index_path(path), save_id)
+        except OSError as e:
+            logger.logger.exception(e)
+            gui.show_error(_t('popup.save_tree.error.text'), parent=self)
+            return False
+        self._autosaver.discard()
+        self._autosaver.start()
+        return True
+
+    def _undo(self):
+        self._history.undo()
+
+    def _redo(self):
+        self._history.redo()
+
+    def _update_history_actions(self):
+        """Enables the undo and redo actions according to the history and names the steps they would apply to."""
+        self._undo_action.setEnabled(self._history.can_undo)
+        label = self._history.undo_label
+        self._undo_action.setText(_t('main_window.menu.edit.item.undo_step', step=label) if label
+                                  else _t('main_window.menu.edit.item.undo'))
+        self._redo_action.setEnabled(self._history.can_redo)
+        label = self._history.redo_label
+        self._redo_action.setText(_t('main_window.menu.edit.item.redo_step', step=label) if label
+                                  else _t('main_window.menu.edit.item.redo'))
 
     def _add_person(self):
         pass  # TODO
@@ -131,17 +320,206 @@ class Application(QMainWindow):
         pass  # TODO
 
     def _check_inconsistencies(self):
-        pass  # TODO
+        """Shows the current findings of the incremental checker."""
+        findings = list(self._consistency.findings())
+        if not findings:
+            gui.show_info(_t('popup.check_inconsistencies.none.text'), parent=self)
+            return
+        dialogs.InconsistenciesDialog(self._tree, findings, self._canvas.set_root, parent=self).show()
+
+    def _check_whole_tree(self):
+        """Checks all persons of a snapshot of the tree from scratch in worker processes
+        and writes the findings to a report file."""
+        date = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        report_path = constants.REPORTS_DIR / f'inconsistencies_{date}.csv'
+        check = consistency_check.ConsistencyCheck(self._tree.snapshot(), report_path, parent=self)
+        progress_dialog = QProgressDialog(_t('popup.check_inconsistencies.progress.text'),
+                                          _t('dialog.common.cancel_button.label'), 0, 0, parent=self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+
+        def on_progress(done: int, total: int):
+            progress_dialog.setMaximum(total)
+            progress_dialog.setValue(done)
+
+        def on_finished(status: int):
+            progress_dialog.reset()
+            progress_dialog.deleteLater()
+            check.deleteLater()
+            if status == consistency_check.FAILED:
+                gui.show_error(_t('popup.check_inconsistencies.error.text'), parent=self)
+            elif status == consistency_check.COMPLETED:
+                self._show_inconsistencies(report_path)
+
+        # noinspection PyUnresolvedReferences
+        check.progress.connect(on_progress)
+        # noinspection PyUnresolvedReferences
+        check.finished.connect(on_finished)
+        # noinspection PyUnresolvedReferences
+        progress_dialog.canceled.connect(check.cancel)
+        check.start()
+
+    def _show_inconsistencies(self, report_path: pathlib.Path):
+        try:
+            findings = sorted(consistency.read_report(report_path), key=lambda f: (f.person_id, f.rule))
+        except (OSError, ValueError) as e:
+            logger.logger.exception(e)
+            gui.show_error(_t('popup.check_inconsistencies.error.text'), parent=self)
+            return
+        if not findings:
+            gui.show_info(_t('popup.check_inconsistencies.none.text'), parent=self)
+            return
+        dialogs.InconsistenciesDialog(self._tree, findings, self._canvas.set_root, report_path=report_path,
+                                      parent=self).show()
+
+    def _show_ancestry_loops(self, always: bool = False):
+        """Warns about the persons that are their own ancestors.
+
+        :param always: If true, a message is also shown when there are none.
+        """
+        loops = self._cycles.cycles()
+        if not loops:
+            if always:
+                gui.show_info(_t('popup.ancestry_loops.none.text'), parent=self)
+            return
+        lines = [' → '.join(self._person_label(pid) for pid in loop.person_ids + loop.person_ids[:1])
+                 for loop in loops]
+        gui.show_warning(_t('popup.ancestry_loops.text', count=len(loops), loops='\n'.join(lines)), parent=self)
+
+    def _show_duplicates(self):
+        """Lists the pairs of persons that are likely duplicates, from the most likely."""
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            suggestions = dedupe.find_duplicates(self._tree.persons())
+        finally:
+            QApplication.restoreOverrideCursor()
+        if not suggestions:
+            gui.show_info(_t('popup.duplicates.none.text'), parent=self)
+            return
+        lines = [f'{self._person_label(s.person_id_1)} ↔ {self._person_label(s.person_id_2)} ({s.score:.0%})'
+                 for s in suggestions[:self.MAX_SHOWN_DUPLICATES]]
+        gui.show_info(_t('popup.duplicates.text', count=len(suggestions), duplicates='\n'.join(lines)), parent=self)
+
+    def _person_label(self, person_id: int) -> str:
+        return f'{self._tree[person_id].full_name} (#{person_id})'
+
+    def _normalize_places(self):
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            with self._history.group(_t('history.normalize_places')):
+                count = gazetteer.normalize_places(self._tree, self._gazetteer)
+        finally:
+            QApplication.restoreOverrideCursor()
+        try:
+            self._gazetteer.save(constants.GAZETTEER_FILE)
+        except OSError as e:
+            logger.logger.exception(e)
+        gui.show_info(_t('popup.normalize_places.text', count=count), parent=self)
 
     def _open_sparql_terminal(self):
         pass  # TODO
 
+    def _export_poster(self):
+        bounds = self._canvas.scene_bounds()
+        if bounds is None:
+            gui.show_info(_t('popup.export_poster.empty.text'), parent=self)
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            parent=self,
+            caption=_t('dialog.export_poster.title'),
+            directory=str(config.CONFIG.last_directory or ''),
+            filter=';;'.join(_t('dialog.export_poster.filter', ext=ext) for ext in poster.FORMATS),
+        )
+        if not path:
+            return
+        path = pathlib.Path(path)
+        if path.suffix.lower() not in poster.FORMATS:
+            path = path.with_suffix(poster.PNG)
+        config.CONFIG.last_directory = path.parent
+        export = poster.PosterExport(self._canvas.scene_content(bounds, lod.FULL), bounds, path, parent=self)
+        progress_dialog = QProgressDialog(_t('popup.export_poster.progress.text'),
+                                          _t('dialog.common.cancel_button.label'), 0, 0, parent=self)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+
+        def on_progress(done: int, total: int):
+            progress_dialog.setMaximum(total)
+            progress_dialog.setValue(done)
+
+        def on_finished(status: int):
+            progress_dialog.reset()
+            progress_dialog.deleteLater()
+            export.deleteLater()
+            if status == poster.FAILED:
+                gui.show_error(_t('popup.export_poster.error.text'), parent=self)
+
+        # noinspection PyUnresolvedReferences
+        export.progress.connect(on_progress)
+        # noinspection PyUnresolvedReferences
+        export.finished.connect(on_finished)
+        # noinspection PyUnresolvedReferences
+        progress_dialog.canceled.connect(export.cancel)
+        export.start()
+
+    def _export_frame_stats(self):
+        try:
+            path = self._canvas.frame_stats.export_csv()
+        except OSError as e:
+            logger.logger.exception(e)
+            gui.show_error(_t('popup.export_frame_stats.error.text'), parent=self)
+        else:
+            gui.show_info(_t('popup.export_frame_stats.text', path=path), parent=self)
+
     def _show_settings_dialog(self):
         dialogs.SettingsDialog(parent=self).show()
 
     def _show_about_dialog(self):
         dialogs.AboutDialog(parent=self).show()
 
+    def _set_tree(self, tree: tree_.FamilyTree, index: text_index.TextIndex = None):
+        """Sets the current tree.
+
+        :param tree: The new tree.
+        :param index: The full-text index of the tree, already attached to it. If None, it is built.
+        """
+        self._tree.remove_listener(self._consistency.on_tree_changed)
+        self._tree = tree
+        self._tree_file = None
+        self._text_index = index if index is not None else text_index.TextIndex.for_tree(tree)
+        self._trigram_index = trigram_index.TrigramIndex.for_tree(tree)
+        self._family = family.FamilyIndex(tree)
+        self._cycles = cycles.CycleDetector.for_tree(tree, self._family)
+        self._consistency = consistency.ConsistencyChecker.for_tree(tree, self._family)
+        self._history = history.History.for_tree(tree)
+        self._history.add_listener(self._update_history_actions)
+        self._update_history_actions()
+        self._canvas.set_tree(tree, self._family, next((pid for pid, _ in tree.persons()), None))
+        self._person_list.set_tree(tree)
+        self._timeline.set_tree(tree)
+        self._map.set_tree(tree)
+        self._show_ancestry_loops()
+
+    def _restore_autosave(self):
+        """Offers to restore the tree saved in the recovery file if one was left by a crash,
+        then starts the periodic autosave."""
+        if autosave.recovery_file_exists():
+            tree = None
+            if gui.show_question(_t('popup.restore_autosave.text'), parent=self):
+                tree = autosave.load_recovery_file()
+                if tree is None:
+                    gui.show_error(_t('popup.restore_autosave.error.text'), parent=self)
+            if tree is not None:
+                # Keep the recovery file as the restored tree has not been saved yet
+                self._set_tree(tree)
+            else:
+                self._autosaver.discard()
+        self._autosaver.start()
+
+    def _on_quit(self):
+        self._search_field.shutdown()
+        self._canvas.shutdown()
+        self._autosaver.stop(discard=True)
+
     def quit(self):
         qApp.quit()
 
@@ -161,6 +539,7 @@ class Application(QMainWindow):
             app = QApplication(sys.argv)
             window = cls()  # Must use variable to avoid object being garbage-collected
             window.show()
+            window._restore_autosave()
             return app.exec_()
         except SystemExit:
             raise
@@ -0,0 +1,97 @@
+"""Periodic autosave of the current tree to a recovery file."""
+from __future__ import annotations
+
+import concurrent.futures
+import time
+import typing as typ
+
+from PyQt5.QtCore import *
+
+from . import constants, logger
+from ..model import serialization, tree as tree_
+
+
+class Autosaver(QObject):
+    """Periodically saves the current tree into constants.RECOVERY_FILE.
+
+    The snapshot of the tree is taken on the GUI thread, which is cheap as the tree is copy-on-write,
+    then written by a worker thread.
+    """
+
+    def __init__(self, tree_supplier: typ.Callable[[], tree_.FamilyTree], parent: QObject = None):
+        """Creates an autosaver. The autosaver is inactive until start() is called.
+
+        :param tree_supplier: A function that returns the tree to save.
+        :param parent: This object’s parent.
+        """
+        super().__init__(parent=parent)
+        self._tree_supplier = tree_supplier
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='autosave')
+        self._pending: concurrent.futures.Future | None = None
+        self._saved_revision = None
+        self._timer = QTimer(parent=self)
+        self._timer.setInterval(constants.AUTOSAVE_INTERVAL)
+        # noinspection PyUnresolvedReferences
+        self._timer.timeout.connect(self.save)
+
+    def start(self):
+        """Starts the periodic autosave. The current state of the tree is considered as already saved."""
+        self._saved_revision = self._tree_supplier().revision
+        self._timer.start()
+
+    def stop(self, discard: bool = True):
+        """Stops the periodic autosave and waits for any pending write.
+
+        :param discard: Whether to delete the recovery file.
+        """
+        self._timer.stop()
+        self._executor.shutdown(wait=True)
+        if discard:
+            self.discard()
+
+    def save(self):
+        """Saves the current tree in a worker thread if it changed since the last save.
+        Does nothing if the previous save has not completed yet."""
+        tree = self._tree_supplier()
+        if tree.revision == self._saved_revision or self._pending is not None and not self._pending.done():
+            return
+        start = time.perf_counter()
+        snapshot = tree.snapshot()
+        duration = time.perf_counter() - start
+        log = logger.logger.warning if duration > constants.FRAME_DURATION else logger.logger.info
+        log(f'Autosave: snapshot of {len(snapshot)} persons taken in {duration * 1000:.2f} ms')
+        self._saved_revision = snapshot.revision
+        self._pending = self._executor.submit(self._write, snapshot)
+
+    @staticmethod
+    def _write(snapshot: tree_.TreeSnapshot):
+        start = time.perf_counter()
+        try:
+            serialization.dump_tree(snapshot, constants.RECOVERY_FILE)
+        except OSError as e:
+            logger.logger.exception(e)
+        else:
+            duration = time.perf_counter() - start
+            logger.logger.info(f'Autosave: revision {snapshot.revision} written in {duration * 1000:.2f} ms')
+
+    def discard(self):
+        """Deletes the recovery file."""
+        self._saved_revision = None
+        constants.RECOVERY_FILE.unlink(missing_ok=True)
+
+
+def recovery_file_exists() -> bool:
+    """Whether a recovery file was left by a previous session."""
+    return constants.RECOVERY_FILE.is_file()
+
+
+def load_recovery_file() -> tree_.FamilyTree | None:
+    """Loads the tree from the recovery file.
+
+    :return: The tree or None if it could not be loaded.
+    """
+    try:
+        return serialization.load_tree(constants.RECOVERY_FILE)
+    except (OSError, serialization.TreeFileError) as e:
+        logger.logger.exception(e)
+        return None
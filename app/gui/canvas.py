@@ -1,10 +1,559 @@
+from __future__ import annotations
+
+import collections
+import time
+import typing as typ
+
+from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+from . import fan_chart, frame_stats, tiles
+from .i18n import translate as _t
+from ..entities import Person
+from ..layout import fan, lod, spatial, tidy
+from ..model import family as family_, tree as tree_
+
+ANCESTORS = tidy.ANCESTORS
+DESCENDANTS = tidy.DESCENDANTS
+# Ancestors above the root person, descendants below them
+HOURGLASS = 2
+# Ancestors in concentric rings around the root person
+FAN = 3
+MODES = (ANCESTORS, DESCENDANTS, HOURGLASS, FAN)
+
+# Layouts of each tree mode, the first one being drawn on top of the others
+_LAYOUT_MODES = {
+    ANCESTORS: (tidy.ANCESTORS,),
+    DESCENDANTS: (tidy.DESCENDANTS,),
+    HOURGLASS: (tidy.DESCENDANTS, tidy.ANCESTORS),
+    FAN: (),
+}
+
 
 class Canvas(QWidget):
-    def __init__(self, parent: QWidget = None):
+    """Widget that draws the ancestors or descendants of a root person, both as an hourglass,
+    or their ancestors as a fan chart. It can be panned by dragging it and zoomed with the mouse wheel.
+    Double-clicking a person makes them the root.
+
+    The bounding boxes of nodes and edges are kept in spatial indexes that are updated as the layout changes,
+    so that painting and hit-testing only look at what is under the exposed region or the mouse.
+
+    The tree is rendered into cached image tiles on worker threads. Only the tiles under the nodes
+    that changed are rendered again after an edit. While a tile is being rendered,
+    the cached tiles of the nearest zoom level are shown scaled instead.
+
+    Less details are drawn as the view is zoomed out: full cards, names only, colored dots,
+    then one band per generation. Generation bands are computed once per layout.
+
+    Only the given number of generations is laid out, the persons beyond are shown as "+N more" stubs.
+    Clicking a stub loads its branch and lays it out. Loading is spread over event loop iterations
+    so that the view stays responsive, and the branches of visible stubs are prefetched one generation ahead
+    while the canvas is idle.
+
+    Fan charts are not tiled: their sectors are rendered into a single pixmap that is kept while the view
+    does not change, hovering a person only repaints the labels.
+
+    In debug mode, rendering statistics are shown over the tree.
+    """
+    MIN_ZOOM = 0.01
+    MAX_ZOOM = 4
+    TILE_CACHE_SIZE = 64 * 1024 * 1024  # bytes
+    STUB_WIDTH = 70
+    STUB_HEIGHT = 20
+    # Maximum time spent loading branches per event loop iteration
+    FETCH_SLICE = 0.005  # s
+
+    def __init__(self, debug: bool = False, generations: int = None, parent: QWidget = None):
+        """Creates a canvas.
+
+        :param debug: Whether to show rendering statistics.
+        :param generations: Number of generations to lay out around the root person, and below expanded stubs.
+            None for no limit.
+        :param parent: This widget’s parent.
+        """
         super().__init__(parent=parent)
+        self._tree: tree_.FamilyTree | None = None
+        self._family: family_.FamilyIndex | None = None
+        # One layout per tree drawn, none in FAN mode
+        self._layouts: list[tidy.TreeLayout] = []
+        self._layout_config = tidy.LayoutConfig()
+        self._generations = generations
+        self._root_id: int | None = None
+        self._mode = ANCESTORS
+        # Scene position shown at the center of the widget
+        self._center = QPointF()
+        self._zoom = 1.0
+        self._drag_start: QPoint | None = None
+        self._nodes_index: spatial.QuadTree[tidy.LayoutNode] = spatial.QuadTree()
+        # Each edge is indexed by the node it leads to
+        self._edges_index: spatial.QuadTree[tidy.LayoutNode] = spatial.QuadTree()
+        # Node and index of the person box under the mouse
+        self._hovered: tuple[tidy.LayoutNode, int] | None = None
+        # Version of each edited person’s content, for the label cache
+        self._versions: dict[int, int] = {}
+        # Badge bounds of the nodes whose branch is collapsed, and the layout they belong to
+        self._stubs: dict[tidy.LayoutNode, tuple[QRectF, tidy.TreeLayout]] = {}
+        # Pending branch loads, each with the function to call once it is done
+        self._fetches: collections.deque[tuple[typ.Iterator[int], typ.Callable[[], None] | None]] = \
+            collections.deque()
+        # Stubs whose branch was already prefetched since the last change
+        self._prefetched: set[tidy.LayoutNode] = set()
+        self._fetch_timer = QTimer(self)
+        # noinspection PyUnresolvedReferences
+        self._fetch_timer.timeout.connect(self._run_fetches)
+        # Computed on demand, reset when the layout changes
+        self._bands: list[lod.GenerationBand] | None = None
+        self._fan = fan_chart.FanChart()
+        # Whether the persons of the fan chart must be numbered again
+        self._fan_dirty = True
+        self._hovered_sosa: int | None = None
+        self._stats = frame_stats.FrameStats() if debug else None
+        self._renderer = tiles.TileRenderer(self.TILE_CACHE_SIZE, parent=self)
+        self._renderer.set_style(self._tile_style())
+        # noinspection PyUnresolvedReferences
+        self._renderer.tile_ready.connect(self.update)
+        self.setMouseTracking(True)
+
+    def set_tree(self, tree: tree_.FamilyTree, family: family_.FamilyIndex, root_id: int | None):
+        """Sets the tree to display.
+
+        :param tree: The tree.
+        :param family: The family index of the tree.
+        :param root_id: ID of the person to show the ancestors or descendants of.
+        """
+        if self._tree is not None:
+            self._tree.remove_listener(self._on_tree_changed)
+        self._tree = tree
+        self._family = family
+        tree.add_listener(self._on_tree_changed)
+        # Person IDs of the previous tree may be reused
+        self._versions.clear()
+        self._renderer.invalidate_labels()
+        self._fan.clear_labels()
+        self.set_root(root_id)
+
+    def set_root(self, root_id: int | None):
+        """Sets the person to show the ancestors or descendants of and centers the view on them."""
+        self._root_id = root_id
+        self._relayout()
+        self._center = QPointF()
+
+    @property
+    def mode(self) -> int:
+        return self._mode
+
+    def set_mode(self, mode: int):
+        """Sets the display mode, one of MODES.
+
+        :raise ValueError: If the mode is invalid.
+        """
+        if mode not in MODES:
+            raise ValueError(f'invalid canvas mode {mode}')
+        self._mode = mode
+        self._relayout()
+
+    @property
+    def frame_stats(self) -> frame_stats.FrameStats | None:
+        """The rendering statistics, None if not in debug mode."""
+        return self._stats
+
+    def shutdown(self):
+        """Stops the rendering threads."""
+        self._renderer.shutdown()
+
+    def _relayout(self):
+        if self._family is not None:
+            self._layouts = [tidy.TreeLayout(self._family, self._root_id, mode=mode, config=self._layout_config,
+                                             max_depth=self._generations)
+                             for mode in _LAYOUT_MODES[self._mode]]
+            self._nodes_index.clear()
+            self._edges_index.clear()
+            self._stubs.clear()
+            self._fetches.clear()
+            self._prefetched.clear()
+            self._hovered = None
+            self._hovered_sosa = None
+            self._fan_dirty = True
+            self._renderer.clear()
+            self._update_indexes()
+        self.update()
+
+    def _on_tree_changed(self, change: tree_.TreeChange):
+        if self._family is not None:
+            # Layouts are updated on the next paint, so that bulk changes are processed at once
+            for layout in self._layouts:
+                layout.on_tree_changed(change)
+            self._versions[change.person_id] = self._tree.revision
+            # Layouts discard loaded relations on change
+            self._prefetched.clear()
+            self._fan_dirty = True
+            self.update()
+
+    def _refresh(self):
+        """Updates the layouts and spatial indexes, or the fan chart,
+        after the changes made to the tree since the last call."""
+        if self._mode == FAN:
+            if self._fan_dirty:
+                self._fan.set_persons(fan.ahnentafel(self._family, self._root_id, fan_chart.FanChart.MAX_GENERATIONS))
+                self._fan_dirty = False
+        elif any([layout.refresh() for layout in self._layouts]):
+            self._update_indexes()
+
+    def _hidden_root(self, layout: tidy.TreeLayout) -> tidy.LayoutNode | None:
+        """Returns the root node of the given layout if it is not drawn, because it is already drawn
+        by another layout."""
+        return layout.root if self._mode == HOURGLASS and layout.mode == tidy.ANCESTORS else None
+
+    def _update_indexes(self):
+        """Updates the spatial indexes with the nodes that changed or were removed since the last call,
+        and invalidates the tiles under their old and new bounds."""
+        for layout in self._layouts:
+            changed, removed = layout.pop_changes()
+            if changed or removed:
+                self._bands = None
+            hidden_root = self._hidden_root(layout)
+            direction = -1 if layout.mode == tidy.ANCESTORS else 1
+            for node in changed:
+                if node is not hidden_root:
+                    if node.hidden_count:
+                        self._stubs[node] = self._stub_rect(node, direction), layout
+                    else:
+                        self._stubs.pop(node, None)
+                    self._move(self._nodes_index, node, self._node_bounds(node))
+                for edge in (node, *node.children):
+                    if edge.parent is not None:
+                        self._move(self._edges_index, edge, self._edge_bounds(edge))
+            # Removed nodes may have changed before being removed
+            for node in removed:
+                self._stubs.pop(node, None)
+                self._move(self._nodes_index, node, None)
+                self._move(self._edges_index, node, None)
+                if self._hovered and self._hovered[0] is node:
+                    self._hovered = None
+
+    def _move(self, index: spatial.QuadTree[tidy.LayoutNode], node: tidy.LayoutNode, bounds: spatial.Rect | None):
+        """Moves a node in a spatial index and invalidates the tiles under its old and new bounds.
+
+        :param index: The spatial index.
+        :param node: The node.
+        :param bounds: The node’s new bounds, None to remove it.
+        """
+        if (old_bounds := index.rect(node)) is not None:
+            self._renderer.invalidate(old_bounds)
+        if bounds is not None:
+            index.insert(node, bounds)
+            self._renderer.invalidate(bounds)
+        else:
+            index.remove(node)
+
+    def _node_bounds(self, node: tidy.LayoutNode) -> spatial.Rect:
+        """Returns the bounds of a node, including its stub badge if any."""
+        rect = self._node_rect(node)
+        if stub := self._stubs.get(node):
+            rect = rect.united(stub[0])
+        return rect.left(), rect.top(), rect.right(), rect.bottom()
+
+    def _stub_rect(self, node: tidy.LayoutNode, direction: int) -> QRectF:
+        """Returns the bounds of the badge of a stub, between the node and where its children would be.
+
+        :param node: The stub.
+        :param direction: 1 if children are below their parent, -1 if they are above.
+        """
+        distance = (self._layout_config.node_height + self._layout_config.level_gap) / 2
+        center = QPointF(node.x, node.y + direction * distance)
+        return QRectF(center.x() - self.STUB_WIDTH / 2, center.y() - self.STUB_HEIGHT / 2,
+                      self.STUB_WIDTH, self.STUB_HEIGHT)
+
+    def _edge_bounds(self, node: tidy.LayoutNode) -> spatial.Rect:
+        start, end = self._edge_ends(node)
+        return min(start.x(), end.x()), min(start.y(), end.y()), max(start.x(), end.x()), max(start.y(), end.y())
+
+    def _edge_ends(self, node: tidy.LayoutNode) -> tuple[QPointF, QPointF]:
+        """Returns the ends of the edge from the parent of the given node to this node."""
+        half_height = self._layout_config.node_height / 2
+        direction = 1 if node.y > node.parent.y else -1
+        parent = node.parent
+        return (QPointF(parent.x, parent.y + direction * half_height),
+                QPointF(node.x, node.y - direction * half_height))
+
+    def _transform(self) -> QTransform:
+        """Returns the transform from scene coordinates to widget coordinates."""
+        transform = QTransform()
+        transform.translate(self.width() / 2, self.height() / 2)
+        transform.scale(self._zoom, self._zoom)
+        transform.translate(-self._center.x(), -self._center.y())
+        return transform
+
+    def _node_rect(self, node: tidy.LayoutNode) -> QRectF:
+        height = self._layout_config.node_height
+        return QRectF(node.x - node.width / 2, node.y - height / 2, node.width, height)
+
+    def _person_box(self, node: tidy.LayoutNode, index: int) -> QRectF:
+        """Returns the box of the person at the given index in a node, 0 being the node’s person
+        and the following ones their partners."""
+        rect = self._node_rect(node)
+        person_width = self._layout_config.node_width
+        gap = self._layout_config.sibling_gap
+        return QRectF(rect.x() + index * (person_width + gap), rect.y(), person_width, rect.height())
+
+    def _box_at(self, pos: QPoint) -> tuple[tidy.LayoutNode, int] | None:
+        """Returns the node and index of the person box at the given widget position, None if there is none."""
+        if not self._layouts:
+            return None
+        point = self._transform().inverted()[0].map(QPointF(pos))
+        for node in self._nodes_index.at(point.x(), point.y()):
+            for i in range(1 + len(node.partner_ids)):
+                if self._person_box(node, i).contains(point):
+                    return node, i
+        return None
+
+    def _stub_at(self, pos: QPoint) -> tidy.LayoutNode | None:
+        """Returns the stub whose badge is at the given widget position, None if there is none."""
+        point = self._transform().inverted()[0].map(QPointF(pos))
+        return next((node for node in self._nodes_index.at(point.x(), point.y())
+                     if node in self._stubs and self._stubs[node][0].contains(point)), None)
+
+    def expand(self, node: tidy.LayoutNode):
+        """Loads the branch of a stub and lays it out once loaded."""
+        layout = self._stubs[node][1]
+        generations = self._generations or 1
+
+        def on_loaded():
+            if layout in self._layouts:
+                layout.expand(node, generations)
+                self._update_indexes()
+                self.update()
+
+        # Expansions go before prefetches, the user is waiting for them
+        self._fetches.appendleft((layout.fetch(node.person_id, generations + 1), on_loaded))
+        self._fetch_timer.start(0)
+
+    def _prefetch(self, nodes: typ.Iterable[tidy.LayoutNode]):
+        """Queues the loading of the next generation of the branches of the given stubs."""
+        for node in nodes:
+            if node in self._stubs and node not in self._prefetched:
+                self._prefetched.add(node)
+                layout = self._stubs[node][1]
+                # The stub’s relatives and their own relations, needed to lay them out
+                self._fetches.append((layout.fetch(node.person_id, 2), None))
+        if self._fetches:
+            self._fetch_timer.start(0)
+
+    def _run_fetches(self):
+        """Advances the pending branch loads for at most FETCH_SLICE seconds."""
+        deadline = time.perf_counter() + self.FETCH_SLICE
+        while self._fetches and time.perf_counter() < deadline:
+            fetch, on_done = self._fetches[0]
+            if next(fetch, None) is None:
+                self._fetches.popleft()
+                if on_done:
+                    on_done()
+        if not self._fetches:
+            self._fetch_timer.stop()
+
+    def _sosa_at(self, pos: QPoint) -> int | None:
+        """Returns the Sosa number of the fan chart sector at the given widget position, None if there is none."""
+        if self._mode != FAN:
+            return None
+        return self._fan.sosa_at(self._transform().inverted()[0].map(QPointF(pos)))
+
+    def person_at(self, pos: QPoint) -> int | None:
+        """Returns the ID of the person drawn at the given widget position, None if there is none."""
+        if self._mode == FAN:
+            return self._fan.person_at(self._transform().inverted()[0].map(QPointF(pos)))
+        if box := self._box_at(pos):
+            node, i = box
+            return (node.person_id, *node.partner_ids)[i]
+        return None
+
+    def _tile_style(self) -> tiles.TileStyle:
+        palette = self.palette()
+        return tiles.TileStyle(
+            background=palette.base().color(),
+            foreground=palette.text().color(),
+            fill=palette.window().color(),
+            font=self.font(),
+        )
+
+    def _tile_content(self, key: tiles.TileKey) -> tiles.TileContent:
+        return self.scene_content(tiles.tile_bounds(key, margin=tiles.MARGIN), lod.tier(tiles.level_scale(key[0])))
+
+    def scene_bounds(self) -> spatial.Rect | None:
+        """Returns the bounds of the whole layout in scene coordinates, None if it is empty or in FAN mode."""
+        if not self._layouts:
+            return None
+        self._refresh()
+        bands = self._generation_bands()
+        if not bands:
+            return None
+        return (min(b.left for b in bands), min(b.top for b in bands),
+                max(b.right for b in bands), max(b.bottom for b in bands))
+
+    def scene_content(self, bounds: spatial.Rect, tier: int) -> tiles.TileContent:
+        """Returns what to draw in an area of the scene. The returned objects are not shared with the layout
+        so that they can be painted on another thread.
+
+        :param bounds: The area in scene coordinates.
+        :param tier: The level of detail.
+        :return: The content of the area.
+        """
+        content = tiles.TileContent(tier)
+        if not self._layouts:
+            return content
+        self._refresh()
+        if tier == lod.BANDS:
+            content.bands.extend(
+                tiles.Band(QRectF(b.left, b.top, b.right - b.left, b.bottom - b.top), self._generation_color(b.depth))
+                for b in self._generation_bands() if spatial.intersects((b.left, b.top, b.right, b.bottom), bounds)
+            )
+            return content
+        for node in self._edges_index.query(bounds):
+            start, end = self._edge_ends(node)
+            middle_y = (start.y() + end.y()) / 2
+            content.edges.append([start, QPointF(start.x(), middle_y), QPointF(end.x(), middle_y), end])
+        for node in self._nodes_index.query(bounds):
+            for i, person_id in enumerate((node.person_id, *node.partner_ids)):
+                box = self._person_box(node, i)
+                if tier == lod.DOTS:
+                    content.dots.append(tiles.Dot(box.center(), self._generation_color(node.depth)))
+                elif person := self._tree.get_person(person_id):
+                    details = self._details(person) if tier == lod.FULL else ''
+                    content.boxes.append(tiles.Box(box, person_id, self._versions.get(person_id, 0), person.full_name,
+                                                   details, dashed=node.is_reference))
+            if tier != lod.DOTS and (stub := self._stubs.get(node)):
+                content.stubs.append(tiles.Stub(
+                    stub[0], _t('canvas.stub', default='+{count} more', count=node.hidden_count)))
+        return content
+
+    def _generation_bands(self) -> list[lod.GenerationBand]:
+        if self._bands is None:
+            self._bands = [band for layout in self._layouts for band in lod.generation_bands(layout)
+                           if not (band.depth == 0 and self._hidden_root(layout))]
+        return self._bands
+
+    @staticmethod
+    def _details(person: Person) -> str:
+        """Returns the second line of a person’s card."""
+        if (dates := lod.card_dates(person)) is None:
+            return ''
+        return _t('canvas.card.dates', default='{birth} – {death}', birth=dates[0], death=dates[1])
+
+    @staticmethod
+    def _generation_color(depth: int) -> QColor:
+        return QColor.fromHsv(depth * 47 % 360, 160, 220)
 
     def paintEvent(self, event: QPaintEvent):
-        pass
+        start = time.perf_counter()
+        tile_hits, tile_misses = self._renderer.cache.hits, self._renderer.cache.misses
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), self.palette().base())
+        if self._family is None:
+            return
+        self._refresh()
+        layout_time = time.perf_counter() - start
+        transform = self._transform()
+        if self._mode == FAN:
+            self._fan.paint(painter, transform, self.palette(), self.font(), self._hovered_sosa, self._fan_label)
+            # The fan chart is drawn whole
+            nodes_drawn, nodes_culled = self._fan.sectors_count, 0
+        else:
+            region = self._paint_tree(painter, transform)
+            # Only counted in debug mode
+            nodes_drawn = sum(1 for _ in self._nodes_index.query(region)) if self._stats is not None else 0
+            nodes_culled = len(self._nodes_index) - nodes_drawn
+        if self._stats is not None:
+            self._stats.add(frame_stats.FrameSample(
+                time=time.time(),
+                paint_time=time.perf_counter() - start,
+                layout_time=layout_time,
+                nodes_drawn=nodes_drawn,
+                nodes_culled=nodes_culled,
+                tile_hits=self._renderer.cache.hits - tile_hits,
+                tile_misses=self._renderer.cache.misses - tile_misses,
+            ))
+            painter.resetTransform()
+            self._stats.draw_overlay(painter, QPoint(8, 8), self.palette())
+
+    def _paint_tree(self, painter: QPainter, transform: QTransform) -> tuple[float, float, float, float]:
+        """Paints the tiles of the tree and the hovered person’s box.
+
+        :return: The visible region, in scene coordinates.
+        """
+        painter.setTransform(transform)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        visible = transform.inverted()[0].mapRect(QRectF(self.rect()))
+        keys = tiles.tiles_in((visible.left(), visible.top(), visible.right(), visible.bottom()),
+                              tiles.zoom_level(self._zoom))
+        self._renderer.retain(keys)
+        for key in keys:
+            image = self._renderer.tile(key, self._tile_content)
+            if image is not None:
+                self._draw_tile(painter, key, image)
+            else:
+                for fallback_key, fallback_image in self._renderer.fallback(key):
+                    self._draw_tile(painter, fallback_key, fallback_image)
+        if self._hovered is not None:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(QPen(self.palette().highlight().color(), 2))
+            painter.setBrush(Qt.NoBrush)
+            painter.drawRoundedRect(self._person_box(*self._hovered), 5, 5)
+        region = (visible.left(), visible.top(), visible.right(), visible.bottom())
+        self._prefetch(self._nodes_index.query(region))
+        return region
+
+    def _fan_label(self, person_id: int) -> tuple[str, int] | None:
+        if person := self._tree.get_person(person_id):
+            return person.full_name, self._versions.get(person_id, 0)
+        return None
+
+    @staticmethod
+    def _draw_tile(painter: QPainter, key: tiles.TileKey, image: QImage):
+        left, top, right, bottom = tiles.tile_bounds(key)
+        painter.drawImage(QRectF(left, top, right - left, bottom - top), image)
+
+    def changeEvent(self, event: QEvent):
+        super().changeEvent(event)
+        if event.type() in (QEvent.PaletteChange, QEvent.FontChange):
+            self._renderer.set_style(self._tile_style())
+            self._fan.invalidate()
+            self._fan.clear_labels()
+            self.update()
+        elif event.type() == QEvent.LanguageChange:
+            self._renderer.invalidate_labels()
+            self._fan.clear_labels()
+            self.update()
+
+    def mousePressEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton:
+            if (stub := self._stub_at(event.pos())) is not None:
+                self.expand(stub)
+            else:
+                self._drag_start = event.pos()
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        if self._drag_start is not None:
+            delta = event.pos() - self._drag_start
+            self._drag_start = event.pos()
+            self._center -= QPointF(delta) / self._zoom
+            self.update()
+        elif self._mode == FAN:
+            if (hovered_sosa := self._sosa_at(event.pos())) != self._hovered_sosa:
+                self._hovered_sosa = hovered_sosa
+                self.update()
+        elif (hovered := self._box_at(event.pos())) != self._hovered:
+            self._hovered = hovered
+            self.update()
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton:
+            self._drag_start = None
+
+    def mouseDoubleClickEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton and (person_id := self.person_at(event.pos())) is not None:
+            self.set_root(person_id)
+
+    def wheelEvent(self, event: QWheelEvent):
+        factor = tiles.ZOOM_STEP if event.angleDelta().y() > 0 else 1 / tiles.ZOOM_STEP
+        self._zoom = min(self.MAX_ZOOM, max(self.MIN_ZOOM, self._zoom * factor))
+        self.update()
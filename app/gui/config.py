@@ -24,17 +24,20 @@ class Config:
             language: i18n.Language,
             icon_theme: IconTheme,
             debug: bool,
+            generations: int = None,
     ):
         """Creates a new configuration object.
 
         :param language: App’s UI language.
         :param debug: Whether to load the app in debug mode. Set to True if you have issues with file dialogs.
+        :param generations: Number of generations the canvas lays out before showing collapsed branches.
         """
         self._language = language
         self._language_pending = None
         self._icon_theme = icon_theme
         self._icon_theme_pending = None
         self._debug = debug
+        self._generations = generations or _DEFAULT_GENERATIONS
         self._last_directory = None
 
     @property
@@ -63,6 +66,10 @@ class Config:
     def debug(self) -> bool:
         return self._debug
 
+    @property
+    def generations(self) -> int:
+        return self._generations
+
     @property
     def last_directory(self) -> pathlib.Path | None:
         return self._last_directory
@@ -90,6 +97,7 @@ class Config:
             language=pending_lang,
             icon_theme=pending_theme,
             debug=self.debug,
+            generations=self.generations,
         )
 
     def save(self):
@@ -98,6 +106,7 @@ class Config:
         parser[_APP_SECTION] = {
             _LANG_KEY: (self.language_pending or self.language).code,
             _ICON_THEME_KEY: (self.icon_theme_pending or self.icon_theme).code,
+            _GENERATIONS_KEY: str(self.generations),
         }
 
         try:
@@ -121,10 +130,12 @@ _ICON_THEMES: dict[str, IconTheme] = {}
 _NAME_KEY = 'name'
 
 _DEFAULT_LANG_CODE = 'en'
+_DEFAULT_GENERATIONS = 5
 
 _APP_SECTION = 'App'
 _LANG_KEY = 'language'
 _ICON_THEME_KEY = 'icon_theme'
+_GENERATIONS_KEY = 'generations'
 
 
 def get_icon_themes() -> list[IconTheme]:
@@ -150,6 +161,7 @@ def load_config(debug: bool):
 
     lang_code = _DEFAULT_LANG_CODE
     icon_theme_code = get_icon_themes()[0].code
+    generations = _DEFAULT_GENERATIONS
 
     config_file_exists = constants.CONFIG_FILE.is_file()
 
@@ -159,6 +171,7 @@ def load_config(debug: bool):
         try:
             lang_code = config_parser.get(_APP_SECTION, _LANG_KEY, fallback=lang_code)
             icon_theme_code = config_parser.get(_APP_SECTION, _ICON_THEME_KEY, fallback=icon_theme_code)
+            generations = config_parser.getint(_APP_SECTION, _GENERATIONS_KEY, fallback=generations)
         except ValueError as e:
             raise ConfigError(e)
         except KeyError as e:
@@ -170,8 +183,10 @@ def load_config(debug: bool):
         raise ConfigError(f'invalid language code: {lang_code}')
     if not icon_theme:
         raise ConfigError(f'invalid icon theme: {icon_theme_code}')
+    if generations < 1:
+        raise ConfigError(f'invalid number of generations: {generations}')
 
-    CONFIG = Config(language, icon_theme, debug)
+    CONFIG = Config(language, icon_theme, debug, generations)
 
     if not config_file_exists:
         CONFIG.save()
@@ -0,0 +1,75 @@
+"""Check of the consistency of a whole tree in the background."""
+from __future__ import annotations
+
+import concurrent.futures
+import pathlib
+import threading
+
+from PyQt5.QtCore import *
+
+from . import logger
+from ..model import consistency, tree as tree_
+
+COMPLETED = 0
+CANCELLED = 1
+FAILED = 2
+
+
+class ConsistencyCheck(QObject):
+    """Checks all persons of a snapshot of a tree in worker processes, driven from a worker thread,
+    and writes the findings to a report file."""
+
+    # Emitted with the number of checked persons and the total number of persons
+    progress = pyqtSignal(int, int)
+    # Emitted with either COMPLETED, CANCELLED or FAILED
+    finished = pyqtSignal(int)
+
+    def __init__(self, snapshot: tree_.TreeSnapshot, report_path: pathlib.Path, parent: QObject = None):
+        """Creates a check. It does not start until start() is called.
+
+        :param snapshot: Snapshot of the tree to check.
+        :param report_path: Path of the report file to write.
+        :param parent: This object’s parent.
+        """
+        super().__init__(parent=parent)
+        self._snapshot = snapshot
+        self._report_path = report_path
+        self._cancelled = threading.Event()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='consistency')
+
+    @property
+    def report_path(self) -> pathlib.Path:
+        return self._report_path
+
+    def start(self):
+        self._executor.submit(self._run)
+        self._executor.shutdown(wait=False)
+
+    def cancel(self):
+        """Stops the check as soon as possible. The partially written report is deleted."""
+        self._cancelled.set()
+
+    def _run(self):
+        """Runs the check. Runs in the worker thread."""
+        status = COMPLETED
+        try:
+            self._report_path.parent.mkdir(parents=True, exist_ok=True)
+            consistency.check_tree(self._snapshot, self._report_path, progress=self._on_progress,
+                                   cancelled=self._cancelled)
+        except consistency.CheckCancelled:
+            status = CANCELLED
+        except Exception as e:
+            logger.logger.exception(e)
+            status = FAILED
+        try:
+            # noinspection PyUnresolvedReferences
+            self.finished.emit(status)
+        except RuntimeError as e:  # The check was deleted
+            logger.logger.debug(e)
+
+    def _on_progress(self, done: int, total: int):
+        try:
+            # noinspection PyUnresolvedReferences
+            self.progress.emit(done, total)
+        except RuntimeError as e:  # The check was deleted
+            logger.logger.debug(e)
@@ -6,4 +6,12 @@ APP_VERSION = '1.0'
 LANG_DIR = pathlib.Path('langs')
 LOGS_DIR = pathlib.Path('logs')
 ICONS_DIR = pathlib.Path('icons')
+REPORTS_DIR = pathlib.Path('reports')
 CONFIG_FILE = pathlib.Path('settings.ini')
+RECOVERY_FILE = pathlib.Path('recovery.json')
+GAZETTEER_FILE = pathlib.Path('gazetteer.json')
+
+AUTOSAVE_INTERVAL = 60_000  # ms
+FRAME_DURATION = 1 / 60  # s
+
+TREE_FILE_EXTENSION = '.gwt'
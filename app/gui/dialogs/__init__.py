@@ -1,3 +1,4 @@
 from ._about_dialog import AboutDialog
 from ._dialog_base import Dialog
+from ._inconsistencies_dialog import InconsistenciesDialog
 from ._settings_dialog import SettingsDialog
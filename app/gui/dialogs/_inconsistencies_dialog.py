@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pathlib
+import typing as typ
+
+from PyQt5.QtCore import *
+from PyQt5.QtWidgets import *
+
+from . import _dialog_base
+from ..i18n import translate as _t
+from ...model import consistency, tree as tree_
+
+
+class InconsistenciesDialog(_dialog_base.Dialog):
+    """This dialog lists the inconsistencies found in a tree. Double-clicking one selects its person."""
+
+    def __init__(self, tree: tree_.FamilyTree, findings: typ.Iterable[consistency.Finding],
+                 on_person_selected: typ.Callable[[int], None], report_path: pathlib.Path = None,
+                 parent: QWidget = None):
+        """Creates the inconsistencies dialog.
+
+        :param tree: The tree the findings are about.
+        :param findings: The findings to list.
+        :param on_person_selected: Called with the ID of the person of a finding when it is double-clicked.
+        :param report_path: Path of the report file the findings were written to, if any.
+        :param parent: The widget this dialog is attached to.
+        """
+        self._tree = tree
+        self._findings = list(findings)
+        self._on_person_selected = on_person_selected
+        self._report_path = report_path
+        super().__init__(
+            parent=parent,
+            title=_t('dialog.inconsistencies.title'),
+            modal=False,
+            mode=_dialog_base.Dialog.CLOSE
+        )
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.resize(600, 400)
+
+    def _init_body(self) -> QLayout:
+        body = QVBoxLayout()
+
+        # noinspection PyArgumentList
+        summary = QLabel(_t('dialog.inconsistencies.summary', count=len(self._findings)), parent=self)
+        # noinspection PyArgumentList
+        body.addWidget(summary)
+        if self._report_path is not None:
+            # noinspection PyArgumentList
+            report = QLabel(_t('dialog.inconsistencies.report', path=self._report_path.absolute()), parent=self)
+            report.setTextInteractionFlags(Qt.TextSelectableByMouse)
+            # noinspection PyArgumentList
+            body.addWidget(report)
+
+        self._list = QListWidget(parent=self)
+        self._list.setUniformItemSizes(True)
+        for finding in self._findings:
+            item = QListWidgetItem(self._finding_text(finding))
+            item.setData(Qt.UserRole, finding.person_id)
+            self._list.addItem(item)
+        # noinspection PyUnresolvedReferences
+        self._list.itemDoubleClicked.connect(lambda i: self._on_person_selected(i.data(Qt.UserRole)))
+        # noinspection PyArgumentList
+        body.addWidget(self._list)
+
+        return body
+
+    def _finding_text(self, finding: consistency.Finding) -> str:
+        related = ', '.join(self._person_name(person_id) for person_id in finding.related_ids)
+        return _t(
+            'dialog.inconsistencies.finding.' + ('certain' if finding.certain else 'possible'),
+            person=self._person_name(finding.person_id),
+            rule=_t(f'consistency.rule.{finding.rule}', related=related),
+        )
+
+    def _person_name(self, person_id: int) -> str:
+        person = self._tree.get_person(person_id)
+        return person.full_name if person is not None and person.full_name else f'#{person_id}'
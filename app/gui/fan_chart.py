@@ -0,0 +1,195 @@
+"""Drawing of fan charts on the canvas."""
+from __future__ import annotations
+
+import functools
+import math
+import typing as typ
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+from . import labels
+from ..layout import fan, lod
+
+
+@functools.lru_cache(maxsize=16)
+def sector_paths(generations: int, config: fan.FanConfig) -> tuple[QPainterPath, ...]:
+    """Returns the outline of each sector of a fan chart, indexed by Sosa number. Index 0 is unused.
+    Results are cached, as they only depend on the number of generations."""
+    paths = [QPainterPath()]
+    for sector in fan.sectors(generations, config)[1:]:
+        path = QPainterPath()
+        outer = QRectF(-sector.outer_radius, -sector.outer_radius, 2 * sector.outer_radius, 2 * sector.outer_radius)
+        if sector.inner_radius == 0:
+            path.addEllipse(outer)
+        else:
+            r = sector.inner_radius
+            inner = QRectF(-r, -r, 2 * r, 2 * r)
+            path.arcMoveTo(outer, sector.start_angle)
+            path.arcTo(outer, sector.start_angle, sector.span)
+            path.arcTo(inner, sector.start_angle + sector.span, -sector.span)
+            path.closeSubpath()
+        paths.append(path)
+    return tuple(paths)
+
+
+class FanChart:
+    """Draws the ancestors of a person as a fan chart centered on the scene’s origin.
+
+    Sector paths are shared by all charts with the same number of generations. The sectors of the whole chart
+    are rendered once into a pixmap for a given zoom level; panning only moves the pixmap, and hovering a sector
+    only repaints the highlight and the labels.
+    """
+    MAX_GENERATIONS = 12
+    # Largest side of the pixmap of the sectors, beyond which they are drawn directly
+    MAX_PIXMAP_SIZE = 4096  # px
+    # Room around the chart in the pixmap for the antialiased outlines
+    _PIXMAP_MARGIN = 2  # px
+
+    def __init__(self, config: fan.FanConfig = fan.FanConfig()):
+        self._config = config
+        # Person ID for each Sosa number
+        self._persons: dict[int, int] = {}
+        self._generations = 0
+        self._pixmap: QPixmap | None = None
+        self._pixmap_key = None
+        # Only used from the GUI thread
+        self._labels = labels.LabelCache()
+
+    @property
+    def generations(self) -> int:
+        return self._generations
+
+    @property
+    def sectors_count(self) -> int:
+        """The number of sectors of the chart, one per ancestor."""
+        return len(self._persons)
+
+    def set_persons(self, persons: dict[int, int]):
+        """Sets the persons to draw.
+
+        :param persons: A dict mapping Sosa numbers to person IDs, as returned by fan.ahnentafel().
+        """
+        self._persons = persons
+        self._generations = max(map(fan.generation, persons), default=-1) + 1
+        self.invalidate()
+
+    def invalidate(self):
+        """Discards the rendered sectors, e.g. after the palette changed."""
+        self._pixmap = None
+
+    def clear_labels(self):
+        self._labels.clear()
+
+    def bounds(self) -> tuple[float, float, float, float] | None:
+        """Returns the bounds of the chart in scene coordinates, None if it is empty."""
+        if not self._generations:
+            return None
+        r = self._config.center_radius + (self._generations - 1) * self._config.ring_width
+        return -r, -r, r, r
+
+    def sosa_at(self, point: QPointF) -> int | None:
+        """Returns the Sosa number of the person drawn at the given scene position, None if there is none."""
+        sosa = fan.sector_at(point.x(), point.y(), self._generations, self._config)
+        return sosa if sosa in self._persons else None
+
+    def person_at(self, point: QPointF) -> int | None:
+        """Returns the ID of the person drawn at the given scene position, None if there is none."""
+        return self._persons.get(self.sosa_at(point))
+
+    def paint(self, painter: QPainter, transform: QTransform, palette: QPalette, font: QFont,
+              hovered_sosa: int | None, label: typ.Callable[[int], tuple[str, int] | None]):
+        """Paints the chart.
+
+        :param painter: A painter without any transform.
+        :param transform: The transform from scene coordinates to the painter’s device, a scaling and a translation.
+        :param palette: Colors to use.
+        :param font: Font of the labels.
+        :param hovered_sosa: Sosa number of the sector to highlight.
+        :param label: A function that returns the name and content version of a person.
+        """
+        if not self._generations:
+            return
+        paths = sector_paths(self._generations, self._config)
+        scale = transform.m11()
+        left, top, right, _ = self.bounds()
+        side = math.ceil((right - left) * scale) + 2 * self._PIXMAP_MARGIN
+        painter.setRenderHint(QPainter.Antialiasing)
+        if side <= self.MAX_PIXMAP_SIZE:
+            # The pixmap covers the whole chart, so that panning only moves it
+            key = (scale, palette.cacheKey())
+            if self._pixmap is None or self._pixmap_key != key:
+                self._pixmap = self._render_sectors(paths, scale, side, palette)
+                self._pixmap_key = key
+            origin = transform.map(QPointF(left, top))
+            painter.drawPixmap(round(origin.x()) - self._PIXMAP_MARGIN, round(origin.y()) - self._PIXMAP_MARGIN,
+                               self._pixmap)
+            painter.setTransform(transform)
+        else:
+            # Zoomed in too far to cache the whole chart, only the sectors in view are rasterized
+            painter.setTransform(transform)
+            self._draw_sectors(painter, paths, palette)
+        if hovered_sosa in self._persons:
+            highlight = QColor(palette.highlight().color())
+            highlight.setAlpha(128)
+            painter.fillPath(paths[hovered_sosa], highlight)
+        self._paint_labels(painter, scale, palette, font, label)
+
+    def _render_sectors(self, paths: tuple[QPainterPath, ...], scale: float, side: int,
+                        palette: QPalette) -> QPixmap:
+        """Renders the sectors of the whole chart at the given scale into a square pixmap
+        whose top-left corner is the top-left corner of the chart’s bounds, minus a margin."""
+        left, top, _, _ = self.bounds()
+        pixmap = QPixmap(side, side)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.translate(self._PIXMAP_MARGIN, self._PIXMAP_MARGIN)
+        painter.scale(scale, scale)
+        painter.translate(-left, -top)
+        self._draw_sectors(painter, paths, palette)
+        painter.end()
+        return pixmap
+
+    def _draw_sectors(self, painter: QPainter, paths: tuple[QPainterPath, ...], palette: QPalette):
+        painter.setPen(QPen(palette.text().color(), 0))
+        for sosa in self._persons:
+            painter.setBrush(QColor.fromHsv(fan.generation(sosa) * 47 % 360, 60, 240))
+            painter.drawPath(paths[sosa])
+
+    def _paint_labels(self, painter: QPainter, zoom: float, palette: QPalette, font: QFont,
+                      label: typ.Callable[[int], tuple[str, int] | None]):
+        sectors = fan.sectors(self._generations, self._config)
+        min_height = QFontMetricsF(font).height() / zoom
+        painter.setPen(palette.text().color())
+        painter.setFont(font)
+        for sosa, person_id in self._persons.items():
+            if (name_version := label(person_id)) is None:
+                continue
+            sector = sectors[sosa]
+            if sosa == 1:
+                box_size = QSizeF(2 * sector.outer_radius, 2 * min_height)
+            else:
+                # Room available across the sector, at its middle radius
+                box_size = QSizeF(self._config.ring_width,
+                                  min(2 * min_height, math.radians(sector.span) * sector.middle_radius))
+            if box_size.height() < min_height:
+                continue  # Too small to be readable at this zoom
+            name, version = name_version
+            generation = fan.generation(sosa)
+            text = self._labels.get(
+                (person_id, version, font.key(), generation),
+                lambda: labels.make_label(lod.NAMES, font, box_size, name),
+            )
+            painter.save()
+            if sosa == 1:
+                origin = QPointF(-box_size.width() / 2, -box_size.height() / 2)
+            else:
+                angle = sector.middle_angle % 360
+                # Text goes outwards along the radius, and is flipped on the left side to not be upside down
+                flipped = 90 < angle < 270
+                painter.rotate(-angle + (180 if flipped else 0))
+                x = -sector.outer_radius if flipped else sector.inner_radius
+                origin = QPointF(x, -box_size.height() / 2)
+            painter.drawStaticText(origin + text.name_offset, text.name)
+            painter.restore()
@@ -0,0 +1,110 @@
+"""Rendering performance measurements of the canvas, shown in debug mode."""
+from __future__ import annotations
+
+import bisect
+import collections
+import csv
+import dataclasses
+import datetime
+import pathlib
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+from . import constants
+
+
+@dataclasses.dataclass(frozen=True)
+class FrameSample:
+    """Measurements of a single frame."""
+    time: float  # s since the epoch
+    paint_time: float  # s
+    layout_time: float  # s
+    nodes_drawn: int
+    nodes_culled: int
+    tile_hits: int
+    tile_misses: int
+
+
+class FrameStats:
+    """Keeps the measurements of the last frames."""
+    # Number of frames kept for export
+    MAX_SAMPLES = 100_000
+    # Number of frames shown in the overlay
+    WINDOW_SIZE = 240
+    # Upper bounds of the histogram’s bins, the last bin holds all slower frames
+    BINS = (0.001, 0.002, 0.004, 0.008, constants.FRAME_DURATION, 2 * constants.FRAME_DURATION)  # s
+
+    def __init__(self):
+        self._samples: collections.deque[FrameSample] = collections.deque(maxlen=self.MAX_SAMPLES)
+
+    def add(self, sample: FrameSample):
+        self._samples.append(sample)
+
+    def recent(self) -> list[FrameSample]:
+        """Returns the samples of the rolling window, from the oldest."""
+        start = max(0, len(self._samples) - self.WINDOW_SIZE)
+        return [self._samples[i] for i in range(start, len(self._samples))]
+
+    def histogram(self) -> list[int]:
+        """Returns the number of frames of the rolling window in each bin of paint time."""
+        counts = [0] * (len(self.BINS) + 1)
+        for sample in self.recent():
+            counts[bisect.bisect_left(self.BINS, sample.paint_time)] += 1
+        return counts
+
+    def export_csv(self) -> pathlib.Path:
+        """Writes all kept samples to a new CSV file in the logs directory.
+
+        :return: The path of the file.
+        """
+        date = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        path = constants.LOGS_DIR / f'frames_{date}.csv'
+        with path.open('w', encoding='UTF-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(field.name for field in dataclasses.fields(FrameSample))
+            for sample in self._samples:
+                writer.writerow(dataclasses.astuple(sample))
+        return path
+
+    def draw_overlay(self, painter: QPainter, origin: QPoint, palette: QPalette):
+        """Draws the statistics of the rolling window and the histogram of paint times.
+
+        :param painter: The painter, without any transform.
+        :param origin: Top left corner of the overlay.
+        :param palette: The palette to draw with.
+        """
+        recent = self.recent()
+        if not recent:
+            return
+        last = recent[-1]
+        mean_paint = sum(s.paint_time for s in recent) / len(recent)
+        hits = sum(s.tile_hits for s in recent)
+        lookups = hits + sum(s.tile_misses for s in recent)
+        lines = [
+            f'paint: {last.paint_time * 1000:.2f} ms (mean {mean_paint * 1000:.2f} ms)',
+            f'layout: {last.layout_time * 1000:.2f} ms',
+            f'nodes: {last.nodes_drawn} drawn, {last.nodes_culled} culled',
+            f'tile hit rate: {hits / lookups:.0%}' if lookups else 'tile hit rate: -',
+        ]
+        metrics = painter.fontMetrics()
+        line_height = metrics.height()
+        histogram = self.histogram()
+        bar_width, chart_height = 16, 40
+        width = max(max(metrics.horizontalAdvance(line) for line in lines), bar_width * len(histogram)) + 8
+        height = line_height * len(lines) + chart_height + 12
+        background = QColor(palette.base().color())
+        background.setAlpha(200)
+        painter.fillRect(QRect(origin, QSize(width, height)), background)
+        painter.setPen(palette.text().color())
+        for i, line in enumerate(lines):
+            painter.drawText(origin + QPoint(4, 4 + i * line_height + metrics.ascent()), line)
+        chart_bottom = origin.y() + height - 4
+        max_count = max(histogram)
+        # Bins of frames slower than the target frame duration are drawn in another color
+        slow_bin = self.BINS.index(constants.FRAME_DURATION) + 1
+        for i, count in enumerate(histogram):
+            bar_height = round(chart_height * count / max_count) if max_count else 0
+            color = palette.highlight().color() if i < slow_bin else QColor(Qt.red)
+            painter.fillRect(origin.x() + 4 + i * bar_width, chart_bottom - bar_height, bar_width - 2, bar_height,
+                             color)
@@ -0,0 +1,123 @@
+"""Cache of laid out person labels, so that text is not measured and shaped again on each paint."""
+from __future__ import annotations
+
+import collections
+import dataclasses
+import threading
+import typing as typ
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+from ..layout import lod
+
+# (person ID, content version, font key, level of detail or fan chart generation)
+LabelKey = tuple[int, int, str, int]
+
+PADDING = 4  # px
+
+
+@dataclasses.dataclass(frozen=True)
+class Label:
+    """The static texts of a person’s box, and their positions relative to the box’s top left corner."""
+    name: QStaticText
+    name_offset: QPointF
+    details: QStaticText | None = None
+    details_offset: QPointF | None = None
+
+
+def make_label(tier: int, font: QFont, size: QSizeF, name: str, details: str = '') -> Label:
+    """Lays out the texts of a person’s box.
+
+    :param tier: The level of detail, either lod.FULL or lod.NAMES.
+    :param font: The base font.
+    :param size: Size of the box.
+    :param name: The person’s name.
+    :param details: The second line of full cards.
+    :return: The label.
+    """
+    text_width = size.width() - 2 * PADDING
+    if tier == lod.NAMES:
+        elided_name = QFontMetrics(font).elidedText(name, Qt.ElideRight, int(text_width))
+        name_text = _static_text(elided_name, font)
+        text_size = name_text.size()
+        return Label(name_text, QPointF((size.width() - text_size.width()) / 2,
+                                        (size.height() - text_size.height()) / 2))
+    bold_font = QFont(font)
+    bold_font.setBold(True)
+    name_text = _static_text(name, bold_font, text_width)
+    details_text = _static_text(details, font)
+    details_size = details_text.size()
+    return Label(
+        name_text,
+        QPointF(PADDING, PADDING),
+        details_text,
+        QPointF((size.width() - details_size.width()) / 2, size.height() - PADDING - details_size.height()),
+    )
+
+
+def _static_text(text: str, font: QFont, width: float = None) -> QStaticText:
+    static_text = QStaticText(text)
+    static_text.setTextFormat(Qt.PlainText)
+    if width is not None:
+        static_text.setTextWidth(width)
+        static_text.setTextOption(QTextOption(Qt.AlignHCenter))
+    static_text.prepare(QTransform(), font)
+    return static_text
+
+
+class LabelCache:
+    """LRU cache of laid out labels.
+
+    QStaticText objects update their internal state when drawn, hence a cache must not be shared between threads.
+    Use for_current_thread() to get the cache of the calling thread.
+    """
+    MAX_SIZE = 10_000
+
+    def __init__(self, max_size: int = MAX_SIZE):
+        self._max_size = max_size
+        self._labels: collections.OrderedDict[LabelKey, Label] = collections.OrderedDict()
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: LabelKey, factory: typ.Callable[[], Label]) -> Label:
+        """Returns the label with the given key, creating it if it is not cached.
+
+        :param key: The label’s key.
+        :param factory: A function that creates the label.
+        """
+        label = self._labels.get(key)
+        if label is None:
+            self.misses += 1
+            label = self._labels[key] = factory()
+            if len(self._labels) > self._max_size:
+                self._labels.popitem(last=False)
+        else:
+            self.hits += 1
+            self._labels.move_to_end(key)
+        return label
+
+    def clear(self):
+        self._labels.clear()
+
+    def __len__(self):
+        return len(self._labels)
+
+
+_caches = threading.local()
+
+
+def for_current_thread(epoch: int) -> LabelCache:
+    """Returns the label cache of the calling thread.
+
+    :param epoch: Incremented whenever all labels become invalid, e.g. when the language or theme changes.
+        The cache is cleared if it was last used with another epoch.
+    """
+    cache = getattr(_caches, 'cache', None)
+    if cache is None:
+        cache = _caches.cache = LabelCache()
+    if cache.epoch != epoch:
+        cache.clear()
+        cache.epoch = epoch
+    return cache
@@ -0,0 +1,186 @@
+"""Map of the places where the events of the persons of a tree happened."""
+from __future__ import annotations
+
+import math
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+from ..layout import clusters
+from ..model import tree as tree_
+
+
+class MapView(QWidget):
+    """Shows the events of a tree as markers on a Web Mercator map, one marker per cluster of the current zoom level,
+    with the number of events it stands for.
+
+    Clusters are indexed once, the first time the map is painted, then updated as persons are edited,
+    so that panning and zooming only look up the clusters in view.
+    """
+    MIN_ZOOM = 0
+    MAX_ZOOM = clusters.ClusterIndex.MAX_ZOOM + 3
+    # Zoom levels per wheel step
+    ZOOM_STEP = 0.5
+    MIN_MARKER_RADIUS = 5  # px
+    MAX_MARKER_RADIUS = 24  # px
+    # Spacing between graticule lines, from the widest one, in degrees
+    GRATICULE_STEPS = (30, 10, 5, 2, 1, 0.5, 0.2, 0.1, 0.05, 0.02, 0.01)
+    MIN_GRATICULE_SPACING = 80  # px
+
+    def __init__(self, parent: QWidget = None):
+        super().__init__(parent=parent)
+        self._tree: tree_.FamilyTree | None = None
+        self._index: clusters.ClusterIndex | None = None
+        # Clusters painted last, for hit-testing
+        self._painted: list[tuple[QPointF, float, clusters.Cluster]] = []
+        self._zoom = 1.0
+        # Projected coordinates of the center of the view
+        self._center = (0.5, 0.5)
+        self._drag_start: QPoint | None = None
+        self.setMouseTracking(True)
+        self.setMinimumSize(100, 100)
+
+    def set_tree(self, tree: tree_.FamilyTree):
+        """Sets the tree to show. Its events are indexed the next time the map is painted."""
+        if self._index is not None:
+            self._tree.remove_listener(self._index.on_tree_changed)
+            self._tree.remove_listener(self._on_tree_changed)
+        self._tree = tree
+        self._index = None
+        self._painted.clear()
+        self.update()
+
+    def _build(self):
+        self._index = clusters.ClusterIndex.for_tree(self._tree)
+        self._tree.add_listener(self._on_tree_changed)
+        if root := self._index.clusters(0):
+            # Show the area where the events are, zoomed in until they split into several markers
+            self._center = root[0].x, root[0].y
+            self._zoom = min(max(self._index.expansion_zoom(root[0]), self.MIN_ZOOM), 10)
+
+    # noinspection PyUnusedLocal
+    def _on_tree_changed(self, change: tree_.TreeChange):
+        self.update()
+
+    @property
+    def _scale(self) -> float:
+        """Number of pixels per projected unit."""
+        return clusters.TILE_SIZE * 2 ** self._zoom
+
+    def _to_view(self, mx: float, my: float) -> QPointF:
+        scale = self._scale
+        return QPointF((mx - self._center[0]) * scale + self.width() / 2,
+                       (my - self._center[1]) * scale + self.height() / 2)
+
+    def _to_map(self, pos: QPointF | QPoint) -> tuple[float, float]:
+        scale = self._scale
+        return (self._center[0] + (pos.x() - self.width() / 2) / scale,
+                self._center[1] + (pos.y() - self.height() / 2) / scale)
+
+    def _marker_radius(self, count: int) -> float:
+        return min(self.MAX_MARKER_RADIUS, self.MIN_MARKER_RADIUS + 4 * math.log10(count))
+
+    def paintEvent(self, event: QPaintEvent):
+        painter = QPainter(self)
+        palette = self.palette()
+        painter.fillRect(self.rect(), palette.base())
+        if self._tree is None:
+            return
+        if self._index is None:
+            self._build()
+        painter.setRenderHint(QPainter.Antialiasing)
+        self._paint_graticule(painter, palette)
+
+        # Include the markers centered just outside the view
+        margin = self.MAX_MARKER_RADIUS
+        left, top = self._to_map(QPointF(-margin, -margin))
+        right, bottom = self._to_map(QPointF(self.width() + margin, self.height() + margin))
+        self._painted.clear()
+        fill = QColor(palette.highlight().color())
+        fill.setAlpha(200)
+        painter.setPen(QPen(palette.highlightedText().color(), 1.5))
+        painter.setBrush(fill)
+        visible = self._index.clusters(math.floor(self._zoom), (left, top, right, bottom))
+        for cluster in visible:
+            center = self._to_view(cluster.x, cluster.y)
+            radius = self._marker_radius(cluster.count)
+            painter.drawEllipse(center, radius, radius)
+            self._painted.append((center, radius, cluster))
+        metrics = painter.fontMetrics()
+        for center, radius, cluster in self._painted:
+            if cluster.count > 1 and metrics.horizontalAdvance(str(cluster.count)) <= 2 * radius:
+                painter.drawText(QRectF(center.x() - radius, center.y() - radius, 2 * radius, 2 * radius),
+                                 Qt.AlignCenter, str(cluster.count))
+        painter.setPen(palette.text().color())
+        if len(visible) <= 200:
+            for center, radius, cluster in self._painted:
+                if cluster.place is not None:
+                    painter.drawText(center + QPointF(radius + 2, metrics.ascent() / 2), cluster.place.label)
+
+    def _paint_graticule(self, painter: QPainter, palette: QPalette):
+        degrees_per_px = 360 / self._scale
+        step = next((s for s in reversed(self.GRATICULE_STEPS) if s / degrees_per_px >= self.MIN_GRATICULE_SPACING),
+                    self.GRATICULE_STEPS[0])
+        west, north = clusters.unproject(*self._to_map(QPointF(0, 0)))
+        east, south = clusters.unproject(*self._to_map(QPointF(self.width(), self.height())))
+        color = QColor(palette.text().color())
+        color.setAlpha(40)
+        painter.setPen(QPen(color, 0))
+        for i in range(math.ceil(max(west, -180) / step), math.floor(min(east, 180) / step) + 1):
+            x = self._to_view(*clusters.project(i * step, 0)).x()
+            painter.drawLine(QPointF(x, 0), QPointF(x, self.height()))
+        max_latitude = clusters.MAX_LATITUDE
+        for i in range(math.ceil(max(south, -max_latitude) / step), math.floor(min(north, max_latitude) / step) + 1):
+            y = self._to_view(*clusters.project(0, i * step)).y()
+            painter.drawLine(QPointF(0, y), QPointF(self.width(), y))
+
+    def cluster_at(self, pos: QPoint) -> clusters.Cluster | None:
+        """Returns the cluster whose marker is at the given position, the topmost one if several overlap."""
+        for center, radius, cluster in reversed(self._painted):
+            if (center.x() - pos.x()) ** 2 + (center.y() - pos.y()) ** 2 <= radius ** 2:
+                return cluster
+        return None
+
+    def _zoom_at(self, pos: QPointF | QPoint, zoom: float):
+        """Changes the zoom level while keeping the map point under pos in place."""
+        mx, my = self._to_map(pos)
+        self._zoom = min(self.MAX_ZOOM, max(self.MIN_ZOOM, zoom))
+        scale = self._scale
+        self._set_center(mx - (pos.x() - self.width() / 2) / scale, my - (pos.y() - self.height() / 2) / scale)
+
+    def _set_center(self, mx: float, my: float):
+        self._center = min(max(mx, 0.0), 1.0), min(max(my, 0.0), 1.0)
+        self.update()
+
+    def wheelEvent(self, event: QWheelEvent):
+        steps = event.angleDelta().y() / 120
+        self._zoom_at(event.pos(), self._zoom + steps * self.ZOOM_STEP)
+
+    def mousePressEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton:
+            self._drag_start = event.pos()
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        if self._drag_start is not None:
+            delta = event.pos() - self._drag_start
+            self._drag_start = event.pos()
+            scale = self._scale
+            self._set_center(self._center[0] - delta.x() / scale, self._center[1] - delta.y() / scale)
+        elif (cluster := self.cluster_at(event.pos())) is not None:
+            self.setToolTip(f'{cluster.place.label} ({cluster.count})' if cluster.place else str(cluster.count))
+        else:
+            self.setToolTip('')
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton:
+            self._drag_start = None
+
+    def mouseDoubleClickEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton:
+            # Zoom in on a cluster until it splits
+            if (cluster := self.cluster_at(event.pos())) is not None and cluster.place is None:
+                self._zoom = min(self.MAX_ZOOM, max(self._index.expansion_zoom(cluster), math.floor(self._zoom) + 1))
+                self._set_center(cluster.x, cluster.y)
+            else:
+                self._zoom_at(event.pos(), math.floor(self._zoom) + 1)
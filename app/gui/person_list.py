@@ -0,0 +1,173 @@
+"""Sortable and filterable list of all persons of a tree."""
+from __future__ import annotations
+
+from PyQt5.QtCore import *
+from PyQt5.QtWidgets import *
+
+from .i18n import translate as _t
+from ..entities import Person
+from ..model import person_table, tree as tree_
+
+
+class PersonListModel(QAbstractTableModel):
+    """Table model over a PersonTable. Rows are exposed to views in batches through canFetchMore()
+    and fetchMore(), and cell texts are only computed for the rows being displayed,
+    so that views stay responsive with millions of persons.
+    """
+    BATCH_SIZE = 1000
+
+    _HEADERS = {
+        person_table.NAME: 'person_list.column.name',
+        person_table.BIRTH_DATE: 'person_list.column.birth_date',
+        person_table.BIRTH_PLACE: 'person_list.column.birth_place',
+    }
+
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent=parent)
+        self._tree: tree_.FamilyTree | None = None
+        self._table = person_table.PersonTable()
+        # Number of rows exposed to views
+        self._fetched = 0
+
+    def set_tree(self, tree: tree_.FamilyTree):
+        self.beginResetModel()
+        if self._tree is not None:
+            self._tree.remove_listener(self._on_tree_changed)
+        self._tree = tree
+        table = person_table.PersonTable.for_tree(tree)
+        # The table is updated by _on_tree_changed(), which notifies views
+        tree.remove_listener(table.on_tree_changed)
+        tree.add_listener(self._on_tree_changed)
+        table.sort(self._table.sort_column, self._table.descending)
+        self._table = table
+        self._fetched = min(self.BATCH_SIZE, len(table))
+        self.endResetModel()
+
+    def set_filter(self, query: str):
+        self.beginResetModel()
+        self._table.set_filter(query)
+        self._fetched = min(self.BATCH_SIZE, len(self._table))
+        self.endResetModel()
+
+    def person_id(self, row: int) -> int:
+        return self._table.person_id(row)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._fetched
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(person_table.COLUMNS)
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        return not parent.isValid() and self._fetched < len(self._table)
+
+    def fetchMore(self, parent: QModelIndex):
+        count = min(self.BATCH_SIZE, len(self._table) - self._fetched)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid() or self._tree is None:
+            return None
+        person = self._tree.get_person(self._table.person_id(index.row()))
+        if person is None:
+            return None
+        return self._cell_text(person, index.column())
+
+    @staticmethod
+    def _cell_text(person: Person, column: int) -> str:
+        if column == person_table.NAME:
+            lastname = person.lastname.label if person.lastname else ''
+            return ', '.join(filter(None, (lastname, ' '.join(person.firstnames))))
+        birthday = person.birthday
+        if column == person_table.BIRTH_DATE:
+            return repr(birthday.date) if birthday and birthday.date else ''
+        return birthday.place.label if birthday and birthday.place else ''
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return _t(self._HEADERS[section])
+        return None
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder):
+        self.beginResetModel()
+        self._table.sort(column, descending=order == Qt.DescendingOrder)
+        self._fetched = min(max(self._fetched, self.BATCH_SIZE), len(self._table))
+        self.endResetModel()
+
+    def _on_tree_changed(self, change: tree_.TreeChange):
+        if change.old_person is not None:
+            row = self._table.row_of(change.person_id)
+            if row is not None and row < self._fetched:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                self._table.remove(change.person_id)
+                self._fetched -= 1
+                self.endRemoveRows()
+            else:
+                self._table.remove(change.person_id)
+        if change.new_person is not None:
+            row = self._table.insertion_row(change.person_id, change.new_person)
+            # Rows beyond the fetched ones will be exposed by fetchMore()
+            if row is not None and row <= self._fetched:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._table.add(change.person_id, change.new_person)
+                self._fetched += 1
+                self.endInsertRows()
+            else:
+                self._table.add(change.person_id, change.new_person)
+
+
+class PersonListPanel(QWidget):
+    """A filter field above the sortable list of all persons. Double-clicking a person selects them."""
+    # Delay after the last keystroke before the list is filtered
+    FILTER_DELAY = 300  # ms
+
+    person_selected = pyqtSignal(int)
+
+    def __init__(self, parent: QWidget = None):
+        super().__init__(parent=parent)
+        self._model = PersonListModel(parent=self)
+
+        self._filter_field = QLineEdit(parent=self)
+        self._filter_field.setPlaceholderText(_t('person_list.filter.placeholder'))
+        self._filter_field.setClearButtonEnabled(True)
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(self.FILTER_DELAY)
+        # noinspection PyUnresolvedReferences
+        self._filter_timer.timeout.connect(lambda: self._model.set_filter(self._filter_field.text()))
+        # noinspection PyUnresolvedReferences
+        self._filter_field.textChanged.connect(self._filter_timer.start)
+
+        self._view = QTableView(parent=self)
+        self._view.setModel(self._model)
+        self._view.setSortingEnabled(True)
+        self._view.sortByColumn(person_table.NAME, Qt.AscendingOrder)
+        self._view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self._view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self._view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self._view.setWordWrap(False)
+        # Fixed row heights spare the view from measuring rows
+        vertical_header = self._view.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(self.fontMetrics().height() + 6)
+        vertical_header.hide()
+        self._view.horizontalHeader().setStretchLastSection(True)
+        # noinspection PyUnresolvedReferences
+        self._view.doubleClicked.connect(self._on_double_click)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self._filter_field)
+        layout.addWidget(self._view)
+        self.setLayout(layout)
+
+    def set_tree(self, tree: tree_.FamilyTree):
+        self._model.set_tree(tree)
+
+    def _on_double_click(self, index: QModelIndex):
+        # noinspection PyUnresolvedReferences
+        self.person_selected.emit(self._model.person_id(index.row()))
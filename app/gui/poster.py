@@ -0,0 +1,236 @@
+"""Export of the whole tree as a poster, rendered piece by piece so that memory use is bounded."""
+from __future__ import annotations
+
+import concurrent.futures
+import math
+import pathlib
+import threading
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+from . import constants, logger, tiles
+from ..export import png, svg
+from ..layout import lod, spatial
+
+PNG = '.png'
+SVG = '.svg'
+PDF = '.pdf'
+FORMATS = (PNG, SVG, PDF)
+
+COMPLETED = 0
+CANCELLED = 1
+FAILED = 2
+
+_SVG_STYLESHEET = '''
+polyline { fill: none; stroke: black; stroke-width: 1; }
+rect { fill: white; stroke: black; stroke-width: 1; }
+rect.reference { stroke-dasharray: 4 2; }
+text { font-family: sans-serif; font-size: 12px; text-anchor: middle; }
+text.name { font-weight: bold; }
+'''
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class PosterExport(QObject):
+    """Exports the content of a scene to a PNG, SVG or PDF file in a worker thread.
+
+    The content is collected beforehand on the GUI thread. PNG images are rendered in horizontal strips
+    whose rows are streamed to the file, PDF documents are split into pages, and SVG elements are written
+    one by one. The memory used for pixels never exceeds MEMORY_BUDGET, whatever the size of the poster.
+    """
+    MEMORY_BUDGET = 64 * 1024 * 1024  # bytes
+    # Maximum width of the images strips are rendered in
+    MAX_IMAGE_WIDTH = 8192  # px
+    MARGIN = 20  # px
+
+    # Emitted with the number of steps done and the total number of steps
+    progress = pyqtSignal(int, int)
+    # Emitted with either COMPLETED, CANCELLED or FAILED
+    finished = pyqtSignal(int)
+
+    def __init__(self, content: tiles.TileContent, bounds: spatial.Rect, path: pathlib.Path, scale: float = 1,
+                 parent: QObject = None):
+        """Creates an export. It does not start until start() is called.
+
+        :param content: Content of the whole scene.
+        :param bounds: Bounds of the scene.
+        :param path: Path of the file to write. Its extension must be one of FORMATS.
+        :param scale: Number of pixels per scene unit.
+        :param parent: This object’s parent.
+        :raise ValueError: If the file’s extension is not supported.
+        """
+        super().__init__(parent=parent)
+        if path.suffix.lower() not in FORMATS:
+            raise ValueError(f'unsupported poster format {path.suffix}')
+        self._content = content
+        self._bounds = bounds
+        self._path = path
+        self._scale = scale
+        self._style = tiles.TileStyle(
+            background=QColor(Qt.white),
+            foreground=QColor(Qt.black),
+            fill=QColor(Qt.white),
+            font=QFont(),
+        )
+        self._cancelled = threading.Event()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='poster')
+        # Indexes of edges and boxes in the content, built by the worker
+        self._edges_index: spatial.QuadTree[int] = spatial.QuadTree()
+        self._boxes_index: spatial.QuadTree[int] = spatial.QuadTree()
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """The size of the poster in pixels."""
+        left, top, right, bottom = self._bounds
+        return (math.ceil((right - left) * self._scale) + 2 * self.MARGIN,
+                math.ceil((bottom - top) * self._scale) + 2 * self.MARGIN)
+
+    def start(self):
+        self._executor.submit(self._run)
+        self._executor.shutdown(wait=False)
+
+    def cancel(self):
+        """Stops the export as soon as possible. The partially written file is deleted."""
+        self._cancelled.set()
+
+    def _run(self):
+        """Writes the file. Runs in the worker thread."""
+        status = COMPLETED
+        try:
+            self._build_indexes()
+            {PNG: self._write_png, SVG: self._write_svg, PDF: self._write_pdf}[self._path.suffix.lower()]()
+        except _Cancelled:
+            status = CANCELLED
+        except Exception as e:
+            logger.logger.exception(e)
+            status = FAILED
+        if status != COMPLETED:
+            self._path.unlink(missing_ok=True)
+        try:
+            # noinspection PyUnresolvedReferences
+            self.finished.emit(status)
+        except RuntimeError as e:  # The export was deleted
+            logger.logger.debug(e)
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise _Cancelled()
+
+    def _build_indexes(self):
+        for i, polyline in enumerate(self._content.edges):
+            xs, ys = [p.x() for p in polyline], [p.y() for p in polyline]
+            self._edges_index.insert(i, (min(xs), min(ys), max(xs), max(ys)))
+        for i, box in enumerate(self._content.boxes):
+            rect = box.rect
+            self._boxes_index.insert(i, (rect.left(), rect.top(), rect.right(), rect.bottom()))
+
+    def _area_content(self, area: spatial.Rect) -> tiles.TileContent:
+        """Returns the part of the content that intersects the given scene area, in drawing order."""
+        return tiles.TileContent(
+            lod.FULL,
+            edges=[self._content.edges[i] for i in sorted(self._edges_index.query(area))],
+            boxes=[self._content.boxes[i] for i in sorted(self._boxes_index.query(area))],
+        )
+
+    def _paint_area(self, painter: QPainter, x: int, y: int, width: int, height: int):
+        """Paints the part of the poster whose top left corner in pixels is (x, y).
+        The painter’s origin must be at that corner."""
+        left, top, _, _ = self._bounds
+        painter.translate(self.MARGIN - x, self.MARGIN - y)
+        painter.scale(self._scale, self._scale)
+        painter.translate(-left, -top)
+        # Scene area covered by the given pixels, with a margin for antialiasing
+        m = tiles.MARGIN
+        area = ((x - self.MARGIN - m) / self._scale + left, (y - self.MARGIN - m) / self._scale + top,
+                (x + width - self.MARGIN + m) / self._scale + left, (y + height - self.MARGIN + m) / self._scale + top)
+        tiles.paint_content(painter, self._area_content(area), self._style, self._scale)
+
+    def _write_png(self):
+        width, height = self.size
+        image_width = min(width, self.MAX_IMAGE_WIDTH)
+        # Each strip needs its RGB rows, plus one 32-bit image and its RGB conversion at a time
+        strip_height = max(1, self.MEMORY_BUDGET // (3 * width + 7 * image_width))
+        with self._path.open('wb') as f:
+            writer = png.PngWriter(f, width, height)
+            for y in range(0, height, strip_height):
+                self._check_cancelled()
+                rows_count = min(strip_height, height - y)
+                rows = [bytearray() for _ in range(rows_count)]
+                for x in range(0, width, image_width):
+                    self._check_cancelled()
+                    w = min(image_width, width - x)
+                    image = QImage(w, rows_count, QImage.Format_RGB32)
+                    image.fill(self._style.background)
+                    painter = QPainter(image)
+                    self._paint_area(painter, x, y, w, rows_count)
+                    painter.end()
+                    image = image.convertToFormat(QImage.Format_RGB888)
+                    bits = image.constBits()
+                    bits.setsize(image.sizeInBytes())
+                    data = memoryview(bits)
+                    line_length = image.bytesPerLine()
+                    for i, row in enumerate(rows):
+                        row += data[i * line_length:i * line_length + 3 * w]
+                for row in rows:
+                    writer.write_row(row)
+                # noinspection PyUnresolvedReferences
+                self.progress.emit(y + rows_count, height)
+            writer.close()
+
+    def _write_svg(self):
+        width, height = self.size
+        left, top, right, bottom = self._bounds
+        m = self.MARGIN / self._scale
+        view_box = (left - m, top - m, right - left + 2 * m, bottom - top + 2 * m)
+        total = len(self._content.edges) + len(self._content.boxes)
+        with self._path.open('w', encoding='UTF-8') as f:
+            writer = svg.SvgWriter(f, width, height, view_box, stylesheet=_SVG_STYLESHEET)
+            for i, polyline in enumerate(self._content.edges):
+                if i % 1000 == 0:
+                    self._check_cancelled()
+                writer.polyline((p.x(), p.y()) for p in polyline)
+            for i, box in enumerate(self._content.boxes, start=len(self._content.edges)):
+                if i % 1000 == 0:
+                    self._check_cancelled()
+                    # noinspection PyUnresolvedReferences
+                    self.progress.emit(i, total)
+                rect = box.rect
+                writer.rect(rect.x(), rect.y(), rect.width(), rect.height(), radius=5,
+                            css_class='reference' if box.dashed else None)
+                writer.text(rect.center().x(), rect.top() + 18, box.label, css_class='name')
+                if box.details:
+                    writer.text(rect.center().x(), rect.bottom() - 8, box.details)
+            writer.close()
+        # noinspection PyUnresolvedReferences
+        self.progress.emit(total, total)
+
+    def _write_pdf(self):
+        writer = QPdfWriter(str(self._path))
+        writer.setCreator(constants.APP_NAME)
+        writer.setResolution(72)  # 1 pixel = 1 point
+        writer.setPageSize(QPageSize(QPageSize.A3))
+        writer.setPageMargins(QMarginsF())
+        width, height = self.size
+        painter = QPainter()
+        if not painter.begin(writer):
+            raise OSError(f'could not write to {self._path}')
+        try:
+            page_width, page_height = writer.width(), writer.height()
+            columns, rows = math.ceil(width / page_width), math.ceil(height / page_height)
+            # Each page is written to the file when the next one is started
+            for page in range(columns * rows):
+                self._check_cancelled()
+                if page:
+                    writer.newPage()
+                x, y = page % columns * page_width, page // columns * page_height
+                painter.save()
+                self._paint_area(painter, x, y, page_width, page_height)
+                painter.restore()
+                # noinspection PyUnresolvedReferences
+                self.progress.emit(page + 1, columns * rows)
+        finally:
+            painter.end()
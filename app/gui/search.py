@@ -0,0 +1,130 @@
+"""Search field that suggests persons as the user types."""
+from __future__ import annotations
+
+import concurrent.futures
+import math
+import time
+import typing as typ
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+from . import logger
+from ..model import tree as tree_, trigram_index
+
+
+class PersonSearchField(QLineEdit):
+    """A text field with a completer that suggests persons whose name is similar to the typed text.
+
+    The first batch of suggestions is computed on the GUI thread so that it is shown right away,
+    the following ones are streamed from a worker thread. Each keystroke cancels the previous query.
+    Queries whose first batch takes longer than FIRST_BATCH_SLICE, such as very short or common ones,
+    are run again from the start in the worker thread so that typing is never blocked.
+    """
+    MAX_SUGGESTIONS = 500
+    FIRST_BATCH_SIZE = 20
+    FIRST_BATCH_SLICE = 0.01  # s
+
+    person_selected = pyqtSignal(int)
+    # Emitted from the worker thread with the query generation and a batch of (person ID, label) pairs
+    _batch_ready = pyqtSignal(int, list)
+
+    def __init__(self, tree_supplier: typ.Callable[[], tree_.FamilyTree],
+                 index_supplier: typ.Callable[[], trigram_index.TrigramIndex], parent: QWidget = None):
+        """Creates a search field.
+
+        :param tree_supplier: A function that returns the current tree.
+        :param index_supplier: A function that returns the trigram index of the current tree.
+        :param parent: This widget’s parent.
+        """
+        super().__init__(parent=parent)
+        self._tree_supplier = tree_supplier
+        self._index_supplier = index_supplier
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='search')
+        # Incremented on each keystroke, queries of previous generations are stale
+        self._generation = 0
+        self._suggestions_count = 0
+
+        self._model = QStandardItemModel(parent=self)
+        self._completer = QCompleter(self._model, self)
+        # Suggestions are already filtered by the index
+        self._completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        # noinspection PyUnresolvedReferences
+        self._completer.activated[QModelIndex].connect(self._on_suggestion_activated)
+        self.setCompleter(self._completer)
+        self.setClearButtonEnabled(True)
+
+        # noinspection PyUnresolvedReferences
+        self.textEdited.connect(self._on_text_edited)
+        # noinspection PyUnresolvedReferences
+        self._batch_ready.connect(self._add_suggestions)
+
+    def _on_text_edited(self, text: str):
+        self._generation += 1
+        self._model.clear()
+        self._suggestions_count = 0
+        if not text.strip():
+            return
+        generation = self._generation
+        # Only the GUI thread is subject to the deadline, it is lifted once the first batch is found
+        deadline = [time.perf_counter() + self.FIRST_BATCH_SLICE]
+        batches = self._query(text, generation, lambda: time.perf_counter() > deadline[0])
+        first_batch = next(batches, None)
+        if first_batch is None:
+            if time.perf_counter() > deadline[0]:
+                self._executor.submit(self._stream, generation, self._query(text, generation), 0)
+            return
+        deadline[0] = math.inf
+        self._add_suggestions(generation, self._labels(first_batch))
+        self._executor.submit(self._stream, generation, batches, len(first_batch))
+
+    def _query(self, text: str, generation: int, timed_out: typ.Callable[[], bool] = None) \
+            -> typ.Iterator[list[trigram_index.Match]]:
+        """Starts a query of the trigram index that stops when a newer one is made or if timed_out returns true."""
+        return self._index_supplier().query(
+            text,
+            batch_size=self.FIRST_BATCH_SIZE,
+            cancelled=lambda: generation != self._generation or (timed_out is not None and timed_out()),
+        )
+
+    def _stream(self, generation: int, batches: typ.Iterator[list[trigram_index.Match]], count: int):
+        """Sends the batches to the GUI thread. Runs in the worker thread.
+
+        :param count: The number of suggestions already sent.
+        """
+        try:
+            for batch in batches:
+                if generation != self._generation or count >= self.MAX_SUGGESTIONS:
+                    return
+                count += len(batch)
+                self._batch_ready.emit(generation, self._labels(batch))
+        except RuntimeError as e:  # The tree was edited while streaming, the query is stale anyway
+            logger.logger.debug(e)
+        except Exception as e:  # Not to be swallowed by the executor
+            logger.logger.exception(e)
+
+    def _labels(self, batch: list[trigram_index.Match]) -> list[tuple[int, str]]:
+        tree = self._tree_supplier()
+        return [(m.person_id, person.full_name) for m in batch
+                if (person := tree.get_person(m.person_id)) is not None]
+
+    def _add_suggestions(self, generation: int, suggestions: list[tuple[int, str]]):
+        if generation != self._generation:
+            return
+        for person_id, label in suggestions[:self.MAX_SUGGESTIONS - self._suggestions_count]:
+            item = QStandardItem(label)
+            item.setData(person_id, Qt.UserRole)
+            self._model.appendRow(item)
+        self._suggestions_count = self._model.rowCount()
+        if self._suggestions_count and not self._completer.popup().isVisible():
+            self._completer.complete()
+
+    def _on_suggestion_activated(self, index: QModelIndex):
+        # noinspection PyUnresolvedReferences
+        self.person_selected.emit(index.data(Qt.UserRole))
+
+    def shutdown(self):
+        """Cancels any pending query and stops the worker thread."""
+        self._generation += 1
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,388 @@
+"""Offscreen rendering of the canvas into cached image tiles.
+
+The scene is cut into square tiles of TILE_SIZE pixels for each discrete zoom level.
+Tiles are painted on worker threads from a description of their content built on the GUI thread,
+so that workers never access the tree or the layout.
+"""
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import dataclasses
+import itertools
+import math
+import os
+import typing as typ
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+
+from . import labels, logger
+from ..layout import lod, spatial
+
+TILE_SIZE = 256  # px
+# Ratio between two consecutive zoom levels
+ZOOM_STEP = 1.25
+# Number of pixels drawn outside of the bounds of items because of antialiasing and pen width
+MARGIN = 2  # px
+
+# (zoom level, column, row)
+TileKey = tuple[int, int, int]
+
+
+def zoom_level(zoom: float) -> int:
+    """Returns the zoom level that is closest to the given zoom factor."""
+    return round(math.log(zoom, ZOOM_STEP))
+
+
+def level_scale(level: int) -> float:
+    """Returns the zoom factor of the given zoom level."""
+    return ZOOM_STEP ** level
+
+
+def tile_bounds(key: TileKey, margin: float = 0) -> spatial.Rect:
+    """Returns the scene rectangle covered by a tile.
+
+    :param key: The tile’s key.
+    :param margin: A margin in pixels to add around the rectangle.
+    """
+    level, i, j = key
+    scale = level_scale(level)
+    size = TILE_SIZE / scale
+    m = margin / scale
+    return i * size - m, j * size - m, (i + 1) * size + m, (j + 1) * size + m
+
+
+def tiles_in(rect: spatial.Rect, level: int, margin: float = 0) -> list[TileKey]:
+    """Returns the keys of the tiles of a zoom level that intersect a scene rectangle.
+
+    :param rect: The scene rectangle.
+    :param level: The zoom level.
+    :param margin: A margin in pixels to add around the rectangle.
+    """
+    scale = level_scale(level)
+    size = TILE_SIZE / scale
+    m = margin / scale
+    columns = range(math.floor((rect[0] - m) / size), math.floor((rect[2] + m) / size) + 1)
+    rows = range(math.floor((rect[1] - m) / size), math.floor((rect[3] + m) / size) + 1)
+    return [(level, i, j) for j in rows for i in columns]
+
+
+@dataclasses.dataclass(frozen=True)
+class Box:
+    """A person’s box in scene coordinates."""
+    rect: QRectF
+    person_id: int
+    # Changes whenever the person is edited
+    version: int
+    label: str
+    # Second line of full cards
+    details: str = ''
+    dashed: bool = False
+
+
+@dataclasses.dataclass(frozen=True)
+class Stub:
+    """The badge of a collapsed branch."""
+    rect: QRectF
+    label: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Dot:
+    center: QPointF
+    color: QColor
+
+
+@dataclasses.dataclass(frozen=True)
+class Band:
+    rect: QRectF
+    color: QColor
+
+
+@dataclasses.dataclass(frozen=True)
+class TileContent:
+    """What to draw in an area of the scene, in scene coordinates.
+    Which lists are filled depends on the level of detail."""
+    tier: int
+    edges: list[list[QPointF]] = dataclasses.field(default_factory=list)
+    boxes: list[Box] = dataclasses.field(default_factory=list)
+    stubs: list[Stub] = dataclasses.field(default_factory=list)
+    dots: list[Dot] = dataclasses.field(default_factory=list)
+    bands: list[Band] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass(frozen=True)
+class TileStyle:
+    background: QColor
+    foreground: QColor
+    fill: QColor
+    font: QFont
+
+
+def render_tile(key: TileKey, content: TileContent, style: TileStyle, labels_epoch: int = 0) -> QImage:
+    """Paints a tile into a new image. May be called from any thread.
+
+    :param key: The tile’s key.
+    :param content: What to draw.
+    :param style: Colors and font.
+    :param labels_epoch: Incremented whenever cached labels become invalid.
+    :return: The tile’s image.
+    """
+    image = QImage(TILE_SIZE, TILE_SIZE, QImage.Format_ARGB32_Premultiplied)
+    image.fill(style.background)
+    left, top, _, _ = tile_bounds(key)
+    scale = level_scale(key[0])
+    painter = QPainter(image)
+    painter.scale(scale, scale)
+    painter.translate(-left, -top)
+    paint_content(painter, content, style, scale, labels_epoch)
+    painter.end()
+    return image
+
+
+def paint_content(painter: QPainter, content: TileContent, style: TileStyle, scale: float, labels_epoch: int = 0):
+    """Paints the given content. May be called from any thread.
+
+    :param painter: A painter whose transform maps scene coordinates to the device.
+    :param content: What to draw.
+    :param style: Colors and font.
+    :param scale: Number of device pixels per scene unit.
+    :param labels_epoch: Incremented whenever cached labels become invalid.
+    """
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setFont(style.font)
+    painter.setPen(QPen(style.foreground, 0))  # Cosmetic pen, 1 px wide at all zoom levels
+    for polyline in content.edges:
+        painter.drawPolyline(*polyline)
+    label_cache = labels.for_current_thread(labels_epoch)
+    if content.tier == lod.FULL:
+        _draw_cards(painter, content.boxes, style, label_cache)
+    elif content.tier == lod.NAMES:
+        _draw_name_boxes(painter, content.boxes, style, label_cache)
+    if content.stubs:
+        painter.setPen(QPen(style.foreground, 0, Qt.DashLine))
+        painter.setBrush(style.fill)
+        for stub in content.stubs:
+            painter.drawRoundedRect(stub.rect, 3, 3)
+            painter.drawText(stub.rect, Qt.AlignCenter, stub.label)
+    painter.setPen(Qt.NoPen)
+    radius = 3 / scale
+    for dot in content.dots:
+        painter.setBrush(dot.color)
+        painter.drawEllipse(dot.center, radius, radius)
+    for band in content.bands:
+        painter.fillRect(band.rect, band.color)
+
+
+def _get_label(cache: labels.LabelCache, box: Box, tier: int, font: QFont) -> labels.Label:
+    return cache.get(
+        (box.person_id, box.version, font.key(), tier),
+        lambda: labels.make_label(tier, font, box.rect.size(), box.label, box.details),
+    )
+
+
+def _draw_cards(painter: QPainter, boxes: list[Box], style: TileStyle, label_cache: labels.LabelCache):
+    bold_font = QFont(style.font)
+    bold_font.setBold(True)
+    painter.setBrush(style.fill)
+    solid_pen, dashed_pen = QPen(style.foreground, 1), QPen(style.foreground, 1, Qt.DashLine)
+    for box in boxes:
+        painter.setPen(dashed_pen if box.dashed else solid_pen)
+        painter.drawRoundedRect(box.rect, 5, 5)
+        label = _get_label(label_cache, box, lod.FULL, style.font)
+        painter.setFont(bold_font)
+        painter.drawStaticText(box.rect.topLeft() + label.name_offset, label.name)
+        painter.setFont(style.font)
+        painter.drawStaticText(box.rect.topLeft() + label.details_offset, label.details)
+
+
+def _draw_name_boxes(painter: QPainter, boxes: list[Box], style: TileStyle, label_cache: labels.LabelCache):
+    painter.setBrush(style.fill)
+    painter.setPen(QPen(style.foreground, 0))
+    for box in boxes:
+        painter.drawRect(box.rect)
+        label = _get_label(label_cache, box, lod.NAMES, style.font)
+        painter.drawStaticText(box.rect.topLeft() + label.name_offset, label.name)
+
+
+class TileCache:
+    """LRU cache of rendered tiles whose total size in bytes is bounded."""
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._tiles: collections.OrderedDict[TileKey, QImage] = collections.OrderedDict()
+        self._bytes = 0
+        # Number of cached tiles per zoom level
+        self._levels: collections.Counter[int] = collections.Counter()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def levels(self) -> typ.Iterable[int]:
+        """The zoom levels that have at least one cached tile."""
+        return self._levels.keys()
+
+    def get(self, key: TileKey) -> QImage | None:
+        """Returns a tile and marks it as the most recently used one, None if it is not cached."""
+        image = self._tiles.get(key)
+        if image is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._tiles.move_to_end(key)
+        return image
+
+    def peek(self, key: TileKey) -> QImage | None:
+        """Returns a tile without affecting the LRU order nor the statistics."""
+        return self._tiles.get(key)
+
+    def put(self, key: TileKey, image: QImage):
+        """Adds a tile, evicting the least recently used ones if the cache exceeds its budget."""
+        self.pop(key)
+        self._tiles[key] = image
+        self._bytes += image.sizeInBytes()
+        self._levels[key[0]] += 1
+        while self._bytes > self._max_bytes and len(self._tiles) > 1:
+            self.pop(next(iter(self._tiles)))
+
+    def pop(self, key: TileKey) -> QImage | None:
+        image = self._tiles.pop(key, None)
+        if image is not None:
+            self._bytes -= image.sizeInBytes()
+            self._levels[key[0]] -= 1
+            if not self._levels[key[0]]:
+                del self._levels[key[0]]
+        return image
+
+    def clear(self):
+        self._tiles.clear()
+        self._levels.clear()
+        self._bytes = 0
+
+    def __contains__(self, key: TileKey):
+        return key in self._tiles
+
+    def __len__(self):
+        return len(self._tiles)
+
+
+class TileRenderer(QObject):
+    """Renders tiles on worker threads and caches them.
+
+    Tiles that are invalidated while being rendered are discarded when their rendering finishes.
+    """
+    # Emitted on the GUI thread when a requested tile has been cached
+    tile_ready = pyqtSignal()
+    # Emitted from worker threads with the tile’s key, the job ID and the image
+    _rendered = pyqtSignal(object, int, QImage)
+
+    def __init__(self, max_bytes: int, parent: QObject = None):
+        """Creates a renderer.
+
+        :param max_bytes: Memory budget of the tile cache.
+        :param parent: This object’s parent.
+        """
+        super().__init__(parent=parent)
+        self._cache = TileCache(max_bytes)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1), thread_name_prefix='tiles')
+        self._job_ids = itertools.count()
+        # Tiles being rendered, with their job ID
+        self._pending: dict[TileKey, tuple[int, concurrent.futures.Future]] = {}
+        self._style: TileStyle | None = None
+        # Incremented whenever the labels cached by worker threads become invalid
+        self._labels_epoch = 0
+        # noinspection PyUnresolvedReferences
+        self._rendered.connect(self._on_rendered)
+
+    @property
+    def cache(self) -> TileCache:
+        return self._cache
+
+    def set_style(self, style: TileStyle):
+        """Sets the colors and font of tiles. All tiles and labels are discarded."""
+        self._style = style
+        self.invalidate_labels()
+
+    def invalidate_labels(self):
+        """Discards all tiles and cached labels, e.g. after the language changed."""
+        self._labels_epoch += 1
+        self.clear()
+
+    def tile(self, key: TileKey, content_supplier: typ.Callable[[TileKey], TileContent]) -> QImage | None:
+        """Returns a cached tile. If it is not cached, its rendering is requested and None is returned.
+
+        :param key: The tile’s key.
+        :param content_supplier: A function that returns the content of a tile. Called on this thread.
+        """
+        image = self._cache.get(key)
+        if image is None and key not in self._pending:
+            job_id = next(self._job_ids)
+            future = self._executor.submit(self._render, job_id, key, content_supplier(key), self._style,
+                                           self._labels_epoch)
+            self._pending[key] = (job_id, future)
+        return image
+
+    def fallback(self, key: TileKey, max_distance: int = 4) -> list[tuple[TileKey, QImage]]:
+        """Returns the cached tiles of the nearest zoom level that cover a part of the given tile,
+        to be shown scaled until the tile is rendered."""
+        level = key[0]
+        bounds = tile_bounds(key)
+        for distance in range(1, max_distance + 1):
+            for other_level in (level - distance, level + distance):
+                tiles = [(k, image) for k in tiles_in(bounds, other_level)
+                         if (image := self._cache.peek(k)) is not None]
+                if tiles:
+                    return tiles
+        return []
+
+    def retain(self, keys: typ.Iterable[TileKey]):
+        """Cancels the pending renderings of tiles that are not in the given ones and have not started yet."""
+        keys = set(keys)
+        for key in list(self._pending):
+            if key not in keys and self._pending[key][1].cancel():
+                del self._pending[key]
+
+    def invalidate(self, rect: spatial.Rect):
+        """Discards the tiles of all zoom levels that intersect a scene rectangle."""
+        levels = set(self._cache.levels) | {key[0] for key in self._pending}
+        for level in levels:
+            for key in tiles_in(rect, level, margin=MARGIN):
+                self._cache.pop(key)
+                if (pending := self._pending.pop(key, None)) is not None:
+                    pending[1].cancel()
+
+    def clear(self):
+        """Discards all tiles."""
+        self._cache.clear()
+        for _, future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def _render(self, job_id: int, key: TileKey, content: TileContent, style: TileStyle, labels_epoch: int):
+        """Renders a tile. Runs in a worker thread."""
+        image = render_tile(key, content, style, labels_epoch)
+        try:
+            # noinspection PyUnresolvedReferences
+            self._rendered.emit(key, job_id, image)
+        except RuntimeError as e:  # The renderer was deleted
+            logger.logger.debug(e)
+
+    def _on_rendered(self, key: TileKey, job_id: int, image: QImage):
+        pending = self._pending.get(key)
+        if pending is None or pending[0] != job_id:
+            return  # Invalidated while rendering
+        del self._pending[key]
+        self._cache.put(key, image)
+        # noinspection PyUnresolvedReferences
+        self.tile_ready.emit()
+
+    def shutdown(self):
+        """Cancels pending renderings and stops the worker threads."""
+        self.clear()
+        self._executor.shutdown(wait=True)
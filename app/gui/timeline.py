@@ -0,0 +1,270 @@
+"""Horizontal timeline of the lifespans and events of all persons of a tree."""
+from __future__ import annotations
+
+import math
+
+from PyQt5.QtCore import *
+from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
+
+from ..layout import lifespans
+from ..model import timeline, tree as tree_
+
+
+class Timeline(QAbstractScrollArea):
+    """Shows the lifespan of each person as a bar, packed into rows, under a strip of birth and death ticks.
+
+    Only the bars of the visible rows and years are looked up and painted. When there are more events
+    in the visible years than MAX_TICKS, ticks are aggregated into bins whose height shows how many events
+    they contain. Bars and events are indexed once, the first time the timeline is painted, then updated
+    as persons are edited.
+    """
+    AXIS_HEIGHT = 20  # px
+    TICKS_HEIGHT = 24  # px
+    ROW_HEIGHT = 14  # px
+    BAR_HEIGHT = 10  # px
+    # Width of the bins ticks are aggregated into
+    TICK_BIN_WIDTH = 3  # px
+    MAX_TICKS = 2000
+    # Minimum width of bars labelled with the name of their person
+    MIN_LABEL_WIDTH = 60  # px
+    # Minimum space between year labels
+    MIN_YEAR_SPACING = 60  # px
+    YEAR_STEPS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+    MIN_ZOOM = 0.05  # px per year
+    MAX_ZOOM = 500  # px per year
+    ZOOM_STEP = 1.25
+    MARGIN = 10  # years
+
+    person_selected = pyqtSignal(int)
+
+    def __init__(self, parent: QWidget = None):
+        super().__init__(parent=parent)
+        self._tree: tree_.FamilyTree | None = None
+        self._index: timeline.TimelineIndex | None = None
+        self._layout: lifespans.RowLayout[int] = lifespans.RowLayout()
+        # IDs of the persons whose lifespan is partly assumed
+        self._assumed: set[int] = set()
+        self._built = False
+        self._zoom = 4.0  # px per year
+        # Year at the left edge of the viewport
+        self._left = 1800.0
+        self._drag_start: QPoint | None = None
+        self.setMouseTracking(True)
+        self.horizontalScrollBar().setSingleStep(20)
+        self.verticalScrollBar().setSingleStep(self.ROW_HEIGHT)
+        self.setViewportMargins(0, self.AXIS_HEIGHT + self.TICKS_HEIGHT, 0, 0)
+        self._header = _Header(self)
+        # noinspection PyUnresolvedReferences
+        self.horizontalScrollBar().valueChanged.connect(self._on_horizontal_scroll)
+
+    def set_tree(self, tree: tree_.FamilyTree):
+        """Sets the tree to show. Its persons are indexed the next time the timeline is painted."""
+        if self._built:
+            self._tree.remove_listener(self._index.on_tree_changed)
+            self._tree.remove_listener(self._on_tree_changed)
+        self._tree = tree
+        self._index = None
+        self._layout = lifespans.RowLayout()
+        self._assumed.clear()
+        self._built = False
+        self._refresh()
+
+    def _build(self):
+        spans = []
+        for person_id, person in self._tree.persons():
+            if span := lifespans.lifespan(person):
+                start, end, assumed = span
+                spans.append((person_id, start, end))
+                if assumed:
+                    self._assumed.add(person_id)
+        self._layout = lifespans.RowLayout(spans)
+        self._index = timeline.TimelineIndex.for_tree(self._tree)
+        self._tree.add_listener(self._on_tree_changed)
+        self._built = True
+        if bounds := self._layout.bounds():
+            self._left = bounds[0] - self.MARGIN
+        self._update_scroll_bars()
+        self._header.update()
+
+    def _on_tree_changed(self, change: tree_.TreeChange):
+        person_id = change.person_id
+        self._layout.remove(person_id)
+        self._assumed.discard(person_id)
+        if change.new_person is not None and (span := lifespans.lifespan(change.new_person)):
+            start, end, assumed = span
+            self._layout.add(person_id, start, end)
+            if assumed:
+                self._assumed.add(person_id)
+        self._update_scroll_bars()
+        self._refresh()
+
+    def _update_scroll_bars(self):
+        rows_height = len(self._layout) * self.ROW_HEIGHT
+        vertical = self.verticalScrollBar()
+        vertical.setRange(0, max(0, rows_height - self.viewport().height()))
+        vertical.setPageStep(self.viewport().height())
+        start, end = self._layout.bounds() or (self._left, self._left)
+        start, end = min(start - self.MARGIN, self._left), max(end + self.MARGIN, self._year_at(self.width()))
+        horizontal = self.horizontalScrollBar()
+        horizontal.blockSignals(True)
+        horizontal.setRange(round(start * self._zoom), max(round(start * self._zoom),
+                                                           round(end * self._zoom) - self.viewport().width()))
+        horizontal.setPageStep(self.viewport().width())
+        horizontal.setValue(round(self._left * self._zoom))
+        horizontal.blockSignals(False)
+
+    def _on_horizontal_scroll(self, value: int):
+        self._left = value / self._zoom
+        self._refresh()
+
+    def _refresh(self):
+        self.viewport().update()
+        self._header.update()
+
+    def _x_of(self, year: float) -> float:
+        return (year - self._left) * self._zoom
+
+    def _year_at(self, x: float) -> float:
+        return self._left + x / self._zoom
+
+    def _visible_rows(self) -> tuple[int, int]:
+        top = self.verticalScrollBar().value()
+        return top // self.ROW_HEIGHT, (top + self.viewport().height()) // self.ROW_HEIGHT
+
+    def bar_at(self, pos: QPoint) -> int | None:
+        """Returns the ID of the person whose bar is at the given position of the viewport, if any."""
+        row = (pos.y() + self.verticalScrollBar().value()) // self.ROW_HEIGHT
+        year = self._year_at(pos.x())
+        margin = 2 / self._zoom
+        return next((bar.key for bar in self._layout.bars(row, row, year - margin, year + margin)), None)
+
+    def paintEvent(self, event: QPaintEvent):
+        painter = QPainter(self.viewport())
+        palette = self.palette()
+        painter.fillRect(event.rect(), palette.base())
+        if self._tree is None:
+            return
+        if not self._built:
+            self._build()
+        start, end = self._year_at(0), self._year_at(self.viewport().width())
+        first_row, last_row = self._visible_rows()
+        top = self.verticalScrollBar().value()
+        fill = palette.highlight().color()
+        assumed_fill = QColor(fill)
+        assumed_fill.setAlpha(90)
+        metrics = painter.fontMetrics()
+        painter.setPen(Qt.NoPen)
+        labels = []
+        for bar in self._layout.bars(first_row, last_row, start, end):
+            x1, x2 = self._x_of(bar.start), self._x_of(bar.end)
+            rect = QRectF(x1, bar.row * self.ROW_HEIGHT - top + (self.ROW_HEIGHT - self.BAR_HEIGHT) / 2,
+                          max(x2 - x1, 1), self.BAR_HEIGHT)
+            painter.setBrush(assumed_fill if bar.key in self._assumed else fill)
+            painter.drawRect(rect)
+            if rect.width() >= self.MIN_LABEL_WIDTH:
+                labels.append((rect, bar.key))
+        painter.setPen(palette.highlightedText().color())
+        for rect, person_id in labels:
+            visible_rect = rect.intersected(QRectF(self.viewport().rect())).adjusted(2, 0, -2, 0)
+            text = metrics.elidedText(self._tree[person_id].full_name, Qt.ElideRight, int(visible_rect.width()))
+            painter.drawText(visible_rect, Qt.AlignLeft | Qt.AlignVCenter, text)
+
+    def paint_header(self, painter: QPainter, width: int):
+        """Paints the years axis and the events ticks above the viewport."""
+        palette = self.palette()
+        painter.fillRect(QRect(0, 0, width, self.AXIS_HEIGHT + self.TICKS_HEIGHT), palette.window())
+        if not self._built:
+            return
+        start, end = self._year_at(0), self._year_at(width)
+        painter.setPen(palette.windowText().color())
+        step = next((s for s in self.YEAR_STEPS if s * self._zoom >= self.MIN_YEAR_SPACING), self.YEAR_STEPS[-1])
+        for year in range(math.floor(start / step) * step, math.ceil(end) + 1, step):
+            x = round(self._x_of(year))
+            painter.drawLine(x, self.AXIS_HEIGHT - 4, x, self.AXIS_HEIGHT)
+            painter.drawText(x + 2, self.AXIS_HEIGHT - 6, str(year))
+
+        ticks_top = self.AXIS_HEIGHT
+        ticks_bottom = ticks_top + self.TICKS_HEIGHT - 2
+        start_date, end_date = lifespans.date_at(start), lifespans.date_at(end)
+        if self._index.count(start_date, end_date) <= self.MAX_TICKS:
+            colors = {timeline.BIRTH: palette.highlight().color(), timeline.DEATH: palette.windowText().color()}
+            for event in self._index.events(start_date, end_date):
+                painter.setPen(colors[event.kind])
+                person = self._tree[event.person_id]
+                date = (person.birthday if event.kind == timeline.BIRTH else person.death).date
+                x = round(self._x_of(lifespans.year_of(date)))
+                painter.drawLine(x, ticks_top + 2, x, ticks_bottom)
+        else:
+            bins = lifespans.tick_bins(start, end, width, self.TICK_BIN_WIDTH)
+            counts = [self._index.count(lifespans.date_at(bin_start), lifespans.date_at(bin_end))
+                      for bin_start, bin_end in bins]
+            scale = (self.TICKS_HEIGHT - 4) / math.log1p(max(counts))
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(palette.windowText())
+            for (bin_start, bin_end), count in zip(bins, counts):
+                if count:
+                    height = max(1.0, math.log1p(count) * scale)
+                    x1, x2 = self._x_of(bin_start), self._x_of(bin_end)
+                    painter.drawRect(QRectF(x1, ticks_bottom - height, max(x2 - x1 - 1, 1), height))
+
+    def resizeEvent(self, event: QResizeEvent):
+        super().resizeEvent(event)
+        viewport = self.viewport().geometry()
+        self._header.setGeometry(viewport.x(), viewport.y() - self.AXIS_HEIGHT - self.TICKS_HEIGHT,
+                                 viewport.width(), self.AXIS_HEIGHT + self.TICKS_HEIGHT)
+        self._update_scroll_bars()
+
+    def wheelEvent(self, event: QWheelEvent):
+        if event.modifiers() & Qt.ControlModifier:
+            # Zoom around the cursor
+            x = event.pos().x()
+            year = self._year_at(x)
+            factor = self.ZOOM_STEP if event.angleDelta().y() > 0 else 1 / self.ZOOM_STEP
+            self._zoom = min(self.MAX_ZOOM, max(self.MIN_ZOOM, self._zoom * factor))
+            self._left = year - x / self._zoom
+            self._update_scroll_bars()
+            self._refresh()
+        else:
+            super().wheelEvent(event)
+
+    def mousePressEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton:
+            self._drag_start = event.pos()
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        if self._drag_start is not None:
+            delta = event.pos() - self._drag_start
+            self._drag_start = event.pos()
+            self.horizontalScrollBar().setValue(self.horizontalScrollBar().value() - delta.x())
+            self.verticalScrollBar().setValue(self.verticalScrollBar().value() - delta.y())
+        elif self._built:
+            person_id = self.bar_at(event.pos())
+            self.viewport().setToolTip(self._tree[person_id].full_name if person_id is not None else '')
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton:
+            self._drag_start = None
+
+    def mouseDoubleClickEvent(self, event: QMouseEvent):
+        if event.button() == Qt.LeftButton and self._built \
+                and (person_id := self.bar_at(event.pos())) is not None:
+            # noinspection PyUnresolvedReferences
+            self.person_selected.emit(person_id)
+
+    def changeEvent(self, event: QEvent):
+        super().changeEvent(event)
+        if event.type() in (QEvent.PaletteChange, QEvent.FontChange):
+            self._refresh()
+
+
+class _Header(QWidget):
+    """The years axis and events ticks above the viewport of a timeline."""
+
+    def __init__(self, timeline_: Timeline):
+        super().__init__(parent=timeline_)
+        self._timeline = timeline_
+
+    def paintEvent(self, event: QPaintEvent):
+        painter = QPainter(self)
+        self._timeline.paint_header(painter, self.width())
@@ -0,0 +1,205 @@
+"""Clustering of the places of events into markers for each zoom level of a map.
+
+Places are projected with the Web Mercator projection onto a square of side 1, whose top-left corner is
+at longitude -180° and latitude 85.05°. At zoom level z, the map is TILE_SIZE × 2^z pixels wide and
+is divided into a grid of cells of CELL_SIZE pixels. The events of all places in a cell make up one cluster,
+located at their centroid. Cells are nested: each cell of a level covers four cells of the next one,
+so adding or removing an event only updates one cell per level, and listing the clusters in view
+is a lookup in the grid of the current level.
+"""
+from __future__ import annotations
+
+import collections
+import math
+import typing as typ
+
+from ..entities import Person
+from ..model.spatial import is_located
+from ..model.tree import FamilyTree, TreeChange
+from ..utils import Place
+
+TILE_SIZE = 256  # px
+CELL_SIZE = 64  # px
+# Number of bits of a cell coordinate beyond the zoom level
+_CELL_BITS = int(math.log2(TILE_SIZE // CELL_SIZE))
+# Latitude of the top edge of the Web Mercator square
+MAX_LATITUDE = math.degrees(math.atan(math.sinh(math.pi)))
+
+_Cell = tuple[int, int]
+# (left, top, right, bottom) in projected coordinates
+Rect = tuple[float, float, float, float]
+
+
+def project(x: float, y: float) -> tuple[float, float]:
+    """Projects a longitude and a latitude in degrees onto the Web Mercator unit square.
+    Latitudes beyond MAX_LATITUDE are clamped."""
+    lat = math.radians(max(-MAX_LATITUDE, min(MAX_LATITUDE, y)))
+    return (x + 180) / 360, 0.5 - math.log(math.tan(math.pi / 4 + lat / 2)) / (2 * math.pi)
+
+
+def unproject(mx: float, my: float) -> tuple[float, float]:
+    """Returns the longitude and latitude in degrees of a point of the Web Mercator unit square."""
+    return mx * 360 - 180, math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * my))))
+
+
+class Cluster(typ.NamedTuple):
+    """The events of the places of a grid cell."""
+    # Centroid of the events in projected coordinates
+    x: float
+    y: float
+    count: int
+    zoom: int
+    cell: _Cell
+    # The place of the events, if they all happened in the same one
+    place: Place | None
+
+
+class ClusterIndex:
+    """Counts the events of each place in the grid cells of every zoom level from 0 to MAX_ZOOM.
+    Beyond MAX_ZOOM, each place is its own cluster. Places without valid coordinates are ignored.
+
+    Once attached to a tree, the index is kept up to date as persons are added, edited or removed.
+    """
+    MAX_ZOOM = 16
+
+    def __init__(self):
+        # [events count, places count, sum of x, sum of y] of each non-empty cell of each zoom level
+        self._levels: list[dict[_Cell, list]] = [{} for _ in range(self.MAX_ZOOM + 1)]
+        # Places of each non-empty cell of the last level
+        self._leaves: dict[_Cell, dict[Place, tuple[float, float]]] = {}
+        # Number of events of each place, in a list to be updated in place
+        self._places: dict[Place, list] = {}
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree) -> ClusterIndex:
+        """Creates the index of all persons in the given tree and attaches it to the tree."""
+        index = cls()
+        # Update the cells once per place rather than once per event
+        counts = collections.Counter(place for _, person in tree.persons() for place in cls._person_places(person))
+        for place, count in counts.items():
+            index._update(place, count)
+        tree.add_listener(index.on_tree_changed)
+        return index
+
+    def __len__(self):
+        """Returns the number of indexed events."""
+        return sum(cluster[0] for cluster in self._levels[0].values())
+
+    def on_tree_changed(self, change: TreeChange):
+        if change.old_person is not None:
+            self.remove(change.person_id, change.old_person)
+        if change.new_person is not None:
+            self.add(change.person_id, change.new_person)
+
+    # noinspection PyUnusedLocal
+    def add(self, person_id: int, person: Person):
+        """Counts the events of a person."""
+        for place in self._person_places(person):
+            self._update(place, 1)
+
+    # noinspection PyUnusedLocal
+    def remove(self, person_id: int, person: Person):
+        """Uncounts the events of a person, as they were counted."""
+        for place in self._person_places(person):
+            if place in self._places:
+                self._update(place, -1)
+
+    def clusters(self, zoom: int, rect: Rect = (0, 0, 1, 1)) -> list[Cluster]:
+        """Returns the clusters of a zoom level whose cell intersects a rectangle.
+
+        :param zoom: The zoom level. Levels below 0 are the same as level 0.
+        :param rect: The rectangle in projected coordinates.
+        """
+        zoom = max(zoom, 0)
+        level = min(zoom, self.MAX_ZOOM)
+        cells = self._levels[level]
+        size = 1 << (level + _CELL_BITS)
+        left, top = max(int(rect[0] * size), 0), max(int(rect[1] * size), 0)
+        right, bottom = min(int(rect[2] * size), size - 1), min(int(rect[3] * size), size - 1)
+        if right < left or bottom < top:
+            return []
+        if (right - left + 1) * (bottom - top + 1) <= len(cells):
+            keys = [(cx, cy) for cy in range(top, bottom + 1) for cx in range(left, right + 1) if (cx, cy) in cells]
+        else:
+            keys = [(cx, cy) for cx, cy in cells if left <= cx <= right and top <= cy <= bottom]
+        if zoom > self.MAX_ZOOM:
+            return [Cluster(mx, my, self._places[place][0], zoom, key, place)
+                    for key in keys for place, (mx, my) in self._leaves[key].items()]
+        return [self._cluster(level, key) for key in keys]
+
+    def children(self, cluster: Cluster) -> list[Cluster]:
+        """Returns the clusters of the next zoom level that make up the given one."""
+        if cluster.zoom >= self.MAX_ZOOM:
+            return self.clusters(self.MAX_ZOOM + 1, self._cell_rect(self.MAX_ZOOM, cluster.cell)) \
+                if cluster.place is None else []
+        cx, cy = cluster.cell
+        cells = self._levels[cluster.zoom + 1]
+        return [self._cluster(cluster.zoom + 1, key)
+                for key in ((2 * cx, 2 * cy), (2 * cx + 1, 2 * cy), (2 * cx, 2 * cy + 1), (2 * cx + 1, 2 * cy + 1))
+                if key in cells]
+
+    def expansion_zoom(self, cluster: Cluster) -> int:
+        """Returns the first zoom level at which a cluster splits into several ones."""
+        while cluster.place is None:
+            children = self.children(cluster)
+            if len(children) != 1:
+                return cluster.zoom + 1
+            cluster = children[0]
+        return cluster.zoom
+
+    def _cluster(self, level: int, key: _Cell) -> Cluster:
+        count, places, sum_x, sum_y = self._levels[level][key]
+        return Cluster(sum_x / count, sum_y / count, count, level, key,
+                       self._single_place(level, key) if places == 1 else None)
+
+    def _single_place(self, level: int, key: _Cell) -> Place:
+        """Returns the place of a cell that contains only one, by going down the levels to its leaf cell."""
+        cx, cy = key
+        for next_level in range(level + 1, self.MAX_ZOOM + 1):
+            cells = self._levels[next_level]
+            cx, cy = next(k for k in ((2 * cx, 2 * cy), (2 * cx + 1, 2 * cy), (2 * cx, 2 * cy + 1),
+                                      (2 * cx + 1, 2 * cy + 1)) if k in cells)
+        return next(iter(self._leaves[cx, cy]))
+
+    @staticmethod
+    def _cell_rect(level: int, key: _Cell) -> Rect:
+        size = 1 << (level + _CELL_BITS)
+        return key[0] / size, key[1] / size, (key[0] + 1) / size, (key[1] + 1) / size
+
+    def _update(self, place: Place, delta: int):
+        """Adds delta events to a place, updating the cells of all levels."""
+        mx, my = project(place.x, place.y)
+        size = 1 << (self.MAX_ZOOM + _CELL_BITS)
+        leaf = min(int(mx * size), size - 1), min(int(my * size), size - 1)
+        if (place_entry := self._places.get(place)) is None:
+            place_entry = self._places[place] = [0]
+            self._leaves.setdefault(leaf, {})[place] = (mx, my)
+            places_delta = 1
+        elif place_entry[0] + delta == 0:
+            del self._places[place]
+            leaf_places = self._leaves[leaf]
+            del leaf_places[place]
+            if not leaf_places:
+                del self._leaves[leaf]
+            places_delta = -1
+        else:
+            places_delta = 0
+        place_entry[0] += delta
+        for level in range(self.MAX_ZOOM, -1, -1):
+            shift = self.MAX_ZOOM - level
+            key = leaf[0] >> shift, leaf[1] >> shift
+            cells = self._levels[level]
+            if (cell := cells.get(key)) is None:
+                cell = cells[key] = [0, 0, 0.0, 0.0]
+            cell[0] += delta
+            if cell[0] == 0:
+                del cells[key]
+            else:
+                cell[1] += places_delta
+                cell[2] += delta * mx
+                cell[3] += delta * my
+
+    @staticmethod
+    def _person_places(person: Person) -> list[Place]:
+        return [event.place for event in (person.birthday, person.death)
+                if event is not None and is_located(event.place)]
@@ -0,0 +1,113 @@
+"""Geometry of fan charts, where the ancestors of a person are drawn in concentric rings around them.
+
+Persons are identified by their Sosa–Stradonitz (Ahnentafel) number: the root person is 1
+and the parents of person n are 2n and 2n + 1. Generation g holds the numbers 2^g to 2^(g+1) - 1.
+Angles are in degrees, counterclockwise from the positive x axis, with the y axis pointing down
+as in Qt’s painter paths.
+"""
+from __future__ import annotations
+
+import dataclasses
+import functools
+import math
+
+from ..model import family as family_
+
+
+@dataclasses.dataclass(frozen=True)
+class FanConfig:
+    center_radius: float = 80
+    ring_width: float = 120
+    # Angle covered by the fan
+    angle: float = 240
+
+
+@dataclasses.dataclass(frozen=True)
+class Sector:
+    """The area of a person in a fan chart, between two radii and two angles."""
+    sosa: int
+    inner_radius: float
+    outer_radius: float
+    start_angle: float
+    span: float
+
+    @property
+    def middle_angle(self) -> float:
+        return self.start_angle + self.span / 2
+
+    @property
+    def middle_radius(self) -> float:
+        return (self.inner_radius + self.outer_radius) / 2
+
+
+def generation(sosa: int) -> int:
+    """Returns the generation of a Sosa number, 0 being the root person’s."""
+    return sosa.bit_length() - 1
+
+
+@functools.lru_cache(maxsize=32)
+def sectors(generations: int, config: FanConfig = FanConfig()) -> tuple[Sector, ...]:
+    """Returns the sectors of all persons of a fan chart, indexed by Sosa number.
+    Index 0 holds the root person’s sector, which is the central disk.
+
+    Results are cached, as they only depend on the number of generations.
+
+    :param generations: Number of generations, including the root person’s.
+    :param config: Dimensions of the chart.
+    """
+    if generations <= 0:
+        return ()
+    result = [Sector(1, 0, config.center_radius, 0, 360)]
+    first_angle = 90 + config.angle / 2
+    for g in range(1, generations):
+        inner = config.center_radius + (g - 1) * config.ring_width
+        span = config.angle / 2 ** g
+        result.extend(Sector(2 ** g + i, inner, inner + config.ring_width, first_angle - (i + 1) * span, span)
+                      for i in range(2 ** g))
+    return (result[0], *result)
+
+
+def sector_at(x: float, y: float, generations: int, config: FanConfig = FanConfig()) -> int | None:
+    """Returns the Sosa number of the sector that contains the given point, None if there is none.
+
+    :param x: The point’s x coordinate, relative to the chart’s center.
+    :param y: The point’s y coordinate, relative to the chart’s center.
+    :param generations: Number of generations, including the root person’s.
+    :param config: Dimensions of the chart.
+    """
+    if generations <= 0:
+        return None
+    radius = math.hypot(x, y)
+    if radius < config.center_radius:
+        return 1
+    g = 1 + int((radius - config.center_radius) // config.ring_width)
+    if g >= generations:
+        return None
+    angle = math.degrees(math.atan2(-y, x))
+    offset = (90 + config.angle / 2 - angle) % 360
+    if offset >= config.angle:
+        return None
+    return 2 ** g + min(2 ** g - 1, int(offset / (config.angle / 2 ** g)))
+
+
+def ahnentafel(family: family_.FamilyIndex, root_id: int | None, generations: int) -> dict[int, int]:
+    """Numbers the ancestors of a person. The first parent of a person gets the even number,
+    the second one the odd number; other parents are ignored.
+
+    :param family: The family index of the tree.
+    :param root_id: ID of the root person, or None if there is none.
+    :param generations: Number of generations to number, including the root person’s.
+    :return: A dict mapping Sosa numbers to person IDs.
+    """
+    if generations <= 0 or root_id is None or root_id not in family.tree:
+        return {}
+    result = {1: root_id}
+    current = [1]
+    for _ in range(1, generations):
+        following = []
+        for sosa in current:
+            for i, parent_id in enumerate(family.parents(result[sosa])[:2]):
+                result[2 * sosa + i] = parent_id
+                following.append(2 * sosa + i)
+        current = following
+    return result
@@ -0,0 +1,187 @@
+"""Layout of lifespans as horizontal bars packed into rows, for timelines of many persons."""
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+import typing as typ
+
+from ..entities import Person
+from ..model.date import Date
+
+_K = typ.TypeVar('_K')
+
+# Assumed lifespan of persons with only one known date
+DEFAULT_LIFESPAN = 70  # years
+
+
+class Bar(typ.NamedTuple):
+    """A lifespan placed on a row. Times are in fractional years."""
+    key: typ.Hashable
+    row: int
+    start: float
+    end: float
+
+
+def year_of(date: Date) -> float:
+    """Returns the fractional year of the start of the period denoted by a date with a year."""
+    year = date.year
+    if date.month_set:
+        year += (date.month - 1) / 12
+        if date.day_set:
+            year += (date.day - 1) / (12 * Date.get_days_in_month(date.month, date.year))
+    return year
+
+
+def date_at(year: float) -> Date:
+    """Returns the day at the given fractional year. Inverse of year_of() for full dates."""
+    # Absorbs rounding errors so that the start of a day is not mistaken for the end of the previous one
+    epsilon = 1e-9
+    whole_year = math.floor(year + epsilon)
+    months = max(year - whole_year, 0) * 12
+    month = min(int(months + epsilon), 11) + 1
+    days_in_month = Date.get_days_in_month(month, whole_year)
+    day = min(int(max(months - month + 1, 0) * days_in_month + epsilon), days_in_month - 1) + 1
+    return Date(day=day, month=month, year=whole_year)
+
+
+def lifespan(person: Person) -> tuple[float, float, bool] | None:
+    """Returns the time span of a person’s life.
+
+    :return: The start and end of the lifespan in fractional years, and whether one of them is assumed
+        from DEFAULT_LIFESPAN; None if neither the birth nor the death date has a year.
+    """
+    birth = person.birthday.date if person.birthday and person.birthday.date else None
+    death = person.death.date if person.death and person.death.date else None
+    start = year_of(birth) if birth and birth.year_set else None
+    end = year_of(death) if death and death.year_set else None
+    if start is None and end is None:
+        return None
+    if start is None:
+        return end - DEFAULT_LIFESPAN, end, True
+    if end is None:
+        return start, start + DEFAULT_LIFESPAN, True
+    # A death date with a coarser precision than the birth date may sort before it
+    return start, max(start, end), False
+
+
+class RowLayout(typ.Generic[_K]):
+    """Packs intervals into rows so that the intervals of a row are at least GAP apart.
+
+    The initial packing sorts intervals by start and puts each one in the row that became free first,
+    which uses the minimum number of rows. Intervals added afterwards go into the first row they fit into,
+    and removed ones leave a hole, so that other intervals never move.
+    """
+    GAP = 1.0
+
+    def __init__(self, intervals: typ.Iterable[tuple[_K, float, float]] = ()):
+        """Packs the given (key, start, end) triples."""
+        # Intervals of each row sorted by start; as they do not overlap, ends are sorted too
+        self._starts: list[list[float]] = []
+        self._ends: list[list[float]] = []
+        self._keys: list[list[_K]] = []
+        self._rows: dict[_K, int] = {}
+        # (end of the last interval, row index) of each row
+        free_rows: list[tuple[float, int]] = []
+        for key, start, end in sorted(intervals, key=lambda i: i[1]):
+            if free_rows and free_rows[0][0] + self.GAP <= start:
+                row = free_rows[0][1]
+                heapq.heapreplace(free_rows, (end, row))
+            else:
+                row = self._new_row()
+                heapq.heappush(free_rows, (end, row))
+            self._starts[row].append(start)
+            self._ends[row].append(end)
+            self._keys[row].append(key)
+            self._rows[key] = row
+
+    def __len__(self):
+        """Returns the number of rows."""
+        return len(self._starts)
+
+    def __contains__(self, key: _K):
+        return key in self._rows
+
+    def row_of(self, key: _K) -> int | None:
+        return self._rows.get(key)
+
+    def add(self, key: _K, start: float, end: float) -> int:
+        """Puts an interval into the first row with enough room for it.
+
+        :return: The row of the interval.
+        :raise ValueError: If the key is already in this layout.
+        """
+        if key in self._rows:
+            raise ValueError(f'duplicate key {key!r}')
+        for row, (starts, ends) in enumerate(zip(self._starts, self._ends)):
+            i = bisect.bisect_left(starts, start)
+            if (i == 0 or ends[i - 1] + self.GAP <= start) and (i == len(starts) or end + self.GAP <= starts[i]):
+                break
+        else:
+            row = self._new_row()
+            i = 0
+        self._starts[row].insert(i, start)
+        self._ends[row].insert(i, end)
+        self._keys[row].insert(i, key)
+        self._rows[key] = row
+        return row
+
+    def remove(self, key: _K):
+        """Removes an interval. Does nothing if it is not in this layout."""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        i = self._keys[row].index(key)
+        del self._starts[row][i]
+        del self._ends[row][i]
+        del self._keys[row][i]
+        # Drop empty rows at the bottom
+        while self._starts and not self._starts[-1]:
+            self._starts.pop()
+            self._ends.pop()
+            self._keys.pop()
+
+    def bars(self, first_row: int, last_row: int, start: float, end: float) -> typ.Iterator[Bar]:
+        """Iterates over the intervals of a range of rows that overlap a time range.
+
+        :param first_row: Index of the first row.
+        :param last_row: Index of the last row, included.
+        :param start: Start of the time range.
+        :param end: End of the time range.
+        """
+        for row in range(max(first_row, 0), min(last_row + 1, len(self._starts))):
+            starts, ends, keys = self._starts[row], self._ends[row], self._keys[row]
+            for i in range(bisect.bisect_left(ends, start), len(starts)):
+                if starts[i] > end:
+                    break
+                yield Bar(keys[i], row, starts[i], ends[i])
+
+    def bounds(self) -> tuple[float, float] | None:
+        """Returns the earliest start and the latest end of all intervals, None if there are none."""
+        if not self._rows:
+            return None
+        return (min(starts[0] for starts in self._starts if starts),
+                max(ends[-1] for ends in self._ends if ends))
+
+    def _new_row(self) -> int:
+        self._starts.append([])
+        self._ends.append([])
+        self._keys.append([])
+        return len(self._starts) - 1
+
+
+def tick_bins(start: float, end: float, width: float, bin_width: float) -> list[tuple[float, float]]:
+    """Splits a time range into bins covering bin_width pixels each, aligned on multiples of the bin duration
+    so that bins do not change while panning.
+
+    :param start: Start of the time range.
+    :param end: End of the time range.
+    :param width: Number of pixels the time range covers.
+    :param bin_width: Number of pixels each bin covers.
+    :return: The (start, end) times of the bins.
+    """
+    if end <= start or width <= 0:
+        return []
+    duration = (end - start) * bin_width / width
+    first = math.floor(start / duration)
+    return [(i * duration, (i + 1) * duration) for i in range(first, math.ceil(end / duration))]
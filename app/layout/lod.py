@@ -0,0 +1,67 @@
+"""Levels of detail used to draw layouts at different zoom factors.
+
+The less zoomed in the view, the less is drawn for each person: full cards, then boxes with names only,
+then colored dots, and finally a single band per generation.
+"""
+from __future__ import annotations
+
+import dataclasses
+
+from . import tidy
+from ..entities import Person
+
+FULL = 0
+NAMES = 1
+DOTS = 2
+BANDS = 3
+
+# Minimum zoom factor of each tier, from the most detailed one
+_THRESHOLDS = ((0.6, FULL), (0.25, NAMES), (0.06, DOTS))
+
+
+def tier(zoom: float) -> int:
+    """Returns the level of detail to use at the given zoom factor."""
+    for threshold, t in _THRESHOLDS:
+        if zoom >= threshold:
+            return t
+    return BANDS
+
+
+def card_dates(person: Person) -> tuple[str, str] | None:
+    """Returns the birth and death dates shown on the card of a person at the FULL tier.
+    Unknown dates are shown as “?”, and the death date is empty if the person has no death event.
+
+    :return: The (birth, death) texts, None if the person has neither event.
+    """
+    birthday, death = person.birthday, person.death
+    if birthday is None and death is None:
+        return None
+    return (repr(birthday.date) if birthday and birthday.date else '?',
+            (repr(death.date) if death.date else '?') if death else '')
+
+
+@dataclasses.dataclass(frozen=True)
+class GenerationBand:
+    """The bounding box of all nodes of a generation."""
+    depth: int
+    left: float
+    top: float
+    right: float
+    bottom: float
+    count: int
+
+
+def generation_bands(layout: tidy.TreeLayout) -> list[GenerationBand]:
+    """Returns the band of each generation of a layout, sorted by depth."""
+    half_height = layout.config.node_height / 2
+    extents: dict[int, list] = {}
+    for node in layout.nodes():
+        left, right = node.x - node.width / 2, node.x + node.width / 2
+        if (extent := extents.get(node.depth)) is None:
+            extents[node.depth] = [left, right, node.y, 1]
+        else:
+            extent[0] = min(extent[0], left)
+            extent[1] = max(extent[1], right)
+            extent[3] += 1
+    return [GenerationBand(depth, left, y - half_height, right, y + half_height, count)
+            for depth, (left, right, y, count) in sorted(extents.items())]
@@ -0,0 +1,140 @@
+"""Spatial index of rectangles, for viewport culling and hit-testing."""
+from __future__ import annotations
+
+import typing as typ
+
+_T = typ.TypeVar('_T')
+
+# (left, top, right, bottom)
+Rect = tuple[float, float, float, float]
+
+
+class _Node:
+    __slots__ = ('bounds', 'items', 'children')
+
+    def __init__(self, bounds: Rect):
+        self.bounds = bounds
+        self.items: dict = {}
+        self.children: list[_Node] | None = None
+
+    def loose_bounds(self) -> Rect:
+        """Bounds of this node extended by half its size on each side.
+        Any item whose center is inside this node and that is not larger than it fits inside these bounds."""
+        x1, y1, x2, y2 = self.bounds
+        dx, dy = (x2 - x1) / 2, (y2 - y1) / 2
+        return x1 - dx, y1 - dy, x2 + dx, y2 + dy
+
+    def child_for(self, rect: Rect) -> _Node | None:
+        """Returns the child this rectangle should be stored in, None if it is too large for the children."""
+        x1, y1, x2, y2 = self.bounds
+        width, height = (x2 - x1) / 2, (y2 - y1) / 2
+        if rect[2] - rect[0] > width or rect[3] - rect[1] > height:
+            return None
+        cx, cy = (rect[0] + rect[2]) / 2, (rect[1] + rect[3]) / 2
+        return self.children[(cx >= x1 + width) + 2 * (cy >= y1 + height)]
+
+    def split(self):
+        x1, y1, x2, y2 = self.bounds
+        mx, my = (x1 + x2) / 2, (y1 + y2) / 2
+        self.children = [_Node((x1, y1, mx, my)), _Node((mx, y1, x2, my)),
+                         _Node((x1, my, mx, y2)), _Node((mx, my, x2, y2))]
+
+
+def intersects(r1: Rect, r2: Rect) -> bool:
+    return r1[0] <= r2[2] and r2[0] <= r1[2] and r1[1] <= r2[3] and r2[1] <= r1[3]
+
+
+class QuadTree(typ.Generic[_T]):
+    """A loose quadtree that maps items to their bounding rectangles.
+
+    Each item is stored in the deepest node that contains its center and is at least as large as it.
+    Node bounds are extended by half their size when querying, so items never have to be stored
+    higher in the tree because they straddle a boundary. The tree grows as needed to contain all items.
+    """
+    MAX_ITEMS = 16
+    MIN_NODE_SIZE = 1.0
+
+    def __init__(self, bounds: Rect = (-1024, -1024, 1024, 1024)):
+        self._root = _Node(bounds)
+        # Node each item is stored in, for constant-time removal
+        self._locations: dict[_T, _Node] = {}
+
+    def insert(self, item: _T, rect: Rect):
+        """Adds an item or updates its rectangle if it is already in this tree."""
+        if item in self._locations:
+            self.remove(item)
+        self._grow(rect)
+        node = self._root
+        while node.children is not None and (child := node.child_for(rect)) is not None:
+            node = child
+        node.items[item] = rect
+        self._locations[item] = node
+        if node.children is None and len(node.items) > self.MAX_ITEMS \
+                and node.bounds[2] - node.bounds[0] > self.MIN_NODE_SIZE:
+            node.split()
+            for other_item, other_rect in list(node.items.items()):
+                if (child := node.child_for(other_rect)) is not None:
+                    del node.items[other_item]
+                    child.items[other_item] = other_rect
+                    self._locations[other_item] = child
+
+    def remove(self, item: _T) -> bool:
+        """Removes an item.
+
+        :return: True if the item was in this tree.
+        """
+        node = self._locations.pop(item, None)
+        if node is None:
+            return False
+        del node.items[item]
+        return True
+
+    def clear(self):
+        self._root = _Node(self._root.bounds)
+        self._locations.clear()
+
+    def rect(self, item: _T) -> Rect | None:
+        """Returns the rectangle of the given item, None if it is not in this tree."""
+        node = self._locations.get(item)
+        return node.items[item] if node is not None else None
+
+    def query(self, rect: Rect) -> typ.Iterator[_T]:
+        """Iterates over the items whose rectangle intersects the given one."""
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if not intersects(node.loose_bounds(), rect):
+                continue
+            for item, item_rect in node.items.items():
+                if intersects(item_rect, rect):
+                    yield item
+            if node.children is not None:
+                stack.extend(node.children)
+
+    def at(self, x: float, y: float) -> list[_T]:
+        """Returns the items whose rectangle contains the given point."""
+        return list(self.query((x, y, x, y)))
+
+    def _grow(self, rect: Rect):
+        """Enlarges the root until it can contain the given rectangle."""
+        cx, cy = (rect[0] + rect[2]) / 2, (rect[1] + rect[3]) / 2
+        while True:
+            x1, y1, x2, y2 = self._root.bounds
+            width, height = x2 - x1, y2 - y1
+            if x1 <= cx < x2 and y1 <= cy < y2 and rect[2] - rect[0] <= width and rect[3] - rect[1] <= height:
+                return
+            # Double the root’s size towards the rectangle, the old root becomes one of the quadrants
+            grow_left = cx < x1
+            grow_up = cy < y1
+            new_x1 = x1 - width if grow_left else x1
+            new_y1 = y1 - height if grow_up else y1
+            new_root = _Node((new_x1, new_y1, new_x1 + 2 * width, new_y1 + 2 * height))
+            new_root.split()
+            new_root.children[grow_left + 2 * grow_up] = self._root
+            self._root = new_root
+
+    def __contains__(self, item: _T):
+        return item in self._locations
+
+    def __len__(self):
+        return len(self._locations)
@@ -0,0 +1,457 @@
+"""Tidy layout of ancestor and descendant trees.
+
+The layout follows the Reingold–Tilford approach: each subtree is laid out relatively to its root,
+then sibling subtrees are pushed apart as little as possible by comparing their contours,
+and parents are centered above their children.
+
+The relative layout and contours of each subtree are cached, so that after an edit only the subtrees
+containing the edited persons are laid out again; the other ones are moved as a whole.
+
+Layouts may be limited to a number of generations. Nodes at the limit are stubs, whose relatives
+are only loaded and laid out when they are expanded.
+"""
+from __future__ import annotations
+
+import dataclasses
+import math
+import typing as typ
+
+from ..model import family as family_, tree as tree_
+
+ANCESTORS = 0
+DESCENDANTS = 1
+
+# IDs of the persons to show as children of a person, and of the partners to show next to them
+Relations = tuple[tuple[int, ...], tuple[int, ...]]
+
+# A contour is an immutable linked list of (value, next) cells, one per depth of a subtree. The first cell holds
+# the position of the subtree’s edge at its first depth relative to the subtree’s root, each following one
+# the difference with the previous depth. A contour can thus be shifted by replacing its first cell, and the
+# contour of a subtree shares the cells of its children’s contours instead of copying them.
+_Contour = tuple[float, typ.Any]
+
+
+def _shifted(contour: _Contour, shift: float) -> _Contour:
+    return contour[0] + shift, contour[1]
+
+
+def _values(contour: _Contour, count: int) -> list[float]:
+    """Returns the positions of the first count depths of a contour."""
+    values = []
+    value = 0.0
+    cell = contour
+    for _ in range(count):
+        value += cell[0]
+        values.append(value)
+        cell = cell[1]
+    return values
+
+
+def _spliced(head: _Contour, length: int, tail: _Contour) -> _Contour:
+    """Returns the contour made of the first length depths of head followed by the depths of tail below them,
+    both contours being relative to the same node. Only the first length cells are copied, in O(length)."""
+    values = _values(head, length)
+    cell = tail
+    tail_value = 0.0
+    for _ in range(length):
+        tail_value += cell[0]
+        cell = cell[1]
+    # First cell of tail below head, with its difference to the last depth of head
+    spliced = (tail_value + cell[0] - values[-1], cell[1])
+    for i in range(length - 1, 0, -1):
+        spliced = (values[i] - values[i - 1], spliced)
+    return values[0], spliced
+
+
+@dataclasses.dataclass(frozen=True)
+class LayoutConfig:
+    node_width: float = 160
+    node_height: float = 60
+    sibling_gap: float = 20
+    level_gap: float = 60
+
+
+class LayoutNode:
+    """An occurrence of a person in a layout.
+
+    Due to pedigree collapse, a person may appear several times in a tree. Only their first occurrence
+    is expanded, the other ones are references without children.
+
+    Nodes beyond the depth limit of their branch are stubs: their relatives are not shown,
+    hidden_count tells how many there are.
+    """
+    __slots__ = ('person_id', 'parent', 'children', 'depth', 'partner_ids', 'is_reference', 'hidden_count',
+                 'width', 'x', 'y', '_limit', '_offsets', '_left', '_right', '_height', '_dirty')
+
+    def __init__(self, person_id: int, parent: LayoutNode | None, depth: int):
+        self.person_id = person_id
+        self.parent = parent
+        self.children: list[LayoutNode] = []
+        self.depth = depth
+        # Partners are drawn next to the person in descendant trees
+        self.partner_ids: tuple[int, ...] = ()
+        self.is_reference = False
+        self.hidden_count = 0
+        self.width = 0.0
+        # Absolute position of the node’s center, NaN until the node is first laid out
+        self.x = math.nan
+        self.y = math.nan
+        # Depth beyond which the nodes of this subtree are stubs
+        self._limit = math.inf
+        # Offsets of the children relative to this node
+        self._offsets: list[float] = []
+        # Left and right contours of this subtree, relative to this node, and its number of levels
+        self._left: _Contour | None = None
+        self._right: _Contour | None = None
+        self._height = 0
+        self._dirty = True
+
+    def subtree(self) -> typ.Iterator[LayoutNode]:
+        """Iterates over the nodes of this subtree in pre-order."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+
+class TreeLayout:
+    """Layout of the ancestors or descendants of a root person."""
+
+    def __init__(self, family: family_.FamilyIndex, root_id: int | None, mode: int = ANCESTORS,
+                 config: LayoutConfig = LayoutConfig(), max_depth: int = None):
+        """Creates and computes a layout.
+
+        :param family: The family index of the tree.
+        :param root_id: ID of the root person.
+        :param mode: Either ANCESTORS or DESCENDANTS.
+        :param config: Dimensions of the nodes.
+        :param max_depth: Depth of the deepest nodes that are not stubs, None for no limit.
+        :raise ValueError: If the mode is invalid or max_depth is negative.
+        """
+        if mode not in (ANCESTORS, DESCENDANTS):
+            raise ValueError(f'invalid layout mode {mode}')
+        if max_depth is not None and max_depth < 0:
+            raise ValueError(f'negative maximum depth {max_depth}')
+        self._family = family
+        self._root_id = root_id
+        self._mode = mode
+        self._config = config
+        self._max_depth = math.inf if max_depth is None else max_depth
+        # Number of generations shown below each expanded stub’s person
+        self._expanded: dict[int, int] = {}
+        # Relations of the persons loaded so far, see fetch(). Cleared whenever the tree changes
+        self._loaded: dict[int, Relations] = {}
+        self._root: LayoutNode | None = None
+        self._occurrences: dict[int, list[LayoutNode]] = {}
+        self._pending: set[int] = set()
+        # Nodes that changed or were removed since the last call to pop_changes()
+        self._moved: list[LayoutNode] = []
+        self._removed: list[LayoutNode] = []
+        self.build()
+
+    @property
+    def root(self) -> LayoutNode | None:
+        return self._root
+
+    @property
+    def mode(self) -> int:
+        return self._mode
+
+    @property
+    def config(self) -> LayoutConfig:
+        return self._config
+
+    def nodes(self) -> typ.Iterator[LayoutNode]:
+        """Iterates over all nodes of this layout in pre-order."""
+        if self._root:
+            yield from self._root.subtree()
+
+    def occurrences(self, person_id: int) -> list[LayoutNode]:
+        """Returns all nodes of the given person."""
+        return self._occurrences.get(person_id, [])
+
+    def __len__(self):
+        return sum(map(len, self._occurrences.values()))
+
+    def pop_changes(self) -> tuple[list[LayoutNode], list[LayoutNode]]:
+        """Returns the nodes that were added, moved or may look different, and the nodes that were removed
+        since the last call to this method."""
+        changes = self._moved, self._removed
+        self._moved, self._removed = [], []
+        return changes
+
+    def build(self):
+        """Lays out the whole tree from scratch."""
+        self._removed.extend(self.nodes())
+        self._occurrences.clear()
+        self._pending.clear()
+        if self._root_id is None or self._root_id not in self._family.tree:
+            self._root = None
+            return
+        self._root = self._create_subtree(self._root_id, None, 0)
+        self._layout()
+
+    def on_tree_changed(self, change: tree_.TreeChange):
+        """Records the persons whose nodes are affected by the given change. The layout is updated
+        the next time refresh() is called, so that bulk changes are processed at once."""
+        self._loaded.clear()
+        self._pending.add(change.person_id)
+        for person in (change.old_person, change.new_person):
+            if person is not None:
+                self._pending.update(person.parent_ids)
+        for child_id in self._family.children(change.person_id):
+            # The other parents of the children, whose partners may have changed
+            self._pending.add(child_id)
+            self._pending.update(self._family.tree[child_id].parent_ids)
+
+    def refresh(self) -> bool:
+        """Updates the layout after the changes recorded by on_tree_changed().
+        Only the subtrees containing the nodes of the changed persons are laid out again.
+
+        :return: True if the layout changed.
+        """
+        if not self._pending:
+            return False
+        pending, self._pending = self._pending, set()
+        if self._root is None or self._root_id in pending and self._root_id not in self._family.tree:
+            self.build()
+            return True
+        touched = set()
+        for person_id in pending:
+            for node in list(self._occurrences.get(person_id, [])):
+                if node.person_id not in self._family.tree:
+                    continue  # Will be removed when its parent is rebuilt
+                relatives, partners = self._relations(person_id)
+                if node.is_reference or node.depth >= node._limit:
+                    hidden_count = 0 if node.is_reference else len(relatives)
+                    relatives = ()
+                    if hidden_count != node.hidden_count:
+                        node.hidden_count = hidden_count
+                        self._mark_changed(node)
+                if relatives != tuple(c.person_id for c in node.children) or partners != node.partner_ids:
+                    touched |= self._rebuild_children(node)
+                self._mark_dirty(node)
+                self._mark_changed(node)
+        self._fix_references(touched)
+        self._layout()
+        return True
+
+    @property
+    def max_depth(self) -> float:
+        """Depth of the deepest nodes that are not stubs, unless expanded. Infinite if there is no limit."""
+        return self._max_depth
+
+    def expand(self, node: LayoutNode, generations: int):
+        """Shows more generations below a stub. Relations not loaded by fetch() are loaded now.
+
+        :param node: The stub to expand.
+        :param generations: Number of generations to show below the stub.
+        """
+        if node.person_id not in self._occurrences or node not in self._occurrences[node.person_id]:
+            return
+        self._expanded[node.person_id] = max(generations, self._expanded.get(node.person_id, 0))
+        touched = self._rebuild_children(node)
+        self._mark_dirty(node)
+        self._fix_references(touched)
+        self._layout()
+
+    def fetch(self, person_id: int, generations: int) -> typ.Iterator[int]:
+        """Loads the relations of a person and of their relatives up to the given number of generations,
+        so that expanding their node later does not have to query the family index.
+        The work is done one person at a time so that it can be spread over several event loop iterations.
+
+        :param person_id: ID of the person whose branch to load.
+        :param generations: Number of generations to load below the person.
+        :return: An iterator that loads one person each time it is advanced, and yields their ID.
+        """
+        current = [person_id]
+        for _ in range(generations):
+            following = []
+            for pid in current:
+                if pid in self._family.tree:
+                    following.extend(self._relations(pid)[0])
+                    yield pid
+            current = following
+
+    def _relations(self, person_id: int) -> Relations:
+        """Returns the IDs of the persons to show as children of the given one in this layout,
+        and of the partners to show next to them."""
+        if (relations := self._loaded.get(person_id)) is not None:
+            return relations
+        if self._mode == ANCESTORS:
+            relations = self._family.parents(person_id), ()
+        else:
+            families = self._family.families(person_id)
+            relations = (tuple(child_id for _, children in families for child_id in children),
+                         tuple(partner_id for partner_id, _ in families if partner_id is not None))
+        self._loaded[person_id] = relations
+        return relations
+
+    def _update_limit(self, node: LayoutNode):
+        """Computes the depth limit of a node from its parent’s and whether its person was expanded."""
+        limit = self._max_depth if node.parent is None else node.parent._limit
+        if (generations := self._expanded.get(node.person_id)) is not None:
+            limit = max(limit, node.depth + generations)
+        node._limit = limit
+
+    def _create_subtree(self, person_id: int, parent: LayoutNode | None, depth: int) -> LayoutNode:
+        root = LayoutNode(person_id, parent, depth)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            occurrences = self._occurrences.setdefault(node.person_id, [])
+            node.is_reference = any(not n.is_reference for n in occurrences)
+            occurrences.append(node)
+            self._update_limit(node)
+            relatives, node.partner_ids = self._relations(node.person_id)
+            node.width = self._node_width(node)
+            if node.is_reference:
+                continue
+            if node.depth >= node._limit:
+                node.hidden_count = len(relatives)
+            else:
+                node.children = [LayoutNode(pid, node, node.depth + 1) for pid in relatives]
+                stack.extend(reversed(node.children))
+        return root
+
+    def _rebuild_children(self, node: LayoutNode) -> set[int]:
+        """Recreates the subtrees of the children of the given node.
+
+        :return: The IDs of the persons whose nodes were removed or created.
+        """
+        touched = self._remove_children(node)
+        relatives, node.partner_ids = self._relations(node.person_id)
+        node.width = self._node_width(node)
+        self._update_limit(node)
+        node.hidden_count = 0
+        self._mark_changed(node)
+        if node.is_reference:
+            pass
+        elif node.depth >= node._limit:
+            node.hidden_count = len(relatives)
+        else:
+            node.children = [self._create_subtree(pid, node, node.depth + 1) for pid in relatives]
+        for child in node.children:
+            touched.update(n.person_id for n in child.subtree())
+        return touched
+
+    def _remove_children(self, node: LayoutNode) -> set[int]:
+        touched = set()
+        for child in node.children:
+            for n in child.subtree():
+                touched.add(n.person_id)
+                self._removed.append(n)
+                self._occurrences[n.person_id].remove(n)
+                if not self._occurrences[n.person_id]:
+                    del self._occurrences[n.person_id]
+        node.children = []
+        return touched
+
+    def _fix_references(self, person_ids: set[int]):
+        """Makes sure that the expanded node of each of the given persons is their first one in pre-order,
+        as it would be after a full build."""
+        worklist = set(person_ids)
+        while worklist:
+            occurrences = self._occurrences.get(worklist.pop())
+            if not occurrences:
+                continue
+            first = min(occurrences, key=self._preorder_path)
+            for node in occurrences:
+                if node is not first and not node.is_reference:
+                    worklist |= self._remove_children(node)
+                    node.is_reference = True
+                    self._mark_dirty(node)
+                    self._mark_changed(node)
+            if first.is_reference:
+                first.is_reference = False
+                worklist |= self._rebuild_children(first)
+                self._mark_dirty(first)
+
+    @staticmethod
+    def _preorder_path(node: LayoutNode) -> list[int]:
+        """Returns the indices of the nodes on the path from the root to the given node.
+        Comparing paths gives the pre-order of nodes."""
+        path = []
+        while node.parent is not None:
+            path.append(node.parent.children.index(node))
+            node = node.parent
+        path.reverse()
+        return path
+
+    def _node_width(self, node: LayoutNode) -> float:
+        c = self._config
+        return c.node_width + len(node.partner_ids) * (c.node_width + c.sibling_gap)
+
+    @staticmethod
+    def _mark_dirty(node: LayoutNode | None):
+        while node is not None and not node._dirty:
+            node._dirty = True
+            node = node.parent
+
+    @staticmethod
+    def _mark_changed(node: LayoutNode):
+        """Makes the next layout report the given node as moved, as its size or content may have changed."""
+        node.x = math.nan
+
+    def _layout(self):
+        if self._root is None:
+            return
+        # Post-order traversal of dirty nodes only, clean subtrees keep their cached contours
+        stack = [(self._root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if not node._dirty:
+                continue
+            if children_done:
+                self._layout_node(node)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children)
+        # Absolute positions
+        direction = -1 if self._mode == ANCESTORS else 1
+        level_height = self._config.node_height + self._config.level_gap
+        stack = [(self._root, 0.0)]
+        while stack:
+            node, x = stack.pop()
+            y = direction * node.depth * level_height
+            if node.x != x or node.y != y:
+                node.x, node.y = x, y
+                self._moved.append(node)
+            stack.extend((child, x + offset) for child, offset in zip(node.children, node._offsets))
+
+    def _layout_node(self, node: LayoutNode):
+        """Computes the relative positions of the children of the given node and the contours of its subtree,
+        assuming the children’s subtrees are already laid out.
+
+        Comparing and merging contours only walks them down to the depth of the shallower one, so that laying out
+        a whole tree takes linear time, as in Reingold and Tilford’s algorithm.
+        """
+        half_width = node.width / 2
+        if not node.children:
+            node._offsets = []
+            node._left = (-half_width, None)
+            node._right = (half_width, None)
+            node._height = 1
+        else:
+            # Contours of the children laid out so far, relative to the first child
+            first = node.children[0]
+            left, right, height = first._left, first._right, first._height
+            positions = [0.0]
+            for child in node.children[1:]:
+                # Smallest shift that keeps this subtree at distance from all previous ones at each depth
+                depth = min(height, child._height)
+                shift = max(r - l for r, l in zip(_values(right, depth), _values(child._left, depth))) \
+                    + self._config.sibling_gap
+                positions.append(shift)
+                child_right = _shifted(child._right, shift)
+                right = child_right if child._height >= height else _spliced(child_right, child._height, right)
+                if child._height > height:
+                    left = _spliced(left, height, _shifted(child._left, shift))
+                height = max(height, child._height)
+            middle = (positions[0] + positions[-1]) / 2
+            node._offsets = [p - middle for p in positions]
+            node._left = (-half_width, (left[0] - middle + half_width, left[1]))
+            node._right = (half_width, (right[0] - middle - half_width, right[1]))
+            node._height = height + 1
+        node._dirty = False
@@ -0,0 +1,457 @@
+"""Rule-based detection of inconsistencies between the dates of persons, such as a death before a birth.
+
+Dates are turned into intervals of days that contain all the days they may denote: a year covers
+its 365 or 366 days, an approximate date is widened by APPROX_MARGIN on both sides, a date known
+to be before or after another one is unbounded on one side. A rule is certainly violated if it is
+for all days of the intervals, and possibly violated if it is only for some of them.
+"""
+from __future__ import annotations
+
+import abc
+import concurrent.futures
+import csv
+import dataclasses
+import math
+import multiprocessing
+import os
+import pathlib
+import threading
+import typing as typ
+
+from . import partition
+from .date import Date
+from .family import FamilyIndex
+from .tree import FamilyTree, TreeChange, TreeSnapshot
+from ..entities import Person
+
+YEAR = 365.2425  # days
+APPROX_MARGIN = 5 * YEAR
+
+PERSON_FIELDS = frozenset(f.name for f in dataclasses.fields(Person))
+
+
+class Interval(typ.NamedTuple):
+    """A range of days, both ends included. Ends may be infinite."""
+    start: float
+    end: float
+
+
+# Intervals of the dates seen so far, by sort key. Trees have much fewer distinct dates than persons.
+_intervals: dict[int, Interval] = {}
+_MAX_CACHED_INTERVALS = 1 << 18
+
+
+def _ordinal(year: int, month: int, day: int) -> int:
+    """Returns the number of days between 1 March of year 0 and the given proleptic Gregorian date."""
+    if month < 3:
+        year -= 1
+        month += 12
+    return 365 * year + year // 4 - year // 100 + year // 400 + (153 * (month - 3) + 2) // 5 + day - 1
+
+
+def date_interval(date: Date | None) -> Interval | None:
+    """Returns the days the given date may denote, None if it does not have a year or is None."""
+    if date is None or not date.year_set:
+        return None
+    key = date.sort_key
+    if (interval := _intervals.get(key)) is None:
+        if len(_intervals) >= _MAX_CACHED_INTERVALS:
+            _intervals.clear()
+        interval = _intervals[key] = _date_interval(date)
+    return interval
+
+
+def _date_interval(date: Date) -> Interval:
+    year = date.year
+    if not date.month_set:
+        start, end = _ordinal(year, 1, 1), _ordinal(year, 12, 31)
+    elif not date.day_set:
+        start, end = _ordinal(year, date.month, 1), _ordinal(year, date.month, Date.get_days_in_month(date.month, year))
+    else:
+        start = end = _ordinal(year, date.month, date.day)
+    if date.precision == Date.BEFORE:
+        return Interval(-math.inf, end)
+    if date.precision == Date.AFTER:
+        return Interval(start, math.inf)
+    if date.precision == Date.APPROX:
+        return Interval(start - APPROX_MARGIN, end + APPROX_MARGIN)
+    return Interval(start, end)
+
+
+def gap_violation(first: Interval, second: Interval, min_days: float = -math.inf,
+                  max_days: float = math.inf) -> bool | None:
+    """Checks that the number of days from one interval to another is within bounds.
+
+    :param first: The interval the gap starts from.
+    :param second: The interval the gap ends in.
+    :param min_days: Minimum number of days.
+    :param max_days: Maximum number of days.
+    :return: None if the gap is within bounds for all days of the intervals, True if it is not for any of them,
+        False if it is not for some of them.
+    """
+    least, most = second.start - first.end, second.end - first.start
+    if min_days <= least and most <= max_days:
+        return None
+    return most < min_days or least > max_days
+
+
+class DateIntervals:
+    """The intervals of the known birth and death dates of the persons of a tree, by person ID,
+    so that rules that read the dates of other persons, such as parents, do not convert their dates again."""
+
+    def __init__(self):
+        self._births: dict[int, Interval] = {}
+        self._deaths: dict[int, Interval] = {}
+
+    def set(self, person_id: int, person: Person | None):
+        """Stores the intervals of the given person, or forgets them if the person is None."""
+        birth = death = None
+        if person is not None:
+            birth = date_interval(person.birthday.date) if person.birthday else None
+            death = date_interval(person.death.date) if person.death else None
+        for intervals, interval in ((self._births, birth), (self._deaths, death)):
+            if interval is None:
+                intervals.pop(person_id, None)
+            else:
+                intervals[person_id] = interval
+
+    def birth(self, person_id: int) -> Interval | None:
+        """Returns the birth interval of the given person, None if it is unknown."""
+        return self._births.get(person_id)
+
+    def death(self, person_id: int) -> Interval | None:
+        """Returns the death interval of the given person, None if it is unknown."""
+        return self._deaths.get(person_id)
+
+
+@dataclasses.dataclass(frozen=True)
+class Finding:
+    """A violation of a rule by a person."""
+    rule: str
+    person_id: int
+    # Other persons involved, e.g. a parent
+    related_ids: tuple[int, ...]
+    # False if the dates are not precise enough to tell whether the rule is violated
+    certain: bool
+
+
+class Rule(abc.ABC):
+    """A check made on each person.
+
+    Rules declare the fields they read, so that after an edit only the rules that depend on the changed
+    fields are evaluated again.
+    """
+    # Name of the rule, also used for its translation key
+    name: str
+    # Fields of the checked person the rule reads
+    fields: frozenset[str] = frozenset()
+    # Fields of the parents of the checked person the rule reads
+    parent_fields: frozenset[str] = frozenset()
+
+    @abc.abstractmethod
+    def check(self, person_id: int, person: Person, dates: DateIntervals) -> list[Finding]:
+        """Checks a person.
+
+        :param person_id: ID of the person to check.
+        :param person: The person to check.
+        :param dates: The date intervals of all persons of the tree.
+        :return: The violations of this rule by the person.
+        """
+        pass
+
+    def _findings(self, person_id: int, violation: bool | None, *related_ids: int) -> list[Finding]:
+        return [] if violation is None else [Finding(self.name, person_id, related_ids, violation)]
+
+
+class DeathBeforeBirth(Rule):
+    name = 'death_before_birth'
+    fields = frozenset({'birthday', 'death'})
+
+    def check(self, person_id: int, person: Person, dates: DateIntervals) -> list[Finding]:
+        if (birth := dates.birth(person_id)) and (death := dates.death(person_id)):
+            return self._findings(person_id, gap_violation(birth, death, min_days=0))
+        return []
+
+
+class Lifespan(Rule):
+    name = 'lifespan'
+    fields = frozenset({'birthday', 'death'})
+    MAX_AGE = 120 * YEAR
+
+    def check(self, person_id: int, person: Person, dates: DateIntervals) -> list[Finding]:
+        if (birth := dates.birth(person_id)) and (death := dates.death(person_id)):
+            return self._findings(person_id, gap_violation(birth, death, max_days=self.MAX_AGE))
+        return []
+
+
+class ParentAge(Rule):
+    """Parents must be between MIN_AGE and MAX_AGE at the birth of their children."""
+    name = 'parent_age'
+    fields = frozenset({'birthday', 'parent_ids'})
+    parent_fields = frozenset({'birthday'})
+    MIN_AGE = 12 * YEAR
+    MAX_AGE = 70 * YEAR
+
+    def check(self, person_id: int, person: Person, dates: DateIntervals) -> list[Finding]:
+        findings = []
+        if person.parent_ids and (birth := dates.birth(person_id)):
+            for parent_id in person.parent_ids:
+                if parent_birth := dates.birth(parent_id):
+                    violation = gap_violation(parent_birth, birth, min_days=self.MIN_AGE, max_days=self.MAX_AGE)
+                    findings += self._findings(person_id, violation, parent_id)
+        return findings
+
+
+class BirthAfterParentDeath(Rule):
+    """Children may be born up to MAX_DAYS after the death of a parent, i.e. after their father’s."""
+    name = 'birth_after_parent_death'
+    fields = frozenset({'birthday', 'parent_ids'})
+    parent_fields = frozenset({'death'})
+    MAX_DAYS = 300
+
+    def check(self, person_id: int, person: Person, dates: DateIntervals) -> list[Finding]:
+        findings = []
+        if person.parent_ids and (birth := dates.birth(person_id)):
+            for parent_id in person.parent_ids:
+                if parent_death := dates.death(parent_id):
+                    violation = gap_violation(parent_death, birth, max_days=self.MAX_DAYS)
+                    findings += self._findings(person_id, violation, parent_id)
+        return findings
+
+
+DEFAULT_RULES = (DeathBeforeBirth(), Lifespan(), ParentAge(), BirthAfterParentDeath())
+
+
+def changed_fields(old_person: Person | None, new_person: Person | None) -> frozenset[str]:
+    """Returns the names of the fields that differ between two versions of a person.
+    All fields are returned if the person was added or removed."""
+    if old_person is None or new_person is None:
+        return PERSON_FIELDS
+    return frozenset(name for name in PERSON_FIELDS if getattr(old_person, name) != getattr(new_person, name))
+
+
+class ConsistencyChecker:
+    """Checks the persons of a tree against a set of rules.
+
+    Once attached to a tree, the findings are kept up to date as persons are added, edited or removed:
+    only the rules that read the changed fields are evaluated again, on the changed person
+    and, for rules that read their parents’ fields, on their children.
+    """
+
+    def __init__(self, tree: FamilyTree, family: FamilyIndex, rules: typ.Sequence[Rule] = DEFAULT_RULES):
+        """Creates a checker. No person is checked until check_all() is called.
+
+        :param tree: The tree to check.
+        :param family: The family index of the tree. It must be attached to the tree before this checker.
+        :param rules: The rules to check.
+        """
+        self._tree = tree
+        self._family = family
+        self._rules = tuple(rules)
+        self._dates = DateIntervals()
+        # Findings of each person, by rule name
+        self._findings: dict[int, dict[str, list[Finding]]] = {}
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree, family: FamilyIndex, rules: typ.Sequence[Rule] = DEFAULT_RULES) \
+            -> ConsistencyChecker:
+        """Creates a checker, checks all persons of the given tree and attaches the checker to the tree."""
+        checker = cls(tree, family, rules)
+        checker.check_all()
+        tree.add_listener(checker.on_tree_changed)
+        return checker
+
+    @property
+    def rules(self) -> tuple[Rule, ...]:
+        return self._rules
+
+    def check_all(self):
+        """Checks all persons from scratch."""
+        self._findings.clear()
+        self._dates = dates = DateIntervals()
+        for person_id, person in self._tree.persons():
+            dates.set(person_id, person)
+        for person_id, person in self._tree.persons():
+            person_findings = None
+            for rule in self._rules:
+                if findings := rule.check(person_id, person, dates):
+                    if person_findings is None:
+                        person_findings = self._findings[person_id] = {}
+                    person_findings[rule.name] = findings
+
+    def findings(self) -> typ.Iterator[Finding]:
+        """Returns the current findings, sorted by person ID."""
+        for person_id in sorted(self._findings):
+            for rule_findings in self._findings[person_id].values():
+                yield from rule_findings
+
+    def person_findings(self, person_id: int) -> list[Finding]:
+        return [f for rule_findings in self._findings.get(person_id, {}).values() for f in rule_findings]
+
+    def __len__(self):
+        """Returns the number of findings."""
+        return sum(len(f) for person_findings in self._findings.values() for f in person_findings.values())
+
+    def on_tree_changed(self, change: TreeChange):
+        fields = changed_fields(change.old_person, change.new_person)
+        person_id = change.person_id
+        self._dates.set(person_id, change.new_person)
+        if change.new_person is None:
+            self._findings.pop(person_id, None)
+        else:
+            for rule in self._rules:
+                if rule.fields & fields:
+                    self._check(rule, person_id, change.new_person)
+        if children_rules := [rule for rule in self._rules if rule.parent_fields & fields]:
+            for child_id in self._family.children(person_id):
+                child = self._tree[child_id]
+                for rule in children_rules:
+                    self._check(rule, child_id, child)
+
+    def _check(self, rule: Rule, person_id: int, person: Person):
+        findings = rule.check(person_id, person, self._dates)
+        person_findings = self._findings.get(person_id)
+        if findings:
+            if person_findings is None:
+                person_findings = self._findings[person_id] = {}
+            person_findings[rule.name] = findings
+        elif person_findings is not None:
+            person_findings.pop(rule.name, None)
+            if not person_findings:
+                del self._findings[person_id]
+
+
+# Maximum number of persons in the core of the partitions checked by worker processes
+PARTITION_SIZE = 50_000
+_REPORT_HEADER = ('rule', 'person_id', 'related_ids', 'certain')
+
+
+class CheckCancelled(Exception):
+    """Raised by check_tree() when it is cancelled."""
+    pass
+
+
+def check_tree(tree: FamilyTree | TreeSnapshot, report_path: pathlib.Path, rules: typ.Sequence[Rule] = DEFAULT_RULES,
+               workers: int = None, partition_size: int = PARTITION_SIZE,
+               progress: typ.Callable[[int, int], None] = None, cancelled: threading.Event = None) -> int:
+    """Checks all persons of a tree in worker processes and writes the findings to a CSV report.
+
+    The tree is split into partitions of connected persons, each sent to one worker with only its persons
+    and their halo. Workers are not forked from the calling process, as it may be a multithreaded GUI process
+    whose locks would be inherited in their locked state; the forkserver start method is used where available,
+    spawn elsewhere. Only a few partitions are in flight at a time, and findings are written to the report
+    as partitions are checked, without sorting them, so that the memory used does not grow with the size of the tree.
+
+    :param tree: The tree to check. To check a tree that may be edited meanwhile, pass a snapshot of it.
+    :param report_path: Path of the report file to write.
+    :param rules: The rules to check.
+    :param workers: Number of worker processes. If None, the number of CPUs is used; if 0, partitions are checked
+        in the current process.
+    :param partition_size: Maximum number of persons checked by a worker at a time.
+    :param progress: Called with the number of checked persons and the total number of persons
+        after each partition.
+    :param cancelled: If set, the check stops as soon as possible and the partially written report is deleted.
+    :return: The number of findings.
+    :raise CheckCancelled: If the check was cancelled.
+    :raise OSError: If the report could not be written.
+    """
+    rules = tuple(rules)
+    total = len(tree)
+    done = 0
+    # Findings are only reported for the core persons of a partition, and cores do not overlap,
+    # so each finding is written once
+    written = 0
+    with report_path.open('w', encoding='UTF-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(_REPORT_HEADER)
+
+        def write(checked: int, findings: list[Finding]):
+            nonlocal done, written
+            for finding in findings:
+                writer.writerow((finding.rule, finding.person_id, ' '.join(map(str, finding.related_ids)),
+                                 int(finding.certain)))
+            written += len(findings)
+            done += checked
+            if progress:
+                progress(done, total)
+
+        try:
+            if workers == 0:
+                for p in partition.partitions(tree, partition_size):
+                    _raise_if_cancelled(cancelled)
+                    write(len(p.core), _check_partition(p, rules, _partition_persons(tree, p)))
+            else:
+                _check_in_pool(tree, rules, workers or os.cpu_count() or 1, partition_size, write, cancelled)
+        except CheckCancelled:
+            f.close()
+            report_path.unlink(missing_ok=True)
+            raise
+    return written
+
+
+def _check_in_pool(tree: FamilyTree | TreeSnapshot, rules: tuple[Rule, ...], workers: int, partition_size: int,
+                   write: typ.Callable[[int, list[Finding]], None], cancelled: threading.Event | None):
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context(method)) as executor:
+        try:
+            pending: dict[concurrent.futures.Future, int] = {}
+            for p in partition.partitions(tree, partition_size):
+                _raise_if_cancelled(cancelled)
+                persons = _partition_persons(tree, p)
+                pending[executor.submit(_check_partition, p, rules, persons)] = len(p.core)
+                if len(pending) >= 2 * workers:
+                    completed, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in completed:
+                        write(pending.pop(future), future.result())
+            for future in concurrent.futures.as_completed(pending):
+                _raise_if_cancelled(cancelled)
+                write(pending[future], future.result())
+        except CheckCancelled:
+            executor.shutdown(cancel_futures=True)
+            raise
+
+
+def _raise_if_cancelled(cancelled: threading.Event | None):
+    if cancelled is not None and cancelled.is_set():
+        raise CheckCancelled()
+
+
+def _partition_persons(tree: FamilyTree | TreeSnapshot, p: partition.Partition) -> list[tuple[int, Person]]:
+    """Returns the persons of the core of a partition followed by those of its halo."""
+    return [(person_id, tree.get_person(person_id)) for person_id in p.core + p.halo]
+
+
+def _check_partition(p: partition.Partition, rules: tuple[Rule, ...], persons: list[tuple[int, Person]]) \
+        -> list[Finding]:
+    """Checks the persons of the core of a partition. Runs in worker processes.
+
+    :param p: The partition to check.
+    :param rules: The rules to check.
+    :param persons: The persons of the partition, as returned by _partition_persons().
+    """
+    dates = DateIntervals()
+    for person_id, person in persons:
+        dates.set(person_id, person)
+    findings = []
+    for person_id, person in persons[:len(p.core)]:
+        for rule in rules:
+            findings.extend(rule.check(person_id, person, dates))
+    return findings
+
+
+def read_report(report_path: pathlib.Path) -> typ.Iterator[Finding]:
+    """Reads the findings of a report written by check_tree().
+
+    :raise OSError: If the report could not be read.
+    :raise ValueError: If the report is malformed.
+    """
+    with report_path.open(encoding='UTF-8', newline='') as f:
+        reader = csv.reader(f)
+        if tuple(next(reader, ())) != _REPORT_HEADER:
+            raise ValueError(f'invalid report header in {report_path}')
+        for row in reader:
+            if len(row) != len(_REPORT_HEADER):
+                raise ValueError(f'invalid report row {row!r}')
+            rule, person_id, related_ids, certain = row
+            yield Finding(rule, int(person_id), tuple(map(int, related_ids.split())), certain == '1')
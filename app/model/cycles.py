@@ -0,0 +1,193 @@
+"""Detection of persons that are their own ancestors, which can only come from erroneous data.
+
+The graph of persons linked to their parents should be acyclic. Cycles are found by computing its strongly
+connected components with Tarjan’s algorithm in linear time; the shortest cycle of each component
+is then reported. Once a tree has been checked, adding a parent link only requires checking that link.
+"""
+from __future__ import annotations
+
+import collections
+import dataclasses
+import typing as typ
+
+from .family import FamilyIndex
+from .tree import FamilyTree, TreeChange, TreeSnapshot
+
+
+@dataclasses.dataclass(frozen=True)
+class Cycle:
+    """A list of persons where each one is a child of the next one and the last one is a child of the first one.
+    It starts with the person with the smallest ID."""
+    person_ids: tuple[int, ...]
+
+    def links(self) -> set[tuple[int, int]]:
+        """Returns the (child ID, parent ID) pairs of the cycle."""
+        ids = self.person_ids
+        return {(ids[i], ids[(i + 1) % len(ids)]) for i in range(len(ids))}
+
+    @classmethod
+    def of(cls, person_ids: typ.Sequence[int]) -> Cycle:
+        """Creates the cycle going through the given persons in that order, starting from the smallest ID."""
+        start = person_ids.index(min(person_ids))
+        return cls(tuple(person_ids[start:]) + tuple(person_ids[:start]))
+
+
+def strongly_connected_components(tree: FamilyTree | TreeSnapshot) -> list[list[int]]:
+    """Returns the strongly connected components of the graph of the persons of a tree linked to their parents,
+    using an iterative version of Tarjan’s algorithm. Parents that are not in the tree are ignored.
+
+    :return: The IDs of the persons of each component with at least two persons or a person who is their own parent.
+    """
+    indexes: dict[int, int] = {}
+    lowlinks: dict[int, int] = {}
+    stack: list[int] = []
+    on_stack: set[int] = set()
+    components = []
+    # Persons being visited with the iterator over their remaining parents
+    path: list[tuple[int, typ.Iterator[int]]] = []
+
+    def visit(person_id: int):
+        indexes[person_id] = lowlinks[person_id] = len(indexes)
+        stack.append(person_id)
+        on_stack.add(person_id)
+        path.append((person_id, iter(tree.get_person(person_id).parent_ids)))
+
+    for root_id, _ in tree.persons():
+        if root_id in indexes:
+            continue
+        visit(root_id)
+        while path:
+            person_id, parents = path[-1]
+            for parent_id in parents:
+                if parent_id not in indexes:
+                    if tree.get_person(parent_id) is not None:
+                        visit(parent_id)
+                        break
+                elif parent_id in on_stack:
+                    lowlinks[person_id] = min(lowlinks[person_id], indexes[parent_id])
+            else:
+                path.pop()
+                if path:
+                    child_id = path[-1][0]
+                    lowlinks[child_id] = min(lowlinks[child_id], lowlinks[person_id])
+                if lowlinks[person_id] == indexes[person_id]:
+                    component = []
+                    while True:
+                        member_id = stack.pop()
+                        on_stack.discard(member_id)
+                        component.append(member_id)
+                        if member_id == person_id:
+                            break
+                    if len(component) > 1 or person_id in tree.get_person(person_id).parent_ids:
+                        components.append(sorted(component))
+    return components
+
+
+def find_cycles(tree: FamilyTree | TreeSnapshot) -> list[Cycle]:
+    """Returns the shortest cycle of each strongly connected component of the graph of the persons of a tree
+    linked to their parents, sorted by first person ID."""
+    cycles = []
+    for component in strongly_connected_components(tree):
+        members = set(component)
+        cycles.append(Cycle.of(_shortest_path(tree, component[0], component[0], members)))
+    return sorted(cycles, key=lambda c: c.person_ids)
+
+
+def _shortest_path(tree: FamilyTree | TreeSnapshot, start_id: int, end_id: int,
+                   members: set[int] = None) -> list[int] | None:
+    """Looks for the shortest path of parent links that goes from a person to one of their ancestors.
+
+    :param tree: The tree to search into.
+    :param start_id: ID of the first person of the path.
+    :param end_id: ID of the ancestor to look for. If it is the first person, a cycle is looked for.
+    :param members: If specified, only these persons are visited.
+    :return: The IDs of the persons of the path, each one being a child of the next one, without end_id.
+        None if there is no such path.
+    """
+    previous: dict[int, int | None] = {start_id: None}
+    queue = collections.deque([start_id])
+    while queue:
+        person_id = queue.popleft()
+        for parent_id in tree.get_person(person_id).parent_ids:
+            if parent_id == end_id:
+                path = []
+                while person_id is not None:
+                    path.append(person_id)
+                    person_id = previous[person_id]
+                return path[::-1]
+            if parent_id not in previous and (members is None and tree.get_person(parent_id) is not None
+                                              or members is not None and parent_id in members):
+                previous[parent_id] = person_id
+                queue.append(parent_id)
+    return None
+
+
+class CycleDetector:
+    """Keeps track of the cycles in a tree.
+
+    Once attached to a tree, a cycle is reported for each strongly connected component found by the initial check
+    and for each parent link added afterwards that closes a cycle, found by looking for the child among
+    the ancestors of the parent. Removing a link that is part of a reported cycle may leave other cycles
+    in its component, so all cycles are then computed again from scratch, when next requested.
+    """
+
+    def __init__(self, tree: FamilyTree, family: FamilyIndex):
+        """Creates a detector and checks the given tree. It is not attached to the tree.
+
+        :param tree: The tree to check.
+        :param family: The family index of the tree. It must be attached to the tree before this detector.
+        """
+        self._tree = tree
+        self._family = family
+        self._cycles: list[Cycle] = find_cycles(tree)
+        self._dirty = False
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree, family: FamilyIndex) -> CycleDetector:
+        """Creates a detector for the given tree and attaches it to the tree."""
+        detector = cls(tree, family)
+        tree.add_listener(detector.on_tree_changed)
+        return detector
+
+    def cycles(self) -> list[Cycle]:
+        """Returns the cycles in the tree, sorted by first person ID."""
+        if self._dirty:
+            self._cycles = find_cycles(self._tree)
+            self._dirty = False
+        return list(self._cycles)
+
+    def check_link(self, child_id: int, parent_id: int) -> Cycle | None:
+        """Checks whether a parent link closes a cycle, in time proportional to the number of ancestors
+        of the parent.
+
+        :param child_id: ID of the child.
+        :param parent_id: ID of the parent.
+        :return: The shortest cycle through the link, None if there is none.
+        """
+        if child_id == parent_id:
+            return Cycle((child_id,))
+        if self._tree.get_person(parent_id) is None or self._tree.get_person(child_id) is None:
+            return None
+        path = _shortest_path(self._tree, parent_id, child_id)
+        return Cycle.of([child_id] + path) if path is not None else None
+
+    def on_tree_changed(self, change: TreeChange):
+        person_id = change.person_id
+        old_parents = set(change.old_person.parent_ids) if change.old_person else set()
+        new_parents = set(change.new_person.parent_ids) if change.new_person else set()
+        children = self._family.children(person_id)
+        removed_links = {(person_id, parent_id) for parent_id in old_parents - new_parents}
+        added_links = {(person_id, parent_id) for parent_id in new_parents - old_parents}
+        if change.new_person is None:
+            removed_links.update((child_id, person_id) for child_id in children)
+        elif change.old_person is None:
+            added_links.update((child_id, person_id) for child_id in children)
+        if not self._dirty and any(removed_links & cycle.links() for cycle in self._cycles):
+            self._dirty = True
+        if self._dirty:
+            return
+        for child_id, parent_id in sorted(added_links):
+            cycle = self.check_link(child_id, parent_id)
+            if cycle is not None and cycle not in self._cycles:
+                self._cycles.append(cycle)
+        self._cycles.sort(key=lambda c: c.person_ids)
@@ -111,6 +111,21 @@ class Date:
     def precision(self):
         return self.__precision
 
+    @property
+    def sort_key(self) -> int:
+        """
+        An integer that gives a total order over all dates, including partial and imprecise ones,
+        so that large numbers of dates can be sorted without comparing Date objects.
+
+        Dates are ordered by year, month then day. A missing month or day sorts before any set one
+        (1850 < 01/1850 < 01/01/1850) and dates without a year sort after all others.
+        Equal values are ordered by precision: before, exact, approximate then after.
+        """
+        year = self.__year + 2 ** 31 if self.__year is not None else 2 ** 32
+        month = self.__month or 0
+        day = self.__day or 0
+        return year << 11 | month << 7 | day << 2 | _PRECISION_RANKS[self.__precision]
+
     # TODO voir les cas selon la précision ; n'a pas de sens si les dates sont BEFORE ou AFTER et se chevauchent
     def __gt__(self, other: Date):
         pass
@@ -271,6 +286,10 @@ class Date:
         return f'{self.PRECISIONS[self.precision]} {str(day).rjust(2, "0")}/{str(month).rjust(2, "0")}/{year}'.strip()
 
 
+# Order of dates with the same values in Date.sort_key
+_PRECISION_RANKS = {Date.BEFORE: 0, Date.EXACT: 1, Date.APPROX: 2, Date.AFTER: 3}
+
+
 class TimePeriod:
     """
     This class represents a time period.
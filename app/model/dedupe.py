@@ -0,0 +1,261 @@
+"""Detection of duplicate persons, within a tree or between two trees.
+
+Instead of comparing every pair of persons, persons are grouped into blocks sharing a blocking key
+(phonetic surname with birth year range, phonetic surname with birth place, or phonetic surname alone),
+and only persons within the same block are compared.
+"""
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import dataclasses
+import multiprocessing
+import typing as typ
+
+from . import phonetics, text
+from ..entities import Person
+
+# Width of birth year ranges. Each person is put in two overlapping ranges
+# so that any two persons born less than half a range apart share a block.
+_YEAR_RANGE = 10
+# Blocks larger than this are compared using a sliding window over the sorted records instead of pairwise.
+_MAX_BLOCK_SIZE = 500
+_WINDOW_SIZE = 50
+# Approximate number of comparisons per task sent to the process pool
+_TASK_SIZE = 200_000
+
+
+@dataclasses.dataclass(frozen=True)
+class Weights:
+    """Weights of each criterion in the similarity score of two persons."""
+    lastname: float = 0.35
+    firstnames: float = 0.25
+    birth_date: float = 0.25
+    birth_place: float = 0.15
+
+
+@dataclasses.dataclass(frozen=True)
+class MergeSuggestion:
+    """Two persons that are likely duplicates.
+    When comparing two trees, person_id_1 belongs to the first tree and person_id_2 to the second one."""
+    score: float
+    person_id_1: int
+    person_id_2: int
+
+
+# (source, person ID, lastname, first names, birth year, birth month, birth day, birth place)
+_Record = tuple[int, int, str, str, typ.Optional[int], typ.Optional[int], typ.Optional[int], str]
+
+
+def find_duplicates(
+        persons: typ.Iterable[tuple[int, Person]],
+        other_persons: typ.Iterable[tuple[int, Person]] = None,
+        threshold: float = 0.8,
+        weights: Weights = Weights(),
+        workers: int = None,
+) -> list[MergeSuggestion]:
+    """Looks for duplicate persons.
+
+    :param persons: The (ID, person) pairs to look for duplicates into.
+    :param other_persons: If specified, only pairs made of one person from each iterable are compared.
+    :param threshold: Minimum similarity score of returned suggestions, between 0 and 1.
+    :param weights: The weight of each criterion.
+    :param workers: Number of worker processes. If None, the number of CPUs is used; if 0, blocks are scored
+        in the current process. Workers are not forked, so that this function may be called from a multithreaded
+        process.
+    :return: The merge suggestions, sorted by decreasing score then by IDs.
+    """
+    records = [_make_record(0, pid, p) for pid, p in persons]
+    cross = other_persons is not None
+    if cross:
+        records.extend(_make_record(1, pid, p) for pid, p in other_persons)
+    blocks = [block for block in _make_blocks(records).values() if _is_comparable(block, cross)]
+
+    results: dict[tuple[int, int], float] = {}
+    if workers == 0:
+        for task in _make_tasks(blocks):
+            _merge_results(results, _score_blocks(task, cross, threshold, weights))
+    else:
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context(method)) as executor:
+            futures = [executor.submit(_score_blocks, task, cross, threshold, weights) for task in _make_tasks(blocks)]
+            for future in concurrent.futures.as_completed(futures):
+                _merge_results(results, future.result())
+
+    suggestions = [MergeSuggestion(score, id1, id2) for (id1, id2), score in results.items()]
+    suggestions.sort(key=lambda s: (-s.score, s.person_id_1, s.person_id_2))
+    return suggestions
+
+
+def _make_record(source: int, person_id: int, person: Person) -> _Record:
+    year = month = day = None
+    place = ''
+    if person.birthday:
+        if date := person.birthday.date:
+            year = date.year if date.year_set else None
+            month = date.month if date.month_set else None
+            day = date.day if date.day_set else None
+        if person.birthday.place:
+            place = text.fold(person.birthday.place.label).strip()
+    lastname = text.fold(person.lastname.label).strip() if person.lastname else ''
+    firstnames = text.fold(' '.join(person.firstnames)).strip()
+    return source, person_id, lastname, firstnames, year, month, day, place
+
+
+def _make_blocks(records: list[_Record]) -> dict[tuple, list[_Record]]:
+    blocks = collections.defaultdict(list)
+    for record in records:
+        lastname_code = phonetics.soundex(record[2])
+        if not lastname_code:
+            continue
+        year, place = record[4], record[7]
+        if year is not None:
+            blocks[('y', lastname_code, year // _YEAR_RANGE)].append(record)
+            blocks[('y+', lastname_code, (year + _YEAR_RANGE // 2) // _YEAR_RANGE)].append(record)
+        if place:
+            blocks[('p', lastname_code, place)].append(record)
+        # Persons with a missing or differing birth year or place still meet their namesakes here.
+        # Large blocks are compared using a sliding window, see _score_blocks().
+        blocks[('n', lastname_code)].append(record)
+    return blocks
+
+
+def _is_comparable(block: list[_Record], cross: bool) -> bool:
+    if len(block) < 2:
+        return False
+    return not cross or len({r[0] for r in block}) == 2
+
+
+def _make_tasks(blocks: list[list[_Record]]) -> typ.Iterator[list[list[_Record]]]:
+    """Groups blocks into tasks of roughly _TASK_SIZE comparisons."""
+    task = []
+    size = 0
+    for block in blocks:
+        task.append(block)
+        n = len(block)
+        size += n * min(n, _WINDOW_SIZE if n > _MAX_BLOCK_SIZE else n)
+        if size >= _TASK_SIZE:
+            yield task
+            task = []
+            size = 0
+    if task:
+        yield task
+
+
+def _merge_results(results: dict[tuple[int, int], float], scores: list[tuple[int, int, float]]):
+    for id1, id2, score in scores:
+        key = (id1, id2)
+        if score > results.get(key, -1):
+            results[key] = score
+
+
+def _score_blocks(blocks: list[list[_Record]], cross: bool, threshold: float, weights: Weights) \
+        -> list[tuple[int, int, float]]:
+    """Scores all candidate pairs in the given blocks. Runs in worker processes.
+
+    :return: The list of (ID1, ID2, score) triples whose score is above the threshold.
+    """
+    scores = []
+    for block in blocks:
+        if len(block) > _MAX_BLOCK_SIZE:
+            # Sorted neighbourhood: compare each record with the following ones in the sorted order only
+            block = sorted(block, key=lambda r: (r[3], r[4] or 0, r[2]))
+            pairs = ((block[i], block[j])
+                     for i in range(len(block)) for j in range(i + 1, min(i + 1 + _WINDOW_SIZE, len(block))))
+        else:
+            pairs = ((block[i], block[j]) for i in range(len(block)) for j in range(i + 1, len(block)))
+        for r1, r2 in pairs:
+            if cross:
+                if r1[0] == r2[0]:
+                    continue
+                if r1[0] == 1:
+                    r1, r2 = r2, r1
+            elif r1[1] > r2[1]:
+                r1, r2 = r2, r1
+            score = _similarity(r1, r2, weights)
+            if score >= threshold:
+                scores.append((r1[1], r2[1], score))
+    return scores
+
+
+def _similarity(r1: _Record, r2: _Record, weights: Weights) -> float:
+    """Computes the weighted similarity score between two records.
+    Criteria for which one of the persons has no value are ignored.
+
+    :return: A score between 0 and 1.
+    """
+    year1, year2 = r1[4], r2[4]
+    if year1 is not None and year2 is not None and abs(year1 - year2) > _YEAR_RANGE // 2:
+        return 0
+    total = weights.lastname * jaro_winkler(r1[2], r2[2])
+    total_weight = weights.lastname
+    if r1[3] and r2[3]:
+        total += weights.firstnames * jaro_winkler(r1[3], r2[3])
+        total_weight += weights.firstnames
+    if year1 is not None and year2 is not None:
+        total += weights.birth_date * _date_similarity(r1[4:7], r2[4:7])
+        total_weight += weights.birth_date
+    if r1[7] and r2[7]:
+        total += weights.birth_place * (1 if r1[7] == r2[7] else jaro_winkler(r1[7], r2[7]))
+        total_weight += weights.birth_place
+    return total / total_weight
+
+
+def _date_similarity(date1: tuple, date2: tuple) -> float:
+    year1, month1, day1 = date1
+    year2, month2, day2 = date2
+    score = 1 - abs(year1 - year2) / (_YEAR_RANGE // 2 + 1)
+    if year1 == year2 and month1 is not None and month2 is not None:
+        if month1 != month2:
+            score = 0.8
+        elif day1 is not None and day2 is not None and day1 != day2:
+            score = 0.9
+    return score
+
+
+# Jaro similarity below which the common prefix bonus is not applied
+_WINKLER_THRESHOLD = 0.7
+
+
+def jaro_winkler(s1: str, s2: str) -> float:
+    """Computes the Jaro-Winkler similarity between two strings.
+
+    :return: A value between 0 (no similarity) and 1 (identical strings).
+    """
+    if s1 == s2:
+        return 1
+    len1, len2 = len(s1), len(s2)
+    if not len1 or not len2:
+        return 0
+    match_distance = max(max(len1, len2) // 2 - 1, 0)
+    matches1 = [False] * len1
+    matches2 = [False] * len2
+    matches = 0
+    for i, c in enumerate(s1):
+        for j in range(max(0, i - match_distance), min(i + match_distance + 1, len2)):
+            if not matches2[j] and s2[j] == c:
+                matches1[i] = matches2[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0
+    transpositions = 0
+    j = 0
+    for i in range(len1):
+        if matches1[i]:
+            while not matches2[j]:
+                j += 1
+            if s1[i] != s2[j]:
+                transpositions += 1
+            j += 1
+    jaro = (matches / len1 + matches / len2 + (matches - transpositions / 2) / matches) / 3
+    if jaro < _WINKLER_THRESHOLD:
+        # Only strings that are already similar get the bonus of a common prefix
+        return jaro
+    prefix = 0
+    for c1, c2 in zip(s1[:4], s2[:4]):
+        if c1 != c2:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
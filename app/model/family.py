@@ -0,0 +1,66 @@
+"""Index of the family links between the persons of a tree."""
+from __future__ import annotations
+
+import collections
+
+from .tree import FamilyTree, TreeChange
+
+
+class FamilyIndex:
+    """Gives access to the parents, children and partners of each person of a tree.
+    Parents are stored in the persons themselves, this index maintains the reverse links.
+
+    Once attached to a tree, the index is kept up to date as persons are added, edited or removed.
+    """
+
+    def __init__(self, tree: FamilyTree):
+        """Creates the index of the given tree and attaches it to the tree."""
+        self._tree = tree
+        self._children: dict[int, set[int]] = collections.defaultdict(set)
+        for person_id, person in tree.persons():
+            for parent_id in person.parent_ids:
+                self._children[parent_id].add(person_id)
+        tree.add_listener(self.on_tree_changed)
+
+    @property
+    def tree(self) -> FamilyTree:
+        return self._tree
+
+    def on_tree_changed(self, change: TreeChange):
+        if change.old_person is not None:
+            for parent_id in change.old_person.parent_ids:
+                children = self._children[parent_id]
+                children.discard(change.person_id)
+                if not children:
+                    del self._children[parent_id]
+        if change.new_person is not None:
+            for parent_id in change.new_person.parent_ids:
+                self._children[parent_id].add(change.person_id)
+
+    def parents(self, person_id: int) -> tuple[int, ...]:
+        """Returns the IDs of the parents of the given person that are in the tree."""
+        person = self._tree.get_person(person_id)
+        if person is None:
+            return ()
+        return tuple(pid for pid in person.parent_ids if pid in self._tree)
+
+    def children(self, person_id: int) -> list[int]:
+        """Returns the IDs of the children of the given person, sorted by ID."""
+        return sorted(self._children.get(person_id, ()))
+
+    def families(self, person_id: int) -> list[tuple[int | None, list[int]]]:
+        """Returns the families of the given person, i.e. their children grouped by their other parent.
+
+        :return: A list of (partner ID, children IDs) pairs, sorted by partner ID; children without
+            another known parent are in the last family, with a None partner.
+        """
+        families = collections.defaultdict(list)
+        for child_id in self.children(person_id):
+            partner_id = next((pid for pid in self._tree[child_id].parent_ids
+                               if pid != person_id and pid in self._tree), None)
+            families[partner_id].append(child_id)
+        return sorted(families.items(), key=lambda e: (e[0] is None, e[0] or 0))
+
+    def partners(self, person_id: int) -> list[int]:
+        """Returns the IDs of the persons the given one had children with."""
+        return [partner_id for partner_id, _ in self.families(person_id) if partner_id is not None]
@@ -0,0 +1,287 @@
+"""Gazetteer that resolves the inconsistent labels of places to canonical places.
+
+A label is split at commas into components, from the most specific to the broadest one,
+such as “Paris, Seine, France”. Places are kept in a trie of components going from the broadest one down,
+e.g. country > region > department > town, and each node of the trie is a canonical place with a unique ID.
+A label resolves to the only place whose name is its first component and whose enclosing places include
+its other components, so that “Paris” and “PARIS 75” resolve to the same place as “Paris, Seine, France”.
+"""
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import re
+import typing as typ
+
+from . import text
+from .tree import FamilyTree
+from ..entities import Person
+from ..utils import Event, Place
+
+FORMAT_VERSION = 1
+
+# Parenthesized parts of labels usually hold codes or old names: “Paris (75)”
+_PARENTHESES_PATTERN = re.compile(r'\(.*?\)|\[.*?]')
+# Postal codes, department numbers and punctuation are not part of names
+_WORD_PATTERN = re.compile(r'[^\W\d_]+')
+_ABBREVIATIONS = {
+    'st': 'saint',
+    'ste': 'sainte',
+    'mt': 'mont',
+}
+
+
+def _display(component: str) -> str:
+    """Returns the component of a label as it should be displayed, without codes."""
+    return ' '.join(word for word in component.replace('_', ' ').split() if _WORD_PATTERN.search(word))
+
+
+def normalize(label: str) -> tuple[str, ...]:
+    """Splits a place label into normalized components, from the most specific to the broadest one.
+    Components are folded, codes and punctuation are removed and common abbreviations are expanded.
+
+    >>> normalize('St-Denis (93), Seine, FRANCE')
+    ('saint denis', 'seine', 'france')
+    """
+    components = []
+    for component in _PARENTHESES_PATTERN.sub(' ', label).split(','):
+        words = _WORD_PATTERN.findall(text.fold(component))
+        if words:
+            components.append(' '.join(_ABBREVIATIONS.get(word, word) for word in words))
+    return tuple(components)
+
+
+def _is_subsequence(items: typ.Sequence[str], sequence: typ.Sequence[str]) -> bool:
+    """Tells whether all items appear in the sequence in the same order."""
+    it = iter(sequence)
+    return all(item in it for item in items)
+
+
+class _Node:
+    __slots__ = ('place_id', 'name', 'display', 'parent', 'children', 'x', 'y')
+
+    def __init__(self, place_id: int, name: str, display: str, parent: _Node | None):
+        self.place_id = place_id
+        self.name = name
+        self.display = display
+        self.parent = parent
+        self.children: dict[str, _Node] = {}
+        self.x: float | None = None
+        self.y: float | None = None
+
+    def ancestors(self) -> typ.Iterator[_Node]:
+        """Iterates over the places that enclose this one, from the nearest one, excluding the trie’s root."""
+        node = self.parent
+        while node is not None and node.parent is not None:
+            yield node
+            node = node.parent
+
+    def ancestor_names(self) -> tuple[str, ...]:
+        return tuple(node.name for node in self.ancestors())
+
+
+class Gazetteer:
+    """Resolves place labels to canonical place IDs.
+
+    Places are created as new labels are resolved. When a label is more qualified than an existing place
+    with the same name and no other place bears that name, that place is moved under the label’s enclosing places
+    instead, keeping its ID. Resolutions are cached by label, so that resolving the places of a tree again,
+    for instance when it is imported a second time, returns the same IDs.
+    """
+
+    def __init__(self):
+        self._root = _Node(-1, '', '', None)
+        self._nodes: dict[int, _Node] = {}
+        # Places bearing each name
+        self._by_name: dict[str, list[_Node]] = {}
+        self._cache: dict[str, int | None] = {}
+        # Interned canonical places
+        self._places: dict[int, Place] = {}
+
+    def __len__(self):
+        """Returns the number of canonical places."""
+        return len(self._nodes)
+
+    def __contains__(self, place_id: int):
+        return place_id in self._nodes
+
+    def resolve(self, label: str) -> int | None:
+        """Returns the ID of the canonical place of a label, creating it if needed.
+
+        :return: The place ID, None if the label has no name in it.
+        """
+        if (place_id := self._cache.get(label, -1)) != -1:
+            return place_id
+        components = normalize(label)
+        displays = [d for d in map(_display, _PARENTHESES_PATTERN.sub(' ', label).split(',')) if d]
+        place_id = self._resolve(components, displays).place_id if components else None
+        self._cache[label] = place_id
+        return place_id
+
+    def resolve_all(self, labels: typ.Iterable[str]) -> list[int | None]:
+        """Resolves many labels. Each distinct label is only normalized once, then its resolution is cached."""
+        return [self.resolve(label) for label in labels]
+
+    def label(self, place_id: int) -> str:
+        """Returns the canonical label of a place, with its enclosing places.
+
+        :raise KeyError: If there is no place with this ID.
+        """
+        node = self._nodes[place_id]
+        return ', '.join([node.display] + [ancestor.display for ancestor in node.ancestors()])
+
+    def parent(self, place_id: int) -> int | None:
+        """Returns the ID of the place that directly encloses another one, None if it is not known.
+
+        :raise KeyError: If there is no place with this ID.
+        """
+        parent = self._nodes[place_id].parent
+        return parent.place_id if parent is not self._root else None
+
+    def children(self, place_id: int = None) -> list[int]:
+        """Returns the IDs of the places directly enclosed by a place, or of the broadest places if None."""
+        node = self._root if place_id is None else self._nodes[place_id]
+        return sorted(child.place_id for child in node.children.values())
+
+    def place(self, place_id: int) -> Place:
+        """Returns the canonical place of an ID. The same Place object is returned for each call with the same ID.
+
+        :raise KeyError: If there is no place with this ID.
+        """
+        if (place := self._places.get(place_id)) is None:
+            node = self._nodes[place_id]
+            place = self._places[place_id] = Place(self.label(place_id), node.x, node.y)
+        return place
+
+    def canonical(self, place: Place) -> Place:
+        """Returns the canonical place of a place. Coordinates of canonical places are taken from the first
+        resolved place that has any.
+
+        :return: The canonical place, or the given one if its label has no name in it.
+        """
+        place_id = self.resolve(place.label)
+        if place_id is None:
+            return place
+        node = self._nodes[place_id]
+        if node.x is None and place.x is not None and place.y is not None:
+            node.x, node.y = place.x, place.y
+            self._places.pop(place_id, None)
+        return self.place(place_id)
+
+    def _resolve(self, components: typ.Sequence[str], displays: typ.Sequence[str]) -> _Node:
+        name, qualifiers = components[0], tuple(components[1:])
+        display = displays[0] if displays else name
+        nodes = self._by_name.get(name, [])
+        matches = [node for node in nodes if _is_subsequence(qualifiers, node.ancestor_names())]
+        if matches:
+            exact = [node for node in matches if node.ancestor_names() == qualifiers]
+            if exact or len(matches) == 1:
+                node = (exact or matches)[0]
+                self._update_display(node, display)
+                return node
+        parent = self._resolve(qualifiers, displays[1:]) if qualifiers else self._root
+        if (node := parent.children.get(name)) is not None:
+            return node
+        if not matches and len(nodes) == 1:
+            node = nodes[0]
+            parent_path = [parent] + list(parent.ancestors()) if parent is not self._root else []
+            if node not in parent_path and _is_subsequence(node.ancestor_names(), [p.name for p in parent_path]):
+                # A more qualified label for the only place bearing this name
+                self._move(node, parent)
+                self._update_display(node, display)
+                return node
+        node = _Node(len(self._nodes), name, display, parent)
+        self._add(node)
+        return node
+
+    def _add(self, node: _Node):
+        self._nodes[node.place_id] = node
+        self._by_name.setdefault(node.name, []).append(node)
+        node.parent.children[node.name] = node
+
+    def _move(self, node: _Node, parent: _Node):
+        del node.parent.children[node.name]
+        node.parent = parent
+        parent.children[node.name] = node
+        self._invalidate(node)
+
+    def _update_display(self, node: _Node, display: str):
+        # Prefer mixed-case spellings over all-caps ones
+        if node.display.isupper() and not display.isupper():
+            node.display = display
+            self._invalidate(node)
+
+    def _invalidate(self, node: _Node):
+        """Discards the interned places of a node and of the ones it encloses, as their labels changed."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            self._places.pop(node.place_id, None)
+            stack.extend(node.children.values())
+
+    def save(self, path: pathlib.Path):
+        """Writes the places and cached resolutions of this gazetteer to a file."""
+        data = {
+            'version': FORMAT_VERSION,
+            'places': [[node.place_id, node.parent.place_id, node.name, node.display, node.x, node.y]
+                       for node in self._nodes.values()],
+            'labels': self._cache,
+        }
+        tmp_path = path.with_name(path.name + '.tmp')
+        with tmp_path.open(mode='w', encoding='UTF-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> Gazetteer | None:
+        """Reads a gazetteer from a file.
+
+        :return: The gazetteer or None if the file does not exist or is invalid.
+        """
+        gazetteer = cls()
+        try:
+            with path.open(encoding='UTF-8') as f:
+                data = json.load(f)
+            if data.get('version') != FORMAT_VERSION:
+                return None
+            for place_id, _, name, display, x, y in data['places']:
+                node = _Node(place_id, name, display, None)
+                node.x, node.y = x, y
+                gazetteer._nodes[place_id] = node
+            for place_id, parent_id, *_ in data['places']:
+                node = gazetteer._nodes[place_id]
+                node.parent = gazetteer._root if parent_id == -1 else gazetteer._nodes[parent_id]
+                node.parent.children[node.name] = node
+                gazetteer._by_name.setdefault(node.name, []).append(node)
+            gazetteer._cache = {label: place_id for label, place_id in data['labels'].items()
+                                if place_id is None or place_id in gazetteer._nodes}
+        except (OSError, json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError):
+            return None
+        return gazetteer
+
+
+def normalize_places(tree: FamilyTree, gazetteer: Gazetteer) -> int:
+    """Replaces the places of the events of all persons of a tree by their canonical places.
+
+    :return: The number of updated persons.
+    """
+    cache: dict[Place, Place] = {}
+
+    def canonical(event: Event | None) -> Event | None:
+        if event is None or event.place is None:
+            return event
+        if (place := cache.get(event.place)) is None:
+            place = cache[event.place] = gazetteer.canonical(event.place)
+        return event if place == event.place else Event(event.date, place)
+
+    updates = []
+    for person_id, person in tree.persons():
+        old_birthday, old_death = person.birthday, person.death
+        birthday, death = canonical(old_birthday), canonical(old_death)
+        if birthday is not old_birthday or death is not old_death:
+            updates.append((person_id, Person(person.lastname, person.firstnames, birthday, death, person.notes,
+                                              person.parent_ids)))
+    for person_id, person in updates:
+        tree.update_person(person_id, person)
+    return len(updates)
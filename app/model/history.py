@@ -0,0 +1,212 @@
+"""Undo/redo history of the changes made to a family tree.
+
+The history listens to the tree and records the TreeChange of each modification. A change holds the old and new
+person, so it is its own reversible command: undoing it applies the opposite change. The recorded persons are the
+views read from the tree, which share the tree’s immutable rows (see person_store), so an undo step costs memory
+in proportion to the number and size of the persons it changed, never to the size of the tree. The size of a step
+is estimated from the texts of its persons, as long notes may outweigh everything else.
+"""
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import typing as typ
+
+from .tree import FamilyTree, TreeChange
+from ..entities import Person
+
+# Approximate memory held by a recorded change and the views of its persons, without their texts, in bytes
+_CHANGE_OVERHEAD = 400
+# Approximate memory held by each parent ID of a person, in bytes
+_PARENT_ID_SIZE = 8
+
+
+def _person_size(person: Person | None) -> int:
+    """Estimates the memory held by the texts and parent IDs of a person, in bytes."""
+    if person is None:
+        return 0
+    return (len(person.notes) + (len(person.lastname.label) if person.lastname else 0)
+            + sum(map(len, person.firstnames)) + _PARENT_ID_SIZE * len(person.parent_ids))
+
+
+def _change_size(change: TreeChange) -> int:
+    """Estimates the memory held by a recorded change, in bytes."""
+    return _CHANGE_OVERHEAD + _person_size(change.old_person) + _person_size(change.new_person)
+
+
+@dataclasses.dataclass(frozen=True)
+class Step:
+    """A group of changes that are undone and redone together, in the order they were made."""
+    label: str | None
+    changes: tuple[TreeChange, ...]
+    # Estimated memory held by this step, in bytes
+    size: int
+
+
+HistoryListener = typ.Callable[[], None]
+
+
+class History:
+    """Undo and redo stacks of the changes made to a tree.
+
+    Each change made to the tree outside a group is its own step. Changes made inside a group (see group())
+    make up a single step, so that bulk operations are undone at once. Making a new change clears the redo stack.
+    The oldest steps are dropped once the steps of both stacks hold more memory than the budget.
+    """
+    DEFAULT_BUDGET = 64 * 1024 * 1024  # bytes
+
+    def __init__(self, tree: FamilyTree, budget: int = DEFAULT_BUDGET):
+        """Creates an empty history. Use for_tree() to also attach it to the tree.
+
+        :param tree: The tree whose changes are recorded.
+        :param budget: The maximum estimated memory held by the steps, in bytes.
+        """
+        self._tree = tree
+        self._budget = budget
+        self._undo_steps: list[Step] = []
+        self._redo_steps: list[Step] = []
+        self._size = 0
+        # Changes of the current group and its label
+        self._group: list[TreeChange] | None = None
+        self._group_label: str | None = None
+        self._group_depth = 0
+        self._applying = False
+        self._listeners: list[HistoryListener] = []
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree, budget: int = DEFAULT_BUDGET) -> History:
+        """Creates a history and attaches it to the given tree."""
+        history = cls(tree, budget)
+        tree.add_listener(history.on_tree_changed)
+        return history
+
+    def add_listener(self, listener: HistoryListener):
+        """Adds a function that will be called each time steps are added, undone, redone or dropped."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: HistoryListener):
+        self._listeners.remove(listener)
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo_steps)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo_steps)
+
+    @property
+    def undo_label(self) -> str | None:
+        """The label of the step that would be undone, None if there is none or it has no label."""
+        return self._undo_steps[-1].label if self._undo_steps else None
+
+    @property
+    def redo_label(self) -> str | None:
+        """The label of the step that would be redone, None if there is none or it has no label."""
+        return self._redo_steps[-1].label if self._redo_steps else None
+
+    @property
+    def size(self) -> int:
+        """Estimated memory held by the steps of both stacks, in bytes."""
+        return self._size
+
+    def on_tree_changed(self, change: TreeChange):
+        if self._applying:
+            return
+        if change.new_person is not None:
+            # Keep the view stored by the tree rather than the object that was passed to it
+            change = TreeChange(change.person_id, change.old_person, self._tree.get_person(change.person_id))
+        if self._group is not None:
+            self._group.append(change)
+        else:
+            self._push(None, (change,))
+
+    @contextlib.contextmanager
+    def group(self, label: str = None) -> typ.Iterator[None]:
+        """Returns a context manager that records all changes made to the tree inside it as a single step.
+        Nested groups are part of the outermost one, whose label is used.
+
+        :param label: The label of the step.
+        """
+        if self._group_depth == 0:
+            self._group = []
+            self._group_label = label
+        self._group_depth += 1
+        try:
+            yield
+        finally:
+            self._group_depth -= 1
+            if self._group_depth == 0:
+                changes, self._group = self._group, None
+                if changes:
+                    self._push(self._group_label, tuple(changes))
+
+    def undo(self) -> Step | None:
+        """Reverts the changes of the last step.
+
+        :return: The undone step, None if there is nothing to undo.
+        :raise ValueError: If a group is open.
+        """
+        if self._group_depth:
+            raise ValueError('cannot undo while a group is open')
+        if not self._undo_steps:
+            return None
+        step = self._undo_steps.pop()
+        self._apply(TreeChange(c.person_id, c.new_person, c.old_person) for c in reversed(step.changes))
+        self._redo_steps.append(step)
+        self._notify()
+        return step
+
+    def redo(self) -> Step | None:
+        """Applies again the changes of the last undone step.
+
+        :return: The redone step, None if there is nothing to redo.
+        :raise ValueError: If a group is open.
+        """
+        if self._group_depth:
+            raise ValueError('cannot redo while a group is open')
+        if not self._redo_steps:
+            return None
+        step = self._redo_steps.pop()
+        self._apply(step.changes)
+        self._undo_steps.append(step)
+        self._notify()
+        return step
+
+    def clear(self):
+        """Drops all steps."""
+        self._undo_steps.clear()
+        self._redo_steps.clear()
+        self._size = 0
+        self._notify()
+
+    def _apply(self, changes: typ.Iterable[TreeChange]):
+        self._applying = True
+        try:
+            for change in changes:
+                if change.new_person is None:
+                    self._tree.remove_person(change.person_id)
+                elif change.old_person is None:
+                    self._tree.add_person(change.new_person, person_id=change.person_id)
+                else:
+                    self._tree.update_person(change.person_id, change.new_person)
+        finally:
+            self._applying = False
+
+    def _push(self, label: str | None, changes: tuple[TreeChange, ...]):
+        step = Step(label, changes, sum(map(_change_size, changes)))
+        self._size -= sum(s.size for s in self._redo_steps)
+        self._redo_steps.clear()
+        self._undo_steps.append(step)
+        self._size += step.size
+        # Drop the oldest steps, and the new one too if it does not fit on its own
+        dropped = 0
+        while self._size > self._budget and dropped < len(self._undo_steps):
+            self._size -= self._undo_steps[dropped].size
+            dropped += 1
+        del self._undo_steps[:dropped]
+        self._notify()
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener()
@@ -0,0 +1,111 @@
+"""Phonetic indexes over the names of the persons of a tree, for “sounds like” searches."""
+from __future__ import annotations
+
+import collections
+import functools
+import typing as typ
+
+from . import phonetics
+from .tree import FamilyTree, TreeChange
+from ..entities import Person
+
+LASTNAME = 'lastname'
+FIRSTNAMES = 'firstnames'
+
+
+@functools.lru_cache(maxsize=100_000)
+def _encode(name: str, algorithm: str) -> frozenset[str]:
+    # Names are highly repeated in a tree, caching their codes speeds up indexing a lot
+    return frozenset(phonetics.encode(name, algorithm))
+
+
+class PhoneticIndex:
+    """Maps the phonetic codes of last names and first names to the IDs of the persons that bear them,
+    for each phonetic algorithm in phonetics.ALGORITHMS.
+
+    Once attached to a tree, the index is kept up to date as persons are added, edited or removed.
+    """
+
+    def __init__(self, algorithms: typ.Iterable[str] = None):
+        """Creates an empty index.
+
+        :param algorithms: The algorithms to index names with. Defaults to all available algorithms.
+        """
+        if algorithms is None:
+            algorithms = phonetics.ALGORITHMS.keys()
+        # algorithm -> field -> code -> person IDs
+        self._index: dict[str, dict[str, dict[str, set[int]]]] = {
+            algorithm: {LASTNAME: collections.defaultdict(set), FIRSTNAMES: collections.defaultdict(set)}
+            for algorithm in algorithms
+        }
+        for algorithm in self._index:
+            if algorithm not in phonetics.ALGORITHMS:
+                raise ValueError(f'unknown phonetic algorithm "{algorithm}"')
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree, algorithms: typ.Iterable[str] = None) -> PhoneticIndex:
+        """Creates an index of all persons in the given tree and attaches it to the tree."""
+        index = cls(algorithms)
+        for person_id, person in tree.persons():
+            index.add(person_id, person)
+        tree.add_listener(index.on_tree_changed)
+        return index
+
+    @property
+    def algorithms(self) -> list[str]:
+        return list(self._index)
+
+    def add(self, person_id: int, person: Person):
+        for algorithm, codes in self._codes(person):
+            fields = self._index[algorithm]
+            for field, code in codes:
+                fields[field][code].add(person_id)
+
+    def remove(self, person_id: int, person: Person):
+        """Removes a person from this index.
+
+        :param person_id: The person’s ID.
+        :param person: The person as it was when it was indexed.
+        """
+        for algorithm, codes in self._codes(person):
+            fields = self._index[algorithm]
+            for field, code in codes:
+                if (ids := fields[field].get(code)) is not None:
+                    ids.discard(person_id)
+                    if not ids:
+                        del fields[field][code]
+
+    def on_tree_changed(self, change: TreeChange):
+        if change.old_person is not None:
+            self.remove(change.person_id, change.old_person)
+        if change.new_person is not None:
+            self.add(change.person_id, change.new_person)
+
+    def search(self, name: str, algorithm: str, field: str = LASTNAME) -> set[int]:
+        """Returns the IDs of all persons whose name sounds like the given one.
+
+        :param name: The name to look for.
+        :param algorithm: The phonetic algorithm to use.
+        :param field: The name to look into, either LASTNAME or FIRSTNAMES.
+        :return: The IDs of the matching persons.
+        :raise ValueError: If the algorithm is not indexed or the field does not exist.
+        """
+        if algorithm not in self._index:
+            raise ValueError(f'algorithm "{algorithm}" is not indexed')
+        if field not in (LASTNAME, FIRSTNAMES):
+            raise ValueError(f'invalid field "{field}"')
+        codes = self._index[algorithm][field]
+        result = set()
+        for code in _encode(name, algorithm):
+            result |= codes.get(code, set())
+        return result
+
+    def _codes(self, person: Person) -> typ.Iterator[tuple[str, set[tuple[str, str]]]]:
+        """Returns the (field, code) pairs of the given person for each indexed algorithm."""
+        for algorithm in self._index:
+            codes = set()
+            if person.lastname:
+                codes.update((LASTNAME, code) for code in _encode(person.lastname.label, algorithm))
+            for firstname in person.firstnames:
+                codes.update((FIRSTNAMES, code) for code in _encode(firstname, algorithm))
+            yield algorithm, codes
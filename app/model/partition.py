@@ -0,0 +1,110 @@
+"""Splitting of the persons of a tree into independent partitions, to process them in parallel.
+
+Persons are linked to their parents. Persons of different connected components are never linked,
+so whole components are packed together into partitions of bounded size. Components larger than
+that are cut into parts of consecutive persons in breadth-first order, which keeps relatives together;
+each part then comes with the halo of the persons outside of it that its persons are linked to.
+"""
+from __future__ import annotations
+
+import collections
+import dataclasses
+import typing as typ
+
+from .tree import FamilyTree, TreeSnapshot
+
+
+@dataclasses.dataclass(frozen=True)
+class Partition:
+    """A set of persons to process together."""
+    # IDs of the persons of the partition
+    core: tuple[int, ...]
+    # IDs of the persons outside of the partition that persons of the core are linked to
+    halo: tuple[int, ...] = ()
+
+
+def connected_components(tree: FamilyTree | TreeSnapshot) -> list[list[int]]:
+    """Returns the connected components of the graph of the persons of a tree linked to their parents.
+    Parents that are not in the tree are ignored.
+
+    :return: The IDs of the persons of each component. Components are in the order of their smallest ID.
+    """
+    # Union-find with path halving and union by size
+    roots: dict[int, int] = {}
+    sizes: dict[int, int] = {}
+
+    def find(person_id: int) -> int:
+        while (root := roots[person_id]) != person_id:
+            roots[person_id] = person_id = roots[root]
+        return person_id
+
+    for person_id, _ in tree.persons():
+        roots[person_id] = person_id
+        sizes[person_id] = 1
+    for person_id, person in tree.persons():
+        for parent_id in person.parent_ids:
+            if parent_id not in roots:
+                continue
+            root1, root2 = find(person_id), find(parent_id)
+            if root1 != root2:
+                if sizes[root1] < sizes[root2]:
+                    root1, root2 = root2, root1
+                roots[root2] = root1
+                sizes[root1] += sizes.pop(root2)
+
+    components: dict[int, list[int]] = {}
+    for person_id in sorted(roots):
+        components.setdefault(find(person_id), []).append(person_id)
+    return list(components.values())
+
+
+def partitions(tree: FamilyTree | TreeSnapshot, max_size: int) -> typ.Iterator[Partition]:
+    """Splits the persons of a tree into partitions of at most max_size persons, halos excluded.
+    Each person is in the core of exactly one partition.
+
+    :param tree: The tree to split.
+    :param max_size: Maximum number of persons in the core of a partition.
+    :raise ValueError: If max_size is less than 1.
+    """
+    if max_size < 1:
+        raise ValueError(f'invalid partition size {max_size}')
+    packed = []
+    for component in connected_components(tree):
+        if len(component) > max_size:
+            yield from _split(tree, component, max_size)
+            continue
+        if len(packed) + len(component) > max_size:
+            yield Partition(tuple(packed))
+            packed = []
+        packed.extend(component)
+    if packed:
+        yield Partition(tuple(packed))
+
+
+def _split(tree: FamilyTree | TreeSnapshot, component: list[int], max_size: int) -> typ.Iterator[Partition]:
+    """Cuts a connected component into parts of max_size persons in breadth-first order."""
+    # Parents in the tree are in the same component
+    members = set(component)
+    links: dict[int, list[int]] = {person_id: [] for person_id in component}
+    for person_id in component:
+        for parent_id in tree.get_person(person_id).parent_ids:
+            if parent_id in members:
+                links[person_id].append(parent_id)
+                links[parent_id].append(person_id)
+
+    order = []
+    visited = {component[0]}
+    queue = collections.deque([component[0]])
+    while queue:
+        person_id = queue.popleft()
+        order.append(person_id)
+        for linked_id in links[person_id]:
+            if linked_id not in visited:
+                visited.add(linked_id)
+                queue.append(linked_id)
+
+    for i in range(0, len(order), max_size):
+        core = order[i:i + max_size]
+        core_ids = set(core)
+        halo = {linked_id for person_id in core for linked_id in links[person_id] if linked_id not in core_ids}
+        yield Partition(tuple(core), tuple(sorted(halo)))
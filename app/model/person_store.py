@@ -0,0 +1,316 @@
+"""Compact storage of the persons of a family tree as columns of integers rather than as objects.
+
+Each person is stored as a row of arrays: the ID of its last name in a table of interned LastName objects,
+its first names, events and parents in CSR layout (each row stores the end offset of its values in a shared
+array), and dates packed into integers. Person objects are only created when they are read, as lightweight
+views over a row. Rows are never modified once written, so views never change; replacing a person
+appends a new row, and rows no longer used are dropped when there are as many as used ones.
+"""
+from __future__ import annotations
+
+import array
+import functools
+import typing as typ
+
+from .date import Date
+from ..entities import Person
+from ..utils import Event, LastName, Place
+
+_T = typ.TypeVar('_T')
+
+# Value of missing references and dates in columns
+_NONE = -1
+_BIRTH = 0
+_DEATH = 1
+# Packed dates: precision in bits 0-1, day in bits 2-6, month in bits 7-10, whether the year is set in bit 11,
+# then the year shifted to be positive. Unset days and months are 0.
+_YEAR_OFFSET = 1 << 31
+
+
+def encode_date(date: Date | None) -> int:
+    """Packs a date into a non-negative integer, or -1 if it is None."""
+    if date is None:
+        return _NONE
+    packed = date.precision | (date.day if date.day_set else 0) << 2 | (date.month if date.month_set else 0) << 7
+    if date.year_set:
+        packed |= 1 << 11 | (date.year + _YEAR_OFFSET) << 12
+    return packed
+
+
+@functools.lru_cache(maxsize=100_000)
+def decode_date(packed: int) -> Date | None:
+    """Unpacks a date packed by encode_date(). Dates are immutable, so decoded ones are cached and shared."""
+    if packed == _NONE:
+        return None
+    return Date(
+        day=(packed >> 2 & 0b11111) or None,
+        month=(packed >> 7 & 0b1111) or None,
+        year=(packed >> 12) - _YEAR_OFFSET if packed >> 11 & 1 else None,
+        precision=packed & 0b11,
+    )
+
+
+class InternTable(typ.Generic[_T]):
+    """Gives an integer ID to each distinct value. Values are never removed, as they are few compared to persons.
+    Tables are only appended to, so they may be shared by trees and their snapshots across threads."""
+
+    def __init__(self):
+        self._values: list[_T] = []
+        self._ids: dict[_T, int] = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, value_id: int) -> _T:
+        return self._values[value_id]
+
+    def intern(self, value: _T) -> int:
+        """Returns the ID of a value, adding it to the table if needed."""
+        if (value_id := self._ids.get(value)) is None:
+            value_id = self._ids[value] = len(self._values)
+            self._values.append(value)
+        return value_id
+
+
+class Tables:
+    """The intern tables of the values shared by many persons."""
+
+    def __init__(self):
+        self.lastnames: InternTable[LastName] = InternTable()
+        self.firstnames: InternTable[str] = InternTable()
+        self.places: InternTable[Place] = InternTable()
+
+
+class _Rows:
+    """Append-only columns of person rows."""
+    __slots__ = ('lastnames', 'names_ends', 'names', 'events_ends', 'event_kinds', 'event_dates', 'event_places',
+                 'notes', 'parents_ends', 'parents')
+
+    def __init__(self):
+        self.lastnames = array.array('i')
+        self.names_ends = array.array('I')
+        self.names = array.array('i')
+        self.events_ends = array.array('I')
+        self.event_kinds = array.array('b')
+        self.event_dates = array.array('q')
+        self.event_places = array.array('i')
+        # Notes are mostly empty or unique, they are not worth interning
+        self.notes: list[str] = []
+        self.parents_ends = array.array('I')
+        self.parents = array.array('q')
+
+    def __len__(self):
+        return len(self.lastnames)
+
+    def append(self, person: Person, tables: Tables) -> int:
+        """Appends a row for a person.
+
+        :return: The index of the row.
+        """
+        self.lastnames.append(tables.lastnames.intern(person.lastname) if person.lastname is not None else _NONE)
+        self.names.extend(map(tables.firstnames.intern, person.firstnames))
+        self.names_ends.append(len(self.names))
+        for kind, event in ((_BIRTH, person.birthday), (_DEATH, person.death)):
+            if event is not None:
+                self.event_kinds.append(kind)
+                self.event_dates.append(encode_date(event.date))
+                self.event_places.append(tables.places.intern(event.place) if event.place is not None else _NONE)
+        self.events_ends.append(len(self.event_kinds))
+        self.notes.append(person.notes)
+        self.parents.extend(person.parent_ids)
+        self.parents_ends.append(len(self.parents))
+        return len(self.lastnames) - 1
+
+    def copy_row(self, rows: _Rows, row: int) -> int:
+        """Appends a copy of a row of other columns that use the same tables.
+
+        :return: The index of the new row.
+        """
+        self.lastnames.append(rows.lastnames[row])
+        start, end = _bounds(rows.names_ends, row)
+        self.names.extend(rows.names[start:end])
+        self.names_ends.append(len(self.names))
+        start, end = _bounds(rows.events_ends, row)
+        self.event_kinds.extend(rows.event_kinds[start:end])
+        self.event_dates.extend(rows.event_dates[start:end])
+        self.event_places.extend(rows.event_places[start:end])
+        self.events_ends.append(len(self.event_kinds))
+        self.notes.append(rows.notes[row])
+        start, end = _bounds(rows.parents_ends, row)
+        self.parents.extend(rows.parents[start:end])
+        self.parents_ends.append(len(self.parents))
+        return len(self.lastnames) - 1
+
+
+def _bounds(ends: array.array, row: int) -> tuple[int, int]:
+    """Returns the start and end offsets of the values of a row in a CSR column."""
+    return ends[row - 1] if row else 0, ends[row]
+
+
+class PersonView:
+    """A person stored in a PersonStore, with the same attributes as Person.
+    It compares equal to the person it was stored from and is pickled as a Person."""
+    __slots__ = ('_rows', '_row', '_tables')
+
+    def __init__(self, rows: _Rows, row: int, tables: Tables):
+        self._rows = rows
+        self._row = row
+        self._tables = tables
+
+    @property
+    def lastname(self) -> LastName | None:
+        lastname_id = self._rows.lastnames[self._row]
+        return self._tables.lastnames[lastname_id] if lastname_id != _NONE else None
+
+    @property
+    def firstnames(self) -> tuple[str, ...]:
+        start, end = _bounds(self._rows.names_ends, self._row)
+        return tuple(map(self._tables.firstnames.__getitem__, self._rows.names[start:end]))
+
+    @property
+    def birthday(self) -> Event | None:
+        return self._event(_BIRTH)
+
+    @property
+    def death(self) -> Event | None:
+        return self._event(_DEATH)
+
+    @property
+    def notes(self) -> str:
+        return self._rows.notes[self._row]
+
+    @property
+    def parent_ids(self) -> tuple[int, ...]:
+        start, end = _bounds(self._rows.parents_ends, self._row)
+        return tuple(self._rows.parents[start:end])
+
+    @property
+    def full_name(self) -> str:
+        return Person.full_name.fget(self)
+
+    def _event(self, kind: int) -> Event | None:
+        rows, row = self._rows, self._row
+        ends = rows.events_ends
+        kinds = rows.event_kinds
+        for i in range(ends[row - 1] if row else 0, ends[row]):
+            if kinds[i] == kind:
+                place_id = rows.event_places[i]
+                place = self._tables.places[place_id] if place_id != _NONE else None
+                return Event(decode_date(rows.event_dates[i]), place)
+        return None
+
+    def to_person(self) -> Person:
+        """Returns a Person object with the same attributes as this view."""
+        return Person(*self._fields())
+
+    def _fields(self) -> tuple:
+        return self.lastname, self.firstnames, self.birthday, self.death, self.notes, self.parent_ids
+
+    def __eq__(self, other):
+        if isinstance(other, PersonView):
+            return self._fields() == other._fields()
+        if isinstance(other, Person):
+            return self._fields() == (other.lastname, other.firstnames, other.birthday, other.death, other.notes,
+                                      other.parent_ids)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._fields())
+
+    def __reduce__(self):
+        return Person, self._fields()
+
+    def __repr__(self):
+        return repr(self.to_person())
+
+
+class PersonStore:
+    """Stores the persons of a range of consecutive IDs.
+
+    Copies share their rows with the original store, only the mapping from IDs to rows is copied.
+    Rows are only appended to, so a store may be read from other threads while a copy of it is modified.
+    """
+
+    def __init__(self, first_id: int, capacity: int, tables: Tables):
+        """Creates an empty store.
+
+        :param first_id: The first ID of the range.
+        :param capacity: The number of IDs in the range.
+        :param tables: The intern tables of the tree the store belongs to.
+        """
+        self._first_id = first_id
+        self._tables = tables
+        self._rows = _Rows()
+        # Row of the person with each ID of the range
+        self._slots = array.array('i', [_NONE]) * capacity
+        self._size = 0
+
+    @property
+    def tables(self) -> Tables:
+        return self._tables
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, person_id: int):
+        return self._row(person_id) != _NONE
+
+    def get(self, person_id: int) -> PersonView | None:
+        row = self._row(person_id)
+        return PersonView(self._rows, row, self._tables) if row != _NONE else None
+
+    def set(self, person_id: int, person: Person):
+        """Stores a person, replacing any person with the same ID.
+
+        :raise IndexError: If the ID is not in the range of this store.
+        """
+        slot = self._slot(person_id)
+        if self._slots[slot] == _NONE:
+            self._size += 1
+        self._slots[slot] = self._rows.append(person, self._tables)
+        self._compact_if_needed()
+
+    def remove(self, person_id: int):
+        """Removes a person. Does nothing if there is no person with this ID."""
+        slot = self._slot(person_id)
+        if self._slots[slot] != _NONE:
+            self._slots[slot] = _NONE
+            self._size -= 1
+            self._compact_if_needed()
+
+    def items(self) -> typ.Iterator[tuple[int, PersonView]]:
+        """Iterates over the (ID, person) pairs of this store, sorted by ID."""
+        rows, tables, first_id = self._rows, self._tables, self._first_id
+        for slot, row in enumerate(self._slots):
+            if row != _NONE:
+                yield first_id + slot, PersonView(rows, row, tables)
+
+    def copy(self) -> PersonStore:
+        store = PersonStore.__new__(PersonStore)
+        store._first_id = self._first_id
+        store._tables = self._tables
+        store._rows = self._rows
+        store._slots = array.array('i', self._slots)
+        store._size = self._size
+        return store
+
+    def _slot(self, person_id: int) -> int:
+        slot = person_id - self._first_id
+        if not 0 <= slot < len(self._slots):
+            raise IndexError(f'person ID {person_id} out of range')
+        return slot
+
+    def _row(self, person_id: int) -> int:
+        slot = person_id - self._first_id
+        return self._slots[slot] if 0 <= slot < len(self._slots) else _NONE
+
+    def _compact_if_needed(self):
+        """Copies the used rows into new columns when there are more unused rows than used ones.
+        Existing views and copies of this store keep the old columns."""
+        if len(self._rows) <= 2 * self._size + 16:
+            return
+        rows = _Rows()
+        for slot, row in enumerate(self._slots):
+            if row != _NONE:
+                self._slots[slot] = rows.copy_row(self._rows, row)
+        self._rows = rows
@@ -0,0 +1,211 @@
+"""Sortable and filterable table of the persons of a tree, for lists of millions of rows."""
+from __future__ import annotations
+
+import array
+import bisect
+import typing as typ
+
+from . import text
+from .tree import FamilyTree, TreeChange
+from ..entities import Person
+
+NAME = 0
+BIRTH_DATE = 1
+BIRTH_PLACE = 2
+COLUMNS = (NAME, BIRTH_DATE, BIRTH_PLACE)
+
+# Sort key of persons without a birth date, after all dates
+_NO_DATE = 1 << 62
+
+
+def name_key(person: Person) -> str:
+    """Returns the key to sort persons by last name then first names."""
+    lastname = person.lastname.label if person.lastname else ''
+    return text.fold(lastname) + '\0' + text.fold(' '.join(person.firstnames))
+
+
+def birth_date_key(person: Person) -> int:
+    """Returns the key to sort persons by birth date. Persons without a date come last."""
+    if person.birthday is None or person.birthday.date is None:
+        return _NO_DATE
+    return person.birthday.date.sort_key
+
+
+def birth_place_key(person: Person) -> str:
+    """Returns the key to sort persons by birth place. Persons without a place come first."""
+    if person.birthday is None or person.birthday.place is None:
+        return ''
+    return text.fold(person.birthday.place.label)
+
+
+class PersonTable:
+    """The rows of a list of persons, sorted by one column and filtered by name.
+
+    Sort keys are computed once per person and stored in one array per column, so that sorting
+    only compares integers or strings instead of persons or dates. Persons that compare equal
+    are ordered by ID, hence persons added afterwards are inserted at their place by binary search.
+
+    Once attached to a tree, the table is kept up to date as persons are added, edited or removed.
+    """
+
+    def __init__(self):
+        # Columns of the table, indexed by slot. Removing a person moves the last slot into theirs.
+        self._ids = array.array('q')
+        self._name_keys: list[str] = []
+        self._date_keys = array.array('q')
+        self._place_keys: list[str] = []
+        # Slot of each person
+        self._slots: dict[int, int] = {}
+        # Slots of the persons that pass the filter, sorted in ascending order
+        self._order = array.array('q')
+        self._sort_column = NAME
+        self._descending = False
+        self._filter: list[str] = []
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree) -> PersonTable:
+        """Creates the table of all persons in the given tree and attaches it to the tree."""
+        table = cls()
+        for person_id, person in tree.persons():
+            table._append(person_id, person)
+        table._sort()
+        tree.add_listener(table.on_tree_changed)
+        return table
+
+    @property
+    def sort_column(self) -> int:
+        return self._sort_column
+
+    @property
+    def descending(self) -> bool:
+        return self._descending
+
+    def sort(self, column: int, descending: bool = False):
+        """Sorts the rows by the given column.
+
+        :raise ValueError: If the column does not exist.
+        """
+        if column not in COLUMNS:
+            raise ValueError(f'invalid column {column}')
+        self._descending = descending
+        if column != self._sort_column:
+            self._sort_column = column
+            self._sort()
+
+    def set_filter(self, query: str):
+        """Only keeps the persons whose name contains all words of the given query."""
+        self._filter = text.fold(query).split()
+        self._sort()
+
+    def __len__(self):
+        """Returns the number of rows, i.e. of persons that pass the filter."""
+        return len(self._order)
+
+    def person_id(self, row: int) -> int:
+        """Returns the ID of the person at the given row.
+
+        :raise IndexError: If the row does not exist.
+        """
+        if not 0 <= row < len(self._order):
+            raise IndexError(row)
+        return self._ids[self._order[self._position(row)]]
+
+    def row_of(self, person_id: int) -> int | None:
+        """Returns the row of the given person, None if they are not in the table or filtered out."""
+        slot = self._slots.get(person_id)
+        if slot is None:
+            return None
+        key = self._slot_key(slot)
+        position = bisect.bisect_left(self._order, key, key=self._slot_key)
+        if position < len(self._order) and self._order[position] == slot:
+            return self._position(position)
+        return None
+
+    def insertion_row(self, person_id: int, person: Person) -> int | None:
+        """Returns the row a person would be inserted at by add(), None if they would be filtered out."""
+        if not self._matches(name_key(person)):
+            return None
+        keys = (name_key(person), birth_date_key(person), birth_place_key(person))
+        position = bisect.bisect_left(self._order, (keys[self._sort_column], person_id), key=self._slot_key)
+        return len(self._order) - position if self._descending else position
+
+    def add(self, person_id: int, person: Person):
+        """Adds a person to this table.
+
+        :raise ValueError: If the person is already in the table.
+        """
+        if person_id in self._slots:
+            raise ValueError(f'duplicate person ID {person_id}')
+        slot = self._append(person_id, person)
+        if self._matches(self._name_keys[slot]):
+            bisect.insort_left(self._order, slot, key=self._slot_key)
+
+    def remove(self, person_id: int):
+        """Removes a person from this table. Does nothing if they are not in it."""
+        slot = self._slots.get(person_id)
+        if slot is None:
+            return
+        self._remove_from_order(slot)
+        last = len(self._ids) - 1
+        if slot != last:
+            # Move the last slot into the freed one
+            last_in_order = self._remove_from_order(last)
+            self._ids[slot] = self._ids[last]
+            self._name_keys[slot] = self._name_keys[last]
+            self._date_keys[slot] = self._date_keys[last]
+            self._place_keys[slot] = self._place_keys[last]
+            self._slots[self._ids[slot]] = slot
+            if last_in_order:
+                bisect.insort_left(self._order, slot, key=self._slot_key)
+        self._ids.pop()
+        self._name_keys.pop()
+        self._date_keys.pop()
+        self._place_keys.pop()
+        del self._slots[person_id]
+
+    def on_tree_changed(self, change: TreeChange):
+        if change.old_person is not None:
+            self.remove(change.person_id)
+        if change.new_person is not None:
+            self.add(change.person_id, change.new_person)
+
+    def _append(self, person_id: int, person: Person) -> int:
+        slot = len(self._ids)
+        self._ids.append(person_id)
+        self._name_keys.append(name_key(person))
+        self._date_keys.append(birth_date_key(person))
+        self._place_keys.append(birth_place_key(person))
+        self._slots[person_id] = slot
+        return slot
+
+    def _remove_from_order(self, slot: int) -> bool:
+        """Removes a slot from the sorted rows.
+
+        :return: True if the slot was in the rows.
+        """
+        position = bisect.bisect_left(self._order, self._slot_key(slot), key=self._slot_key)
+        if position < len(self._order) and self._order[position] == slot:
+            del self._order[position]
+            return True
+        return False
+
+    def _sort(self):
+        """Sorts all slots that pass the filter, from scratch."""
+        slots = [slot for slot in range(len(self._ids)) if self._matches(self._name_keys[slot])]
+        # Two stable sorts on plain sequences are much faster than one with a tuple key
+        slots.sort(key=self._ids.__getitem__)
+        slots.sort(key=self._keys().__getitem__)
+        self._order = array.array('q', slots)
+
+    def _keys(self) -> typ.Sequence[str | int]:
+        return (self._name_keys, self._date_keys, self._place_keys)[self._sort_column]
+
+    def _slot_key(self, slot: int) -> tuple[str | int, int]:
+        return self._keys()[slot], self._ids[slot]
+
+    def _position(self, row: int) -> int:
+        """Converts a row into a position in the ascending order and vice versa."""
+        return len(self._order) - 1 - row if self._descending else row
+
+    def _matches(self, name: str) -> bool:
+        return all(word in name for word in self._filter)
@@ -0,0 +1,219 @@
+"""Phonetic encoding algorithms for names."""
+from __future__ import annotations
+
+import typing as typ
+
+from . import text
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def soundex(name: str) -> str:
+    """Encodes the given name using the American Soundex algorithm.
+
+    >>> soundex('Robert'), soundex('Rupert'), soundex('Tymczak')
+    ('R163', 'R163', 'T522')
+
+    :param name: The name to encode. Accents and non-letter characters are ignored.
+    :return: The name’s code, an empty string if it contains no letters.
+    """
+    letters = [c for c in text.fold(name) if 'a' <= c <= 'z']
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0])
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES.get(c)
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in 'hw':  # H and W do not separate letters with the same code
+            previous = digit
+    return code.ljust(4, '0')
+
+
+# Daitch–Mokotoff rules: pattern -> list of alternative (at start, before a vowel, other) codes.
+# None means “not coded”.
+_DM_RULES: dict[str, list[tuple[str | None, str | None, str | None]]] = {
+    'ai': [('0', '1', None)], 'aj': [('0', '1', None)], 'ay': [('0', '1', None)],
+    'au': [('0', '7', None)],
+    'a': [('0', None, None)],
+    'b': [('7', '7', '7')],
+    'chs': [('5', '54', '54')],
+    'ch': [('5', '5', '5'), ('4', '4', '4')],
+    'ck': [('5', '5', '5'), ('45', '45', '45')],
+    'csz': [('4', '4', '4')], 'czs': [('4', '4', '4')], 'cs': [('4', '4', '4')], 'cz': [('4', '4', '4')],
+    'c': [('5', '5', '5'), ('4', '4', '4')],
+    'drz': [('4', '4', '4')], 'drs': [('4', '4', '4')],
+    'dsh': [('4', '4', '4')], 'dsz': [('4', '4', '4')], 'ds': [('4', '4', '4')],
+    'dzh': [('4', '4', '4')], 'dzs': [('4', '4', '4')], 'dz': [('4', '4', '4')],
+    'dt': [('3', '3', '3')], 'd': [('3', '3', '3')],
+    'ei': [('0', '1', None)], 'ej': [('0', '1', None)], 'ey': [('0', '1', None)],
+    'eu': [('1', '1', None)],
+    'e': [('0', None, None)],
+    'fb': [('7', '7', '7')], 'f': [('7', '7', '7')],
+    'g': [('5', '5', '5')],
+    'h': [('5', '5', None)],
+    'ia': [('1', None, None)], 'ie': [('1', None, None)], 'io': [('1', None, None)], 'iu': [('1', None, None)],
+    'i': [('0', None, None)],
+    'j': [('1', '1', '1'), ('4', '4', '4')],
+    'ks': [('5', '54', '54')], 'kh': [('5', '5', '5')], 'k': [('5', '5', '5')],
+    'l': [('8', '8', '8')],
+    'mn': [('66', '66', '66')], 'm': [('6', '6', '6')],
+    'nm': [('66', '66', '66')], 'n': [('6', '6', '6')],
+    'oi': [('0', '1', None)], 'oj': [('0', '1', None)], 'oy': [('0', '1', None)],
+    'o': [('0', None, None)],
+    'pf': [('7', '7', '7')], 'ph': [('7', '7', '7')], 'p': [('7', '7', '7')],
+    'q': [('5', '5', '5')],
+    'rz': [('94', '94', '94'), ('4', '4', '4')], 'rs': [('94', '94', '94'), ('4', '4', '4')],
+    'r': [('9', '9', '9')],
+    'schtsch': [('2', '4', '4')], 'schtsh': [('2', '4', '4')], 'schtch': [('2', '4', '4')],
+    'shtch': [('2', '4', '4')], 'shtsh': [('2', '4', '4')], 'shch': [('2', '4', '4')],
+    'stsch': [('2', '4', '4')], 'stch': [('2', '4', '4')],
+    'strz': [('2', '4', '4')], 'strs': [('2', '4', '4')], 'stsh': [('2', '4', '4')],
+    'szcz': [('2', '4', '4')], 'szcs': [('2', '4', '4')],
+    'scht': [('2', '43', '43')], 'schd': [('2', '43', '43')], 'sht': [('2', '43', '43')],
+    'szt': [('2', '43', '43')], 'shd': [('2', '43', '43')], 'szd': [('2', '43', '43')],
+    'sch': [('4', '4', '4')],
+    'st': [('2', '43', '43')], 'sd': [('2', '43', '43')],
+    'sc': [('2', '4', '4')],
+    'sh': [('4', '4', '4')], 'sz': [('4', '4', '4')],
+    's': [('4', '4', '4')],
+    'ttsch': [('4', '4', '4')], 'ttch': [('4', '4', '4')], 'tsch': [('4', '4', '4')], 'tch': [('4', '4', '4')],
+    'ttsz': [('4', '4', '4')], 'tts': [('4', '4', '4')], 'ttz': [('4', '4', '4')],
+    'trz': [('4', '4', '4')], 'trs': [('4', '4', '4')],
+    'tsh': [('4', '4', '4')], 'tsz': [('4', '4', '4')], 'tzs': [('4', '4', '4')],
+    'ts': [('4', '4', '4')], 'tc': [('4', '4', '4')], 'tz': [('4', '4', '4')],
+    'th': [('3', '3', '3')], 't': [('3', '3', '3')],
+    'ui': [('0', '1', None)], 'uj': [('0', '1', None)], 'uy': [('0', '1', None)],
+    'ue': [('0', None, None)], 'u': [('0', None, None)],
+    'v': [('7', '7', '7')],
+    'w': [('7', '7', '7')],
+    'x': [('5', '54', '54')],
+    'y': [('1', None, None)],
+    'zhdzh': [('2', '4', '4')], 'zdzh': [('2', '4', '4')], 'zdz': [('2', '4', '4')],
+    'zhd': [('2', '43', '43')], 'zd': [('2', '43', '43')],
+    'zsch': [('4', '4', '4')], 'zsh': [('4', '4', '4')], 'zh': [('4', '4', '4')], 'zs': [('4', '4', '4')],
+    'z': [('4', '4', '4')],
+}
+_DM_MAX_PATTERN_LENGTH = max(map(len, _DM_RULES))
+_DM_CODE_LENGTH = 6
+_DM_VOWELS = 'aeiou'
+
+
+def daitch_mokotoff(name: str) -> set[str]:
+    """Encodes the given name using the Daitch–Mokotoff Soundex algorithm.
+    Some letters have several possible pronunciations, hence a name may have several codes.
+
+    >>> sorted(daitch_mokotoff('Peters')), sorted(daitch_mokotoff('Kleinman'))
+    (['734000', '739400'], ['586660'])
+
+    :param name: The name to encode. Accents and non-letter characters are ignored.
+    :return: The set of codes of the name, an empty set if it contains no letters.
+    """
+    letters = ''.join(c for c in text.fold(name) if 'a' <= c <= 'z')
+    if not letters:
+        return set()
+    # Each branch is a (code, last appended code) pair
+    branches = [('', None)]
+    i = 0
+    while i < len(letters):
+        for length in range(min(_DM_MAX_PATTERN_LENGTH, len(letters) - i), 0, -1):
+            pattern = letters[i:i + length]
+            if pattern in _DM_RULES:
+                break
+        else:  # Cannot happen as all letters have a rule
+            raise AssertionError(f'no rule for {letters[i]!r}')
+        i += length
+        if i == length:
+            index = 0
+        elif i < len(letters) and letters[i] in _DM_VOWELS:
+            index = 1
+        else:
+            index = 2
+        new_branches = []
+        for code, last in branches:
+            for alternative in _DM_RULES[pattern]:
+                digits = alternative[index]
+                if digits is None:
+                    new_branches.append((code, ''))
+                elif digits != last:
+                    new_branches.append((code + digits, digits))
+                else:
+                    new_branches.append((code, last))
+        branches = list(dict.fromkeys(new_branches))
+    return {code[:_DM_CODE_LENGTH].ljust(_DM_CODE_LENGTH, '0') for code, _ in branches}
+
+
+_FRENCH_REPLACEMENTS_1 = [
+    ('gui', 'ki'), ('gue', 'ke'), ('ga', 'ka'), ('go', 'ko'), ('gu', 'k'),
+    ('ca', 'ka'), ('co', 'ko'), ('cu', 'ku'), ('q', 'k'), ('cc', 'k'), ('ck', 'k'),
+]
+_FRENCH_PREFIXES = [('mac', 'mcc'), ('asa', 'aza'), ('kn', 'nn'), ('pf', 'ff'), ('sch', 'sss'), ('ph', 'ff')]
+_FRENCH_CODE_LENGTH = 4
+
+
+def french_phonetic(name: str) -> str:
+    """Encodes the given name using the Soundex2 algorithm, a variant of Soundex adapted to French.
+
+    >>> french_phonetic('Dupont'), french_phonetic('Dupond'), french_phonetic('Philippe')
+    ('DPN', 'DPN', 'FLP')
+
+    :param name: The name to encode. Accents and non-letter characters are ignored.
+    :return: The name’s code, an empty string if it contains no letters.
+    """
+    code = ''.join(c for c in text.fold(name) if 'a' <= c <= 'z')
+    if not code:
+        return ''
+    for pattern, replacement in _FRENCH_REPLACEMENTS_1:
+        code = code.replace(pattern, replacement)
+    # Replace all vowels but the first letter by A
+    code = code[0] + ''.join('a' if c in 'eiou' else c for c in code[1:])
+    for prefix, replacement in _FRENCH_PREFIXES:
+        if code.startswith(prefix):
+            code = replacement + code[len(prefix):]
+            break
+    # Remove H unless preceded by C or S, and Y unless preceded by A
+    code = code[0] + ''.join(
+        c for p, c in zip(code, code[1:])
+        if not (c == 'h' and p not in 'cs' or c == 'y' and p != 'a')
+    )
+    if len(code) > 1 and code[-1] in 'adts':
+        code = code[:-1]
+    # Remove all A but the first letter
+    code = code[0] + code[1:].replace('a', '')
+    # Remove repeated letters
+    code = ''.join(c for i, c in enumerate(code) if i == 0 or c != code[i - 1])
+    return code[:_FRENCH_CODE_LENGTH].upper()
+
+
+SOUNDEX = 'soundex'
+DAITCH_MOKOTOFF = 'daitch_mokotoff'
+FRENCH = 'french'
+
+ALGORITHMS: dict[str, typ.Callable[[str], set[str]]] = {
+    SOUNDEX: lambda name: {c} if (c := soundex(name)) else set(),
+    DAITCH_MOKOTOFF: daitch_mokotoff,
+    FRENCH: lambda name: {c} if (c := french_phonetic(name)) else set(),
+}
+
+
+def encode(name: str, algorithm: str) -> set[str]:
+    """Encodes the given name using the given algorithm.
+
+    :param name: The name to encode.
+    :param algorithm: One of SOUNDEX, DAITCH_MOKOTOFF or FRENCH.
+    :return: The set of codes of the name.
+    :raise ValueError: If the algorithm does not exist.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f'unknown phonetic algorithm "{algorithm}"')
+    return ALGORITHMS[algorithm](name)
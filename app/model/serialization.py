@@ -0,0 +1,143 @@
+"""This module defines functions to write and read family trees to/from files.
+
+Trees are stored as UTF-8 JSON lines: the first line is a header, then each following line holds a single person.
+Writing one line at a time keeps the interpreter responsive when the tree is written from a worker thread.
+"""
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import uuid
+
+from .date import Date
+from .tree import FamilyTree, TreeSnapshot
+from ..entities import Person
+from ..utils import Event, LastName, Place
+
+FORMAT_VERSION = 1
+
+
+class TreeFileError(ValueError):
+    pass
+
+
+def dump_tree(snapshot: TreeSnapshot, path: pathlib.Path) -> str:
+    """Writes the given tree snapshot to a file. The file is first written to a temporary file then moved,
+    so that an interrupted write never corrupts an existing file.
+
+    :param snapshot: The snapshot to write.
+    :param path: Path of the file to write.
+    :return: A unique ID of this save. Files stored alongside the tree file may use it to check that
+        they are in sync with the tree file.
+    """
+    save_id = uuid.uuid4().hex
+    tmp_path = path.with_name(path.name + '.tmp')
+    with tmp_path.open(mode='w', encoding='UTF-8') as f:
+        header = {
+            'version': FORMAT_VERSION,
+            'save_id': save_id,
+            'revision': snapshot.revision,
+            'next_id': snapshot.next_id,
+        }
+        f.write(json.dumps(header) + '\n')
+        for person_id, person in snapshot.persons():
+            f.write(json.dumps([person_id, _encode_person(person)], ensure_ascii=False) + '\n')
+    os.replace(tmp_path, path)
+    return save_id
+
+
+def read_save_id(path: pathlib.Path) -> str | None:
+    """Returns the save ID of the given tree file, None if it could not be read."""
+    try:
+        with path.open(encoding='UTF-8') as f:
+            return json.loads(f.readline()).get('save_id')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def load_tree(path: pathlib.Path) -> FamilyTree:
+    """Reads a family tree from the given file.
+
+    :param path: Path of the file to read.
+    :return: The tree.
+    :raise TreeFileError: If the file is improperly formatted.
+    """
+    tree = FamilyTree()
+    try:
+        with path.open(encoding='UTF-8') as f:
+            header = json.loads(f.readline())
+            if not isinstance(header, dict):
+                raise TreeFileError(f'invalid tree file header in {path}')
+            if header.get('version') != FORMAT_VERSION:
+                raise TreeFileError(f'unsupported tree file version: {header.get("version")}')
+            for line in f:
+                if line.strip():
+                    person_id, data = json.loads(line)
+                    tree.add_person(_decode_person(data), person_id=person_id)
+            # IDs of the persons removed before the tree was saved are not reused
+            tree.reserve_ids(int(header.get('next_id', 0)))
+    except TreeFileError:
+        raise
+    # ValueError includes JSON and UTF-8 decoding errors, and duplicate person IDs
+    except (ValueError, AttributeError, KeyError, TypeError) as e:
+        raise TreeFileError(f'invalid tree file {path}: {e}')
+    return tree
+
+
+def _encode_person(person: Person) -> dict:
+    return {
+        'lastname': person.lastname.label if person.lastname else None,
+        'firstnames': list(person.firstnames),
+        'birthday': _encode_event(person.birthday),
+        'death': _encode_event(person.death),
+        'notes': person.notes,
+        'parents': list(person.parent_ids),
+    }
+
+
+def _decode_person(data: dict) -> Person:
+    return Person(
+        lastname=LastName(data['lastname']) if data['lastname'] is not None else None,
+        firstnames=tuple(data['firstnames']),
+        birthday=_decode_event(data['birthday']),
+        death=_decode_event(data['death']),
+        notes=data.get('notes', ''),
+        parent_ids=tuple(data.get('parents', ())),
+    )
+
+
+def _encode_event(event: Event | None) -> dict | None:
+    if event is None:
+        return None
+    return {
+        'date': encode_date(event.date),
+        'place': [event.place.label, event.place.x, event.place.y] if event.place else None,
+    }
+
+
+def _decode_event(data: dict | None) -> Event | None:
+    if data is None:
+        return None
+    return Event(
+        date=decode_date(data['date']),
+        place=Place(*data['place']) if data['place'] else None,
+    )
+
+
+def encode_date(date: Date | None) -> list | None:
+    if date is None:
+        return None
+    return [
+        date.day if date.day_set else None,
+        date.month if date.month_set else None,
+        date.year if date.year_set else None,
+        date.precision,
+    ]
+
+
+def decode_date(data: list | None) -> Date | None:
+    if data is None:
+        return None
+    day, month, year, precision = data
+    return Date(day=day, month=month, year=year, precision=precision)
@@ -0,0 +1,247 @@
+"""Spatial index of the places where the events of the persons of a tree happened,
+for radius, bounding-box and nearest-neighbour queries.
+
+The x and y coordinates of places are their longitude and latitude in degrees. Distances are great-circle
+distances in kilometres, computed with the haversine formula.
+"""
+from __future__ import annotations
+
+import math
+import typing as typ
+
+from .timeline import BIRTH, DEATH
+from .tree import FamilyTree, TreeChange
+from ..entities import Person
+from ..utils import Place
+
+# Mean radius of the Earth
+EARTH_RADIUS = 6371.0088  # km
+# Length of the half of a great circle; no two places can be further apart
+MAX_DISTANCE = math.pi * EARTH_RADIUS  # km
+
+_Cell = tuple[int, int]
+# Longitude and latitude in radians, and cosine of the latitude
+_Point = tuple[float, float, float]
+
+
+class PlaceDistance(typ.NamedTuple):
+    place: Place
+    distance: float  # km
+
+
+def _point(x: float, y: float) -> _Point:
+    lat = math.radians(y)
+    return math.radians(x), lat, math.cos(lat)
+
+
+def distances(x: float, y: float, points: typ.Iterable[_Point]) -> list[float]:
+    """Computes the distances from a location to many points in one pass.
+
+    :param x: Longitude of the location in degrees.
+    :param y: Latitude of the location in degrees.
+    :param points: The longitude and latitude of each point in radians, with the cosine of its latitude.
+    :return: The distances in kilometres, in the order of the points.
+    """
+    lon, lat, cos_lat = _point(x, y)
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    diameter = 2 * EARTH_RADIUS
+    return [diameter * asin(min(1.0, sqrt(sin((p_lat - lat) / 2) ** 2
+                                          + cos_lat * p_cos_lat * sin((p_lon - lon) / 2) ** 2)))
+            for p_lon, p_lat, p_cos_lat in points]
+
+
+def distance(x1: float, y1: float, x2: float, y2: float) -> float:
+    """Returns the distance in kilometres between two locations given by their longitude and latitude in degrees."""
+    return distances(x1, y1, (_point(x2, y2),))[0]
+
+
+def is_located(place: Place | None) -> bool:
+    """Tells whether a place has valid coordinates."""
+    return (place is not None and place.x is not None and place.y is not None
+            and -180 <= place.x <= 180 and -90 <= place.y <= 90)
+
+
+class SpatialIndex:
+    """Keeps the places of the births and deaths of the persons of a tree in a grid of cells of CELL_SIZE degrees,
+    so that queries only compute the distances to the places in the cells around the queried location.
+    Places without valid coordinates are not indexed.
+
+    Once attached to a tree, the index is kept up to date as persons are added, edited or removed,
+    a place being dropped when no event happens there anymore.
+
+    The GUI does not use it yet: nearest() is meant to suggest places while one is typed in the person editor,
+    which does not exist yet.
+    """
+    CELL_SIZE = 0.5  # degrees
+
+    def __init__(self):
+        self._cells: dict[_Cell, dict[Place, _Point]] = {}
+        # IDs and kinds of the events that happened in each place
+        self._events: dict[Place, set[tuple[int, int]]] = {}
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree) -> SpatialIndex:
+        """Creates the index of all persons in the given tree and attaches it to the tree."""
+        index = cls()
+        for person_id, person in tree.persons():
+            index.add(person_id, person)
+        tree.add_listener(index.on_tree_changed)
+        return index
+
+    def __len__(self):
+        """Returns the number of indexed places."""
+        return len(self._events)
+
+    def __contains__(self, place: Place):
+        return place in self._events
+
+    def on_tree_changed(self, change: TreeChange):
+        if change.old_person is not None:
+            self.remove(change.person_id, change.old_person)
+        if change.new_person is not None:
+            self.add(change.person_id, change.new_person)
+
+    def add(self, person_id: int, person: Person):
+        """Indexes the places of the events of a person."""
+        for kind, place in self._person_places(person):
+            if (events := self._events.get(place)) is None:
+                events = self._events[place] = set()
+                self._cells.setdefault(self._cell(place.x, place.y), {})[place] = _point(place.x, place.y)
+            events.add((person_id, kind))
+
+    def remove(self, person_id: int, person: Person):
+        """Removes the places of the events of a person, as they were indexed."""
+        for kind, place in self._person_places(person):
+            if (events := self._events.get(place)) is None:
+                continue
+            events.discard((person_id, kind))
+            if not events:
+                del self._events[place]
+                cell_key = self._cell(place.x, place.y)
+                cell = self._cells[cell_key]
+                del cell[place]
+                if not cell:
+                    del self._cells[cell_key]
+
+    def events(self, place: Place) -> list[tuple[int, int]]:
+        """Returns the (person ID, kind) pairs of the events that happened in a place, sorted by person ID."""
+        return sorted(self._events.get(place, ()))
+
+    def within_radius(self, x: float, y: float, radius: float,
+                      predicate: typ.Callable[[Place], bool] = None) -> list[PlaceDistance]:
+        """Returns the places within a distance of a location.
+
+        :param x: Longitude of the location in degrees.
+        :param y: Latitude of the location in degrees.
+        :param radius: Maximum distance in kilometres, included.
+        :param predicate: If specified, only the places it accepts are returned.
+        :return: The places with their distances, nearest first.
+        """
+        if radius < 0:
+            return []
+        angle = radius / EARTH_RADIUS
+        south, north = y - math.degrees(angle), y + math.degrees(angle)
+        if south <= -90 or north >= 90:
+            # The circle contains a pole, hence all longitudes
+            west, east = -180, 180
+            south, north = max(south, -90), min(north, 90)
+        else:
+            # Longitudes of the meridians tangent to the circle
+            delta = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(y)))))
+            west, east = x - delta, x + delta
+        candidates = [(place, point) for place, point in self._box_points(west, south, east, north)
+                      if predicate is None or predicate(place)]
+        candidates_distances = distances(x, y, (point for _, point in candidates))
+        result = [PlaceDistance(place, d) for (place, _), d in zip(candidates, candidates_distances) if d <= radius]
+        result.sort(key=lambda r: (r.distance, r.place.label))
+        return result
+
+    def in_box(self, west: float, south: float, east: float, north: float) -> list[Place]:
+        """Returns the places within a longitude and latitude range.
+
+        :param west: Minimum longitude in degrees. If greater than east, the box crosses the antimeridian.
+        :param south: Minimum latitude in degrees.
+        :param east: Maximum longitude in degrees.
+        :param north: Maximum latitude in degrees.
+        :return: The places, sorted by label.
+        """
+        if west > east:
+            east += 360
+        places = [place for place, _ in self._box_points(west, south, east, north)]
+        return sorted(places, key=lambda p: (p.label, p.x, p.y))
+
+    def nearest(self, x: float, y: float, count: int,
+                predicate: typ.Callable[[Place], bool] = None) -> list[PlaceDistance]:
+        """Returns the places nearest to a location.
+
+        :param x: Longitude of the location in degrees.
+        :param y: Latitude of the location in degrees.
+        :param count: Maximum number of places to return.
+        :param predicate: If specified, only the places it accepts are returned,
+            such as the ones whose label starts with the text typed so far.
+        :return: The places with their distances, nearest first.
+        """
+        if count <= 0 or not self._events:
+            return []
+        # Widen the search until enough places are found; all places within the final radius are compared
+        radius = self.CELL_SIZE * 111
+        while True:
+            result = self.within_radius(x, y, radius, predicate)
+            if len(result) >= count or radius >= MAX_DISTANCE:
+                return result[:count]
+            radius = min(radius * 4, MAX_DISTANCE)
+
+    def events_within(self, x: float, y: float, radius: float, kind: int = None) -> list[tuple[int, int]]:
+        """Returns the events that happened within a distance of a location.
+
+        :param x: Longitude of the location in degrees.
+        :param y: Latitude of the location in degrees.
+        :param radius: Maximum distance in kilometres, included.
+        :param kind: If specified, only events of this kind are returned, BIRTH or DEATH.
+        :return: The (person ID, kind) pairs of the events, nearest first.
+        """
+        return [event
+                for place, _ in self.within_radius(x, y, radius)
+                for event in self.events(place)
+                if kind is None or event[1] == kind]
+
+    def _cell(self, x: float, y: float) -> _Cell:
+        columns = round(360 / self.CELL_SIZE)
+        rows = round(180 / self.CELL_SIZE)
+        # 180° and -180° are the same meridian
+        return (math.floor((x + 180) / self.CELL_SIZE) % columns,
+                min(math.floor((y + 90) / self.CELL_SIZE), rows - 1))
+
+    def _box_points(self, west: float, south: float, east: float, north: float) \
+            -> typ.Iterator[tuple[Place, _Point]]:
+        """Iterates over the places within a longitude and latitude range. Longitudes may be out of [-180, 180],
+        in which case the range wraps around the antimeridian."""
+        columns_count = round(360 / self.CELL_SIZE)
+        if east - west >= 360:
+            west, east = -180, 180
+        first_column = math.floor((west + 180) / self.CELL_SIZE)
+        last_column = math.floor((east + 180) / self.CELL_SIZE)
+        columns = {column % columns_count for column in range(first_column, last_column + 1)}
+        first_row, last_row = self._cell(0, max(south, -90))[1], self._cell(0, min(north, 90))[1]
+        rows_count = last_row - first_row + 1
+        if len(columns) * rows_count <= len(self._cells):
+            cells = (self._cells.get((column, row)) for column in columns for row in range(first_row, last_row + 1))
+        else:
+            cells = (cell for (column, row), cell in self._cells.items()
+                     if column in columns and first_row <= row <= last_row)
+        full = west <= -180 and east >= 180
+
+        def in_longitudes(lon: float) -> bool:
+            # Shift the longitude by whole turns into the range, if it can be
+            return full or west <= lon + 360 * math.ceil((west - lon) / 360) <= east
+
+        for cell in cells:
+            if cell:
+                for place, point in cell.items():
+                    if south <= place.y <= north and in_longitudes(place.x):
+                        yield place, point
+
+    @staticmethod
+    def _person_places(person: Person) -> list[tuple[int, Place]]:
+        return [(kind, event.place) for kind, event in ((BIRTH, person.birthday), (DEATH, person.death))
+                if event is not None and is_located(event.place)]
@@ -0,0 +1,22 @@
+"""Text normalization functions shared by the search and matching features."""
+import unicodedata
+
+# Letters that do not decompose into a base letter and combining marks
+_LIGATURES = str.maketrans({
+    'œ': 'oe',
+    'æ': 'ae',
+    'ß': 'ss',
+    'ø': 'o',
+    'đ': 'd',
+    'ł': 'l',
+})
+
+
+def fold(text: str) -> str:
+    """Folds the given text for comparisons: case is folded and accents are removed.
+
+    >>> fold('Hélène Œuvray')
+    'helene oeuvray'
+    """
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in text if not unicodedata.combining(c)).translate(_LIGATURES)
@@ -0,0 +1,175 @@
+"""Full-text inverted index over the names, places and notes of the persons of a tree."""
+from __future__ import annotations
+
+import bisect
+import collections
+import json
+import os
+import pathlib
+import re
+import typing as typ
+
+from . import text
+from .tree import FamilyTree, TreeChange
+from ..entities import Person
+
+# Indexed fields, as bit flags
+NAME = 1
+PLACE = 2
+NOTES = 4
+ALL_FIELDS = NAME | PLACE | NOTES
+
+FORMAT_VERSION = 1
+FILE_SUFFIX = '.index'
+
+_TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+
+def tokenize(s: str) -> list[str]:
+    """Splits the given text into tokens. Case is folded and accents are removed.
+
+    >>> tokenize("Sainte-Marie-d'Œuvray")
+    ['sainte', 'marie', 'd', 'oeuvray']
+    """
+    return _TOKEN_PATTERN.findall(text.fold(s))
+
+
+def index_path(tree_path: pathlib.Path) -> pathlib.Path:
+    """Returns the path of the index file stored alongside the given tree file."""
+    return tree_path.with_name(tree_path.name + FILE_SUFFIX)
+
+
+class TextIndex:
+    """Maps tokens to the persons whose names, places or notes contain them.
+
+    Once attached to a tree, the index is kept up to date as persons are added, edited or removed.
+    """
+
+    def __init__(self):
+        # token -> person ID -> fields the token appears in
+        self._postings: dict[str, dict[int, int]] = collections.defaultdict(dict)
+        # Sorted tokens, for prefix searches. Built lazily after bulk changes.
+        self._vocabulary: list[str] | None = None
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree) -> TextIndex:
+        """Creates an index of all persons in the given tree and attaches it to the tree."""
+        index = cls()
+        for person_id, person in tree.persons():
+            index.add(person_id, person)
+        index.attach(tree)
+        return index
+
+    def attach(self, tree: FamilyTree):
+        """Keeps this index up to date with the changes made to the given tree."""
+        tree.add_listener(self.on_tree_changed)
+
+    def add(self, person_id: int, person: Person):
+        for token, fields in self._tokens(person).items():
+            postings = self._postings[token]
+            if not postings and self._vocabulary is not None:
+                bisect.insort(self._vocabulary, token)
+            postings[person_id] = fields
+
+    def remove(self, person_id: int, person: Person):
+        """Removes a person from this index.
+
+        :param person_id: The person’s ID.
+        :param person: The person as it was when it was indexed.
+        """
+        for token in self._tokens(person):
+            if (postings := self._postings.get(token)) is not None:
+                postings.pop(person_id, None)
+                if not postings:
+                    del self._postings[token]
+                    if self._vocabulary is not None:
+                        del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+
+    def on_tree_changed(self, change: TreeChange):
+        if change.old_person is not None:
+            self.remove(change.person_id, change.old_person)
+        if change.new_person is not None:
+            self.add(change.person_id, change.new_person)
+
+    def search(self, query: str, fields: int = ALL_FIELDS, prefix: bool = True) -> set[int]:
+        """Returns the IDs of the persons that match all tokens of the given query.
+
+        :param query: The text to look for.
+        :param fields: The fields to look into, as a combination of NAME, PLACE and NOTES.
+        :param prefix: If true, query tokens also match the indexed tokens they are a prefix of.
+        :return: The IDs of the matching persons.
+        """
+        result = None
+        # Look for the longest tokens first as they are usually the rarest, to keep intermediate results small
+        for token in sorted(set(tokenize(query)), key=len, reverse=True):
+            ids = set()
+            for indexed_token in (self._prefixed_tokens(token) if prefix else [token]):
+                ids.update(pid for pid, f in self._postings.get(indexed_token, {}).items() if f & fields)
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result or set()
+
+    def _prefixed_tokens(self, prefix: str) -> typ.Iterator[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        i = bisect.bisect_left(self._vocabulary, prefix)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(prefix):
+            yield self._vocabulary[i]
+            i += 1
+
+    @staticmethod
+    def _tokens(person: Person) -> dict[str, int]:
+        """Returns the tokens of the given person with the fields they appear in."""
+        tokens = collections.defaultdict(int)
+
+        def add(s: str, field: int):
+            for token in tokenize(s):
+                tokens[token] |= field
+
+        if person.lastname:
+            add(person.lastname.label, NAME)
+        for firstname in person.firstnames:
+            add(firstname, NAME)
+        for event in (person.birthday, person.death):
+            if event and event.place:
+                add(event.place.label, PLACE)
+        add(person.notes, NOTES)
+        return tokens
+
+    def save(self, path: pathlib.Path, save_id: str):
+        """Writes this index to a file.
+
+        :param path: Path of the file to write.
+        :param save_id: Save ID of the tree file this index is stored alongside.
+        """
+        tmp_path = path.with_name(path.name + '.tmp')
+        with tmp_path.open(mode='w', encoding='UTF-8') as f:
+            f.write(json.dumps({'version': FORMAT_VERSION, 'save_id': save_id}) + '\n')
+            for token, postings in self._postings.items():
+                f.write(json.dumps([token, [v for item in postings.items() for v in item]], ensure_ascii=False)
+                        + '\n')
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: pathlib.Path, save_id: str) -> TextIndex | None:
+        """Reads an index from a file.
+
+        :param path: Path of the file to read.
+        :param save_id: Save ID of the tree file the index is stored alongside.
+        :return: The index or None if the file does not exist, is invalid or is not in sync with the tree file.
+        """
+        if save_id is None:
+            return None
+        index = cls()
+        try:
+            with path.open(encoding='UTF-8') as f:
+                header = json.loads(f.readline())
+                if header.get('version') != FORMAT_VERSION or header.get('save_id') != save_id:
+                    return None
+                for line in f:
+                    token, postings = json.loads(line)
+                    index._postings[token] = dict(zip(postings[::2], postings[1::2]))
+        except (OSError, json.JSONDecodeError, AttributeError, ValueError):
+            return None
+        return index
@@ -0,0 +1,264 @@
+"""Chronological index of the events of the persons of a tree, globally, by person and by place."""
+from __future__ import annotations
+
+import bisect
+import heapq
+import itertools
+import typing as typ
+
+from .date import Date
+from .tree import FamilyTree, TreeChange
+from ..entities import Person
+from ..utils import Place
+
+BIRTH = 0
+DEATH = 1
+
+# Events are stored as integers that sort chronologically: date sort key, then person ID, then kind
+_PERSON_BITS = 32
+_ID_SHIFT = 1
+_KEY_SHIFT = _PERSON_BITS + _ID_SHIFT
+# Greater than all encoded events
+_END = 1 << 128
+
+
+class TimelineEvent(typ.NamedTuple):
+    """The birth or death of a person."""
+    # Date.sort_key of the event’s date
+    date_key: int
+    person_id: int
+    kind: int
+
+
+def _encode(date_key: int, person_id: int, kind: int) -> int:
+    return date_key << _KEY_SHIFT | person_id << _ID_SHIFT | kind
+
+
+def _decode(value: int) -> TimelineEvent:
+    return TimelineEvent(value >> _KEY_SHIFT, (value >> _ID_SHIFT) & ((1 << _PERSON_BITS) - 1), value & 1)
+
+
+def _bound(date: Date | None, default: int) -> int:
+    """Returns the encoded value of the first event on or after the given date.
+    Partial dates denote the start of their period."""
+    if date is None:
+        return default
+    # Clear the precision rank so that all events of the period are included
+    return (date.sort_key & ~0b11) << _KEY_SHIFT
+
+
+class SortedList:
+    """A list of integers kept in ascending order, stored in chunks of bounded size, so that inserting or removing
+    a value only moves the values of one chunk, while finding a value or a position takes a binary search.
+    """
+    # Chunks are split when they reach twice this size
+    LOAD = 1000
+
+    def __init__(self, values: typ.Iterable[int] = ()):
+        values = sorted(values)
+        self._chunks: list[list[int]] = [values[i:i + self.LOAD] for i in range(0, len(values), self.LOAD)]
+        # Last value of each chunk
+        self._maxes: list[int] = [chunk[-1] for chunk in self._chunks]
+        self._len = len(values)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self) -> typ.Iterator[int]:
+        return itertools.chain.from_iterable(self._chunks)
+
+    def __contains__(self, value: int):
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            return False
+        chunk = self._chunks[i]
+        j = bisect.bisect_left(chunk, value)
+        return chunk[j] == value
+
+    def add(self, value: int):
+        if not self._chunks:
+            self._chunks.append([value])
+            self._maxes.append(value)
+        else:
+            i = min(bisect.bisect_left(self._maxes, value), len(self._maxes) - 1)
+            chunk = self._chunks[i]
+            bisect.insort(chunk, value)
+            self._maxes[i] = chunk[-1]
+            if len(chunk) >= 2 * self.LOAD:
+                self._chunks.insert(i + 1, chunk[self.LOAD:])
+                del chunk[self.LOAD:]
+                self._maxes.insert(i, chunk[-1])
+        self._len += 1
+
+    def remove(self, value: int):
+        """Removes a value.
+
+        :raise ValueError: If the value is not in this list.
+        """
+        i = bisect.bisect_left(self._maxes, value)
+        if i < len(self._maxes):
+            chunk = self._chunks[i]
+            j = bisect.bisect_left(chunk, value)
+            if chunk[j] == value:
+                del chunk[j]
+                if chunk:
+                    self._maxes[i] = chunk[-1]
+                else:
+                    del self._chunks[i]
+                    del self._maxes[i]
+                self._len -= 1
+                return
+        raise ValueError(f'{value} not in list')
+
+    def bisect_left(self, value: int) -> int:
+        """Returns the position of the first value that is greater than or equal to the given one."""
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            return self._len
+        return sum(map(len, self._chunks[:i])) + bisect.bisect_left(self._chunks[i], value)
+
+    def islice(self, start: int, stop: int) -> typ.Iterator[int]:
+        """Iterates over the values between two positions, the second one excluded."""
+        start, stop = max(start, 0), min(stop, self._len)
+        offset = 0
+        for chunk in self._chunks:
+            if offset >= stop:
+                break
+            if offset + len(chunk) > start:
+                yield from chunk[max(start - offset, 0):stop - offset]
+            offset += len(chunk)
+
+    def irange(self, minimum: int, maximum: int) -> typ.Iterator[int]:
+        """Iterates over the values that are greater than or equal to minimum and less than maximum."""
+        i = bisect.bisect_left(self._maxes, minimum)
+        for chunk in itertools.islice(self._chunks, i, None):
+            j = bisect.bisect_left(chunk, minimum) if chunk[0] < minimum else 0
+            for value in itertools.islice(chunk, j, None):
+                if value >= maximum:
+                    return
+                yield value
+
+
+class TimelineIndex:
+    """Keeps the births and deaths of the persons of a tree sorted by date, globally, by person and by place,
+    so that events within a date range can be listed or paged through without sorting them.
+    Events without a date or whose date has no year are not indexed.
+
+    Once attached to a tree, the index is kept up to date as persons are added, edited or removed.
+    """
+
+    def __init__(self):
+        self._events = SortedList()
+        self._person_events: dict[int, tuple[int, ...]] = {}
+        self._place_events: dict[Place, SortedList] = {}
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree) -> TimelineIndex:
+        """Creates the index of all persons in the given tree and attaches it to the tree."""
+        index = cls()
+        values = []
+        places: dict[Place, list[int]] = {}
+        for person_id, person in tree.persons():
+            events = index._person_values(person_id, person)
+            if events:
+                index._person_events[person_id] = tuple(value for value, _ in events)
+                values.extend(value for value, _ in events)
+                for value, place in events:
+                    if place is not None:
+                        places.setdefault(place, []).append(value)
+        index._events = SortedList(values)
+        index._place_events = {place: SortedList(place_values) for place, place_values in places.items()}
+        tree.add_listener(index.on_tree_changed)
+        return index
+
+    def __len__(self):
+        """Returns the number of indexed events."""
+        return len(self._events)
+
+    def on_tree_changed(self, change: TreeChange):
+        if change.old_person is not None:
+            self.remove(change.person_id, change.old_person)
+        if change.new_person is not None:
+            self.add(change.person_id, change.new_person)
+
+    def add(self, person_id: int, person: Person):
+        """Indexes the events of a person.
+
+        :raise ValueError: If the person is already indexed.
+        """
+        if person_id in self._person_events:
+            raise ValueError(f'duplicate person ID {person_id}')
+        events = self._person_values(person_id, person)
+        if not events:
+            return
+        self._person_events[person_id] = tuple(value for value, _ in events)
+        for value, place in events:
+            self._events.add(value)
+            if place is not None:
+                self._place_events.setdefault(place, SortedList()).add(value)
+
+    def remove(self, person_id: int, person: Person):
+        """Removes the events of a person, as they were indexed. Does nothing if they are not indexed."""
+        if self._person_events.pop(person_id, None) is None:
+            return
+        for value, place in self._person_values(person_id, person):
+            self._events.remove(value)
+            if place is not None:
+                place_events = self._place_events[place]
+                place_events.remove(value)
+                if not place_events:
+                    del self._place_events[place]
+
+    def events(self, start: Date = None, end: Date = None) -> typ.Iterator[TimelineEvent]:
+        """Iterates over the events between two dates in chronological order.
+
+        :param start: Date of the first events. Partial dates denote the start of their period. If None,
+            iteration starts from the first event.
+        :param end: Date after the last events, excluded. Partial dates denote the start of their period. If None,
+            iteration stops after the last event.
+        """
+        return map(_decode, self._events.irange(_bound(start, 0), _bound(end, _END)))
+
+    def count(self, start: Date = None, end: Date = None) -> int:
+        """Returns the number of events between two dates, the end excluded."""
+        return self._events.bisect_left(_bound(end, _END)) - self._events.bisect_left(_bound(start, 0))
+
+    def page(self, offset: int, count: int, start: Date = None) -> list[TimelineEvent]:
+        """Returns a page of events in chronological order.
+
+        :param offset: Number of events to skip after the start date.
+        :param count: Maximum number of events to return.
+        :param start: Date of the first events. If None, pages start from the first event.
+        """
+        first = self._events.bisect_left(_bound(start, 0)) + offset
+        return [_decode(value) for value in self._events.islice(first, first + count)]
+
+    def person_events(self, person_id: int) -> list[TimelineEvent]:
+        """Returns the events of a person in chronological order."""
+        return [_decode(value) for value in self._person_events.get(person_id, ())]
+
+    def family_events(self, person_ids: typ.Iterable[int], start: Date = None, end: Date = None) \
+            -> list[TimelineEvent]:
+        """Returns the events of a group of persons, such as a family, between two dates in chronological order."""
+        minimum, maximum = _bound(start, 0), _bound(end, _END)
+        values = heapq.merge(*(self._person_events.get(person_id, ()) for person_id in set(person_ids)))
+        return [_decode(value) for value in values if minimum <= value < maximum]
+
+    def place_events(self, place: Place, start: Date = None, end: Date = None) -> typ.Iterator[TimelineEvent]:
+        """Iterates over the events that happened in a place between two dates in chronological order."""
+        place_events = self._place_events.get(place)
+        if place_events is None:
+            return iter(())
+        return map(_decode, place_events.irange(_bound(start, 0), _bound(end, _END)))
+
+    @staticmethod
+    def _person_values(person_id: int, person: Person) -> list[tuple[int, Place | None]]:
+        """Returns the encoded events of a person with their places, in chronological order."""
+        if not 0 <= person_id < 1 << _PERSON_BITS:
+            raise ValueError(f'person ID out of range: {person_id}')
+        events = []
+        for kind, event in ((BIRTH, person.birthday), (DEATH, person.death)):
+            if event is not None and event.date is not None and event.date.year_set:
+                events.append((_encode(event.date.sort_key, person_id, kind), event.place))
+        events.sort(key=lambda e: e[0])
+        return events
@@ -0,0 +1,216 @@
+"""This module defines the family tree, i.e. the container of all persons of a research file."""
+from __future__ import annotations
+
+import dataclasses
+import typing as typ
+
+from .person_store import PersonStore, Tables
+from ..entities import Person
+
+# Persons are stored in buckets of 2^_BUCKET_BITS consecutive IDs.
+# Snapshots share the buckets with the tree, only the buckets modified afterwards are copied.
+_BUCKET_BITS = 10
+_BUCKET_SIZE = 1 << _BUCKET_BITS
+
+
+@dataclasses.dataclass(frozen=True)
+class TreeChange:
+    """A change made to a FamilyTree: old_person is None if the person was added,
+    new_person is None if it was removed."""
+    person_id: int
+    old_person: Person | None
+    new_person: Person | None
+
+
+TreeListener = typ.Callable[[TreeChange], None]
+
+
+class TreeSnapshot:
+    """An immutable view of a FamilyTree at a given revision.
+
+    Creating a snapshot is O(n / 1024) as the person buckets are shared with the tree until it is modified.
+    Snapshots may safely be read from other threads.
+    """
+
+    def __init__(self, buckets: tuple[PersonStore, ...], tables: Tables, size: int, next_id: int, revision: int):
+        self.__buckets = buckets
+        self.__tables = tables
+        self.__size = size
+        self.__next_id = next_id
+        self.__revision = revision
+
+    @property
+    def revision(self) -> int:
+        """The revision of the tree this snapshot was taken at."""
+        return self.__revision
+
+    @property
+    def next_id(self) -> int:
+        return self.__next_id
+
+    @property
+    def buckets(self) -> tuple[PersonStore, ...]:
+        return self.__buckets
+
+    @property
+    def tables(self) -> Tables:
+        """The tables of the values interned by the persons of this snapshot."""
+        return self.__tables
+
+    def get_person(self, person_id: int) -> Person | None:
+        bucket_index = person_id >> _BUCKET_BITS
+        if 0 <= bucket_index < len(self.__buckets):
+            return self.__buckets[bucket_index].get(person_id)
+        return None
+
+    def persons(self) -> typ.Iterator[tuple[int, Person]]:
+        """Returns an iterator over the (ID, person) pairs of this snapshot, sorted by ID."""
+        for bucket in self.__buckets:
+            yield from bucket.items()
+
+    def __len__(self):
+        return self.__size
+
+
+class FamilyTree:
+    """A family tree. Each person is identified by a unique integer ID.
+
+    Persons are stored in compact columns (see person_store), and the persons read from the tree are views
+    over them with the same attributes as Person. The tree supports cheap copy-on-write snapshots (see snapshot()).
+    """
+
+    def __init__(self):
+        self.__buckets: list[PersonStore] = []
+        self.__tables = Tables()
+        # Whether each bucket is owned by this tree, i.e. not shared with a snapshot.
+        self.__owned: list[bool] = []
+        self.__size = 0
+        self.__next_id = 0
+        self.__revision = 0
+        self.__listeners: list[TreeListener] = []
+
+    @classmethod
+    def from_snapshot(cls, snapshot: TreeSnapshot) -> FamilyTree:
+        """Creates a tree from the given snapshot. The buckets are shared until the new tree is modified."""
+        tree = cls()
+        tree.__buckets = list(snapshot.buckets)
+        tree.__tables = snapshot.tables
+        tree.__owned = [False] * len(tree.__buckets)
+        tree.__size = len(snapshot)
+        tree.__next_id = snapshot.next_id
+        tree.__revision = snapshot.revision
+        return tree
+
+    @property
+    def revision(self) -> int:
+        """The revision number of this tree. It is incremented each time the tree is modified."""
+        return self.__revision
+
+    def add_listener(self, listener: TreeListener):
+        """Adds a function that will be called after each change made to this tree."""
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener: TreeListener):
+        self.__listeners.remove(listener)
+
+    def add_person(self, person: Person, person_id: int = None) -> int:
+        """Adds a person to this tree.
+
+        :param person: The person to add.
+        :param person_id: The ID to give to the person. If None, a new ID is generated.
+        :return: The person’s ID.
+        :raise ValueError: If the ID is already used.
+        """
+        if person_id is None:
+            person_id = self.__next_id
+        elif person_id < 0:
+            raise ValueError(f'negative person ID {person_id}')
+        elif person_id in self:
+            raise ValueError(f'duplicate person ID {person_id}')
+        self.__get_writable_bucket(person_id).set(person_id, person)
+        self.__next_id = max(self.__next_id, person_id + 1)
+        self.__size += 1
+        self.__revision += 1
+        self.__notify(TreeChange(person_id, None, person))
+        return person_id
+
+    def update_person(self, person_id: int, person: Person) -> Person:
+        """Replaces the person with the given ID.
+
+        :param person_id: ID of the person to replace.
+        :param person: The new person.
+        :return: The replaced person.
+        :raise KeyError: If no person has the given ID.
+        """
+        old_person = self[person_id]
+        self.__get_writable_bucket(person_id).set(person_id, person)
+        self.__revision += 1
+        self.__notify(TreeChange(person_id, old_person, person))
+        return old_person
+
+    def remove_person(self, person_id: int) -> Person:
+        """Removes the person with the given ID.
+
+        :param person_id: ID of the person to remove.
+        :return: The removed person.
+        :raise KeyError: If no person has the given ID.
+        """
+        old_person = self[person_id]
+        self.__get_writable_bucket(person_id).remove(person_id)
+        self.__size -= 1
+        self.__revision += 1
+        self.__notify(TreeChange(person_id, old_person, None))
+        return old_person
+
+    @property
+    def next_id(self) -> int:
+        """The ID given to the next person added without an explicit ID."""
+        return self.__next_id
+
+    def reserve_ids(self, next_id: int):
+        """Makes sure that no ID below next_id is generated, e.g. to not reuse the IDs of removed persons."""
+        self.__next_id = max(self.__next_id, next_id)
+
+    def get_person(self, person_id: int) -> Person | None:
+        bucket_index = person_id >> _BUCKET_BITS
+        if 0 <= bucket_index < len(self.__buckets):
+            return self.__buckets[bucket_index].get(person_id)
+        return None
+
+    def persons(self) -> typ.Iterator[tuple[int, Person]]:
+        """Returns an iterator over the (ID, person) pairs of this tree, sorted by ID.
+        The tree must not be modified during the iteration."""
+        for bucket in self.__buckets:
+            yield from bucket.items()
+
+    def snapshot(self) -> TreeSnapshot:
+        """Takes a snapshot of this tree. All buckets become shared with the snapshot
+        and will be copied the first time they are modified."""
+        self.__owned = [False] * len(self.__buckets)
+        return TreeSnapshot(tuple(self.__buckets), self.__tables, self.__size, self.__next_id, self.__revision)
+
+    def __notify(self, change: TreeChange):
+        for listener in self.__listeners:
+            listener(change)
+
+    def __get_writable_bucket(self, person_id: int) -> PersonStore:
+        bucket_index = person_id >> _BUCKET_BITS
+        while bucket_index >= len(self.__buckets):
+            self.__buckets.append(PersonStore(len(self.__buckets) * _BUCKET_SIZE, _BUCKET_SIZE, self.__tables))
+            self.__owned.append(True)
+        if not self.__owned[bucket_index]:
+            self.__buckets[bucket_index] = self.__buckets[bucket_index].copy()
+            self.__owned[bucket_index] = True
+        return self.__buckets[bucket_index]
+
+    def __getitem__(self, person_id: int) -> Person:
+        person = self.get_person(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return person
+
+    def __contains__(self, person_id: int):
+        return self.get_person(person_id) is not None
+
+    def __len__(self):
+        return self.__size
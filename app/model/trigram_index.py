@@ -0,0 +1,125 @@
+"""Trigram index over the names of the persons of a tree, for substring and fuzzy searches as the user types."""
+from __future__ import annotations
+
+import collections
+import dataclasses
+import math
+import typing as typ
+
+from .text_index import tokenize
+from .tree import FamilyTree, TreeChange
+from ..entities import Person
+
+
+@dataclasses.dataclass(frozen=True)
+class Match:
+    person_id: int
+    score: float
+
+
+def trigrams(s: str, last_word_complete: bool = True) -> set[str]:
+    """Returns the trigrams of the words of the given string.
+    Words are padded so that their first and last letters also make trigrams.
+
+    :param s: The string to split.
+    :param last_word_complete: If false, the last word is considered a prefix and its end is not padded.
+    """
+    words = tokenize(s)
+    result = set()
+    for i, word in enumerate(words):
+        padded = '  ' + word + (' ' if last_word_complete or i < len(words) - 1 else '')
+        result.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return result
+
+
+class TrigramIndex:
+    """Maps the trigrams of the names of persons to their IDs.
+
+    Once attached to a tree, the index is kept up to date as persons are added, edited or removed.
+    """
+
+    def __init__(self):
+        self._postings: dict[str, set[int]] = collections.defaultdict(set)
+        self._trigrams_count: dict[int, int] = {}
+
+    @classmethod
+    def for_tree(cls, tree: FamilyTree) -> TrigramIndex:
+        """Creates an index of all persons in the given tree and attaches it to the tree."""
+        index = cls()
+        for person_id, person in tree.persons():
+            index.add(person_id, person)
+        tree.add_listener(index.on_tree_changed)
+        return index
+
+    def add(self, person_id: int, person: Person):
+        person_trigrams = trigrams(person.full_name)
+        for trigram in person_trigrams:
+            self._postings[trigram].add(person_id)
+        self._trigrams_count[person_id] = len(person_trigrams)
+
+    def remove(self, person_id: int, person: Person):
+        """Removes a person from this index.
+
+        :param person_id: The person’s ID.
+        :param person: The person as it was when it was indexed.
+        """
+        for trigram in trigrams(person.full_name):
+            if (ids := self._postings.get(trigram)) is not None:
+                ids.discard(person_id)
+                if not ids:
+                    del self._postings[trigram]
+        self._trigrams_count.pop(person_id, None)
+
+    def on_tree_changed(self, change: TreeChange):
+        if change.old_person is not None:
+            self.remove(change.person_id, change.old_person)
+        if change.new_person is not None:
+            self.add(change.person_id, change.new_person)
+
+    def query(self, s: str, min_similarity: float = 0.5, batch_size: int = 50,
+              cancelled: typ.Callable[[], bool] = None) -> typ.Iterator[list[Match]]:
+        """Looks for the persons whose name is similar to the given string.
+        The last word of the string is considered as being typed and matches the names it is a prefix of.
+
+        Results are returned lazily in batches, by decreasing number of trigrams shared with the query
+        then by decreasing similarity. The first batches only require intersecting the rarest trigrams’ postings,
+        hence they are returned quickly even for large trees.
+
+        The index may be modified between two batches, e.g. by another thread: the persons removed meanwhile
+        are skipped, but later batches may not reflect the other changes. The iteration may be interrupted
+        at any time.
+
+        :param s: The string to look for.
+        :param min_similarity: Minimum proportion of the query’s trigrams that a name must contain.
+        :param batch_size: Maximum number of matches per batch.
+        :param cancelled: An optional function that returns true when the query should be stopped.
+        :return: An iterator over batches of matches.
+        """
+        query_trigrams = trigrams(s, last_word_complete=False)
+        if not query_trigrams:
+            return
+        # Rarest trigrams first
+        postings = sorted((self._postings.get(t, set()) for t in query_trigrams), key=len)
+        n = len(postings)
+        min_shared = max(1, math.ceil(n * min_similarity))
+        # Candidates grouped by the number of trigrams they share with the query
+        candidates: dict[int, list[int]] = collections.defaultdict(list)
+        seen = set()
+        for shared in range(n, min_shared - 1, -1):
+            # Prefix filtering: a name sharing `shared` trigrams with the query appears
+            # in at least one of the (n - shared + 1) rarest postings, so all of them have been seen at this point.
+            for i, person_id in enumerate(postings[n - shared] - seen):
+                if cancelled and i % 1000 == 0 and cancelled():
+                    return
+                seen.add(person_id)
+                candidates[sum(person_id in p for p in postings)].append(person_id)
+            matches = [
+                # Jaccard similarity
+                Match(person_id, shared / (n + count - shared))
+                for person_id in candidates.pop(shared, [])
+                # Skip the persons removed since they were collected
+                if (count := self._trigrams_count.get(person_id)) is not None
+            ]
+            matches.sort(key=lambda m: (-m.score, m.person_id))
+            for i in range(0, len(matches), batch_size):
+                yield matches[i:i + batch_size]
@@ -1,23 +1,23 @@
-class LastName:
-    def __init__(self, label):
-        self.__label = label
+from __future__ import annotations
+
+import dataclasses
 
+from .model import date as _date
 
-class Date:
-    def __init__(self, day, month, year):
-        self.__day = day
-        self.__month = month
-        self.__year = year
+
+@dataclasses.dataclass(frozen=True)
+class LastName:
+    label: str
 
 
+@dataclasses.dataclass(frozen=True)
 class Place:
-    def __init__(self, label, x, y):
-        self.__label = label
-        self.__x = x
-        self.__y = y
+    label: str
+    x: float = None
+    y: float = None
 
 
+@dataclasses.dataclass(frozen=True)
 class Event:
-    def __init__(self, date: Date, place: Place):
-        self.__date = date
-        self.__place = place
+    date: _date.Date = None
+    place: Place = None
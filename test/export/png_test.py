@@ -0,0 +1,70 @@
+import io
+import struct
+import zlib
+
+import pytest
+
+from app.export.png import SIGNATURE, PngWriter
+
+
+def _chunks(data: bytes) -> list[tuple[bytes, bytes]]:
+    assert data.startswith(SIGNATURE)
+    chunks = []
+    i = len(SIGNATURE)
+    while i < len(data):
+        length, = struct.unpack('>I', data[i:i + 4])
+        chunk_type, chunk_data = data[i + 4:i + 8], data[i + 8:i + 8 + length]
+        crc, = struct.unpack('>I', data[i + 8 + length:i + 12 + length])
+        assert crc == zlib.crc32(chunk_type + chunk_data)
+        chunks.append((chunk_type, chunk_data))
+        i += 12 + length
+    return chunks
+
+
+class TestPngWriter:
+    def test_image(self):
+        f = io.BytesIO()
+        writer = PngWriter(f, 2, 2)
+        writer.write_row(bytes([255, 0, 0, 0, 255, 0]))
+        writer.write_row(bytes([0, 0, 255, 255, 255, 255]))
+        writer.close()
+        chunks = _chunks(f.getvalue())
+        assert chunks[0] == (b'IHDR', struct.pack('>IIBBBBB', 2, 2, 8, 2, 0, 0, 0))
+        assert chunks[-1] == (b'IEND', b'')
+        pixels = zlib.decompress(b''.join(data for chunk_type, data in chunks if chunk_type == b'IDAT'))
+        assert pixels == bytes([0, 255, 0, 0, 0, 255, 0, 0, 0, 0, 255, 255, 255, 255])
+
+    def test_large_image_split_into_chunks(self):
+        f = io.BytesIO()
+        width, height = 1000, 200
+        writer = PngWriter(f, width, height, compression_level=0)
+        for y in range(height):
+            writer.write_row(bytes([y % 256]) * (3 * width))
+        writer.close()
+        chunks = _chunks(f.getvalue())
+        idat = [data for chunk_type, data in chunks if chunk_type == b'IDAT']
+        assert len(idat) > 1
+        pixels = zlib.decompress(b''.join(idat))
+        assert len(pixels) == height * (1 + 3 * width)
+
+    def test_wrong_row_length(self):
+        writer = PngWriter(io.BytesIO(), 2, 2)
+        with pytest.raises(ValueError):
+            writer.write_row(bytes(5))
+
+    def test_too_many_rows(self):
+        writer = PngWriter(io.BytesIO(), 1, 1)
+        writer.write_row(bytes(3))
+        with pytest.raises(ValueError):
+            writer.write_row(bytes(3))
+
+    def test_missing_rows(self):
+        writer = PngWriter(io.BytesIO(), 1, 2)
+        writer.write_row(bytes(3))
+        with pytest.raises(ValueError):
+            writer.close()
+
+    @pytest.mark.parametrize('width, height', [(0, 1), (1, 0), (2 ** 31, 1)])
+    def test_invalid_dimensions(self, width, height):
+        with pytest.raises(ValueError):
+            PngWriter(io.BytesIO(), width, height)
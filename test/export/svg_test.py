@@ -0,0 +1,34 @@
+import io
+from xml.etree import ElementTree
+
+from app.export.svg import SvgWriter
+
+NS = '{http://www.w3.org/2000/svg}'
+
+
+class TestSvgWriter:
+    def test_document(self):
+        f = io.StringIO()
+        writer = SvgWriter(f, 200, 100.5, (-100, -50, 200, 100.5), stylesheet='.a > text { fill: red; }')
+        writer.rect(-10, -5, 20, 10, radius=5, css_class='box')
+        writer.polyline([(0, 0), (0, 10.25), (5, 10.25)])
+        writer.text(0, 0, 'Dupont & <fils>', css_class='name')
+        writer.close()
+        root = ElementTree.fromstring(f.getvalue())
+        assert root.get('width') == '200'
+        assert root.get('height') == '100.5'
+        assert root.get('viewBox') == '-100 -50 200 100.5'
+        assert root.find(NS + 'style').text == '.a > text { fill: red; }'
+        rect = root.find(NS + 'rect')
+        assert rect.attrib == {'x': '-10', 'y': '-5', 'width': '20', 'height': '10', 'rx': '5', 'class': 'box'}
+        assert root.find(NS + 'polyline').get('points') == '0,0 0,10.25 5,10.25'
+        text = root.find(NS + 'text')
+        assert text.text == 'Dupont & <fils>'
+        assert text.get('class') == 'name'
+
+    def test_no_radius(self):
+        f = io.StringIO()
+        writer = SvgWriter(f, 10, 10, (0, 0, 10, 10))
+        writer.rect(0, 0, 1, 1)
+        writer.close()
+        assert 'rx' not in ElementTree.fromstring(f.getvalue()).find(NS + 'rect').attrib
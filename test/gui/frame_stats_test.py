@@ -0,0 +1,56 @@
+import csv
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from app.gui import constants, frame_stats
+from app.gui.frame_stats import FrameSample, FrameStats
+
+
+def _sample(paint_time: float, time: float = 0) -> FrameSample:
+    return FrameSample(time=time, paint_time=paint_time, layout_time=0, nodes_drawn=1, nodes_culled=2,
+                       tile_hits=3, tile_misses=4)
+
+
+class TestFrameStats:
+    def test_histogram(self):
+        stats = FrameStats()
+        for paint_time in (0.0005, 0.001, 0.003, 0.003, constants.FRAME_DURATION, 0.02, 1):
+            stats.add(_sample(paint_time))
+        assert stats.histogram() == [2, 0, 2, 0, 1, 1, 1]
+
+    def test_histogram_empty(self):
+        assert FrameStats().histogram() == [0] * (len(FrameStats.BINS) + 1)
+
+    def test_histogram_rolling_window(self):
+        stats = FrameStats()
+        stats.add(_sample(1))
+        for _ in range(FrameStats.WINDOW_SIZE):
+            stats.add(_sample(0))
+        assert stats.histogram()[0] == FrameStats.WINDOW_SIZE
+        assert stats.histogram()[-1] == 0
+
+    def test_export_csv(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(frame_stats.constants, 'LOGS_DIR', tmp_path)
+        stats = FrameStats()
+        stats.add(_sample(0.5, time=10))
+        stats.add(_sample(0.25, time=11))
+        path = stats.export_csv()
+        assert path.parent == tmp_path
+        with path.open(encoding='UTF-8', newline='') as f:
+            rows = list(csv.reader(f))
+        assert rows == [
+            ['time', 'paint_time', 'layout_time', 'nodes_drawn', 'nodes_culled', 'tile_hits', 'tile_misses'],
+            ['10', '0.5', '0', '1', '2', '3', '4'],
+            ['11', '0.25', '0', '1', '2', '3', '4'],
+        ]
+
+    def test_max_samples(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(frame_stats.constants, 'LOGS_DIR', tmp_path)
+        monkeypatch.setattr(FrameStats, 'MAX_SAMPLES', 3)
+        stats = FrameStats()
+        for i in range(5):
+            stats.add(_sample(0, time=i))
+        with stats.export_csv().open(encoding='UTF-8', newline='') as f:
+            assert [row[0] for row in csv.reader(f)] == ['time', '2', '3', '4']
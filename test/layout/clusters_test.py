@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from app.entities import Person
+from app.layout.clusters import ClusterIndex, project, unproject
+from app.model.tree import FamilyTree
+from app.utils import Event, LastName, Place
+
+PARIS = Place('Paris', 2.3522, 48.8566)
+VERSAILLES = Place('Versailles', 2.1301, 48.8049)
+LYON = Place('Lyon', 4.8357, 45.7640)
+NOWHERE = Place('Nowhere')
+
+
+def _person(birth_place: Place = None, death_place: Place = None) -> Person:
+    return Person(LastName('X'), ('Y',), birthday=Event(place=birth_place) if birth_place else None,
+                  death=Event(place=death_place) if death_place else None)
+
+
+class TestProject:
+    def test_origin(self):
+        assert project(0, 0) == pytest.approx((0.5, 0.5))
+
+    def test_corners(self):
+        assert project(-180, 90) == pytest.approx((0, 0))
+        assert project(180, -90) == pytest.approx((1, 1))
+
+    def test_unproject(self):
+        assert unproject(*project(PARIS.x, PARIS.y)) == pytest.approx((PARIS.x, PARIS.y))
+
+
+class TestClusterIndex:
+    @pytest.fixture
+    def tree(self):
+        tree = FamilyTree()
+        tree.add_person(_person(PARIS, LYON))
+        tree.add_person(_person(VERSAILLES, PARIS))
+        tree.add_person(_person(NOWHERE, PARIS))
+        return tree
+
+    def test_for_tree(self, tree):
+        index = ClusterIndex.for_tree(tree)
+        assert len(index) == 5
+        [cluster] = index.clusters(0)
+        assert cluster.count == 5 and cluster.place is None
+        mx, my = project(PARIS.x, PARIS.y)
+        vx, vy = project(VERSAILLES.x, VERSAILLES.y)
+        lx, ly = project(LYON.x, LYON.y)
+        assert (cluster.x, cluster.y) == pytest.approx(((3 * mx + vx + lx) / 5, (3 * my + vy + ly) / 5))
+
+    def test_zoom_levels(self, tree):
+        index = ClusterIndex.for_tree(tree)
+        clusters = index.clusters(8)
+        assert sorted((c.count, c.place and c.place.label) for c in clusters) == [(1, 'Lyon'), (4, None)]
+        clusters = index.clusters(ClusterIndex.MAX_ZOOM + 1)
+        assert sorted((c.count, c.place.label) for c in clusters) == [(1, 'Lyon'), (1, 'Versailles'), (3, 'Paris')]
+
+    def test_rect(self, tree):
+        index = ClusterIndex.for_tree(tree)
+        x1, y1 = project(4, 46)
+        x2, y2 = project(5, 45)
+        assert [c.place for c in index.clusters(10, (x1, y1, x2, y2))] == [LYON]
+        assert index.clusters(10, (0, 0, 0.1, 0.1)) == []
+
+    def test_children(self, tree):
+        index = ClusterIndex.for_tree(tree)
+        [cluster] = index.clusters(0)
+        zoom = index.expansion_zoom(cluster)
+        children = index.clusters(zoom)
+        assert len(children) == 2
+        assert sum(c.count for c in children) == 5
+        for child in children:
+            assert child in index.children(index.clusters(zoom - 1)[0])
+
+    def test_expansion_zoom_single_place(self, tree):
+        index = ClusterIndex.for_tree(tree)
+        cluster = next(c for c in index.clusters(8) if c.place == LYON)
+        assert index.expansion_zoom(cluster) == 8
+
+    def test_update(self, tree):
+        index = ClusterIndex.for_tree(tree)
+        tree.update_person(1, _person(LYON))
+        assert sorted((c.count, c.place.label) for c in index.clusters(8)) == [(2, 'Lyon'), (2, 'Paris')]
+        tree.remove_person(0)
+        tree.remove_person(1)
+        [cluster] = index.clusters(3)
+        assert cluster.count == 1 and cluster.place == PARIS
+        tree.remove_person(2)
+        assert index.clusters(0) == [] and len(index) == 0
+
+    def test_random(self):
+        rng = random.Random(0)
+        places = [Place(str(i), rng.uniform(-10, 10), rng.uniform(40, 50)) for i in range(300)]
+        tree = FamilyTree()
+        for _ in range(1000):
+            tree.add_person(_person(rng.choice(places), rng.choice(places)))
+        index = ClusterIndex.for_tree(tree)
+        for person_id in range(0, 1000, 3):
+            tree.remove_person(person_id)
+        expected = ClusterIndex.for_tree(tree)
+        for zoom in range(0, ClusterIndex.MAX_ZOOM + 2, 3):
+            actual = sorted(index.clusters(zoom), key=lambda c: c.cell)
+            assert [(c.cell, c.count, c.place) for c in actual] \
+                   == [(c.cell, c.count, c.place) for c in sorted(expected.clusters(zoom), key=lambda c: c.cell)]
+            assert sum(c.count for c in actual) == len(expected)
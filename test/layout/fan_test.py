@@ -0,0 +1,73 @@
+import math
+
+import pytest
+
+from app.entities import Person
+from app.layout import fan
+from app.model.family import FamilyIndex
+from app.model.tree import FamilyTree
+from app.utils import LastName
+
+CONFIG = fan.FanConfig(center_radius=10, ring_width=20, angle=180)
+
+
+def _person(*parent_ids: int) -> Person:
+    return Person(LastName('X'), (), parent_ids=parent_ids)
+
+
+def _point(radius: float, angle: float) -> tuple[float, float]:
+    return radius * math.cos(math.radians(angle)), -radius * math.sin(math.radians(angle))
+
+
+class TestSectors:
+    def test_generation(self):
+        assert [fan.generation(n) for n in (1, 2, 3, 4, 7, 8)] == [0, 1, 1, 2, 2, 3]
+
+    def test_sectors(self):
+        sectors = fan.sectors(3, CONFIG)
+        assert len(sectors) == 8
+        assert sectors[1] == fan.Sector(1, 0, 10, 0, 360)
+        assert sectors[2] == fan.Sector(2, 10, 30, 90, 90)
+        assert sectors[3] == fan.Sector(3, 10, 30, 0, 90)
+        assert sectors[4] == fan.Sector(4, 30, 50, 135, 45)
+        assert sectors[7] == fan.Sector(7, 30, 50, 0, 45)
+
+    def test_sectors_cached(self):
+        assert fan.sectors(5, CONFIG) is fan.sectors(5, CONFIG)
+
+    def test_no_generations(self):
+        assert fan.sectors(0, CONFIG) == ()
+        assert fan.sector_at(0, 0, 0, CONFIG) is None
+
+    @pytest.mark.parametrize('generations', [1, 4, 8])
+    def test_sector_at_matches_sectors(self, generations):
+        for sector in fan.sectors(generations, CONFIG)[2:]:
+            x, y = _point(sector.middle_radius, sector.middle_angle)
+            assert fan.sector_at(x, y, generations, CONFIG) == sector.sosa
+
+    def test_sector_at_center(self):
+        assert fan.sector_at(3, -4, 3, CONFIG) == 1
+
+    def test_sector_at_outside(self):
+        assert fan.sector_at(*_point(60, 45), 3, CONFIG) is None  # Beyond the last ring
+        assert fan.sector_at(*_point(20, -45), 3, CONFIG) is None  # Outside of the fan’s angle
+
+
+class TestAhnentafel:
+    def test_ahnentafel(self):
+        tree = FamilyTree()
+        tree.add_person(_person())  # 0
+        tree.add_person(_person())  # 1
+        tree.add_person(_person(0))  # 2
+        tree.add_person(_person(2, 1))  # 3
+        family = FamilyIndex(tree)
+        assert fan.ahnentafel(family, 3, 3) == {1: 3, 2: 2, 3: 1, 4: 0}
+        assert fan.ahnentafel(family, 3, 2) == {1: 3, 2: 2, 3: 1}
+
+    def test_missing_root(self):
+        assert fan.ahnentafel(FamilyIndex(FamilyTree()), 0, 3) == {}
+
+    def test_no_root(self):
+        tree = FamilyTree()
+        tree.add_person(_person())
+        assert fan.ahnentafel(FamilyIndex(tree), None, 3) == {}
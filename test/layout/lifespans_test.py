@@ -0,0 +1,106 @@
+import pytest
+
+from app.entities import Person
+from app.layout.lifespans import DEFAULT_LIFESPAN, Bar, RowLayout, date_at, lifespan, tick_bins, year_of
+from app.model.date import Date
+from app.utils import Event, LastName
+
+
+def _person(birth: Date = None, death: Date = None) -> Person:
+    return Person(LastName('X'), ('Y',), birthday=Event(birth) if birth else None,
+                  death=Event(death) if death else None)
+
+
+def _no_overlap(layout: RowLayout) -> bool:
+    bars = sorted(layout.bars(0, len(layout), -10_000, 10_000), key=lambda b: (b.row, b.start))
+    return all(b1.end + RowLayout.GAP <= b2.start for b1, b2 in zip(bars, bars[1:]) if b1.row == b2.row)
+
+
+class TestYearOf:
+    def test_year(self):
+        assert year_of(Date(year=1850)) == 1850
+
+    def test_month(self):
+        assert year_of(Date(month=7, year=1850)) == 1850.5
+
+    def test_day(self):
+        assert 1850 < year_of(Date(day=2, month=1, year=1850)) < year_of(Date(month=2, year=1850))
+
+
+class TestDateAt:
+    def test_start_of_year(self):
+        assert repr(date_at(1850)) == '01/01/1850'
+
+    def test_end_of_year(self):
+        assert repr(date_at(1850.9999)) == '31/12/1850'
+
+    def test_negative(self):
+        assert repr(date_at(-10.25)) == '01/10/-11'
+
+    def test_inverse(self):
+        date = Date(day=15, month=8, year=1900)
+        assert repr(date_at(year_of(date))) == repr(date)
+
+
+class TestLifespan:
+    def test_both(self):
+        assert lifespan(_person(Date(year=1850), Date(year=1900))) == (1850, 1900, False)
+
+    def test_birth_only(self):
+        assert lifespan(_person(Date(year=1850))) == (1850, 1850 + DEFAULT_LIFESPAN, True)
+
+    def test_death_only(self):
+        assert lifespan(_person(None, Date(year=1900))) == (1900 - DEFAULT_LIFESPAN, 1900, True)
+
+    def test_none(self):
+        assert lifespan(_person(Date(day=1, month=1))) is None
+
+
+class TestRowLayout:
+    def test_minimum_rows(self):
+        layout = RowLayout([('a', 0, 10), ('b', 5, 15), ('c', 12, 20), ('d', 16, 30)])
+        assert len(layout) == 2
+        assert layout.row_of('a') == layout.row_of('c') and layout.row_of('b') == layout.row_of('d')
+        assert _no_overlap(layout)
+
+    def test_gap(self):
+        layout = RowLayout([('a', 0, 10), ('b', 10.5, 20)])
+        assert len(layout) == 2
+
+    def test_add_into_hole(self):
+        layout = RowLayout([('a', 0, 10), ('b', 0, 10), ('c', 30, 40)])
+        assert layout.add('d', 15, 25) == 0
+        assert layout.add('e', 5, 8) == 2
+        assert _no_overlap(layout)
+
+    def test_add_duplicate(self):
+        with pytest.raises(ValueError):
+            RowLayout([('a', 0, 10)]).add('a', 20, 30)
+
+    def test_remove(self):
+        layout = RowLayout([('a', 0, 10), ('b', 5, 15)])
+        layout.remove('b')
+        assert len(layout) == 1 and 'b' not in layout
+        layout.remove('b')
+
+    def test_bars(self):
+        layout = RowLayout([('a', 0, 10), ('b', 12, 20), ('c', 30, 40), ('d', 5, 35)])
+        assert sorted(b.key for b in layout.bars(0, 0, 11, 25)) == ['b']
+        assert sorted(b.key for b in layout.bars(0, 1, 11, 25)) == ['b', 'd']
+        assert list(layout.bars(1, 1, 36, 50)) == []
+        assert Bar('a', 0, 0, 10) in layout.bars(0, 0, 0, 0)
+
+    def test_bounds(self):
+        assert RowLayout().bounds() is None
+        assert RowLayout([('a', 0, 10), ('b', 5, 35)]).bounds() == (0, 35)
+
+
+class TestTickBins:
+    def test_bins(self):
+        assert tick_bins(0, 10, 100, 10) == [(i, i + 1) for i in range(10)]
+
+    def test_aligned(self):
+        assert tick_bins(0.5, 10.5, 100, 10)[0] == (0, 1)
+
+    def test_empty(self):
+        assert tick_bins(10, 0, 100, 10) == []
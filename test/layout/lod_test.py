@@ -0,0 +1,63 @@
+import pytest
+
+from app.entities import Person
+from app.layout import lod
+from app.layout.tidy import ANCESTORS, LayoutConfig, TreeLayout
+from app.model.date import Date
+from app.model.family import FamilyIndex
+from app.model.tree import FamilyTree
+from app.utils import Event, LastName, Place
+
+CONFIG = LayoutConfig(node_width=10, node_height=10, sibling_gap=2, level_gap=5)
+
+
+def _person(*parent_ids: int) -> Person:
+    return Person(LastName('X'), (), parent_ids=parent_ids)
+
+
+class TestTier:
+    @pytest.mark.parametrize('zoom, tier', [
+        (4, lod.FULL),
+        (0.6, lod.FULL),
+        (0.5, lod.NAMES),
+        (0.25, lod.NAMES),
+        (0.1, lod.DOTS),
+        (0.06, lod.DOTS),
+        (0.05, lod.BANDS),
+        (0.01, lod.BANDS),
+    ])
+    def test_tier(self, zoom, tier):
+        assert lod.tier(zoom) == tier
+
+
+class TestCardDates:
+    def test_dates(self):
+        person = Person(LastName('X'), (), birthday=Event(Date(day=1, month=2, year=1850), Place('P', 1, 2)),
+                        death=Event(Date(year=1900)))
+        assert lod.card_dates(person) == (repr(Date(day=1, month=2, year=1850)), repr(Date(year=1900)))
+        assert 'Event' not in ''.join(lod.card_dates(person))
+        assert 'P' not in ''.join(lod.card_dates(person))
+
+    def test_unknown_dates(self):
+        assert lod.card_dates(Person(LastName('X'), (), death=Event(place=Place('P')))) == ('?', '?')
+        assert lod.card_dates(Person(LastName('X'), (), birthday=Event(Date(year=1850)))) == \
+               (repr(Date(year=1850)), '')
+
+    def test_no_events(self):
+        assert lod.card_dates(Person(LastName('X'), ())) is None
+
+
+class TestGenerationBands:
+    def test_bands(self):
+        tree = FamilyTree()
+        tree.add_person(_person())  # 0
+        tree.add_person(_person())  # 1
+        tree.add_person(_person(0, 1))  # 2
+        layout = TreeLayout(FamilyIndex(tree), 2, mode=ANCESTORS, config=CONFIG)
+        assert lod.generation_bands(layout) == [
+            lod.GenerationBand(depth=0, left=-5, top=-5, right=5, bottom=5, count=1),
+            lod.GenerationBand(depth=1, left=-11, top=-20, right=11, bottom=-10, count=2),
+        ]
+
+    def test_empty_layout(self):
+        assert lod.generation_bands(TreeLayout(FamilyIndex(FamilyTree()), None, config=CONFIG)) == []
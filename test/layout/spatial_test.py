@@ -0,0 +1,82 @@
+import random
+
+from app.layout.spatial import QuadTree, intersects
+
+
+def _brute_force(rects: dict, region) -> set:
+    return {item for item, rect in rects.items() if intersects(rect, region)}
+
+
+class TestQuadTree:
+    def test_query(self):
+        tree = QuadTree()
+        tree.insert('a', (0, 0, 10, 10))
+        tree.insert('b', (20, 20, 30, 30))
+        assert set(tree.query((5, 5, 15, 15))) == {'a'}
+        assert set(tree.query((-100, -100, 100, 100))) == {'a', 'b'}
+        assert set(tree.query((11, 11, 19, 19))) == set()
+
+    def test_at(self):
+        tree = QuadTree()
+        tree.insert('a', (0, 0, 10, 10))
+        tree.insert('b', (5, 5, 15, 15))
+        assert set(tree.at(7, 7)) == {'a', 'b'}
+        assert tree.at(12, 12) == ['b']
+        assert tree.at(-1, 0) == []
+
+    def test_update(self):
+        tree = QuadTree()
+        tree.insert('a', (0, 0, 10, 10))
+        tree.insert('a', (100, 100, 110, 110))
+        assert len(tree) == 1
+        assert tree.at(5, 5) == []
+        assert tree.at(105, 105) == ['a']
+        assert tree.rect('a') == (100, 100, 110, 110)
+
+    def test_remove(self):
+        tree = QuadTree()
+        tree.insert('a', (0, 0, 10, 10))
+        assert tree.remove('a')
+        assert not tree.remove('a')
+        assert 'a' not in tree
+        assert tree.rect('a') is None
+        assert tree.at(5, 5) == []
+
+    def test_grow(self):
+        tree = QuadTree(bounds=(0, 0, 16, 16))
+        tree.insert('a', (1, 1, 2, 2))
+        tree.insert('b', (-1000, 5000, -990, 5010))
+        tree.insert('c', (0, 0, 100_000, 10))
+        assert set(tree.query((-2000, -2000, 6000, 6000))) == {'a', 'b', 'c'}
+        assert tree.at(-995, 5005) == ['b']
+        assert set(tree.at(1.5, 1.5)) == {'a', 'c'}
+
+    def test_clear(self):
+        tree = QuadTree()
+        tree.insert('a', (0, 0, 10, 10))
+        tree.clear()
+        assert len(tree) == 0
+        assert tree.at(5, 5) == []
+
+    def test_random_matches_brute_force(self):
+        rng = random.Random(1)
+        tree = QuadTree()
+        rects = {}
+        for i in range(2000):
+            r = rng.random()
+            if r < 0.2 and rects:
+                item = rng.choice(list(rects))
+                del rects[item]
+                assert tree.remove(item)
+            else:
+                item = i if r < 0.8 or not rects else rng.choice(list(rects))
+                x, y = rng.uniform(-5000, 5000), rng.uniform(-5000, 5000)
+                rects[item] = (x, y, x + rng.uniform(0, 200), y + rng.uniform(0, 60))
+                tree.insert(item, rects[item])
+        assert len(tree) == len(rects)
+        for _ in range(100):
+            x, y = rng.uniform(-6000, 6000), rng.uniform(-6000, 6000)
+            region = (x, y, x + rng.uniform(0, 2000), y + rng.uniform(0, 2000))
+            results = list(tree.query(region))
+            assert len(results) == len(set(results))
+            assert set(results) == _brute_force(rects, region)
@@ -0,0 +1,319 @@
+import itertools
+import random
+import time
+
+import pytest
+
+from app.entities import Person
+from app.layout.tidy import ANCESTORS, DESCENDANTS, LayoutConfig, TreeLayout
+from app.model.family import FamilyIndex
+from app.model.tree import FamilyTree
+from app.utils import LastName
+
+CONFIG = LayoutConfig(node_width=10, node_height=10, sibling_gap=2, level_gap=5)
+
+
+def _person(*parent_ids: int) -> Person:
+    return Person(LastName('X'), (), parent_ids=parent_ids)
+
+
+def _positions(layout: TreeLayout) -> list[tuple[int, float, float]]:
+    return [(n.person_id, n.x, n.y) for n in layout.nodes()]
+
+
+def _assert_no_overlap(layout: TreeLayout):
+    for depth, nodes in itertools.groupby(sorted(layout.nodes(), key=lambda n: (n.depth, n.x)), lambda n: n.depth):
+        nodes = list(nodes)
+        for n1, n2 in zip(nodes, nodes[1:]):
+            assert n2.x - n1.x >= (n1.width + n2.width) / 2 + CONFIG.sibling_gap - 1e-9
+
+
+def _random_tree(size: int, seed: int) -> FamilyTree:
+    rng = random.Random(seed)
+    tree = FamilyTree()
+    tree.add_person(_person())
+    for i in range(1, size):
+        tree.add_person(_person(*sorted(set(rng.sample(range(i), min(i, rng.randint(1, 2)))))))
+    return tree
+
+
+class TestTreeLayout:
+    def test_ancestors(self):
+        tree = FamilyTree()
+        tree.add_person(_person())  # 0
+        tree.add_person(_person())  # 1
+        tree.add_person(_person(0, 1))  # 2
+        layout = TreeLayout(FamilyIndex(tree), 2, mode=ANCESTORS, config=CONFIG)
+        assert _positions(layout) == [(2, 0, 0), (0, -6, -15), (1, 6, -15)]
+
+    def test_descendants(self):
+        tree = FamilyTree()
+        tree.add_person(_person())  # 0
+        tree.add_person(_person(0))  # 1
+        tree.add_person(_person(0))  # 2
+        tree.add_person(_person(0))  # 3
+        layout = TreeLayout(FamilyIndex(tree), 0, mode=DESCENDANTS, config=CONFIG)
+        assert _positions(layout) == [(0, 0, 0), (1, -12, 15), (2, 0, 15), (3, 12, 15)]
+
+    def test_multiple_partners(self):
+        tree = FamilyTree()
+        tree.add_person(_person())  # 0
+        tree.add_person(_person())  # 1
+        tree.add_person(_person())  # 2
+        tree.add_person(_person(0, 2))  # 3
+        tree.add_person(_person(0, 1))  # 4
+        tree.add_person(_person(0))  # 5
+        layout = TreeLayout(FamilyIndex(tree), 0, mode=DESCENDANTS, config=CONFIG)
+        assert layout.root.partner_ids == (1, 2)
+        assert layout.root.width == 10 + 2 * 12
+        # Children grouped by partner
+        assert [c.person_id for c in layout.root.children] == [4, 3, 5]
+
+    def test_pedigree_collapse(self):
+        tree = FamilyTree()
+        tree.add_person(_person())  # 0
+        tree.add_person(_person(0))  # 1
+        tree.add_person(_person(0))  # 2
+        tree.add_person(_person(1, 2))  # 3
+        layout = TreeLayout(FamilyIndex(tree), 3, mode=ANCESTORS, config=CONFIG)
+        occurrences = layout.occurrences(0)
+        assert len(occurrences) == 2
+        assert [n.is_reference for n in occurrences] == [False, True]
+        assert len(layout) == 5
+
+    def test_cycle_does_not_loop(self):
+        tree = FamilyTree()
+        tree.add_person(_person(1))  # 0
+        tree.add_person(_person(0))  # 1
+        layout = TreeLayout(FamilyIndex(tree), 0, mode=ANCESTORS, config=CONFIG)
+        assert len(layout) == 3
+
+    def test_missing_root(self):
+        layout = TreeLayout(FamilyIndex(FamilyTree()), 0, config=CONFIG)
+        assert layout.root is None
+        assert list(layout.nodes()) == []
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError):
+            TreeLayout(FamilyIndex(FamilyTree()), 0, mode=3)
+
+    @pytest.mark.parametrize('mode', [ANCESTORS, DESCENDANTS])
+    def test_no_overlap(self, mode):
+        tree = _random_tree(200, seed=1)
+        root = 199 if mode == ANCESTORS else 0
+        _assert_no_overlap(TreeLayout(FamilyIndex(tree), root, mode=mode, config=CONFIG))
+
+    def test_parent_centered(self):
+        tree = _random_tree(100, seed=2)
+        for node in TreeLayout(FamilyIndex(tree), 0, mode=DESCENDANTS, config=CONFIG).nodes():
+            if node.children:
+                assert node.x == pytest.approx((node.children[0].x + node.children[-1].x) / 2)
+
+    @pytest.mark.parametrize('leaf_parents', [False, True])
+    def test_linear_time(self, leaf_parents):
+        def layout_time(size: int) -> float:
+            # A chain of ancestors with even IDs, each with a parent without ancestors if leaf_parents
+            tree = FamilyTree()
+            for i in range(size):
+                parent_ids = (2 * i + 2, 2 * i + 1) if leaf_parents else (2 * i + 2,)
+                tree.add_person(_person(*parent_ids) if i < size - 1 else _person(), person_id=2 * i)
+                if leaf_parents:
+                    tree.add_person(_person(), person_id=2 * i + 1)
+            family = FamilyIndex(tree)
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                TreeLayout(family, 0, config=CONFIG)
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        # 8 times more persons should take about 8 times longer, not 64 times as with quadratic layouts
+        assert layout_time(8_000) < 24 * layout_time(1_000)
+
+    #####################
+    # Incremental layout
+    #####################
+
+    @pytest.mark.parametrize('mode', [ANCESTORS, DESCENDANTS])
+    def test_incremental_add(self, mode):
+        tree = _random_tree(100, seed=3)
+        family = FamilyIndex(tree)
+        root = 99 if mode == ANCESTORS else 0
+        layout = TreeLayout(family, root, mode=mode, config=CONFIG)
+        tree.add_listener(layout.on_tree_changed)
+        tree.add_person(_person(5, 7))
+        tree.update_person(99, _person(3))
+        assert layout.refresh()
+        assert _positions(layout) == _positions(TreeLayout(family, root, mode=mode, config=CONFIG))
+
+    @pytest.mark.parametrize('mode', [ANCESTORS, DESCENDANTS])
+    def test_incremental_remove(self, mode):
+        tree = _random_tree(100, seed=4)
+        family = FamilyIndex(tree)
+        root = 99 if mode == ANCESTORS else 0
+        layout = TreeLayout(family, root, mode=mode, config=CONFIG)
+        tree.add_listener(layout.on_tree_changed)
+        tree.remove_person(50)
+        assert layout.refresh()
+        assert _positions(layout) == _positions(TreeLayout(family, root, mode=mode, config=CONFIG))
+
+    def test_incremental_only_dirty_subtrees(self):
+        tree = FamilyTree()
+        tree.add_person(_person())  # 0
+        tree.add_person(_person(0))  # 1
+        tree.add_person(_person(0))  # 2
+        family = FamilyIndex(tree)
+        layout = TreeLayout(family, 0, mode=DESCENDANTS, config=CONFIG)
+        tree.add_listener(layout.on_tree_changed)
+        node1 = layout.occurrences(1)[0]
+        left = node1._left
+        tree.add_person(_person(2))
+        layout.refresh()
+        assert layout.occurrences(1)[0]._left is left  # Not laid out again
+
+    def test_refresh_without_changes(self):
+        tree = _random_tree(10, seed=5)
+        assert not TreeLayout(FamilyIndex(tree), 0, config=CONFIG).refresh()
+
+    def test_root_removed(self):
+        tree = _random_tree(10, seed=5)
+        family = FamilyIndex(tree)
+        layout = TreeLayout(family, 0, mode=DESCENDANTS, config=CONFIG)
+        tree.add_listener(layout.on_tree_changed)
+        tree.remove_person(0)
+        layout.refresh()
+        assert layout.root is None
+
+    @pytest.mark.parametrize('mode', [ANCESTORS, DESCENDANTS])
+    def test_incremental_random_edits(self, mode):
+        rng = random.Random(6)
+        tree = _random_tree(150, seed=6)
+        family = FamilyIndex(tree)
+        root = 149 if mode == ANCESTORS else 0
+        layout = TreeLayout(family, root, mode=mode, config=CONFIG)
+        tree.add_listener(layout.on_tree_changed)
+        for _ in range(40):
+            ids = [pid for pid, _ in tree.persons() if pid != root]
+            r = rng.random()
+            if r < 0.3:
+                tree.remove_person(rng.choice(ids))
+            elif r < 0.6:
+                tree.add_person(_person(*sorted(set(rng.sample(ids, 2)))))
+            else:
+                pid = rng.choice(ids)
+                tree.update_person(pid, _person(*[i for i in sorted(set(rng.sample(ids, 2))) if i < pid]))
+            layout.refresh()
+            assert _positions(layout) == _positions(TreeLayout(family, root, mode=mode, config=CONFIG))
+
+    @pytest.mark.parametrize('mode', [ANCESTORS, DESCENDANTS])
+    def test_pop_changes_tracks_positions(self, mode):
+        rng = random.Random(7)
+        tree = _random_tree(100, seed=7)
+        family = FamilyIndex(tree)
+        root = 99 if mode == ANCESTORS else 0
+        layout = TreeLayout(family, root, mode=mode, config=CONFIG)
+        tree.add_listener(layout.on_tree_changed)
+        # Replay the changes onto a copy of the positions
+        positions = {}
+        for _ in range(20):
+            moved, removed = layout.pop_changes()
+            for node in moved:
+                positions[node] = (node.person_id, node.x, node.y)
+            for node in removed:
+                positions.pop(node, None)
+            assert sorted(positions.values()) == sorted(_positions(layout))
+            ids = [pid for pid, _ in tree.persons() if pid != root]
+            if rng.random() < 0.5:
+                tree.remove_person(rng.choice(ids))
+            else:
+                tree.add_person(_person(*sorted(set(rng.sample(ids, 2)))))
+            layout.refresh()
+
+    def test_pop_changes_empty_after_pop(self):
+        layout = TreeLayout(FamilyIndex(_random_tree(10, seed=8)), 0, config=CONFIG)
+        assert len(layout.pop_changes()[0]) == len(layout)
+        assert layout.pop_changes() == ([], [])
+
+    ########################
+    # Depth-limited layout
+    ########################
+
+    def _chain(self, length: int) -> FamilyTree:
+        """Each person is the only parent of the next one."""
+        tree = FamilyTree()
+        tree.add_person(_person())
+        for i in range(1, length):
+            tree.add_person(_person(i - 1))
+        return tree
+
+    def test_max_depth_stubs(self):
+        tree = _random_tree(100, seed=9)
+        layout = TreeLayout(FamilyIndex(tree), 99, mode=ANCESTORS, config=CONFIG, max_depth=2)
+        assert max(n.depth for n in layout.nodes()) == 2
+        for node in layout.nodes():
+            if node.depth == 2 and not node.is_reference:
+                assert node.hidden_count == len(FamilyIndex(tree).parents(node.person_id))
+            else:
+                assert node.hidden_count == 0
+
+    def test_negative_max_depth(self):
+        with pytest.raises(ValueError):
+            TreeLayout(FamilyIndex(FamilyTree()), 0, max_depth=-1)
+
+    def test_expand(self):
+        tree = self._chain(10)
+        layout = TreeLayout(FamilyIndex(tree), 0, mode=DESCENDANTS, config=CONFIG, max_depth=2)
+        stub = layout.occurrences(2)[0]
+        assert stub.hidden_count == 1
+        layout.expand(stub, 3)
+        assert stub.hidden_count == 0
+        assert max(n.depth for n in layout.nodes()) == 5
+        assert layout.occurrences(5)[0].hidden_count == 1
+        _assert_no_overlap(layout)
+
+    def test_expand_kept_after_edit(self):
+        tree = self._chain(10)
+        family = FamilyIndex(tree)
+        layout = TreeLayout(family, 0, mode=DESCENDANTS, config=CONFIG, max_depth=2)
+        tree.add_listener(layout.on_tree_changed)
+        layout.expand(layout.occurrences(2)[0], 3)
+        tree.add_person(_person(1))
+        layout.refresh()
+        assert max(n.depth for n in layout.nodes()) == 5
+        assert len(layout.occurrences(1)[0].children) == 2
+
+    def test_stub_hidden_count_updated(self):
+        tree = self._chain(5)
+        family = FamilyIndex(tree)
+        layout = TreeLayout(family, 0, mode=DESCENDANTS, config=CONFIG, max_depth=2)
+        tree.add_listener(layout.on_tree_changed)
+        layout.pop_changes()
+        tree.add_person(_person(2))
+        assert layout.refresh()
+        stub = layout.occurrences(2)[0]
+        assert stub.hidden_count == 2
+        assert stub in layout.pop_changes()[0]
+
+    def test_incremental_with_max_depth(self):
+        rng = random.Random(10)
+        tree = _random_tree(150, seed=10)
+        family = FamilyIndex(tree)
+        layout = TreeLayout(family, 0, mode=DESCENDANTS, config=CONFIG, max_depth=3)
+        tree.add_listener(layout.on_tree_changed)
+        for _ in range(20):
+            ids = [pid for pid, _ in tree.persons() if pid != 0]
+            if rng.random() < 0.5:
+                tree.remove_person(rng.choice(ids))
+            else:
+                tree.add_person(_person(*sorted(set(rng.sample(ids, 2)))))
+            layout.refresh()
+            expected = TreeLayout(family, 0, mode=DESCENDANTS, config=CONFIG, max_depth=3)
+            assert _positions(layout) == _positions(expected)
+            assert [n.hidden_count for n in layout.nodes()] == [n.hidden_count for n in expected.nodes()]
+
+    def test_fetch(self):
+        tree = self._chain(10)
+        layout = TreeLayout(FamilyIndex(tree), 0, mode=DESCENDANTS, config=CONFIG, max_depth=2)
+        assert list(layout.fetch(2, 3)) == [2, 3, 4]
+        assert 4 in layout._loaded
+        assert 5 not in layout._loaded
@@ -0,0 +1,225 @@
+import math
+import threading
+
+import pytest
+
+from app.entities import Person
+from app.model.consistency import (CheckCancelled, ConsistencyChecker, DateIntervals, DeathBeforeBirth, Interval,
+                                   changed_fields, check_tree, date_interval, gap_violation, read_report)
+from app.model.date import Date
+from app.model.family import FamilyIndex
+from app.model.tree import FamilyTree
+from app.utils import Event, LastName
+
+
+def _person(birth: Date = None, death: Date = None, *parent_ids: int) -> Person:
+    return Person(LastName('X'), ('Y',), birthday=Event(birth) if birth else None, death=Event(death) if death else None,
+                  parent_ids=parent_ids)
+
+
+def _checker(tree: FamilyTree) -> ConsistencyChecker:
+    return ConsistencyChecker.for_tree(tree, FamilyIndex(tree))
+
+
+def _summary(checker: ConsistencyChecker) -> list[tuple[str, int, tuple[int, ...], bool]]:
+    return [(f.rule, f.person_id, f.related_ids, f.certain) for f in checker.findings()]
+
+
+class TestDateInterval:
+    def test_exact(self):
+        interval = date_interval(Date(day=1, month=3, year=2000))
+        assert interval.start == interval.end
+
+    def test_year(self):
+        interval = date_interval(Date(year=2000))
+        assert interval.end - interval.start == 365
+
+    def test_month(self):
+        interval = date_interval(Date(month=2, year=1900))
+        assert interval.end - interval.start == 27
+
+    def test_consecutive_days(self):
+        assert date_interval(Date(day=1, month=1, year=2001)).start - \
+               date_interval(Date(day=31, month=12, year=2000)).start == 1
+
+    def test_negative_year(self):
+        assert date_interval(Date(year=-10)).end < date_interval(Date(year=1)).start
+
+    def test_before_after(self):
+        assert date_interval(Date(year=2000, precision=Date.BEFORE)).start == -math.inf
+        assert date_interval(Date(year=2000, precision=Date.AFTER)).end == math.inf
+
+    def test_approx(self):
+        exact, approx = date_interval(Date(year=2000)), date_interval(Date(year=2000, precision=Date.APPROX))
+        assert approx.start < exact.start and approx.end > exact.end
+
+    def test_no_year(self):
+        assert date_interval(Date(day=1, month=1)) is None
+
+
+class TestGapViolation:
+    def test_within(self):
+        assert gap_violation(Interval(0, 0), Interval(10, 10), min_days=0) is None
+
+    def test_certain(self):
+        assert gap_violation(Interval(10, 10), Interval(0, 0), min_days=0) is True
+
+    def test_possible(self):
+        assert gap_violation(Interval(0, 365), Interval(100, 465), min_days=0) is False
+
+    def test_unbounded(self):
+        assert gap_violation(Interval(-math.inf, 0), Interval(10, 10), min_days=0) is None
+        assert gap_violation(Interval(0, math.inf), Interval(10, 10), min_days=0) is False
+
+
+class TestDateIntervals:
+    def test_set(self):
+        dates = DateIntervals()
+        dates.set(3, _person(Date(year=1900)))
+        assert dates.birth(3) == date_interval(Date(year=1900))
+        assert dates.death(3) is None
+
+    def test_unknown_person(self):
+        dates = DateIntervals()
+        assert dates.birth(0) is None and dates.birth(10) is None
+
+    def test_removed(self):
+        dates = DateIntervals()
+        dates.set(0, _person(Date(year=1900), Date(year=1950)))
+        dates.set(0, None)
+        assert dates.birth(0) is None and dates.death(0) is None
+
+
+class TestChangedFields:
+    def test_added(self):
+        assert 'notes' in changed_fields(None, _person())
+
+    def test_updated(self):
+        assert changed_fields(_person(), _person(Date(year=1))) == {'birthday'}
+
+
+class TestConsistencyChecker:
+    def test_death_before_birth(self):
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1900), Date(year=1850)))
+        tree.add_person(_person(Date(year=1900), Date(year=1900)))
+        tree.add_person(_person(Date(year=1900), Date(year=1950)))
+        assert _summary(_checker(tree)) == [('death_before_birth', 0, (), True),
+                                            ('death_before_birth', 1, (), False)]
+
+    def test_lifespan(self):
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1700), Date(year=1900)))
+        assert _summary(_checker(tree)) == [('lifespan', 0, (), True)]
+
+    def test_parent_age(self):
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1800)))  # 0
+        tree.add_person(_person(Date(year=1790)))  # 1
+        tree.add_person(_person(Date(year=1880), None, 0, 1))  # 2
+        tree.add_person(_person(Date(year=1820), None, 0, 1))  # 3
+        assert _summary(_checker(tree)) == [('parent_age', 2, (0,), True), ('parent_age', 2, (1,), True)]
+
+    def test_birth_after_parent_death(self):
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1800), Date(day=1, month=1, year=1830)))  # 0
+        tree.add_person(_person(Date(day=1, month=6, year=1831), None, 0))  # 1
+        tree.add_person(_person(Date(day=1, month=6, year=1830), None, 0))  # 2
+        assert _summary(_checker(tree)) == [('birth_after_parent_death', 1, (0,), True)]
+
+    def test_incremental_person_edit(self):
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1900), Date(year=1950)))
+        checker = _checker(tree)
+        assert len(checker) == 0
+        tree.update_person(0, _person(Date(year=1900), Date(year=1800)))
+        assert _summary(checker) == [('death_before_birth', 0, (), True)]
+        tree.update_person(0, _person(Date(year=1900), Date(year=1950)))
+        assert len(checker) == 0
+
+    def test_incremental_parent_edit(self):
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1800)))  # 0
+        tree.add_person(_person(Date(year=1830), None, 0))  # 1
+        checker = _checker(tree)
+        tree.update_person(0, _person(Date(year=1700)))
+        assert _summary(checker) == [('parent_age', 1, (0,), True)]
+        tree.remove_person(0)
+        assert len(checker) == 0
+
+    def test_only_dependent_rules_rerun(self):
+        calls = []
+
+        class Counting(DeathBeforeBirth):
+            def check(self, person_id, person, dates):
+                calls.append(person_id)
+                return super().check(person_id, person, dates)
+
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1900)))
+        family = FamilyIndex(tree)
+        checker = ConsistencyChecker.for_tree(tree, family, rules=[Counting()])
+        calls.clear()
+        tree.update_person(0, Person(LastName('Z'), ('Y',), birthday=Event(Date(year=1900))))
+        assert calls == []
+        tree.update_person(0, _person(Date(year=1901)))
+        assert calls == [0]
+        assert len(checker) == 0
+
+    def test_removed_person(self):
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1900), Date(year=1850)))
+        checker = _checker(tree)
+        tree.remove_person(0)
+        assert list(checker.findings()) == []
+
+
+
+def _family_tree() -> FamilyTree:
+    tree = FamilyTree()
+    for i in range(5):
+        # Families of a parent and a child born too early, in separate components
+        parent_id = tree.add_person(_person(Date(year=1800), Date(year=1850 if i % 2 else 1700)))
+        tree.add_person(_person(Date(year=1805), None, parent_id))
+    return tree
+
+
+class TestCheckTree:
+    @pytest.mark.parametrize('workers', [0, 1, 2])
+    def test_same_findings_as_checker(self, tmp_path, workers):
+        tree = _family_tree()
+        path = tmp_path / 'report.csv'
+        count = check_tree(tree.snapshot(), path, workers=workers, partition_size=3)
+        expected = sorted(_summary(_checker(tree)))
+        assert count == len(expected)
+        assert sorted((f.rule, f.person_id, f.related_ids, f.certain) for f in read_report(path)) == expected
+
+    def test_split_component(self, tmp_path):
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1800)))
+        for i in range(9):
+            tree.add_person(_person(Date(year=1815 + 20 * i), None, i))
+        tree.add_person(_person(Date(year=1900), None, 9))  # Born before their parent
+        path = tmp_path / 'report.csv'
+        check_tree(tree, path, workers=0, partition_size=2)
+        assert [(f.person_id, f.related_ids) for f in read_report(path)] == [(10, (9,))]
+
+    def test_progress(self, tmp_path):
+        calls = []
+        check_tree(_family_tree(), tmp_path / 'report.csv', workers=0, partition_size=4,
+                   progress=lambda done, total: calls.append((done, total)))
+        assert calls == [(4, 10), (8, 10), (10, 10)]
+
+    def test_cancelled(self, tmp_path):
+        cancelled = threading.Event()
+        cancelled.set()
+        path = tmp_path / 'report.csv'
+        with pytest.raises(CheckCancelled):
+            check_tree(_family_tree(), path, workers=0, cancelled=cancelled)
+        assert not path.exists()
+
+    def test_invalid_report(self, tmp_path):
+        path = tmp_path / 'report.csv'
+        path.write_text('a,b\n')
+        with pytest.raises(ValueError):
+            list(read_report(path))
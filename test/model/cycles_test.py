@@ -0,0 +1,102 @@
+from app.entities import Person
+from app.model.cycles import Cycle, CycleDetector, find_cycles, strongly_connected_components
+from app.model.family import FamilyIndex
+from app.model.tree import FamilyTree
+from app.utils import LastName
+
+
+def _person(*parent_ids: int) -> Person:
+    return Person(LastName('X'), ('Y',), parent_ids=parent_ids)
+
+
+def _tree(*parent_ids: tuple[int, ...]) -> FamilyTree:
+    tree = FamilyTree()
+    for ids in parent_ids:
+        tree.add_person(_person(*ids))
+    return tree
+
+
+def _detector(tree: FamilyTree) -> CycleDetector:
+    return CycleDetector.for_tree(tree, FamilyIndex(tree))
+
+
+class TestCycle:
+    def test_of(self):
+        assert Cycle.of([3, 1, 2]) == Cycle((1, 2, 3))
+
+    def test_links(self):
+        assert Cycle((1, 2, 3)).links() == {(1, 2), (2, 3), (3, 1)}
+
+
+class TestStronglyConnectedComponents:
+    def test_acyclic(self):
+        assert strongly_connected_components(_tree((), (0,), (0, 1))) == []
+
+    def test_cycle(self):
+        # 0 → 1 → 2 → 0, 3 → 0
+        assert strongly_connected_components(_tree((1,), (2,), (0,), (0,))) == [[0, 1, 2]]
+
+    def test_own_parent(self):
+        assert strongly_connected_components(_tree((0,), ())) == [[0]]
+
+    def test_missing_parent(self):
+        assert strongly_connected_components(_tree((5,), (0,))) == []
+
+    def test_deep_chain(self):
+        # Would overflow the stack of a recursive implementation
+        n = 10_000
+        tree = _tree(*((i + 1,) for i in range(n - 1)), (0,))
+        assert strongly_connected_components(tree) == [list(range(n))]
+
+
+class TestFindCycles:
+    def test_shortest(self):
+        # 0 → 1 → 2 → 3 → 0 and 0 → 4 → 0
+        tree = _tree((1, 4), (2,), (3,), (0,), (0,))
+        assert find_cycles(tree) == [Cycle((0, 4))]
+
+    def test_several_components(self):
+        tree = _tree((1,), (0,), (), (4,), (3,), (5,))
+        assert find_cycles(tree) == [Cycle((0, 1)), Cycle((3, 4)), Cycle((5,))]
+
+
+class TestCycleDetector:
+    def test_initial(self):
+        assert _detector(_tree((1,), (0,))).cycles() == [Cycle((0, 1))]
+
+    def test_added_link(self):
+        tree = _tree((), (0,), (1,))
+        detector = _detector(tree)
+        assert detector.cycles() == []
+        tree.update_person(0, _person(2))
+        assert detector.cycles() == [Cycle((0, 2, 1))]
+
+    def test_added_parent(self):
+        tree = _tree((), (0, 3))
+        detector = _detector(tree)
+        # Person 3 is the missing parent of 1
+        tree.add_person(_person(1), person_id=3)
+        assert detector.cycles() == [Cycle((1, 3))]
+
+    def test_check_link(self):
+        tree = _tree((), (0,), (1,))
+        detector = _detector(tree)
+        assert detector.check_link(0, 2) == Cycle((0, 2, 1))
+        assert detector.check_link(2, 0) is None
+        assert detector.check_link(1, 1) == Cycle((1,))
+
+    def test_removed_link(self):
+        # 0 → 1 → 0 and 0 → 2 → 1
+        tree = _tree((1, 2), (0,), (1,))
+        detector = _detector(tree)
+        assert detector.cycles() == [Cycle((0, 1))]
+        tree.update_person(0, _person(2))
+        assert detector.cycles() == [Cycle((0, 2, 1))]
+        tree.update_person(1, _person())
+        assert detector.cycles() == []
+
+    def test_removed_person(self):
+        tree = _tree((1,), (0,))
+        detector = _detector(tree)
+        tree.remove_person(1)
+        assert detector.cycles() == []
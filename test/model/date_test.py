@@ -698,3 +698,29 @@ class TestDate:
     def test_compare_gt_same_day_diff_month_no_year(self):
         assert Date(day=1, month=2, year=1906) > Date(day=1, month=1)
         assert Date(day=1, month=2) > Date(day=1, month=1, year=1905)
+
+    #####################
+    # sort key
+    #####################
+
+    def test_sort_key_order(self):
+        dates = [
+            Date(year=-50),
+            Date(year=1850, precision=Date.BEFORE),
+            Date(year=1850),
+            Date(year=1850, precision=Date.APPROX),
+            Date(year=1850, precision=Date.AFTER),
+            Date(month=1, year=1850),
+            Date(day=1, month=1, year=1850),
+            Date(day=2, month=1, year=1850),
+            Date(day=1, month=2, year=1850),
+            Date(day=31, month=12, year=1850),
+            Date(year=1851),
+            Date(day=1),
+            Date(month=1),
+            Date(day=1, month=1),
+        ]
+        assert sorted(dates, key=lambda d: d.sort_key) == dates
+
+    def test_sort_key_equal_dates(self):
+        assert Date(day=1, month=1, year=1850).sort_key == Date(day=1, month=1, year=1850).sort_key
@@ -0,0 +1,102 @@
+from app.entities import Person
+from app.model.date import Date
+from app.model import dedupe
+from app.model.dedupe import find_duplicates, jaro_winkler
+from app.utils import Event, LastName, Place
+
+
+def _person(lastname: str, firstname: str, year: int = None, place: str = None) -> Person:
+    birthday = Event(Date(year=year) if year else None, Place(place) if place else None)
+    return Person(LastName(lastname), (firstname,), birthday=birthday)
+
+
+class TestJaroWinkler:
+    def test_identical(self):
+        assert jaro_winkler('martin', 'martin') == 1
+
+    def test_empty(self):
+        assert jaro_winkler('', 'martin') == 0
+
+    def test_no_common_letters(self):
+        assert jaro_winkler('abc', 'xyz') == 0
+
+    def test_known_value(self):
+        assert round(jaro_winkler('martha', 'marhta'), 3) == 0.961
+
+    def test_no_prefix_bonus_below_threshold(self):
+        # Jaro similarity of 2/3, just below the 0.7 threshold, despite a common prefix
+        assert round(jaro_winkler('dupont', 'durand'), 3) == 0.667
+
+
+class TestFindDuplicates:
+    def test_same_tree(self):
+        persons = [
+            (1, _person('Dupont', 'Jean', 1850, 'Paris')),
+            (2, _person('Dupond', 'Jean', 1851, 'Paris')),
+            (3, _person('Durand', 'Marie', 1850, 'Paris')),
+        ]
+        suggestions = find_duplicates(persons, workers=0)
+        assert [(s.person_id_1, s.person_id_2) for s in suggestions] == [(1, 2)]
+        assert 0.8 <= suggestions[0].score < 1
+
+    def test_year_too_far(self):
+        persons = [
+            (1, _person('Dupont', 'Jean', 1850)),
+            (2, _person('Dupont', 'Jean', 1880)),
+        ]
+        assert find_duplicates(persons, workers=0) == []
+
+    def test_year_range_boundary(self):
+        persons = [
+            (1, _person('Dupont', 'Jean', 1849)),
+            (2, _person('Dupont', 'Jean', 1850)),
+        ]
+        assert [(s.person_id_1, s.person_id_2) for s in find_duplicates(persons, workers=0)] == [(1, 2)]
+
+    def test_accents_ignored(self):
+        persons = [
+            (1, _person('Lefèvre', 'Hélène', 1850)),
+            (2, _person('Lefevre', 'Helene', 1850)),
+        ]
+        assert find_duplicates(persons, workers=0)[0].score == 1
+
+    def test_missing_birth_year_and_place(self):
+        persons = [
+            (1, _person('Dupont', 'Jean')),
+            (2, _person('Dupont', 'Jean', 1850, 'Paris')),
+            (3, _person('Dupont', 'Jean', place='Lyon')),
+        ]
+        suggestions = find_duplicates(persons, workers=0)
+        assert [(s.person_id_1, s.person_id_2) for s in suggestions] == [(1, 2), (1, 3)]
+
+    def test_large_block(self, monkeypatch):
+        monkeypatch.setattr(dedupe, '_MAX_BLOCK_SIZE', 2)
+        persons = [
+            (1, _person('Dupont', 'Jean')),
+            (2, _person('Dupont', 'Paul', 1900)),
+            (3, _person('Dupont', 'Jean', 1850, 'Paris')),
+        ]
+        suggestions = find_duplicates(persons, workers=0)
+        assert [(s.person_id_1, s.person_id_2) for s in suggestions] == [(1, 3)]
+
+    def test_two_trees_only_cross_pairs(self):
+        persons1 = [(1, _person('Dupont', 'Jean', 1850)), (2, _person('Dupont', 'Jean', 1850))]
+        persons2 = [(1, _person('Dupont', 'Jean', 1850))]
+        suggestions = find_duplicates(persons1, persons2, workers=0)
+        assert [(s.person_id_1, s.person_id_2) for s in suggestions] == [(1, 1), (2, 1)]
+
+    def test_sorted_by_score(self):
+        persons = [
+            (1, _person('Dupont', 'Jean', 1850, 'Paris')),
+            (2, _person('Dupont', 'Jean', 1850, 'Paris')),
+            (3, _person('Dupont', 'Jeanne', 1852, 'Paris')),
+        ]
+        scores = [s.score for s in find_duplicates(persons, threshold=0, workers=0)]
+        assert scores == sorted(scores, reverse=True)
+
+    def test_process_pool(self):
+        persons = [
+            (1, _person('Dupont', 'Jean', 1850, 'Paris')),
+            (2, _person('Dupond', 'Jean', 1851, 'Paris')),
+        ]
+        assert find_duplicates(persons, workers=2) == find_duplicates(persons, workers=0)
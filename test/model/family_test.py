@@ -0,0 +1,47 @@
+from app.entities import Person
+from app.model.family import FamilyIndex
+from app.model.tree import FamilyTree
+from app.utils import LastName
+
+
+def _person(*parent_ids: int) -> Person:
+    return Person(LastName('X'), (), parent_ids=parent_ids)
+
+
+def _tree() -> FamilyTree:
+    tree = FamilyTree()
+    tree.add_person(_person())  # 0
+    tree.add_person(_person())  # 1
+    tree.add_person(_person())  # 2
+    tree.add_person(_person(0, 2))  # 3
+    tree.add_person(_person(0, 1))  # 4
+    tree.add_person(_person(0))  # 5
+    return tree
+
+
+class TestFamilyIndex:
+    def test_parents(self):
+        assert FamilyIndex(_tree()).parents(3) == (0, 2)
+
+    def test_parents_missing(self):
+        tree = _tree()
+        family = FamilyIndex(tree)
+        tree.remove_person(2)
+        assert family.parents(3) == (0,)
+
+    def test_children(self):
+        assert FamilyIndex(_tree()).children(0) == [3, 4, 5]
+
+    def test_families(self):
+        assert FamilyIndex(_tree()).families(0) == [(1, [4]), (2, [3]), (None, [5])]
+
+    def test_partners(self):
+        assert FamilyIndex(_tree()).partners(0) == [1, 2]
+
+    def test_incremental_update(self):
+        tree = _tree()
+        family = FamilyIndex(tree)
+        tree.update_person(5, _person(1))
+        tree.remove_person(3)
+        assert family.children(0) == [4]
+        assert family.children(1) == [4, 5]
@@ -0,0 +1,135 @@
+import pytest
+
+from app.entities import Person
+from app.model.gazetteer import Gazetteer, normalize, normalize_places
+from app.model.tree import FamilyTree
+from app.utils import Event, LastName, Place
+
+
+class TestNormalize:
+    @pytest.mark.parametrize('label, expected', [
+        ('Paris', ('paris',)),
+        ('PARIS 75', ('paris',)),
+        ('Paris (75), Seine,  France', ('paris', 'seine', 'france')),
+        ('St-Étienne, Loire', ('saint etienne', 'loire')),
+        ('Paris, , France', ('paris', 'france')),
+        ('75001', ()),
+        ('', ()),
+    ])
+    def test_normalize(self, label, expected):
+        assert normalize(label) == expected
+
+
+class TestGazetteer:
+    def test_same_label(self):
+        gazetteer = Gazetteer()
+        assert gazetteer.resolve('Paris') == gazetteer.resolve('PARIS 75') == gazetteer.resolve('paris')
+        assert len(gazetteer) == 1
+
+    def test_no_name(self):
+        gazetteer = Gazetteer()
+        assert gazetteer.resolve('75001') is None
+        assert len(gazetteer) == 0
+
+    def test_hierarchy(self):
+        gazetteer = Gazetteer()
+        paris = gazetteer.resolve('Paris, Seine, France')
+        assert gazetteer.label(paris) == 'Paris, Seine, France'
+        seine = gazetteer.parent(paris)
+        france = gazetteer.parent(seine)
+        assert gazetteer.parent(france) is None
+        assert gazetteer.children() == [france]
+        assert gazetteer.resolve('Seine, France') == seine
+        assert gazetteer.resolve('France') == france
+
+    def test_less_qualified(self):
+        gazetteer = Gazetteer()
+        paris = gazetteer.resolve('Paris, Seine, France')
+        assert gazetteer.resolve('Paris') == paris
+        assert gazetteer.resolve('Paris, France') == paris
+        assert gazetteer.resolve('PARIS (75), SEINE') == paris
+        assert len(gazetteer) == 3
+
+    def test_more_qualified_moves_place(self):
+        gazetteer = Gazetteer()
+        paris = gazetteer.resolve('PARIS')
+        assert gazetteer.resolve('Paris, Seine, France') == paris
+        assert gazetteer.label(paris) == 'Paris, Seine, France'
+        assert len(gazetteer) == 3
+
+    def test_homonyms(self):
+        gazetteer = Gazetteer()
+        paris_fr = gazetteer.resolve('Paris, France')
+        paris_tx = gazetteer.resolve('Paris, Texas')
+        assert paris_fr != paris_tx
+        # Ambiguous labels get their own place
+        paris = gazetteer.resolve('Paris')
+        assert paris not in (paris_fr, paris_tx)
+        assert gazetteer.resolve('Paris, Texas, USA') == paris_tx
+        assert gazetteer.resolve('Paris, Loir-et-Cher') not in (paris, paris_fr, paris_tx)
+
+    def test_same_name_at_two_levels(self):
+        gazetteer = Gazetteer()
+        town = gazetteer.resolve('Paris, Paris, France')
+        department = gazetteer.parent(town)
+        assert department != town
+        assert gazetteer.label(town) == 'Paris, Paris, France'
+        assert gazetteer.resolve('Paris, Paris') == town
+
+    def test_display_prefers_mixed_case(self):
+        gazetteer = Gazetteer()
+        paris = gazetteer.resolve('PARIS 75, FRANCE')
+        gazetteer.resolve('Paris, France')
+        assert gazetteer.label(paris) == 'Paris, FRANCE'
+
+    def test_canonical(self):
+        gazetteer = Gazetteer()
+        place = gazetteer.canonical(Place('PARIS 75', 2.35, 48.85))
+        assert place == Place('PARIS', 2.35, 48.85)
+        place = gazetteer.canonical(Place('Paris, France'))
+        assert place == Place('Paris, France', 2.35, 48.85)
+        assert gazetteer.canonical(Place('Paris')) is place
+        assert gazetteer.canonical(Place('123')) == Place('123')
+
+    def test_cache(self):
+        gazetteer = Gazetteer()
+        paris = gazetteer.resolve('Paris')
+        gazetteer.resolve('Paris, Texas')
+        # Earlier resolutions are kept even if the label became ambiguous
+        assert gazetteer.resolve_all(['Paris', 'Paris, Texas', 'paris']) == [paris, gazetteer.resolve('Paris, Texas'),
+                                                                             paris]
+
+    def test_save_load(self, tmp_path):
+        gazetteer = Gazetteer()
+        paris = gazetteer.resolve('Paris, Seine, France')
+        gazetteer.canonical(Place('Paris', 2.35, 48.85))
+        gazetteer.resolve('75')
+        path = tmp_path / 'gazetteer.json'
+        gazetteer.save(path)
+        loaded = Gazetteer.load(path)
+        assert len(loaded) == 3
+        assert loaded.label(paris) == 'Paris, Seine, France'
+        assert loaded.place(paris) == Place('Paris, Seine, France', 2.35, 48.85)
+        assert loaded.resolve('Paris') == paris
+        assert loaded.resolve('75') is None
+        assert loaded.resolve('Lyon, France') == 3
+        assert loaded.parent(3) == gazetteer.parent(gazetteer.parent(paris))
+
+    def test_load_invalid(self, tmp_path):
+        path = tmp_path / 'gazetteer.json'
+        assert Gazetteer.load(path) is None
+        path.write_text('{"version": 1}')
+        assert Gazetteer.load(path) is None
+
+
+class TestNormalizePlaces:
+    def test_normalize_places(self):
+        tree = FamilyTree()
+        tree.add_person(Person(LastName('X'), ('Y',), birthday=Event(place=Place('Paris, Seine, France'))))
+        tree.add_person(Person(LastName('X'), ('Z',), birthday=Event(place=Place('PARIS 75')),
+                               death=Event(place=Place('Lyon'))))
+        tree.add_person(Person(LastName('X'), ('W',)))
+        assert normalize_places(tree, Gazetteer()) == 1
+        assert tree.get_person(0).birthday.place == Place('Paris, Seine, France')
+        assert tree.get_person(1).birthday.place == tree.get_person(0).birthday.place
+        assert tree.get_person(1).death.place == Place('Lyon')
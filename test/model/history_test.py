@@ -0,0 +1,145 @@
+import pytest
+
+from app.entities import Person
+from app.model.history import History
+from app.model.tree import FamilyTree
+from app.utils import LastName
+
+
+def _person(name: str, notes: str = '') -> Person:
+    return Person(LastName(name), ('Jean',), notes=notes)
+
+
+def _names(tree: FamilyTree) -> dict[int, str]:
+    return {person_id: person.lastname.label for person_id, person in tree.persons()}
+
+
+class TestHistory:
+    def test_undo_redo_add(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree)
+        tree.add_person(_person('A'))
+        assert history.can_undo
+        assert history.undo() is not None
+        assert len(tree) == 0
+        assert not history.can_undo and history.can_redo
+        history.redo()
+        assert _names(tree) == {0: 'A'}
+
+    def test_undo_redo_update_remove(self):
+        tree = FamilyTree()
+        tree.add_person(_person('A'))
+        tree.add_person(_person('B'))
+        history = History.for_tree(tree)
+        tree.update_person(0, _person('C'))
+        tree.remove_person(1)
+        history.undo()
+        assert _names(tree) == {0: 'C', 1: 'B'}
+        history.undo()
+        assert _names(tree) == {0: 'A', 1: 'B'}
+        assert history.undo() is None
+        history.redo()
+        history.redo()
+        assert _names(tree) == {0: 'C'}
+        assert history.redo() is None
+
+    def test_new_change_clears_redo(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree)
+        tree.add_person(_person('A'))
+        history.undo()
+        tree.add_person(_person('B'))
+        assert not history.can_redo
+        assert history.size == history._undo_steps[0].size
+
+    def test_group(self):
+        tree = FamilyTree()
+        tree.add_person(_person('A'))
+        history = History.for_tree(tree)
+        with history.group('bulk'):
+            tree.update_person(0, _person('B'))
+            with history.group('inner'):
+                tree.add_person(_person('C'))
+            tree.update_person(0, _person('D'))
+        assert history.undo_label == 'bulk'
+        history.undo()
+        assert _names(tree) == {0: 'A'}
+        assert not history.can_undo
+        assert history.redo_label == 'bulk'
+        history.redo()
+        assert _names(tree) == {0: 'D', 1: 'C'}
+
+    def test_empty_group(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree)
+        with history.group('nothing'):
+            pass
+        assert not history.can_undo
+
+    def test_undo_in_group(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree)
+        tree.add_person(_person('A'))
+        with history.group():
+            with pytest.raises(ValueError):
+                history.undo()
+
+    def test_records_stored_persons(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree)
+        person = _person('A')
+        tree.add_person(person)
+        change = history._undo_steps[0].changes[0]
+        assert change.new_person is not person
+        assert change.new_person == person
+
+    def test_budget_drops_oldest_steps(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree)
+        tree.add_person(_person('A'))
+        tree.update_person(0, _person('B'))
+        step_size = history.size - history._undo_steps[0].size
+        history = History.for_tree(tree, budget=2 * step_size)
+        for name in 'CDE':
+            tree.update_person(0, _person(name))
+        assert history.size == 2 * step_size
+        history.undo()
+        history.undo()
+        assert not history.can_undo
+        assert _names(tree) == {0: 'C'}
+
+    def test_budget_drops_too_large_step(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree, budget=1)
+        tree.add_person(_person('A'))
+        assert not history.can_undo
+        assert history.size == 0
+
+    def test_size_of_large_notes(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree)
+        tree.add_person(_person('A'))
+        small_size = history.size
+        tree.update_person(0, _person('A', notes='x' * 100_000))
+        # The step holds the old person and the new one with its notes
+        assert history.size - small_size >= 100_000 + small_size
+
+    def test_budget_counts_notes(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree, budget=150_000)
+        tree.add_person(_person('A', notes='x' * 100_000))
+        tree.add_person(_person('B', notes='y' * 100_000))
+        assert history.size < 150_000
+        history.undo()
+        assert not history.can_undo
+        assert _names(tree) == {0: 'A'}
+
+    def test_listeners(self):
+        tree = FamilyTree()
+        history = History.for_tree(tree)
+        calls = []
+        history.add_listener(lambda: calls.append(history.can_undo))
+        tree.add_person(_person('A'))
+        history.undo()
+        history.redo()
+        assert calls == [True, False, True]
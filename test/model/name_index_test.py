@@ -0,0 +1,54 @@
+import pytest
+
+from app.entities import Person
+from app.model import phonetics
+from app.model.name_index import FIRSTNAMES, PhoneticIndex
+from app.model.tree import FamilyTree
+from app.utils import LastName
+
+
+def _person(lastname: str, *firstnames: str) -> Person:
+    return Person(LastName(lastname), firstnames)
+
+
+class TestPhoneticIndex:
+    def test_search_lastname(self):
+        tree = FamilyTree()
+        pid1 = tree.add_person(_person('Dupont', 'Jean'))
+        pid2 = tree.add_person(_person('Dupond', 'Pierre'))
+        tree.add_person(_person('Martin', 'Jean'))
+        index = PhoneticIndex.for_tree(tree)
+        assert index.search('Dupon', phonetics.FRENCH) == {pid1, pid2}
+
+    def test_search_firstnames(self):
+        tree = FamilyTree()
+        pid1 = tree.add_person(_person('Dupont', 'Jean', 'Philippe'))
+        tree.add_person(_person('Martin', 'Pierre'))
+        index = PhoneticIndex.for_tree(tree)
+        assert index.search('Filipe', phonetics.FRENCH, field=FIRSTNAMES) == {pid1}
+
+    def test_search_multiple_codes(self):
+        tree = FamilyTree()
+        pid = tree.add_person(_person('Jackson'))
+        index = PhoneticIndex.for_tree(tree)
+        assert index.search('Jaxon', phonetics.DAITCH_MOKOTOFF) == {pid}
+
+    def test_incremental_update(self):
+        tree = FamilyTree()
+        index = PhoneticIndex.for_tree(tree)
+        pid = tree.add_person(_person('Dupont'))
+        assert index.search('Dupond', phonetics.SOUNDEX) == {pid}
+        tree.update_person(pid, _person('Martin'))
+        assert index.search('Dupond', phonetics.SOUNDEX) == set()
+        assert index.search('Martine', phonetics.SOUNDEX) == {pid}
+        tree.remove_person(pid)
+        assert index.search('Martine', phonetics.SOUNDEX) == set()
+
+    def test_algorithm_not_indexed(self):
+        index = PhoneticIndex([phonetics.SOUNDEX])
+        with pytest.raises(ValueError):
+            index.search('Martin', phonetics.FRENCH)
+
+    def test_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            PhoneticIndex(['metaphone'])
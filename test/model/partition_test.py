@@ -0,0 +1,50 @@
+import pytest
+
+from app.entities import Person
+from app.model.partition import Partition, connected_components, partitions
+from app.model.tree import FamilyTree
+from app.utils import LastName
+
+
+def _tree(*parent_ids: tuple[int, ...]) -> FamilyTree:
+    tree = FamilyTree()
+    for ids in parent_ids:
+        tree.add_person(Person(LastName('X'), ('Y',), parent_ids=ids))
+    return tree
+
+
+class TestConnectedComponents:
+    def test_separate(self):
+        assert connected_components(_tree((), (), ())) == [[0], [1], [2]]
+
+    def test_linked(self):
+        # 0 and 1 are parents of 2; 3 is alone; 4 is a child of 3 and an unknown person
+        assert connected_components(_tree((), (), (0, 1), (), (3, 99))) == [[0, 1, 2], [3, 4]]
+
+    def test_linked_through_descendants(self):
+        # 0 → 2 ← 1, 2 → 3
+        assert connected_components(_tree((), (), (0, 1), (2,))) == [[0, 1, 2, 3]]
+
+
+class TestPartitions:
+    def test_packed_components(self):
+        tree = _tree((), (), (0,), ())
+        assert list(partitions(tree, 3)) == [Partition((0, 2, 1)), Partition((3,))]
+
+    def test_each_person_once(self):
+        # Chain of 10 generations
+        tree = _tree((), *((i,) for i in range(9)))
+        parts = list(partitions(tree, 3))
+        assert sorted(pid for p in parts for pid in p.core) == list(range(10))
+        assert all(len(p.core) <= 3 for p in parts)
+
+    def test_halo(self):
+        tree = _tree((), *((i,) for i in range(5)))
+        for p in partitions(tree, 2):
+            core = set(p.core)
+            linked = {pid for pid in core for pid in (pid - 1, pid + 1) if 0 <= pid < 6} - core
+            assert set(p.halo) == linked
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            list(partitions(_tree(()), 0))
@@ -0,0 +1,179 @@
+import pickle
+import tracemalloc
+import typing as typ
+
+import pytest
+
+from app.entities import Person
+from app.model.date import Date
+from app.model.person_store import InternTable, PersonStore, Tables, decode_date, encode_date
+from app.utils import Event, LastName, Place
+
+
+def _person(name: str, *firstnames: str, **kwargs) -> Person:
+    return Person(LastName(name), firstnames, **kwargs)
+
+
+def _generated_persons(n: int) -> typ.Iterator[tuple[int, Person]]:
+    """Generates persons with repeated names, dates and places, each with its own strings as if read from a file."""
+    for i in range(n):
+        yield i, _person(f'Name{i % 100}', f'First{i % 50}', f'Second{i % 30}',
+                         birthday=Event(Date(year=1800 + i % 200), Place(f'Place{i % 40}')),
+                         parent_ids=(i - 2, i - 1) if i >= 2 else ())
+
+
+class TestPackedDates:
+    @pytest.mark.parametrize('date', [
+        None,
+        Date(day=1, month=1, year=1),
+        Date(day=31, month=12, year=2024),
+        Date(year=1850),
+        Date(month=3, year=1850),
+        Date(day=14, month=7),
+        Date(year=-44, precision=1),
+        Date(day=2, month=5, year=1900, precision=3),
+    ])
+    def test_round_trip(self, date):
+        assert decode_date(encode_date(date)) == date
+
+    def test_none(self):
+        assert encode_date(None) == -1
+
+
+class TestInternTable:
+    def test_intern(self):
+        table = InternTable()
+        assert table.intern('a') == 0
+        assert table.intern('b') == 1
+        assert table.intern('a') == 0
+        assert len(table) == 2
+        assert table[1] == 'b'
+
+
+class TestPersonStore:
+    def test_set_get(self):
+        store = PersonStore(1024, 1024, Tables())
+        person = _person('A', 'B', 'C', birthday=Event(Date(year=1850), Place('P', 1, 2)),
+                         death=Event(place=Place('Q')), notes='n', parent_ids=(1, 2))
+        store.set(1030, person)
+        view = store.get(1030)
+        assert view == person
+        assert view.to_person() == person
+        assert view.firstnames == ('B', 'C')
+        assert view.birthday == person.birthday
+        assert view.death == person.death
+        assert view.parent_ids == (1, 2)
+        assert view.full_name == person.full_name
+        assert 1030 in store
+        assert store.get(1031) is None
+        assert 5 not in store
+
+    def test_empty_person(self):
+        store = PersonStore(0, 16, Tables())
+        person = Person(None, ())
+        store.set(0, person)
+        view = store.get(0)
+        assert view == person
+        assert view.lastname is None
+        assert view.birthday is None
+        assert view.death is None
+
+    def test_out_of_range(self):
+        store = PersonStore(0, 16, Tables())
+        with pytest.raises(IndexError):
+            store.set(16, _person('A'))
+
+    def test_interned_values(self):
+        tables = Tables()
+        store = PersonStore(0, 16, tables)
+        store.set(0, _person('A', 'B', birthday=Event(place=Place('P'))))
+        store.set(1, _person('A', 'B', death=Event(place=Place('P'))))
+        assert len(tables.lastnames) == len(tables.firstnames) == len(tables.places) == 1
+        assert store.get(0).lastname is store.get(1).lastname
+        assert store.get(0).birthday.place is store.get(1).death.place
+
+    def test_update_keeps_views(self):
+        store = PersonStore(0, 16, Tables())
+        store.set(0, _person('A'))
+        view = store.get(0)
+        store.set(0, _person('B'))
+        assert view == _person('A')
+        assert store.get(0) == _person('B')
+        assert len(store) == 1
+
+    def test_remove(self):
+        store = PersonStore(0, 16, Tables())
+        store.set(0, _person('A'))
+        store.set(1, _person('B'))
+        store.remove(0)
+        store.remove(0)
+        assert len(store) == 1
+        assert list(store.items()) == [(1, _person('B'))]
+
+    def test_items_sorted_by_id(self):
+        store = PersonStore(0, 16, Tables())
+        for person_id in (3, 0, 7):
+            store.set(person_id, _person(str(person_id)))
+        assert [person_id for person_id, _ in store.items()] == [0, 3, 7]
+
+    def test_copy_isolation(self):
+        store = PersonStore(0, 16, Tables())
+        store.set(0, _person('A'))
+        copy = store.copy()
+        copy.set(0, _person('B'))
+        copy.set(1, _person('C'))
+        assert list(store.items()) == [(0, _person('A'))]
+        assert list(copy.items()) == [(0, _person('B')), (1, _person('C'))]
+
+    def test_compaction(self):
+        store = PersonStore(0, 16, Tables())
+        store.set(0, _person('A', birthday=Event(Date(year=1900))))
+        view = store.get(0)
+        for i in range(100):
+            store.set(1, _person(str(i), parent_ids=(0,)))
+        assert len(store._rows) <= 2 * len(store) + 16
+        assert view == store.get(0) == _person('A', birthday=Event(Date(year=1900)))
+        assert store.get(1) == _person('99', parent_ids=(0,))
+
+    def test_memory(self):
+        n = 10_000
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            persons = list(_generated_persons(n))
+            persons_size = tracemalloc.get_traced_memory()[0] - start
+            del persons
+            start = tracemalloc.get_traced_memory()[0]
+            store = PersonStore(0, n, Tables())
+            for person_id, person in _generated_persons(n):
+                store.set(person_id, person)
+            store_size = tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+        assert len(store) == n
+        assert store_size * 5 < persons_size
+
+
+class TestPersonView:
+    def test_hash(self):
+        store = PersonStore(0, 16, Tables())
+        person = _person('A', 'B', birthday=Event(place=Place('P')))
+        store.set(0, person)
+        store.set(1, person)
+        assert store.get(0) == store.get(1)
+        assert hash(store.get(0)) == hash(person)
+        assert {store.get(0), store.get(1), person} == {person}
+
+    def test_not_equal(self):
+        store = PersonStore(0, 16, Tables())
+        store.set(0, _person('A'))
+        assert store.get(0) != _person('B')
+        assert store.get(0) != 'A'
+
+    def test_pickle(self):
+        store = PersonStore(0, 16, Tables())
+        person = _person('A', 'B', death=Event(Date(day=1, month=2, year=1900), Place('P')))
+        store.set(0, person)
+        unpickled = pickle.loads(pickle.dumps(store.get(0)))
+        assert type(unpickled) is Person
+        assert unpickled == person
@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+from app.entities import Person
+from app.model.date import Date
+from app.model.person_table import BIRTH_DATE, BIRTH_PLACE, NAME, PersonTable
+from app.model.tree import FamilyTree
+from app.utils import Event, LastName, Place
+
+
+def _person(lastname: str, firstname: str, date: Date = None, place: str = None) -> Person:
+    birthday = Event(date, Place(place) if place else None) if date or place else None
+    return Person(LastName(lastname), (firstname,), birthday=birthday)
+
+
+def _tree() -> FamilyTree:
+    tree = FamilyTree()
+    tree.add_person(_person('Martin', 'Pierre', Date(year=1850), 'Paris'))  # 0
+    tree.add_person(_person('Dupont', 'Jean', Date(day=3, month=2, year=1850), 'Lyon'))  # 1
+    tree.add_person(_person('Émery', 'Anne', Date(year=1820, precision=Date.APPROX)))  # 2
+    tree.add_person(_person('Dupont', 'Alice'))  # 3
+    return tree
+
+
+def _rows(table: PersonTable) -> list[int]:
+    return [table.person_id(row) for row in range(len(table))]
+
+
+class TestPersonTable:
+    def test_sorted_by_name(self):
+        assert _rows(PersonTable.for_tree(_tree())) == [3, 1, 2, 0]
+
+    def test_sorted_by_birth_date(self):
+        table = PersonTable.for_tree(_tree())
+        table.sort(BIRTH_DATE)
+        assert _rows(table) == [2, 0, 1, 3]
+
+    def test_sorted_by_birth_place(self):
+        table = PersonTable.for_tree(_tree())
+        table.sort(BIRTH_PLACE)
+        assert _rows(table) == [2, 3, 1, 0]
+
+    def test_descending(self):
+        table = PersonTable.for_tree(_tree())
+        table.sort(NAME, descending=True)
+        assert _rows(table) == [0, 2, 1, 3]
+
+    def test_invalid_column(self):
+        with pytest.raises(ValueError):
+            PersonTable().sort(3)
+
+    def test_filter(self):
+        table = PersonTable.for_tree(_tree())
+        table.set_filter('dupont')
+        assert _rows(table) == [3, 1]
+        table.set_filter('JEAN Dup')
+        assert _rows(table) == [1]
+        table.set_filter('')
+        assert len(table) == 4
+
+    def test_row_of(self):
+        table = PersonTable.for_tree(_tree())
+        table.sort(BIRTH_DATE, descending=True)
+        assert [table.row_of(pid) for pid in range(4)] == [2, 1, 3, 0]
+        assert table.row_of(10) is None
+
+    def test_row_of_filtered_out(self):
+        table = PersonTable.for_tree(_tree())
+        table.set_filter('martin')
+        assert table.row_of(1) is None
+
+    def test_person_id_out_of_range(self):
+        with pytest.raises(IndexError):
+            PersonTable.for_tree(_tree()).person_id(4)
+
+    def test_insertion_row(self):
+        table = PersonTable.for_tree(_tree())
+        person = _person('Dupont', 'Bob')
+        row = table.insertion_row(4, person)
+        table.add(4, person)
+        assert row == table.row_of(4) == 1
+
+    def test_insertion_row_descending(self):
+        table = PersonTable.for_tree(_tree())
+        table.sort(NAME, descending=True)
+        person = _person('Dupont', 'Bob')
+        row = table.insertion_row(4, person)
+        table.add(4, person)
+        assert row == table.row_of(4) == 3
+
+    def test_duplicate(self):
+        table = PersonTable.for_tree(_tree())
+        with pytest.raises(ValueError):
+            table.add(0, _person('A', 'B'))
+
+    @pytest.mark.parametrize('column', [NAME, BIRTH_DATE, BIRTH_PLACE])
+    def test_incremental_matches_rebuild(self, column):
+        rng = random.Random(column)
+        tree = FamilyTree()
+        table = PersonTable.for_tree(tree)
+        table.sort(column)
+        table.set_filter('a')
+        names = ['Anne', 'Paul', 'Jean', 'Marie', 'Luc']
+        places = [None, 'Paris', 'Lyon', 'Nantes']
+
+        def random_person() -> Person:
+            date = Date(year=rng.randint(1800, 1805), month=rng.choice([None, 1, 2])) if rng.random() < 0.8 else None
+            return _person(rng.choice(names), rng.choice(names), date, rng.choice(places))
+
+        for _ in range(300):
+            ids = [pid for pid, _ in tree.persons()]
+            r = rng.random()
+            if r < 0.5 or not ids:
+                tree.add_person(random_person())
+            elif r < 0.75:
+                tree.remove_person(rng.choice(ids))
+            else:
+                tree.update_person(rng.choice(ids), random_person())
+        expected = PersonTable.for_tree(tree)
+        expected.sort(column)
+        expected.set_filter('a')
+        assert _rows(table) == _rows(expected)
+        assert len(table) > 0
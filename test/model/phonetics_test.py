@@ -0,0 +1,73 @@
+import pytest
+
+from app.model import phonetics
+
+
+class TestSoundex:
+    def test_same_code(self):
+        assert phonetics.soundex('Robert') == phonetics.soundex('Rupert') == 'R163'
+
+    def test_h_w_do_not_separate(self):
+        assert phonetics.soundex('Ashcraft') == 'A261'
+
+    def test_first_letter_code_ignored(self):
+        assert phonetics.soundex('Pfister') == 'P236'
+
+    def test_padding(self):
+        assert phonetics.soundex('Lee') == 'L000'
+
+    def test_accents(self):
+        assert phonetics.soundex('Bérénice') == phonetics.soundex('Berenice')
+
+    def test_empty(self):
+        assert phonetics.soundex('') == ''
+        assert phonetics.soundex('--') == ''
+
+
+class TestDaitchMokotoff:
+    @pytest.mark.parametrize('name, codes', [
+        ('Peters', {'734000', '739400'}),
+        ('Kleinman', {'586660'}),
+        ('Moskowitz', {'645740'}),
+        ('Auerbach', {'097400', '097500'}),
+        ('Lipshitz', {'874400'}),
+        ('Lippszyc', {'874400', '874500'}),
+        ('Jackson', {'154600', '454600', '145460', '445460'}),
+        ('Schwarzenegger', {'474659', '479465'}),
+        ('Rosochowaciec', {'944744', '944745', '944754', '944755', '945744', '945745', '945754', '945755'}),
+        ('Topf', {'370000'}),
+    ])
+    def test_codes(self, name, codes):
+        assert phonetics.daitch_mokotoff(name) == codes
+
+    def test_empty(self):
+        assert phonetics.daitch_mokotoff('') == set()
+
+
+class TestFrenchPhonetic:
+    def test_same_code(self):
+        assert phonetics.french_phonetic('Dupont') == phonetics.french_phonetic('Dupond') == 'DPN'
+
+    def test_ph(self):
+        assert phonetics.french_phonetic('Philippe') == 'FLP'
+
+    def test_silent_h(self):
+        assert phonetics.french_phonetic('Gauthier') == phonetics.french_phonetic('Gautier')
+
+    def test_double_letters(self):
+        assert phonetics.french_phonetic('Mathieu') == phonetics.french_phonetic('Matthieu')
+
+    def test_accents(self):
+        assert phonetics.french_phonetic('Hélène') == phonetics.french_phonetic('Helene')
+
+    def test_empty(self):
+        assert phonetics.french_phonetic('') == ''
+
+
+class TestEncode:
+    def test_unknown_algorithm(self):
+        with pytest.raises(ValueError):
+            phonetics.encode('Martin', 'metaphone')
+
+    def test_set(self):
+        assert phonetics.encode('Robert', phonetics.SOUNDEX) == {'R163'}
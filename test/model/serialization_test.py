@@ -0,0 +1,89 @@
+import pytest
+
+from app.entities import Person
+from app.model.date import Date
+from app.model.serialization import TreeFileError, dump_tree, load_tree, read_save_id
+from app.model.tree import FamilyTree
+from app.utils import Event, LastName, Place
+
+
+class TestSerialization:
+    def test_round_trip(self, tmp_path):
+        tree = FamilyTree()
+        tree.add_person(Person(
+            LastName('Dupont'),
+            ('Jean', 'Émile'),
+            birthday=Event(Date(day=1, month=2, year=1850, precision=Date.APPROX), Place('Paris', 2.35, 48.85)),
+        ))
+        tree.add_person(Person(LastName('Martin'), ()), person_id=4000)
+        path = tmp_path / 'tree.json'
+        dump_tree(tree.snapshot(), path)
+        loaded = load_tree(path)
+        assert len(loaded) == 2
+        person = loaded[0]
+        assert person.lastname.label == 'Dupont'
+        assert person.firstnames == ('Jean', 'Émile')
+        assert person.birthday.date == Date(day=1, month=2, year=1850)
+        assert person.birthday.date.precision == Date.APPROX
+        assert person.birthday.place == Place('Paris', 2.35, 48.85)
+        assert person.death is None
+        assert loaded[4000].lastname.label == 'Martin'
+
+    def test_no_temporary_file_left(self, tmp_path):
+        path = tmp_path / 'tree.json'
+        dump_tree(FamilyTree().snapshot(), path)
+        assert [p.name for p in tmp_path.iterdir()] == ['tree.json']
+
+    def test_invalid_file(self, tmp_path):
+        path = tmp_path / 'tree.json'
+        path.write_text('{"version": 1}\n[0, {}]\n', encoding='UTF-8')
+        with pytest.raises(TreeFileError):
+            load_tree(path)
+
+    @pytest.mark.parametrize('content', [
+        b'[]\n',
+        b'{"version": 1}\n[0, {"lastname": "\xff\xfe"}]\n',
+        b'\xff\n',
+        b'{"version": 1}\n[0]\n',
+        b'{"version": 1, "next_id": "x"}\n',
+        b'{"version": 1}\n[0, {"lastname": null, "firstnames": [], "birthday": null, "death": null}]\n'
+        b'[0, {"lastname": null, "firstnames": [], "birthday": null, "death": null}]\n',
+    ])
+    def test_corrupt_file(self, tmp_path, content):
+        path = tmp_path / 'tree.json'
+        path.write_bytes(content)
+        with pytest.raises(TreeFileError):
+            load_tree(path)
+
+    @pytest.mark.parametrize('content', [b'[]\n', b'\xff\n'])
+    def test_save_id_corrupt_file(self, tmp_path, content):
+        path = tmp_path / 'tree.json'
+        path.write_bytes(content)
+        assert read_save_id(path) is None
+
+    def test_next_id_restored(self, tmp_path):
+        tree = FamilyTree()
+        tree.add_person(Person(LastName('A'), ()))
+        tree.add_person(Person(LastName('B'), ()))
+        tree.remove_person(1)
+        path = tmp_path / 'tree.json'
+        dump_tree(tree.snapshot(), path)
+        loaded = load_tree(path)
+        assert loaded.next_id == 2
+        assert loaded.add_person(Person(LastName('C'), ())) == 2
+
+    def test_notes(self, tmp_path):
+        tree = FamilyTree()
+        tree.add_person(Person(LastName('Dupont'), (), notes='Blacksmith'))
+        path = tmp_path / 'tree.json'
+        dump_tree(tree.snapshot(), path)
+        assert load_tree(path)[0].notes == 'Blacksmith'
+
+    def test_save_id(self, tmp_path):
+        path = tmp_path / 'tree.json'
+        save_id = dump_tree(FamilyTree().snapshot(), path)
+        assert read_save_id(path) == save_id
+        assert dump_tree(FamilyTree().snapshot(), path) != save_id
+
+    def test_save_id_missing_file(self, tmp_path):
+        assert read_save_id(tmp_path / 'tree.json') is None
@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+from app.entities import Person
+from app.model.spatial import SpatialIndex, distance
+from app.model.timeline import BIRTH, DEATH
+from app.model.tree import FamilyTree
+from app.utils import Event, LastName, Place
+
+PARIS = Place('Paris', 2.3522, 48.8566)
+VERSAILLES = Place('Versailles', 2.1301, 48.8049)
+LYON = Place('Lyon', 4.8357, 45.7640)
+FIJI = Place('Suva', 178.4419, -18.1416)
+SAMOA = Place('Apia', -171.7514, -13.8333)
+NOWHERE = Place('Nowhere')
+
+
+def _person(birth_place: Place = None, death_place: Place = None) -> Person:
+    return Person(LastName('X'), ('Y',), birthday=Event(place=birth_place) if birth_place else None,
+                  death=Event(place=death_place) if death_place else None)
+
+
+def _labels(results) -> list[str]:
+    return [r.place.label for r in results]
+
+
+class TestDistance:
+    def test_paris_lyon(self):
+        assert distance(PARIS.x, PARIS.y, LYON.x, LYON.y) == pytest.approx(392, abs=1)
+
+    def test_same(self):
+        assert distance(PARIS.x, PARIS.y, PARIS.x, PARIS.y) == 0
+
+    def test_antimeridian(self):
+        assert distance(179.5, 0, -179.5, 0) == pytest.approx(111.2, abs=0.1)
+
+    def test_antipodes(self):
+        assert distance(0, 0, 180, 0) == pytest.approx(20015, abs=1)
+
+
+class TestSpatialIndex:
+    @pytest.fixture
+    def tree(self):
+        tree = FamilyTree()
+        tree.add_person(_person(PARIS, LYON))
+        tree.add_person(_person(VERSAILLES, PARIS))
+        tree.add_person(_person(FIJI, NOWHERE))
+        tree.add_person(_person(SAMOA))
+        return tree
+
+    def test_for_tree(self, tree):
+        index = SpatialIndex.for_tree(tree)
+        assert len(index) == 5
+        assert NOWHERE not in index
+        assert index.events(PARIS) == [(0, BIRTH), (1, DEATH)]
+
+    def test_within_radius(self, tree):
+        index = SpatialIndex.for_tree(tree)
+        assert _labels(index.within_radius(PARIS.x, PARIS.y, 20)) == ['Paris', 'Versailles']
+        assert _labels(index.within_radius(PARIS.x, PARIS.y, 500)) == ['Paris', 'Versailles', 'Lyon']
+
+    def test_within_radius_predicate(self, tree):
+        index = SpatialIndex.for_tree(tree)
+        results = index.within_radius(PARIS.x, PARIS.y, 500, predicate=lambda p: p.label.startswith('V'))
+        assert _labels(results) == ['Versailles']
+
+    def test_within_radius_antimeridian(self, tree):
+        index = SpatialIndex.for_tree(tree)
+        assert _labels(index.within_radius(FIJI.x, FIJI.y, 1200)) == ['Suva', 'Apia']
+
+    def test_within_radius_pole(self):
+        tree = FamilyTree()
+        tree.add_person(_person(Place('A', -100, 89.5)))
+        tree.add_person(_person(Place('B', 80, 89.5)))
+        index = SpatialIndex.for_tree(tree)
+        assert _labels(index.within_radius(-100, 89.5, 120)) == ['A', 'B']
+
+    def test_in_box(self, tree):
+        index = SpatialIndex.for_tree(tree)
+        assert [p.label for p in index.in_box(0, 45, 5, 50)] == ['Lyon', 'Paris', 'Versailles']
+        assert [p.label for p in index.in_box(170, -20, -170, -10)] == ['Apia', 'Suva']
+
+    def test_nearest(self, tree):
+        index = SpatialIndex.for_tree(tree)
+        assert _labels(index.nearest(LYON.x, LYON.y, 2)) == ['Lyon', 'Paris']
+        assert _labels(index.nearest(0, 0, 10)) == ['Lyon', 'Versailles', 'Paris', 'Suva', 'Apia']
+
+    def test_events_within(self, tree):
+        index = SpatialIndex.for_tree(tree)
+        assert index.events_within(PARIS.x, PARIS.y, 20) == [(0, BIRTH), (1, DEATH), (1, BIRTH)]
+        assert index.events_within(PARIS.x, PARIS.y, 20, kind=BIRTH) == [(0, BIRTH), (1, BIRTH)]
+
+    def test_update(self, tree):
+        index = SpatialIndex.for_tree(tree)
+        tree.update_person(1, _person(LYON))
+        assert VERSAILLES not in index
+        assert index.events(PARIS) == [(0, BIRTH)]
+        assert index.events(LYON) == [(0, DEATH), (1, BIRTH)]
+        tree.remove_person(0)
+        assert PARIS not in index
+        assert _labels(index.within_radius(PARIS.x, PARIS.y, 500)) == ['Lyon']
+
+    def test_random(self):
+        rng = random.Random(0)
+        places = [Place(str(i), rng.uniform(-180, 180), rng.uniform(-90, 90)) for i in range(2000)]
+        tree = FamilyTree()
+        for place in places:
+            tree.add_person(_person(place))
+        index = SpatialIndex.for_tree(tree)
+        for _ in range(50):
+            x, y, radius = rng.uniform(-180, 180), rng.uniform(-90, 90), rng.uniform(0, 3000)
+            expected = sorted(p.label for p in places if distance(x, y, p.x, p.y) <= radius)
+            assert sorted(_labels(index.within_radius(x, y, radius))) == expected
+            nearest = sorted(places, key=lambda p: distance(x, y, p.x, p.y))[:5]
+            assert _labels(index.nearest(x, y, 5)) == [p.label for p in nearest]
@@ -0,0 +1,86 @@
+from app.entities import Person
+from app.model.serialization import dump_tree, read_save_id
+from app.model.text_index import NAME, NOTES, PLACE, TextIndex, index_path, tokenize
+from app.model.tree import FamilyTree
+from app.utils import Event, LastName, Place
+
+
+def _person(lastname: str, firstname: str, place: str = None, notes: str = '') -> Person:
+    return Person(LastName(lastname), (firstname,), birthday=Event(place=Place(place)) if place else None,
+                  notes=notes)
+
+
+def _tree() -> FamilyTree:
+    tree = FamilyTree()
+    tree.add_person(_person('Dupont', 'Hélène', 'Saint-Étienne', 'Blacksmith in Paris'))
+    tree.add_person(_person('Martin', 'Jean', 'Paris'))
+    tree.add_person(_person('Paris', 'Étienne'))
+    return tree
+
+
+class TestTokenize:
+    def test_accents_and_case(self):
+        assert tokenize('Hélène ÉTIENNE') == ['helene', 'etienne']
+
+    def test_punctuation(self):
+        assert tokenize("Sainte-Marie-d'Œuvray, France") == ['sainte', 'marie', 'd', 'oeuvray', 'france']
+
+
+class TestTextIndex:
+    def test_search_all_fields(self):
+        assert TextIndex.for_tree(_tree()).search('paris') == {0, 1, 2}
+
+    def test_search_field(self):
+        index = TextIndex.for_tree(_tree())
+        assert index.search('paris', fields=NAME) == {2}
+        assert index.search('paris', fields=PLACE) == {1}
+        assert index.search('paris', fields=NOTES) == {0}
+
+    def test_search_accent_folding(self):
+        assert TextIndex.for_tree(_tree()).search('etienne') == {0, 2}
+
+    def test_search_all_tokens(self):
+        assert TextIndex.for_tree(_tree()).search('jean paris') == {1}
+
+    def test_search_prefix(self):
+        index = TextIndex.for_tree(_tree())
+        assert index.search('dup') == {0}
+        assert index.search('dup', prefix=False) == set()
+
+    def test_search_no_match(self):
+        assert TextIndex.for_tree(_tree()).search('lyon') == set()
+
+    def test_search_empty_query(self):
+        assert TextIndex.for_tree(_tree()).search('') == set()
+
+    def test_incremental_update(self):
+        tree = _tree()
+        index = TextIndex.for_tree(tree)
+        assert index.search('dup') == {0}
+        tree.update_person(0, _person('Durand', 'Hélène'))
+        assert index.search('dup') == set()
+        assert index.search('dur') == {0}
+        pid = tree.add_person(_person('Duval', 'Marc'))
+        assert index.search('du') == {0, pid}
+        tree.remove_person(pid)
+        assert index.search('du') == {0}
+
+    def test_save_load(self, tmp_path):
+        tree = _tree()
+        tree_path = tmp_path / 'tree.json'
+        save_id = dump_tree(tree.snapshot(), tree_path)
+        TextIndex.for_tree(tree).save(index_path(tree_path), save_id)
+        index = TextIndex.load(index_path(tree_path), read_save_id(tree_path))
+        assert index.search('paris', fields=PLACE) == {1}
+        assert index.search('dup') == {0}
+
+    def test_load_out_of_sync(self, tmp_path):
+        tree = _tree()
+        tree_path = tmp_path / 'tree.json'
+        save_id = dump_tree(tree.snapshot(), tree_path)
+        TextIndex.for_tree(tree).save(index_path(tree_path), save_id)
+        dump_tree(tree.snapshot(), tree_path)
+        assert TextIndex.load(index_path(tree_path), read_save_id(tree_path)) is None
+
+    def test_load_missing_file(self, tmp_path):
+        assert TextIndex.load(tmp_path / 'tree.json.index', 'id') is None
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from app.entities import Person
+from app.model.date import Date
+from app.model.timeline import BIRTH, DEATH, SortedList, TimelineIndex
+from app.model.tree import FamilyTree
+from app.utils import Event, LastName, Place
+
+PARIS = Place('Paris')
+LYON = Place('Lyon')
+
+
+def _person(birth: Date = None, death: Date = None, place: Place = None) -> Person:
+    return Person(LastName('X'), ('Y',), birthday=Event(birth, place) if birth else None,
+                  death=Event(death) if death else None)
+
+
+def _summary(events) -> list[tuple[int, int]]:
+    return [(e.person_id, e.kind) for e in events]
+
+
+class TestSortedList:
+    def test_init(self):
+        assert list(SortedList([3, 1, 2])) == [1, 2, 3]
+
+    def test_add_remove(self):
+        values = list(range(5000))
+        random.Random(0).shuffle(values)
+        sorted_list = SortedList()
+        for value in values:
+            sorted_list.add(value)
+        assert list(sorted_list) == list(range(5000))
+        for value in values[:2500]:
+            sorted_list.remove(value)
+        assert list(sorted_list) == sorted(values[2500:])
+        assert len(sorted_list) == 2500
+
+    def test_remove_missing(self):
+        with pytest.raises(ValueError):
+            SortedList([1, 3]).remove(2)
+
+    def test_contains(self):
+        sorted_list = SortedList([1, 3])
+        assert 3 in sorted_list and 2 not in sorted_list and 4 not in sorted_list
+
+    def test_bisect_left(self):
+        sorted_list = SortedList(range(0, 6000, 2))
+        assert sorted_list.bisect_left(2501) == 1251
+        assert sorted_list.bisect_left(-1) == 0
+        assert sorted_list.bisect_left(10_000) == 3000
+
+    def test_islice(self):
+        sorted_list = SortedList(range(3000))
+        assert list(sorted_list.islice(990, 1010)) == list(range(990, 1010))
+        assert list(sorted_list.islice(2995, 4000)) == list(range(2995, 3000))
+
+    def test_irange(self):
+        sorted_list = SortedList(range(0, 6000, 2))
+        assert list(sorted_list.irange(1995, 2005)) == [1996, 1998, 2000, 2002, 2004]
+
+
+class TestTimelineIndex:
+    @pytest.fixture
+    def tree(self) -> FamilyTree:
+        tree = FamilyTree()
+        tree.add_person(_person(Date(year=1850), Date(day=3, month=4, year=1900), PARIS))  # 0
+        tree.add_person(_person(Date(month=5, year=1850), None, LYON))  # 1
+        tree.add_person(_person(Date(day=1, month=1)))  # 2, no year
+        tree.add_person(_person(Date(year=1820), Date(year=1860), PARIS))  # 3
+        return tree
+
+    def test_global_order(self, tree):
+        index = TimelineIndex.for_tree(tree)
+        assert _summary(index.events()) == [(3, BIRTH), (0, BIRTH), (1, BIRTH), (3, DEATH), (0, DEATH)]
+        assert len(index) == 5
+
+    def test_range(self, tree):
+        index = TimelineIndex.for_tree(tree)
+        assert _summary(index.events(Date(year=1850), Date(year=1860))) == [(0, BIRTH), (1, BIRTH)]
+        assert index.count(Date(year=1850), Date(year=1861)) == 3
+        assert index.count(end=Date(year=1850)) == 1
+
+    def test_page(self, tree):
+        index = TimelineIndex.for_tree(tree)
+        assert _summary(index.page(1, 2)) == [(0, BIRTH), (1, BIRTH)]
+        assert _summary(index.page(1, 10, start=Date(year=1850))) == [(1, BIRTH), (3, DEATH), (0, DEATH)]
+
+    def test_person(self, tree):
+        index = TimelineIndex.for_tree(tree)
+        assert _summary(index.person_events(0)) == [(0, BIRTH), (0, DEATH)]
+        assert index.person_events(2) == []
+
+    def test_family(self, tree):
+        index = TimelineIndex.for_tree(tree)
+        assert _summary(index.family_events([0, 3], end=Date(year=1870))) == [(3, BIRTH), (0, BIRTH), (3, DEATH)]
+
+    def test_place(self, tree):
+        index = TimelineIndex.for_tree(tree)
+        assert _summary(index.place_events(PARIS)) == [(3, BIRTH), (0, BIRTH)]
+        assert _summary(index.place_events(Place('Nowhere'))) == []
+
+    def test_incremental(self, tree):
+        index = TimelineIndex.for_tree(tree)
+        tree.update_person(0, _person(Date(year=1830), None, LYON))
+        assert _summary(index.events()) == [(3, BIRTH), (0, BIRTH), (1, BIRTH), (3, DEATH)]
+        assert _summary(index.place_events(LYON)) == [(0, BIRTH), (1, BIRTH)]
+        tree.remove_person(3)
+        assert _summary(index.events()) == [(0, BIRTH), (1, BIRTH)]
+        assert _summary(index.place_events(PARIS)) == []
+
+    def test_same_as_rebuilt(self, tree):
+        index = TimelineIndex.for_tree(tree)
+        tree.add_person(_person(Date(year=1855, precision=Date.BEFORE), Date(year=1855)))
+        assert list(index.events()) == list(TimelineIndex.for_tree(tree).events())
+
+    def test_duplicate(self, tree):
+        index = TimelineIndex.for_tree(tree)
+        with pytest.raises(ValueError):
+            index.add(0, tree[0])
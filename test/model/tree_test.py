@@ -0,0 +1,127 @@
+import pytest
+
+from app.entities import Person
+from app.model.tree import FamilyTree
+from app.utils import LastName
+
+
+def _person(name: str) -> Person:
+    return Person(LastName(name), ('Jean',))
+
+
+class TestFamilyTree:
+    def test_add_person_generates_ids(self):
+        tree = FamilyTree()
+        assert tree.add_person(_person('A')) == 0
+        assert tree.add_person(_person('B')) == 1
+        assert len(tree) == 2
+
+    def test_add_person_explicit_id(self):
+        tree = FamilyTree()
+        assert tree.add_person(_person('A'), person_id=5000) == 5000
+        assert tree.add_person(_person('B')) == 5001
+
+    def test_add_person_duplicate_id(self):
+        tree = FamilyTree()
+        tree.add_person(_person('A'), person_id=1)
+        with pytest.raises(ValueError):
+            tree.add_person(_person('B'), person_id=1)
+
+    def test_update_person(self):
+        tree = FamilyTree()
+        pid = tree.add_person(_person('A'))
+        old = tree.update_person(pid, _person('B'))
+        assert old.lastname.label == 'A'
+        assert tree[pid].lastname.label == 'B'
+
+    def test_remove_person(self):
+        tree = FamilyTree()
+        pid = tree.add_person(_person('A'))
+        tree.remove_person(pid)
+        assert pid not in tree
+        assert len(tree) == 0
+
+    def test_remove_missing_person(self):
+        with pytest.raises(KeyError):
+            FamilyTree().remove_person(0)
+
+    def test_revision_incremented(self):
+        tree = FamilyTree()
+        pid = tree.add_person(_person('A'))
+        tree.update_person(pid, _person('B'))
+        tree.remove_person(pid)
+        assert tree.revision == 3
+
+    def test_persons_sorted(self):
+        tree = FamilyTree()
+        for pid in (3000, 2, 1):
+            tree.add_person(_person(str(pid)), person_id=pid)
+        assert [pid for pid, _ in tree.persons()] == [1, 2, 3000]
+
+    #####################
+    # Snapshots
+    #####################
+
+    def test_snapshot_not_affected_by_update(self):
+        tree = FamilyTree()
+        pid = tree.add_person(_person('A'))
+        snapshot = tree.snapshot()
+        tree.update_person(pid, _person('B'))
+        assert snapshot.get_person(pid).lastname.label == 'A'
+        assert tree[pid].lastname.label == 'B'
+
+    def test_snapshot_not_affected_by_add_remove(self):
+        tree = FamilyTree()
+        pid = tree.add_person(_person('A'))
+        snapshot = tree.snapshot()
+        tree.remove_person(pid)
+        tree.add_person(_person('B'))
+        assert len(snapshot) == 1
+        assert [p.lastname.label for _, p in snapshot.persons()] == ['A']
+
+    def test_snapshot_shares_unmodified_buckets(self):
+        tree = FamilyTree()
+        tree.add_person(_person('A'), person_id=0)
+        tree.add_person(_person('B'), person_id=5000)
+        snapshot = tree.snapshot()
+        tree.update_person(0, _person('C'))
+        new_snapshot = tree.snapshot()
+        assert snapshot.buckets[0] is not new_snapshot.buckets[0]
+        assert snapshot.buckets[-1] is new_snapshot.buckets[-1]
+
+    def test_snapshot_revision(self):
+        tree = FamilyTree()
+        tree.add_person(_person('A'))
+        assert tree.snapshot().revision == tree.revision
+
+    def test_from_snapshot(self):
+        tree = FamilyTree()
+        pid = tree.add_person(_person('A'))
+        snapshot = tree.snapshot()
+        restored = FamilyTree.from_snapshot(snapshot)
+        restored.update_person(pid, _person('B'))
+        assert tree[pid].lastname.label == 'A'
+        assert snapshot.get_person(pid).lastname.label == 'A'
+        assert restored[pid].lastname.label == 'B'
+
+    #####################
+    # Listeners
+    #####################
+
+    def test_listener_notified(self):
+        tree = FamilyTree()
+        changes = []
+        tree.add_listener(changes.append)
+        pid = tree.add_person(_person('A'))
+        tree.update_person(pid, _person('B'))
+        tree.remove_person(pid)
+        assert [(c.old_person and c.old_person.lastname.label, c.new_person and c.new_person.lastname.label)
+                for c in changes] == [(None, 'A'), ('A', 'B'), ('B', None)]
+
+    def test_removed_listener_not_notified(self):
+        tree = FamilyTree()
+        changes = []
+        tree.add_listener(changes.append)
+        tree.remove_listener(changes.append)
+        tree.add_person(_person('A'))
+        assert changes == []
@@ -0,0 +1,83 @@
+from app.entities import Person
+from app.model.tree import FamilyTree
+from app.model.trigram_index import TrigramIndex, trigrams
+from app.utils import LastName
+
+
+def _person(lastname: str, firstname: str) -> Person:
+    return Person(LastName(lastname), (firstname,))
+
+
+def _tree() -> FamilyTree:
+    tree = FamilyTree()
+    tree.add_person(_person('Dupont', 'Jean'))
+    tree.add_person(_person('Dupond', 'Jeanne'))
+    tree.add_person(_person('Martin', 'Pierre'))
+    return tree
+
+
+def _ids(batches) -> list[int]:
+    return [m.person_id for batch in batches for m in batch]
+
+
+class TestTrigrams:
+    def test_padding(self):
+        assert trigrams('Jo') == {'  j', ' jo', 'jo '}
+
+    def test_last_word_prefix(self):
+        assert trigrams('Jo', last_word_complete=False) == {'  j', ' jo'}
+
+    def test_accents(self):
+        assert trigrams('Éa') == trigrams('ea')
+
+
+class TestTrigramIndex:
+    def test_prefix(self):
+        assert sorted(_ids(TrigramIndex.for_tree(_tree()).query('dupo', min_similarity=1))) == [0, 1]
+
+    def test_ranking(self):
+        ids = _ids(TrigramIndex.for_tree(_tree()).query('jean dupont'))
+        assert ids[:2] == [0, 1]
+
+    def test_fuzzy(self):
+        assert _ids(TrigramIndex.for_tree(_tree()).query('martn pierre')) == [2]
+
+    def test_no_match(self):
+        assert _ids(TrigramIndex.for_tree(_tree()).query('xyz')) == []
+
+    def test_empty_query(self):
+        assert _ids(TrigramIndex.for_tree(_tree()).query('')) == []
+
+    def test_batches(self):
+        tree = FamilyTree()
+        for i in range(5):
+            tree.add_person(_person('Dupont', 'Jean'))
+        batches = list(TrigramIndex.for_tree(tree).query('dupont', batch_size=2))
+        assert [len(b) for b in batches] == [2, 2, 1]
+
+    def test_scores_decreasing(self):
+        batches = TrigramIndex.for_tree(_tree()).query('jeanne dupond', min_similarity=0.1)
+        scores = [(m.score, m.person_id) for batch in batches for m in batch]
+        assert scores[0][1] == 1
+        assert len(scores) == 2
+
+    def test_cancelled(self):
+        assert _ids(TrigramIndex.for_tree(_tree()).query('dupont', cancelled=lambda: True)) == []
+
+    def test_incremental_update(self):
+        tree = _tree()
+        index = TrigramIndex.for_tree(tree)
+        tree.update_person(2, _person('Dupuis', 'Pierre'))
+        assert sorted(_ids(index.query('dup', min_similarity=1))) == [0, 1, 2]
+        tree.remove_person(0)
+        assert sorted(_ids(index.query('dup', min_similarity=1))) == [1, 2]
+
+    def test_remove_during_iteration(self):
+        tree = FamilyTree()
+        for name in ('Martin', 'Bartin', 'Marchand', 'Marais'):
+            tree.add_person(_person(name, ''))
+        batches = TrigramIndex.for_tree(tree).query('martin', batch_size=1, min_similarity=0.1)
+        assert _ids([next(batches)]) == [0]
+        # Bartin was collected with the first batch but is scored later
+        tree.remove_person(1)
+        assert sorted(_ids(batches)) == [2, 3]